@@ -0,0 +1,102 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from synap import Network
+from synap.postprocessor import Detector, decode_anchor_free, detect_anchor_free
+from synap.types import Layout, Rect
+
+
+def bench(func, repeat):
+    """
+    Return the mean and min time of a function in ms
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return 1000 * sum(times) / len(times), 1000 * min(times)
+
+
+def print_time(name, mean_min):
+    print(f"{name:<32}: {mean_min[0]:8.3f} ms (min {mean_min[1]:.3f} ms)")
+
+
+def input_rect(network):
+    """
+    Full input rectangle of the network, assuming the image has the input size
+    """
+    tensor = network.inputs[0]
+    shape = tensor.shape
+    if tensor.layout == Layout.nchw:
+        return Rect((0, 0), (shape[3], shape[2]))
+    return Rect((0, 0), (shape[2], shape[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare NumPy and native YOLOv8 detection postprocessing")
+    parser.add_argument('-m', '--model', help='yolov8 synap model, to benchmark the native detector on its outputs')
+    parser.add_argument('-o', '--output', default="tests/data/output_float_0.dat", help='float32 yolov8 output data')
+    parser.add_argument('--shape', default="1,84,5040", help='shape of the output data')
+    parser.add_argument('--image-size', default="640x384", help='image size (WxH) for the output data')
+    parser.add_argument('--input-size', help='box coordinate space (WxH), 1x1 for normalized boxes (default: auto)')
+    parser.add_argument('--score-threshold', type=float, default=0.25, help='minimum detection score')
+    parser.add_argument('--boxes', type=int, default=300, help='random class scores added to the output data')
+    parser.add_argument('-n', '--repeat', type=int, default=100, help='number of runs')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.output):
+        raise FileNotFoundError(f"'{args.output}' not found")
+    shape = tuple(int(dim) for dim in args.shape.split(","))
+    output = np.fromfile(args.output, dtype=np.float32).reshape(shape)
+    image_w, image_h = (int(dim) for dim in args.image_size.split("x"))
+    rect = Rect((0, 0), (image_w, image_h))
+
+    # Random class scores give NMS some work when the recorded output has no detection
+    if args.boxes:
+        rng = np.random.default_rng(0)
+        positions = rng.choice(output.shape[2], args.boxes, replace=False)
+        classes = 4 + rng.integers(0, output.shape[1] - 4, args.boxes)
+        output = output.copy()
+        output[0, classes, positions] = rng.uniform(args.score_threshold, 1.0, args.boxes)
+
+    def get_input_size(output, default):
+        if args.input_size:
+            return tuple(float(dim) for dim in args.input_size.split("x"))
+        # Normalized boxes have all their centers in [0, 1]
+        return (1.0, 1.0) if output[..., :2, :].max() <= 1.0 else default
+
+    input_size = get_input_size(output, None)
+    boxes, _, _ = decode_anchor_free(output, args.score_threshold)
+    result = detect_anchor_free(output, rect, args.score_threshold, input_size=input_size)
+    print("\nOutput data    :", args.output, shape)
+    print(f"Candidates     : {len(boxes)}, detections: {len(result.items)}\n")
+    print_time("numpy decode", bench(lambda: decode_anchor_free(output, args.score_threshold), args.repeat))
+    print_time("numpy detect", bench(lambda: detect_anchor_free(output, rect, args.score_threshold, input_size=input_size), args.repeat))
+
+    if not args.model:
+        return
+    if not os.path.exists(args.model):
+        raise FileNotFoundError(f"'{args.model}' not found")
+    network = Network(args.model)
+    rect = input_rect(network)
+    image = np.random.default_rng(0).integers(0, 255, tuple(network.inputs[0].shape), dtype=np.uint8)
+    outputs = network.predict([image])
+    detector = Detector(score_threshold=args.score_threshold)
+    output = outputs[0].to_numpy()
+    input_size = get_input_size(output, (rect.size.x, rect.size.y))
+    native = detector.process(outputs, rect)
+    result = detect_anchor_free(output, rect, args.score_threshold, input_size=input_size)
+    same = all(np.array_equal(native.as_arrays()[key], result.as_arrays()[key]) for key in ("boxes", "class_index"))
+    print("\nNetwork        :", args.model)
+    print(f"Detections     : native {len(native.items)}, numpy {len(result.items)} ({'same' if same else 'different'} boxes)\n")
+    print_time("native detect", bench(lambda: detector.process(outputs, rect), args.repeat))
+    print_time("numpy detect (incl. to_numpy)", bench(
+        lambda: detect_anchor_free(outputs[0].to_numpy(), rect, args.score_threshold, input_size=input_size), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
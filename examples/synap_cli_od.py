@@ -23,20 +23,20 @@ def main():
     print("\nNetwork        :", args.model)
     print("Input          :", args.input)
 
-    time_pre = time.time()
+    time_pre = time.perf_counter()
     assigned_rect = preprocessor.assign(network.inputs, args.input)
-    time_pre = 1000 * (time.time() - time_pre)
+    time_pre = 1000 * (time.perf_counter() - time_pre)
 
-    time_inf = time.time()
+    time_inf = time.perf_counter()
     outputs = network.predict()
-    time_inf = 1000 * (time.time() - time_inf)
+    time_inf = 1000 * (time.perf_counter() - time_inf)
 
-    time_post = time.time()
+    time_post = time.perf_counter()
     result = detector.process(outputs, assigned_rect)
-    time_post = 1000 * (time.time() - time_post)
+    time_post = 1000 * (time.perf_counter() - time_post)
 
     print(f"Detection time : {time_pre + time_inf + time_post:.3f} ms ", end="")
-    print(f"(pre: {1000 * time_pre:.3f} us, inf: {1000 * time_inf:.3f} us, post: {1000 * time_post:.3f} us)\n")
+    print(f"(pre: {time_pre:.3f} ms, inf: {time_inf:.3f} ms, post: {time_post:.3f} ms)\n")
 
     print("#   Score  Class   Position        Size  Description     Landmarks")
     for i, item in enumerate(result.items):
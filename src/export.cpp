@@ -3,6 +3,7 @@
 
 #include <pybind11/pybind11.h>
 
+#include "export_metrics.cpp"
 #include "export_preprocessor.cpp"
 #include "export_postprocessor.cpp"
 #include "export_tensor.cpp"
@@ -21,4 +22,5 @@ PYBIND11_MODULE(_synap, m)
     export_tensors(m);
     export_preprocessor(m);
     export_postprocessor(m);
+    export_metrics(m);
 }
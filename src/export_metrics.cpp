@@ -0,0 +1,127 @@
+// SPDX-License-Identifier: Apache-2.0
+// SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+#include <cstdlib>
+#include <cstring>
+#include <string>
+
+#include <pybind11/pybind11.h>
+
+#include "export_metrics.hpp"
+
+namespace py = pybind11;
+
+/// Quantiles reported for each histogram
+static const double metrics_quantiles[] = {0.5, 0.95, 0.99};
+
+static py::dict metrics_labels(const metrics::Family& family, const std::string& value)
+{
+    py::dict labels;
+    if (!family.label.empty()) {
+        labels[py::str(family.label)] = value;
+    }
+    return labels;
+}
+
+/// Get the current value of all the metrics, durations in seconds
+static py::list metrics_snapshot()
+{
+    py::list families;
+    metrics::Registry::instance().visit([&](const std::string& name, const metrics::Family& family) {
+        py::list samples;
+        for (const auto& [value, counter] : family.counters) {
+            py::dict sample;
+            sample["labels"] = metrics_labels(family, value);
+            sample["value"] = counter->value();
+            samples.append(sample);
+        }
+        for (const auto& [value, histogram] : family.histograms) {
+            const metrics::Histogram::Snapshot snapshot = histogram->snapshot();
+            py::dict quantiles;
+            for (double q : metrics_quantiles) {
+                quantiles[py::float_(q)] = snapshot.quantile(q) * 1e-9;
+            }
+            py::dict sample;
+            sample["labels"] = metrics_labels(family, value);
+            sample["count"] = snapshot.count;
+            sample["sum"] = snapshot.sum * 1e-9;
+            sample["max"] = snapshot.max * 1e-9;
+            sample["quantiles"] = quantiles;
+            samples.append(sample);
+        }
+        py::dict f;
+        f["name"] = name;
+        f["type"] = family.type == metrics::MetricType::counter ? "counter" : "summary";
+        f["help"] = family.help;
+        f["samples"] = samples;
+        families.append(f);
+    });
+    return families;
+}
+
+static void export_metrics(py::module_& m)
+{
+    auto metrics_module = m.def_submodule("metrics", "SyNAP runtime metrics");
+
+    // Register the metrics not specific to a network, so that they are always exported
+    metrics::tensor_assign_seconds();
+    metrics::tensor_assign_bytes();
+    metrics::to_numpy_seconds();
+    metrics::to_numpy_bytes();
+    metrics::dequantize_seconds();
+    metrics::dequantize_cache_hits();
+    metrics::preprocess_seconds();
+    metrics::classifier_seconds();
+    metrics::classifier_batch_seconds();
+    metrics::detector_seconds();
+    metrics::detector_batch_seconds();
+
+    // Allow enabling metrics without code changes
+    const char* env = std::getenv("SYNAP_METRICS");
+    if (env && *env && std::strcmp(env, "0") != 0) {
+        metrics::enabled_flag() = true;
+    }
+
+    metrics_module.def(
+        "enable",
+        [](bool enabled) {
+            metrics::enabled_flag() = enabled;
+        },
+        py::arg("enabled") = true,
+        "Enable or disable the recording of metrics, they are disabled by default unless the SYNAP_METRICS environment variable is set"
+    );
+    metrics_module.def(
+        "disable",
+        []() {
+            metrics::enabled_flag() = false;
+        },
+        "Disable the recording of metrics, the recorded values are kept"
+    );
+    metrics_module.def(
+        "enabled",
+        &metrics::enabled,
+        "Check if metrics are being recorded"
+    );
+    metrics_module.def(
+        "reset",
+        []() {
+            metrics::Registry::instance().reset();
+        },
+        "Reset all the recorded values to zero"
+    );
+    metrics_module.def(
+        "snapshot",
+        &metrics_snapshot,
+        R"doc(
+        Get the current value of all the metrics.
+
+        Each metric family is a dict with ``name``, ``type`` (``"counter"`` or
+        ``"summary"``), ``help`` and ``samples``. Each sample has ``labels``
+        and either the ``value`` of a counter, or the ``count``, ``sum``,
+        ``max`` and ``quantiles`` (0.5, 0.95 and 0.99) of the recorded
+        durations in seconds.
+
+        :rtype: list[dict]
+        )doc"
+    );
+}
@@ -0,0 +1,350 @@
+// SPDX-License-Identifier: Apache-2.0
+// SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+#pragma once
+
+#include <array>
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <utility>
+#include <vector>
+
+namespace metrics {
+
+/// Monotonic clock used for all the measurements
+using Clock = std::chrono::steady_clock;
+
+/// Global switch, metrics are only recorded when enabled
+inline std::atomic<bool>& enabled_flag()
+{
+    static std::atomic<bool> flag{false};
+    return flag;
+}
+
+inline bool enabled()
+{
+    return enabled_flag().load(std::memory_order_relaxed);
+}
+
+/// Monotonic counter
+class Counter {
+public:
+    void add(uint64_t value)
+    {
+        _value.fetch_add(value, std::memory_order_relaxed);
+    }
+
+    uint64_t value() const
+    {
+        return _value.load(std::memory_order_relaxed);
+    }
+
+    void reset()
+    {
+        _value.store(0, std::memory_order_relaxed);
+    }
+
+private:
+    std::atomic<uint64_t> _value{0};
+};
+
+/// Lock-free histogram of durations in nanoseconds.
+/// Values are counted in log-linear buckets, 8 per power of two, so quantiles
+/// are estimated with a relative error below 7%.
+class Histogram {
+public:
+    static constexpr int sub_bits = 3;
+    static constexpr size_t sub_count = 1 << sub_bits;
+    static constexpr size_t bucket_count = (64 - sub_bits + 1) * sub_count;
+
+    struct Snapshot {
+        uint64_t count{};
+        uint64_t sum{};
+        uint64_t max{};
+        std::array<uint64_t, bucket_count> buckets{};
+
+        /// Estimate the value at quantile q in [0, 1], 0 if there are no values
+        uint64_t quantile(double q) const
+        {
+            if (count == 0) {
+                return 0;
+            }
+            uint64_t rank = std::max<uint64_t>(1, static_cast<uint64_t>(q * count + 0.5));
+            uint64_t seen = 0;
+            for (size_t i = 0; i < bucket_count; ++i) {
+                seen += buckets[i];
+                if (seen >= rank) {
+                    return std::min(bucket_middle(i), max);
+                }
+            }
+            return max;
+        }
+    };
+
+    void record(uint64_t value)
+    {
+        _buckets[bucket_index(value)].fetch_add(1, std::memory_order_relaxed);
+        _sum.fetch_add(value, std::memory_order_relaxed);
+        uint64_t max = _max.load(std::memory_order_relaxed);
+        while (value > max && !_max.compare_exchange_weak(max, value, std::memory_order_relaxed)) {
+        }
+    }
+
+    void record(Clock::duration duration)
+    {
+        record(static_cast<uint64_t>(std::chrono::duration_cast<std::chrono::nanoseconds>(duration).count()));
+    }
+
+    Snapshot snapshot() const
+    {
+        Snapshot s;
+        for (size_t i = 0; i < bucket_count; ++i) {
+            s.buckets[i] = _buckets[i].load(std::memory_order_relaxed);
+            s.count += s.buckets[i];
+        }
+        s.sum = _sum.load(std::memory_order_relaxed);
+        s.max = _max.load(std::memory_order_relaxed);
+        return s;
+    }
+
+    void reset()
+    {
+        for (auto& bucket : _buckets) {
+            bucket.store(0, std::memory_order_relaxed);
+        }
+        _sum.store(0, std::memory_order_relaxed);
+        _max.store(0, std::memory_order_relaxed);
+    }
+
+    static size_t bucket_index(uint64_t value)
+    {
+        if (value < sub_count) {
+            return value;
+        }
+        const int msb = 63 - __builtin_clzll(value);
+        const int shift = msb - sub_bits;
+        return (shift + 1) * sub_count + ((value >> shift) & (sub_count - 1));
+    }
+
+    static uint64_t bucket_middle(size_t index)
+    {
+        if (index < sub_count) {
+            return index;
+        }
+        const int shift = index / sub_count - 1;
+        const uint64_t lower = (sub_count + index % sub_count) << shift;
+        return lower + ((uint64_t{1} << shift) >> 1);
+    }
+
+private:
+    std::array<std::atomic<uint64_t>, bucket_count> _buckets{};
+    std::atomic<uint64_t> _sum{0};
+    std::atomic<uint64_t> _max{0};
+};
+
+enum class MetricType { counter, summary };
+
+/// Metrics with the same name, one per label value
+struct Family {
+    MetricType type;
+    std::string help;
+    std::string label;
+    std::map<std::string, std::unique_ptr<Counter>> counters;
+    std::map<std::string, std::unique_ptr<Histogram>> histograms;
+};
+
+/// Process-wide registry of all the metrics.
+/// Metrics are never deleted, so references to them stay valid.
+class Registry {
+public:
+    static Registry& instance()
+    {
+        static Registry registry;
+        return registry;
+    }
+
+    Counter& counter(const std::string& name, const std::string& help, const std::string& label = "", const std::string& value = "")
+    {
+        std::lock_guard<std::mutex> lock(_mutex);
+        auto& metric = family(name, MetricType::counter, help, label).counters[value];
+        if (!metric) {
+            metric = std::make_unique<Counter>();
+        }
+        return *metric;
+    }
+
+    Histogram& histogram(const std::string& name, const std::string& help, const std::string& label = "", const std::string& value = "")
+    {
+        std::lock_guard<std::mutex> lock(_mutex);
+        auto& metric = family(name, MetricType::summary, help, label).histograms[value];
+        if (!metric) {
+            metric = std::make_unique<Histogram>();
+        }
+        return *metric;
+    }
+
+    /// Call fn(name, family) for each metric family in name order, with the registry locked
+    template <typename Fn>
+    void visit(Fn&& fn) const
+    {
+        std::lock_guard<std::mutex> lock(_mutex);
+        for (const auto& [name, family] : _families) {
+            fn(name, family);
+        }
+    }
+
+    void reset()
+    {
+        std::lock_guard<std::mutex> lock(_mutex);
+        for (auto& [name, family] : _families) {
+            for (auto& [value, counter] : family.counters) {
+                counter->reset();
+            }
+            for (auto& [value, histogram] : family.histograms) {
+                histogram->reset();
+            }
+        }
+    }
+
+private:
+    Family& family(const std::string& name, MetricType type, const std::string& help, const std::string& label)
+    {
+        auto it = _families.find(name);
+        if (it == _families.end()) {
+            it = _families.emplace(name, Family{type, help, label, {}, {}}).first;
+        }
+        return it->second;
+    }
+
+    mutable std::mutex _mutex;
+    std::map<std::string, Family> _families;
+};
+
+/// Record the duration of a scope, if metrics were enabled when it started
+class ScopedTimer {
+public:
+    explicit ScopedTimer(Histogram& histogram)
+    :
+    _histogram(enabled() ? &histogram : nullptr),
+    _start(_histogram ? Clock::now() : Clock::time_point())
+    {}
+
+    ScopedTimer(const ScopedTimer&) = delete;
+    ScopedTimer& operator=(const ScopedTimer&) = delete;
+
+    ~ScopedTimer()
+    {
+        if (_histogram) {
+            _histogram->record(Clock::now() - _start);
+        }
+    }
+
+private:
+    Histogram* _histogram;
+    Clock::time_point _start;
+};
+
+/// Metrics of the networks with the same label
+struct NetworkMetrics {
+    Histogram& predict_seconds;
+    Counter& inferences;
+    Counter& errors;
+
+    static const NetworkMetrics& get(const std::string& label)
+    {
+        static std::mutex mutex;
+        static std::map<std::string, std::unique_ptr<NetworkMetrics>> instances;
+        std::lock_guard<std::mutex> lock(mutex);
+        auto& metrics = instances[label];
+        if (!metrics) {
+            Registry& r = Registry::instance();
+            metrics.reset(new NetworkMetrics{
+                r.histogram("synap_predict_seconds", "Network inference latency", "network", label),
+                r.counter("synap_inferences_total", "Successful network inferences", "network", label),
+                r.counter("synap_inference_errors_total", "Failed network inferences", "network", label),
+            });
+        }
+        return *metrics;
+    }
+};
+
+inline Histogram& tensor_assign_seconds()
+{
+    static Histogram& h = Registry::instance().histogram("synap_tensor_assign_seconds", "Time to copy data to a tensor");
+    return h;
+}
+
+inline Counter& tensor_assign_bytes()
+{
+    static Counter& c = Registry::instance().counter("synap_tensor_assign_bytes_total", "Bytes copied to tensors");
+    return c;
+}
+
+inline Histogram& to_numpy_seconds()
+{
+    static Histogram& h = Registry::instance().histogram("synap_to_numpy_seconds", "Time to get the dequantized data of a tensor");
+    return h;
+}
+
+inline Counter& to_numpy_bytes()
+{
+    static Counter& c = Registry::instance().counter("synap_to_numpy_bytes_total", "Bytes of float data produced by dequantization");
+    return c;
+}
+
+inline Histogram& dequantize_seconds()
+{
+    static Histogram& h = Registry::instance().histogram("synap_dequantize_seconds", "Time to dequantize the data of a tensor, not recorded when cached");
+    return h;
+}
+
+inline Counter& dequantize_cache_hits()
+{
+    static Counter& c = Registry::instance().counter("synap_dequantize_cache_hits_total", "Output dequantizations skipped because the data of the same inference was cached");
+    return c;
+}
+
+inline Histogram& preprocess_seconds()
+{
+    static Histogram& h = Registry::instance().histogram("synap_preprocess_seconds", "Preprocessor assign latency");
+    return h;
+}
+
+inline Histogram& classifier_seconds()
+{
+    static Histogram& h = Registry::instance().histogram("synap_postprocess_seconds", "Postprocessor process latency", "postprocessor", "classifier");
+    return h;
+}
+
+inline Histogram& classifier_batch_seconds()
+{
+    static Histogram& h = Registry::instance().histogram("synap_postprocess_batch_seconds", "Postprocessor process_batch latency", "postprocessor", "classifier");
+    return h;
+}
+
+inline Histogram& detector_seconds()
+{
+    static Histogram& h = Registry::instance().histogram("synap_postprocess_seconds", "Postprocessor process latency", "postprocessor", "detector");
+    return h;
+}
+
+inline Histogram& detector_batch_seconds()
+{
+    static Histogram& h = Registry::instance().histogram("synap_postprocess_batch_seconds", "Postprocessor process_batch latency", "postprocessor", "detector");
+    return h;
+}
+
+/// Add a value to a counter if metrics are enabled
+inline void count(Counter& counter, uint64_t value)
+{
+    if (enabled()) {
+        counter.add(value);
+    }
+}
+
+}  // namespace metrics
@@ -0,0 +1,222 @@
+// SPDX-License-Identifier: Apache-2.0
+// SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+#pragma once
+
+#include <atomic>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <vector>
+#include "synap/buffer.hpp"
+#include "synap/tensor.hpp"
+#include "synap/types.hpp"
+#include "export_metrics.hpp"
+
+#include <pybind11/pybind11.h>
+
+namespace py = pybind11;
+
+using namespace synaptics::synap;
+
+/// Conversion of an array assigned to an input tensor: per-channel normalization
+/// value = (x * scale - mean[c]) / std[c], optional swap of the R and B channels and
+/// transposition from the layout of the data to the layout of the tensor
+struct InputConversion {
+    std::vector<float> mean;
+    std::vector<float> std;
+    float scale{1.0f};
+    bool swap_rb{false};
+    /// Layout of the data, none for the layout of the tensor
+    Layout layout{Layout::none};
+
+    bool empty() const
+    {
+        return mean.empty() && std.empty() && scale == 1.0f && !swap_rb && layout == Layout::none;
+    }
+};
+
+/// Attributes of the input and output tensors of a model, as in its metadata
+struct ModelAttributes {
+    std::vector<TensorAttributes> inputs;
+    std::vector<TensorAttributes> outputs;
+};
+
+/// State shared between a network and the tensors it owns
+struct NetworkState {
+    /// Incremented after each successful inference
+    std::atomic<uint64_t> generation{0};
+
+    /// Incremented each time a model is loaded, the tensors of the previous model are destroyed
+    std::atomic<uint64_t> model_loads{0};
+
+    /// Python buffers set to the network tensors, kept alive as long as the network uses them.
+    /// Only accessed with the GIL held.
+    std::unordered_map<const Tensor*, py::object> buffers;
+
+    /// Dequantized data of an output tensor and the inference generation it belongs to
+    struct Dequantized {
+        uint64_t generation;
+        const float* data;
+    };
+
+    /// Dequantized data of the output tensors, valid until the next inference
+    std::unordered_map<const Tensor*, Dequantized> dequantized;
+    std::mutex dequantized_mutex;
+
+    /// Cached dequantized data of a tensor for the given generation, null if none
+    const float* cached_float(const Tensor* t, uint64_t gen)
+    {
+        std::lock_guard<std::mutex> lock(dequantized_mutex);
+        auto it = dequantized.find(t);
+        return it != dequantized.end() && it->second.generation == gen ? it->second.data : nullptr;
+    }
+
+    void cache_float(const Tensor* t, uint64_t gen, const float* data)
+    {
+        std::lock_guard<std::mutex> lock(dequantized_mutex);
+        dequantized[t] = Dequantized{gen, data};
+    }
+
+    /// Invalidate the cached data of a tensor, or of all tensors if null
+    void invalidate_float(const Tensor* t = nullptr)
+    {
+        std::lock_guard<std::mutex> lock(dequantized_mutex);
+        if (t) {
+            dequantized.erase(t);
+        } else {
+            dequantized.clear();
+        }
+    }
+
+    /// Conversion of the arrays assigned to each input by predict(), only accessed with the GIL held
+    std::vector<InputConversion> input_conversions;
+
+    /// Attributes of the tensors of the loaded model, empty if they could not be read.
+    /// Written when a model is loaded, used to create detached tensors.
+    ModelAttributes attributes;
+
+    /// Label of the network in the metrics, "unnamed" until set or a model file is loaded.
+    /// The default is shared so that networks created repeatedly do not add label values without bound.
+    std::string metrics_label{"unnamed"};
+    bool metrics_label_set{false};
+    std::mutex metrics_mutex;
+
+    /// Metrics of the network, looked up on first use after the label changes
+    std::atomic<const metrics::NetworkMetrics*> metrics{nullptr};
+
+    const metrics::NetworkMetrics& get_metrics()
+    {
+        const metrics::NetworkMetrics* m = metrics.load(std::memory_order_acquire);
+        if (!m) {
+            std::lock_guard<std::mutex> lock(metrics_mutex);
+            m = &metrics::NetworkMetrics::get(metrics_label);
+            metrics.store(m, std::memory_order_release);
+        }
+        return *m;
+    }
+
+    std::string get_metrics_label()
+    {
+        std::lock_guard<std::mutex> lock(metrics_mutex);
+        return metrics_label;
+    }
+
+    void set_metrics_label(const std::string& label, bool user_defined)
+    {
+        std::lock_guard<std::mutex> lock(metrics_mutex);
+        if (user_defined || !metrics_label_set) {
+            metrics_label = label;
+            metrics_label_set = user_defined;
+            metrics.store(nullptr, std::memory_order_release);
+        }
+    }
+};
+
+/// Information about a tensor owned by a network
+struct TensorState {
+    std::shared_ptr<NetworkState> network;
+    bool is_input;
+    /// Buffer allocated by the tensor itself, used again when a user buffer is unset
+    Buffer* default_buffer;
+};
+
+/// Tensors owned by a network, so that they can find their network state
+class TensorRegistry {
+public:
+    /// Get the state of a tensor, with a null network if the tensor doesn't belong to a network
+    static TensorState get(const Tensor& tensor)
+    {
+        std::lock_guard<std::mutex> lock(mutex());
+        auto it = tensors().find(&tensor);
+        return it == tensors().end() ? TensorState{nullptr, false, nullptr} : it->second;
+    }
+
+    static void add(const Tensor& tensor, TensorState state)
+    {
+        std::lock_guard<std::mutex> lock(mutex());
+        tensors()[&tensor] = std::move(state);
+    }
+
+    static void remove(const Tensor& tensor)
+    {
+        std::lock_guard<std::mutex> lock(mutex());
+        tensors().erase(&tensor);
+    }
+
+private:
+    static std::mutex& mutex()
+    {
+        static std::mutex mutex;
+        return mutex;
+    }
+
+    static std::unordered_map<const Tensor*, TensorState>& tensors()
+    {
+        static std::unordered_map<const Tensor*, TensorState> tensors;
+        return tensors;
+    }
+};
+
+/// Get the dequantized data of a tensor, see Tensor::as_float().
+/// The output tensors of a network are dequantized at most once per inference, the
+/// data stays cached in the tensor until the next inference. Can be called without the GIL.
+static inline const float* dequantized_data(const Tensor& t)
+{
+    if (t.data_type() == DataType::float32) {
+        return t.as_float();
+    }
+    const TensorState state = TensorRegistry::get(t);
+    // Inputs can be modified without inference, they are not cached
+    const bool cached = state.network && !state.is_input;
+    const uint64_t gen = cached ? state.network->generation.load() : 0;
+    if (cached) {
+        if (const float* data = state.network->cached_float(&t, gen)) {
+            metrics::count(metrics::dequantize_cache_hits(), 1);
+            return data;
+        }
+    }
+    const float* data;
+    {
+        metrics::ScopedTimer timer(metrics::dequantize_seconds());
+        data = t.as_float();
+    }
+    if (data) {
+        if (cached) {
+            state.network->cache_float(&t, gen, data);
+        }
+        metrics::count(metrics::to_numpy_bytes(), t.item_count() * sizeof(float));
+    }
+    return data;
+}
+
+/// Invalidate the cached dequantized data of a tensor when its data is modified without inference
+static inline void invalidate_dequantized(const Tensor& t)
+{
+    const TensorState state = TensorRegistry::get(t);
+    if (state.network) {
+        state.network->invalidate_float(&t);
+    }
+}
+
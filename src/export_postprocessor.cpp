@@ -1,18 +1,26 @@
 // SPDX-License-Identifier: Apache-2.0
 // SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
 
+#include <algorithm>
 #include <memory>
+#include <optional>
+#include <thread>
 #include <vector>
 #include "synap/classifier.hpp"
 #include "synap/detector.hpp"
+#include "synap/metadata.hpp"
 #include "synap/tensor.hpp"
 #include "synap/network.hpp"
 #include "synap/types.hpp"
 
 #include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
 #include <pybind11/stl_bind.h>
 #include <pybind11/stl.h>
 
+#include "export_metrics.hpp"
+#include "export_network.hpp"
+
 namespace py = pybind11;
 
 using namespace std;
@@ -22,6 +30,317 @@ using namespace synaptics::synap;
 PYBIND11_MAKE_OPAQUE(vector<Detector::Result::Item>);
 PYBIND11_MAKE_OPAQUE(vector<Classifier::Result::Item>);
 
+namespace {
+
+/// Run fn(index) for each index in [0, count) on up to n_threads threads (0: one per CPU core)
+template <typename Fn>
+void parallel_for(size_t count, size_t n_threads, Fn&& fn)
+{
+    if (n_threads == 0) {
+        n_threads = std::max(1u, std::thread::hardware_concurrency());
+    }
+    n_threads = std::min(n_threads, count);
+    if (n_threads <= 1) {
+        for (size_t i = 0; i < count; ++i) {
+            fn(0, i);
+        }
+        return;
+    }
+    std::vector<std::thread> threads;
+    threads.reserve(n_threads - 1);
+    for (size_t t = 1; t < n_threads; ++t) {
+        threads.emplace_back([&, t]() {
+            for (size_t i = t; i < count; i += n_threads) {
+                fn(t, i);
+            }
+        });
+    }
+    for (size_t i = 0; i < count; i += n_threads) {
+        fn(0, i);
+    }
+    for (auto& thread : threads) {
+        thread.join();
+    }
+}
+
+/// Network outputs whose tensors have a batch dimension, split into elements with a batch size of 1
+/// for the framework postprocessors, which only support one element.
+class BatchedOutputs {
+public:
+    /// Dequantize the outputs, must be called before processing the elements in parallel.
+    /// Network outputs are dequantized once per inference, like Tensor.to_numpy().
+    /// The batch size is the first dimension of the first tensor, 0 if there is no tensor.
+    explicit BatchedOutputs(const Tensors& outputs)
+    :
+    _outputs(outputs)
+    {
+        if (outputs.size() == 0) {
+            return;
+        }
+        const Shape& shape = outputs[0].shape();
+        _batch = shape.empty() ? 1 : shape[0];
+        if (_batch <= 0) {
+            throw std::invalid_argument("Invalid batch dimension");
+        }
+        for (const Tensor& tensor : outputs) {
+            const float* data = dequantized_data(tensor);
+            if (!data) {
+                throw std::runtime_error("Tensor data not available");
+            }
+            _data.push_back(data);
+        }
+    }
+
+    size_t size() const
+    {
+        return _batch;
+    }
+
+    /// Call fn(element_outputs) for an element.
+    /// The tensors whose first dimension is the batch size are sliced, the others are used whole.
+    /// Without a batch the outputs are used directly, otherwise the element tensors hold a float32
+    /// copy of the dequantized data, as the quantization of the outputs is not exposed.
+    template <typename Result, typename Fn>
+    Result process(size_t index, Fn&& fn) const
+    {
+        if (_batch == 1) {
+            return fn(_outputs);
+        }
+        std::vector<Tensor> tensors;
+        // Tensors cannot be moved, the vector must never be reallocated
+        tensors.reserve(_outputs.size());
+        for (size_t i = 0; i < _outputs.size(); ++i) {
+            const Tensor& src = _outputs[i];
+            TensorAttributes attr;
+            attr.name = src.name();
+            attr.dtype = DataType::float32;
+            attr.layout = src.layout();
+            attr.security = src.security();
+            attr.shape = src.shape();
+            attr.format = src.format();
+            size_t count = src.item_count();
+            const float* data = _data[i];
+            if (!attr.shape.empty() && attr.shape[0] == static_cast<int32_t>(_batch)) {
+                attr.shape[0] = 1;
+                count /= _batch;
+                data += index * count;
+            }
+            tensors.emplace_back(nullptr, static_cast<int32_t>(i), Tensor::Type::none, &attr);
+            if (!tensors.back().assign(static_cast<const void*>(data), count * sizeof(float))) {
+                return Result{};
+            }
+        }
+        Tensors element(tensors);
+        return fn(element);
+    }
+
+private:
+    const Tensors& _outputs;
+    size_t _batch{};
+    std::vector<const float*> _data;
+};
+
+/// Classifier remembering its parameters, with batch support
+class ClassifierWrapper : public Classifier {
+public:
+    ClassifierWrapper(size_t top_count = 1)
+    :
+    Classifier(top_count),
+    _top_count(top_count)
+    {}
+
+    /// Classify each element along the first dimension of the outputs, must be called with the GIL released
+    std::vector<Classifier::Result> process_batch(const Tensors& outputs, size_t n_threads) const
+    {
+        const BatchedOutputs batched(outputs);
+        std::vector<Classifier::Result> results(batched.size());
+        parallel_for(batched.size(), n_threads, [&](size_t, size_t b) {
+            // Classifier::process is not const, use an instance per element
+            Classifier classifier(_top_count);
+            results[b] = batched.process<Classifier::Result>(b, [&](const Tensors& element) {
+                return classifier.process(element);
+            });
+        });
+        return results;
+    }
+
+private:
+    size_t _top_count;
+};
+
+/// Detector remembering its parameters, with batch support
+class DetectorWrapper : public Detector {
+public:
+    DetectorWrapper(float score_threshold = 0.5, int n_max = 0, bool nms = true, float iou_threshold = 0.5, bool iou_with_min = false)
+    :
+    Detector(score_threshold, n_max, nms, iou_threshold, iou_with_min),
+    _score_threshold(score_threshold),
+    _n_max(n_max),
+    _nms(nms),
+    _iou_threshold(iou_threshold),
+    _iou_with_min(iou_with_min)
+    {}
+
+    /// Detect objects in each element along the first dimension of the outputs, must be called with the GIL released.
+    /// Detector instances are not thread-safe, each thread uses its own one.
+    std::vector<Detector::Result> process_batch(const Tensors& outputs, const std::vector<Rect>& assigned_rects, size_t n_threads)
+    {
+        const BatchedOutputs batched(outputs);
+        if (assigned_rects.size() != batched.size()) {
+            throw std::invalid_argument("One assigned rect expected per batch element");
+        }
+        std::vector<Detector::Result> results(batched.size());
+        if (n_threads == 0) {
+            n_threads = std::max(1u, std::thread::hardware_concurrency());
+        }
+        n_threads = std::min(n_threads, batched.size());
+        while (_workers.size() + 1 < n_threads) {
+            _workers.push_back(std::make_unique<Detector>(_score_threshold, _n_max, _nms, _iou_threshold, _iou_with_min));
+        }
+        parallel_for(batched.size(), n_threads, [&](size_t t, size_t b) {
+            Detector& detector = t == 0 ? static_cast<Detector&>(*this) : *_workers[t - 1];
+            results[b] = batched.process<Detector::Result>(b, [&](const Tensors& element) {
+                return detector.process(element, assigned_rects[b]);
+            });
+        });
+        return results;
+    }
+
+private:
+    float _score_threshold;
+    int _n_max;
+    bool _nms;
+    float _iou_threshold;
+    bool _iou_with_min;
+    std::vector<std::unique_ptr<Detector>> _workers;
+};
+
+}  // namespace
+
+/// Convert classification results to NumPy arrays in a single pass
+static py::dict classifier_result_arrays(const Classifier::Result& result)
+{
+    const auto& items = result.items;
+    const py::ssize_t n = items.size();
+    py::array_t<int32_t> class_index(n);
+    py::array_t<float> scores(n);
+    int32_t* class_index_ptr = class_index.mutable_data();
+    float* scores_ptr = scores.mutable_data();
+    for (py::ssize_t i = 0; i < n; ++i) {
+        class_index_ptr[i] = items[i].class_index;
+        scores_ptr[i] = items[i].confidence;
+    }
+    py::dict arrays;
+    arrays["class_index"] = class_index;
+    arrays["scores"] = scores;
+    return arrays;
+}
+
+/// Convert detection results to NumPy arrays in a single pass
+static py::dict detector_result_arrays(const Detector::Result& result)
+{
+    const auto& items = result.items;
+    const py::ssize_t n = items.size();
+    py::ssize_t n_landmarks = 0;
+    for (const auto& item : items) {
+        n_landmarks = std::max(n_landmarks, static_cast<py::ssize_t>(item.landmarks.size()));
+    }
+    py::array_t<int32_t> boxes({n, py::ssize_t{4}});
+    py::array_t<float> scores(n);
+    py::array_t<int32_t> class_index(n);
+    py::array_t<int32_t> landmarks({n, n_landmarks, py::ssize_t{3}});
+    py::array_t<float> visibility({n, n_landmarks});
+    int32_t* boxes_ptr = boxes.mutable_data();
+    float* scores_ptr = scores.mutable_data();
+    int32_t* class_index_ptr = class_index.mutable_data();
+    int32_t* landmarks_ptr = landmarks.mutable_data();
+    float* visibility_ptr = visibility.mutable_data();
+    for (py::ssize_t i = 0; i < n; ++i) {
+        const auto& item = items[i];
+        const Rect& bb = item.bounding_box;
+        boxes_ptr[4 * i + 0] = bb.origin.x;
+        boxes_ptr[4 * i + 1] = bb.origin.y;
+        boxes_ptr[4 * i + 2] = bb.size.x;
+        boxes_ptr[4 * i + 3] = bb.size.y;
+        scores_ptr[i] = item.confidence;
+        class_index_ptr[i] = item.class_index;
+        // Items with fewer landmarks than the others are padded with zeros and visibility -1
+        for (py::ssize_t k = 0; k < n_landmarks; ++k) {
+            int32_t* lm = landmarks_ptr + 3 * (i * n_landmarks + k);
+            if (k < static_cast<py::ssize_t>(item.landmarks.size())) {
+                const Landmark& landmark = item.landmarks[k];
+                lm[0] = landmark.x;
+                lm[1] = landmark.y;
+                lm[2] = landmark.z;
+                visibility_ptr[i * n_landmarks + k] = landmark.visibility;
+            } else {
+                lm[0] = lm[1] = lm[2] = 0;
+                visibility_ptr[i * n_landmarks + k] = -1.0f;
+            }
+        }
+    }
+    py::dict arrays;
+    arrays["boxes"] = boxes;
+    arrays["scores"] = scores;
+    arrays["class_index"] = class_index;
+    arrays["landmarks"] = landmarks;
+    arrays["landmark_visibility"] = visibility;
+    return arrays;
+}
+
+/// Create detection results from NumPy arrays, the inverse of detector_result_arrays()
+static Detector::Result detector_result_from_arrays(
+    py::array_t<int32_t, py::array::c_style | py::array::forcecast> boxes,
+    py::array_t<float, py::array::c_style | py::array::forcecast> scores,
+    py::array_t<int32_t, py::array::c_style | py::array::forcecast> class_index,
+    std::optional<py::array_t<int32_t, py::array::c_style | py::array::forcecast>> landmarks,
+    std::optional<py::array_t<float, py::array::c_style | py::array::forcecast>> visibility)
+{
+    const py::ssize_t n = scores.size();
+    if (boxes.ndim() != 2 || boxes.shape(0) != n || boxes.shape(1) != 4) {
+        throw std::invalid_argument("boxes must have shape (N, 4)");
+    }
+    if (scores.ndim() != 1 || class_index.ndim() != 1 || class_index.shape(0) != n) {
+        throw std::invalid_argument("scores and class_index must have shape (N,)");
+    }
+    py::ssize_t n_landmarks = 0;
+    if (landmarks) {
+        if (landmarks->ndim() != 3 || landmarks->shape(0) != n || landmarks->shape(2) != 3) {
+            throw std::invalid_argument("landmarks must have shape (N, K, 3)");
+        }
+        n_landmarks = landmarks->shape(1);
+        if (visibility && (visibility->ndim() != 2 || visibility->shape(0) != n || visibility->shape(1) != n_landmarks)) {
+            throw std::invalid_argument("landmark_visibility must have shape (N, K)");
+        }
+    }
+    const int32_t* boxes_ptr = boxes.data();
+    const float* scores_ptr = scores.data();
+    const int32_t* class_index_ptr = class_index.data();
+    const int32_t* landmarks_ptr = landmarks ? landmarks->data() : nullptr;
+    const float* visibility_ptr = landmarks && visibility ? visibility->data() : nullptr;
+
+    Detector::Result result;
+    result.success = true;
+    result.items.resize(n);
+    for (py::ssize_t i = 0; i < n; ++i) {
+        auto& item = result.items[i];
+        item.bounding_box.origin = {boxes_ptr[4 * i + 0], boxes_ptr[4 * i + 1]};
+        item.bounding_box.size = {boxes_ptr[4 * i + 2], boxes_ptr[4 * i + 3]};
+        item.confidence = scores_ptr[i];
+        item.class_index = class_index_ptr[i];
+        for (py::ssize_t k = 0; k < n_landmarks; ++k) {
+            const float lm_visibility = visibility_ptr ? visibility_ptr[i * n_landmarks + k] : -1.0f;
+            const int32_t* lm = landmarks_ptr + 3 * (i * n_landmarks + k);
+            // Landmarks padded by detector_result_arrays() are dropped
+            if (visibility_ptr && lm_visibility == -1.0f && !lm[0] && !lm[1] && !lm[2]) {
+                continue;
+            }
+            item.landmarks.push_back(Landmark{lm[0], lm[1], lm[2], lm_visibility});
+        }
+    }
+    return result;
+}
+
 static void export_postprocessor(py::module_& m)
 {
     auto postprocessor = m.def_submodule("postprocessor", "SyNAP postprocessor");
@@ -54,19 +373,51 @@ static void export_postprocessor(py::module_& m)
     .def(py::init<>())
     .def_readonly("success", &Classifier::Result::success)
     .def_readonly("items", &Classifier::Result::items)
+    .def(
+        "as_arrays",
+        &classifier_result_arrays,
+        R"doc(
+        Get all the results as NumPy arrays, without creating a Python object per item.
+
+        :return: dict with ``class_index`` (N,) int32 and ``scores`` (N,) float32 arrays.
+        :rtype: dict[str, numpy.ndarray]
+        )doc"
+    )
     ;
 
     /* Classifier */
-    py::class_<Classifier>(postprocessor, "Classifier")
+    py::class_<ClassifierWrapper>(postprocessor, "Classifier")
     .def(
         py::init<size_t>(),
         py::arg("top_count") = 1
     )
     .def(
         "process",
-        &Classifier::process,
+        [](ClassifierWrapper& self, const Tensors& outputs) {
+            metrics::ScopedTimer timer(metrics::classifier_seconds());
+            return self.process(outputs);
+        },
+        py::arg("outputs"),
+        py::call_guard<py::gil_scoped_release>(),
+        "Perform classification on network outputs (releases the GIL)")
+    .def(
+        "process_batch",
+        [](const ClassifierWrapper& self, const Tensors& outputs, size_t n_threads) {
+            metrics::ScopedTimer timer(metrics::classifier_batch_seconds());
+            return self.process_batch(outputs, n_threads);
+        },
         py::arg("outputs"),
-        "Perform classification on network outputs")
+        py::arg("n_threads") = 1,
+        py::call_guard<py::gil_scoped_release>(),
+        R"doc(
+        Perform classification on each element of the batch dimension of the network output (releases the GIL).
+
+        :param outputs: network outputs, with a single tensor whose first dimension is the batch size.
+        :param n_threads: number of threads processing the elements in parallel, 0 for one per CPU core.
+        :return: one result per batch element.
+        :rtype: list[ClassifierResult]
+        )doc"
+    )
     ;
 
     /* Detector::Result::Item */
@@ -100,10 +451,50 @@ static void export_postprocessor(py::module_& m)
     .def(py::init<>())
     .def_readonly("success", &Detector::Result::success)
     .def_readonly("items", &Detector::Result::items)
+    .def(
+        "as_arrays",
+        &detector_result_arrays,
+        R"doc(
+        Get all the detections as NumPy arrays, without creating a Python object per item.
+
+        Boxes are ``(x, y, width, height)`` in the coordinates of the original
+        image. Items with fewer landmarks than the others are padded with
+        zeros and a visibility of -1.
+
+        :return: dict with ``boxes`` (N, 4) int32, ``scores`` (N,) float32,
+            ``class_index`` (N,) int32, ``landmarks`` (N, K, 3) int32 (x, y, z)
+            and ``landmark_visibility`` (N, K) float32 arrays.
+        :rtype: dict[str, numpy.ndarray]
+        )doc"
+    )
+    .def_static(
+        "from_arrays",
+        &detector_result_from_arrays,
+        py::arg("boxes"),
+        py::arg("scores"),
+        py::arg("class_index"),
+        py::arg("landmarks") = py::none(),
+        py::arg("landmark_visibility") = py::none(),
+        R"doc(
+        Create a detection result from NumPy arrays, in the format returned by :meth:`as_arrays`.
+
+        This allows postprocessing implemented with NumPy to return the same
+        result type as :class:`Detector`. Padding landmarks (all zeros with a
+        visibility of -1) are dropped.
+
+        :param boxes: (N, 4) boxes as ``(x, y, width, height)`` in the coordinates of the original image.
+        :param scores: (N,) detection confidences.
+        :param class_index: (N,) class indices.
+        :param landmarks: optional (N, K, 3) landmarks as ``(x, y, z)``.
+        :param landmark_visibility: optional (N, K) landmark visibilities.
+        :return: the detection result.
+        :rtype: DetectorResult
+        )doc"
+    )
     ;
 
     /* Detector */
-    py::class_<Detector>(postprocessor, "Detector")
+    py::class_<DetectorWrapper>(postprocessor, "Detector")
     .def(
         py::init<float, int, bool, float, bool>(),
         py::arg("score_threshold") = 0.5,
@@ -114,9 +505,36 @@ static void export_postprocessor(py::module_& m)
     )
     .def(
         "process",
-        &Detector::process,
+        [](DetectorWrapper& self, const Tensors& outputs, const Rect& assigned_rect) {
+            metrics::ScopedTimer timer(metrics::detector_seconds());
+            return self.process(outputs, assigned_rect);
+        },
         py::arg("outputs"),
         py::arg("assigned_rect"),
-        "Perform detection on network outputs")
+        py::call_guard<py::gil_scoped_release>(),
+        "Perform detection on network outputs (releases the GIL)")
+    .def(
+        "process_batch",
+        [](DetectorWrapper& self, const Tensors& outputs, const std::vector<Rect>& assigned_rects, size_t n_threads) {
+            metrics::ScopedTimer timer(metrics::detector_batch_seconds());
+            return self.process_batch(outputs, assigned_rects, n_threads);
+        },
+        py::arg("outputs"),
+        py::arg("assigned_rects"),
+        py::arg("n_threads") = 1,
+        py::call_guard<py::gil_scoped_release>(),
+        R"doc(
+        Perform detection on each element of the batch dimension of the network outputs (releases the GIL).
+
+        The output tensors whose first dimension is the batch size are split
+        into elements, each one decoded as the outputs of a single inference.
+
+        :param outputs: network outputs, the batch size is the first dimension of the first tensor.
+        :param assigned_rects: assigned rectangle of each batch element.
+        :param n_threads: number of threads processing the elements in parallel, 0 for one per CPU core.
+        :return: one result per element.
+        :rtype: list[DetectorResult]
+        )doc"
+    )
     ;
 }
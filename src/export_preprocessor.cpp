@@ -11,11 +11,44 @@
 #include <pybind11/numpy.h>
 #include <pybind11/stl.h>
 
+#include "export_metrics.hpp"
+#include "export_utils.hpp"
+
 namespace py = pybind11;
 
 using namespace std;
 using namespace synaptics::synap;
 
+namespace {
+
+/// InputData referencing the memory of a Python object supporting the buffer protocol.
+/// The buffer stays exported as long as the InputData exists, this keeps the Python object
+/// alive and prevents it from being resized.
+class InputDataWrapper : public InputData {
+public:
+    using InputData::InputData;
+
+    InputDataWrapper(py::buffer_info&& view, InputType type, Shape shape, Layout layout)
+    :
+    InputData(static_cast<const uint8_t*>(view.ptr), view.size * view.itemsize, type, shape, layout),
+    _view(std::move(view))
+    {}
+
+    /// Reference the data of a C-contiguous buffer, the construction releases the GIL
+    static std::unique_ptr<InputDataWrapper> from_buffer(const py::buffer& buffer, InputType type, Shape shape, Layout layout)
+    {
+        py::buffer_info view = request_contiguous(buffer);
+        py::gil_scoped_release release;
+        // encoded images are decoded during construction
+        return std::make_unique<InputDataWrapper>(std::move(view), type, shape, layout);
+    }
+
+private:
+    py::buffer_info _view;
+};
+
+}  // namespace
+
 class PreprocessorWrapper {
 public:
     PreprocessorWrapper(const PreprocessorWrapper&) = delete;
@@ -30,34 +63,51 @@ public:
 
     Rect assign(Tensors& inputs, const InputData& input_data, size_t start_index = 0) const
     {
-        Rect assigned_rect;
-        if (input_data.empty()) {
-            throw std::invalid_argument("Invalid input data");
-        }
-        if (!_preproc.assign(inputs, input_data, start_index, &assigned_rect)) {
-            throw std::runtime_error("Error while preprocessing data");
-        }
-        return assigned_rect;
+        metrics::ScopedTimer timer(metrics::preprocess_seconds());
+        py::gil_scoped_release release;
+        return assign_nogil(inputs, input_data, start_index);
     }
 
     Rect assign(Tensors& inputs, const std::string& filename, size_t start_index = 0) const
     {
+        metrics::ScopedTimer timer(metrics::preprocess_seconds());
+        py::gil_scoped_release release;
         InputData input_data(filename);
         if (input_data.empty()) {
             std::ostringstream err;
             err << "Invalid input image: " << filename;
             throw std::invalid_argument(err.str());
         }
-        return assign(inputs, input_data, start_index);
+        return assign_nogil(inputs, input_data, start_index);
     }
 
-    Rect assign(Tensors& inputs, const uint8_t* buffer, size_t buffer_size, Shape shape, Layout layout, size_t start_index = 0) const
+    Rect assign(Tensors& inputs, const py::buffer& data, InputType type, Shape shape, Layout layout, size_t start_index = 0) const
     {
-        InputData input_data(buffer, buffer_size, InputType::image_8bits, shape, layout);
-        return assign(inputs, input_data, start_index);
+        metrics::ScopedTimer timer(metrics::preprocess_seconds());
+        // The data are only referenced for the duration of the assignment
+        py::buffer_info info = request_contiguous(data);
+        if (type == InputType::image_8bits && info.itemsize != 1) {
+            throw std::invalid_argument("Image data must have 8-bit items");
+        }
+        py::gil_scoped_release release;
+        InputData input_data(static_cast<const uint8_t*>(info.ptr), info.size * info.itemsize, type, shape, layout);
+        return assign_nogil(inputs, input_data, start_index);
     }
 
 private:
+    // Must be called with the GIL released, only touches native data
+    Rect assign_nogil(Tensors& inputs, const InputData& input_data, size_t start_index) const
+    {
+        Rect assigned_rect;
+        if (input_data.empty()) {
+            throw std::invalid_argument("Invalid input data");
+        }
+        if (!_preproc.assign(inputs, input_data, start_index, &assigned_rect)) {
+            throw std::runtime_error("Error while preprocessing data");
+        }
+        return assigned_rect;
+    }
+
     Preprocessor _preproc;
 };
 
@@ -70,24 +120,75 @@ static void export_preprocessor(py::module_& m)
     .value("invalid", InputType::invalid)
     .value("raw", InputType::raw)
     .value("encoded_image", InputType::encoded_image)
+    .value("image_8bits", InputType::image_8bits)
     .value("nv12", InputType::nv12)
     .value("nv21", InputType::nv21)
     ;
 
     /* InputData */
-    py::class_<InputData>(preprocessor, "InputData")
-    .def(py::init<const string &>(), "load input data from file")
+    py::class_<InputDataWrapper>(preprocessor, "InputData")
+    .def(
+        py::init<const string &>(),
+        py::call_guard<py::gil_scoped_release>(),
+        "load input data from file, encoded images are decoded immediately (releases the GIL)"
+    )
+    .def(
+        py::init(&InputDataWrapper::from_buffer),
+        py::arg("buffer"),
+        py::arg("type"),
+        py::arg("shape") = Shape(),
+        py::arg("layout") = Layout::none,
+        R"doc(
+        Create input data referencing the memory of a bytes-like object or
+        C-contiguous NumPy array, without copy.
+
+        The buffer is kept alive, and cannot be resized, as long as the
+        input data exist. Encoded images are decoded immediately (releases
+        the GIL while decoding).
+        )doc"
+    )
     .def(
         py::init<vector<uint8_t>&&, InputType, Shape, Layout>(),
         py::arg("buffer"),
         py::arg("type"),
         py::arg("shape") = Shape(),
         py::arg("layout") = Layout::none,
-        "create input data from buffer"
+        "create input data from a copy of a sequence of integers"
+    )
+    .def("empty", &InputDataWrapper::empty, "check if data present or not")
+    .def("data", &InputDataWrapper::data, py::return_value_policy::reference, "get pointer to data")
+    .def("size", &InputDataWrapper::size, "get data size in bytes")
+    .def_property_readonly("type", &InputDataWrapper::type, "Type of the data, image_8bits for decoded images")
+    .def_property_readonly("shape", &InputDataWrapper::shape, "Shape of the data")
+    .def_property_readonly("layout", &InputDataWrapper::layout, "Layout of the data")
+    .def(
+        "view",
+        [](py::object self) -> py::array {
+            const auto& input_data = self.cast<const InputDataWrapper&>();
+            const void* data = input_data.data();
+            if (!data) {
+                throw std::invalid_argument("Invalid input data");
+            }
+            std::vector<py::ssize_t> shape;
+            const Shape& data_shape = input_data.shape();
+            if (input_data.type() == InputType::image_8bits && data_shape.size() == 4 && data_shape[0] == 1) {
+                shape.assign(data_shape.begin() + 1, data_shape.end());
+            } else {
+                shape.push_back(static_cast<py::ssize_t>(input_data.size()));
+            }
+            // Read-only view keeping the input data alive
+            py::array view(py::dtype::of<uint8_t>(), shape, {}, data, self);
+            view.attr("setflags")(py::arg("write") = false);
+            return view;
+        },
+        R"doc(
+        Get the data as a read-only uint8 NumPy array without copying.
+
+        Decoded images and 8-bit images with a (1, height, width, channels)
+        shape are returned as (height, width, channels) arrays, other data
+        as a 1D array of bytes. The array keeps the input data alive.
+        )doc"
     )
-    .def("empty", &InputData::empty, "check if data present or not")
-    .def("data", &InputData::data, py::return_value_policy::reference, "get pointer to data")
-    .def("size", &InputData::size, "get data size in bytes")
     ;
 
     /* Preprocessor */
@@ -95,11 +196,13 @@ static void export_preprocessor(py::module_& m)
     .def(py::init<>())
     .def(
         "assign",
-        static_cast<Rect (PreprocessorWrapper::*)(Tensors&, const InputData&, size_t) const>(&PreprocessorWrapper::assign),
+        [](const PreprocessorWrapper& self, Tensors& inputs, const InputDataWrapper& input_data, size_t input_index) -> Rect {
+            return self.assign(inputs, input_data, input_index);
+        },
         py::arg("inputs"),
         py::arg("input_data"),
         py::arg("input_index") = 0,
-        "Write input data to network inputs"
+        "Write input data to network inputs (releases the GIL)"
     )
     .def(
         "assign",
@@ -107,22 +210,30 @@ static void export_preprocessor(py::module_& m)
         py::arg("inputs"),
         py::arg("filename"),
         py::arg("input_index") = 0,
-        "Write image data to network inputs"
+        "Write image data to network inputs (releases the GIL)"
     )
     .def(
         "assign",
-        [](const PreprocessorWrapper& self, Tensors& inputs, py::array_t<uint8_t> data, Shape shape, Layout layout, size_t input_index) -> Rect {
-            py::buffer_info info = data.request();
-            const uint8_t* buffer = static_cast<const uint8_t*>(info.ptr);
-            size_t buffer_size = info.size;
-            return self.assign(inputs, buffer, buffer_size, shape, layout, input_index);
+        [](const PreprocessorWrapper& self, Tensors& inputs, py::buffer data, Shape shape, Layout layout, size_t input_index) -> Rect {
+            return self.assign(inputs, data, InputType::image_8bits, shape, layout, input_index);
         },
         py::arg("inputs"),
         py::arg("data"),
         py::arg("shape"),
         py::arg("layout"),
         py::arg("input_index") = 0,
-        "Write raw data to network inputs"
+        "Write 8-bit image data from a bytes-like object or C-contiguous NumPy array to network inputs, without intermediate copy (releases the GIL)"
+    )
+    .def(
+        "assign",
+        static_cast<Rect (PreprocessorWrapper::*)(Tensors&, const py::buffer&, InputType, Shape, Layout, size_t) const>(&PreprocessorWrapper::assign),
+        py::arg("inputs"),
+        py::arg("data"),
+        py::arg("type"),
+        py::arg("shape") = Shape(),
+        py::arg("layout") = Layout::none,
+        py::arg("input_index") = 0,
+        "Write encoded image, nv12, nv21 or raw data from a bytes-like object or C-contiguous NumPy array to network inputs, without intermediate copy (releases the GIL)"
     )
     ;
 }
\ No newline at end of file
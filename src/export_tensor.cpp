@@ -1,13 +1,30 @@
 // SPDX-License-Identifier: Apache-2.0
 // SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
 
+#include <algorithm>
+#include <atomic>
+#include <cmath>
+#include <cstring>
+#include <functional>
+#include <limits>
 #include <memory>
+#include <mutex>
 #include <stdexcept>
 #include <sstream>
 #include <string>
+#include <thread>
+#include <unordered_map>
+#include <vector>
 #include "synap/tensor.hpp"
 #include "synap/network.hpp"
 #include "synap/buffer.hpp"
+#include "synap/bundle_parser.hpp"
+#include "synap/file_utils.hpp"
+#include "synap/metadata.hpp"
+#include "synap/zip_tool.hpp"
+#include "export_metrics.hpp"
+#include "export_network.hpp"
+#include "export_utils.hpp"
 
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
@@ -17,8 +34,609 @@ namespace py = pybind11;
 using namespace std;
 using namespace synaptics::synap;
 
-static void assign_tensor(Tensor &t, const py::array &data) {
-    const auto &shape = t.shape();
+namespace {
+
+/// Read a file of a model bundle by name, empty if not found
+using BundleReader = std::function<std::string(const std::string&)>;
+
+static BundleReader zip_reader(ZipTool& zip)
+{
+    return [&zip](const std::string& name) {
+        std::vector<uint8_t> data = zip.extract_archive(name);
+        return std::string(data.begin(), data.end());
+    };
+}
+
+/// Get the tensor attributes of a model from its metadata
+static bool read_metadata_attributes(const char* meta_data, ModelAttributes& attrs)
+{
+    NetworkMetadata meta = load_metadata(meta_data);
+    if (!meta.valid) {
+        return false;
+    }
+    attrs.inputs = std::move(meta.inputs);
+    attrs.outputs = std::move(meta.outputs);
+    return true;
+}
+
+/// Get the tensor attributes of a bundle model from the metadata of its subgraphs,
+/// connected as by the bundle predictor of the framework
+static bool read_bundle_attributes(const BundleReader& read, ModelAttributes& attrs)
+{
+    const std::string info = read("bundle.json");
+    BundleParser bundle;
+    if (info.empty() || !bundle.init(info.data(), info.size())) {
+        return false;
+    }
+    std::vector<NetworkMetadata> graphs;
+    for (const auto& graph_info : bundle.graph_info()) {
+        const std::string meta_data = read(graph_info.meta);
+        graphs.push_back(meta_data.empty() ? NetworkMetadata{} : load_metadata(meta_data.c_str()));
+        if (!graphs.back().valid) {
+            return false;
+        }
+    }
+    // The model inputs are the subgraph inputs not connected to another subgraph
+    attrs.inputs.assign(bundle.inputs().size(), TensorAttributes{});
+    for (size_t graph_ix = 0; graph_ix < graphs.size(); graph_ix++) {
+        const auto& graph_inputs = bundle.graph_info()[graph_ix].inputs;
+        for (size_t in_ix = 0; in_ix < graph_inputs.size() && in_ix < graphs[graph_ix].inputs.size(); in_ix++) {
+            const auto& in = graph_inputs[in_ix];
+            if (in.subgraph_index < 0 && in.tensor_index < attrs.inputs.size()) {
+                attrs.inputs[in.tensor_index] = graphs[graph_ix].inputs[in_ix];
+            }
+        }
+    }
+    attrs.outputs.clear();
+    for (const auto& out : bundle.outputs()) {
+        if (out.subgraph_index < 0 || static_cast<size_t>(out.subgraph_index) >= graphs.size() ||
+            out.tensor_index >= graphs[out.subgraph_index].outputs.size()) {
+            return false;
+        }
+        attrs.outputs.push_back(graphs[out.subgraph_index].outputs[out.tensor_index]);
+    }
+    return true;
+}
+
+/// Check that attributes describe the given tensors
+static bool same_tensors(const std::vector<TensorAttributes>& attrs, const Tensors& tensors)
+{
+    if (attrs.size() != tensors.size()) {
+        return false;
+    }
+    for (size_t i = 0; i < attrs.size(); i++) {
+        const Tensor& t = tensors[i];
+        if (attrs[i].name != t.name() || attrs[i].dtype != t.data_type() ||
+            attrs[i].layout != t.layout() || attrs[i].shape != t.shape()) {
+            return false;
+        }
+    }
+    return true;
+}
+
+/// Network with bookkeeping of its inference generation.
+/// Tensors owned by the network are registered so that they can find their network state.
+class NetworkWrapper : public Network {
+public:
+    NetworkWrapper(const NetworkWrapper&) = delete;
+    NetworkWrapper(NetworkWrapper&&) = delete;
+    NetworkWrapper& operator=(const NetworkWrapper&) = delete;
+    NetworkWrapper& operator=(NetworkWrapper&&) = delete;
+
+    NetworkWrapper()
+    :
+    _state(std::make_shared<NetworkState>())
+    {}
+
+    ~NetworkWrapper()
+    {
+        untrack_tensors();
+        // Unload the model before releasing the buffers it may still reference
+        static_cast<Network&>(*this) = Network();
+        _state->buffers.clear();
+    }
+
+    bool load_model(const string& model_file, const string& meta_file = "")
+    {
+        untrack_tensors();
+        ++_state->model_loads;
+        _state->invalidate_float();
+        _state->attributes = ModelAttributes{};
+        bool success = Network::load_model(model_file, meta_file);
+        track_tensors();
+        if (success) {
+            _state->set_metrics_label(model_stem(model_file), false);
+            if (!meta_file.empty() && meta_file != "-") {
+                load_attributes(file_read(meta_file).c_str(), nullptr);
+            }
+            else if (directory_exists(model_file)) {
+                load_attributes(nullptr, [&model_file](const std::string& name) {
+                    return file_read(model_file + "/" + name);
+                });
+            }
+            else {
+                ZipTool zip;
+                if (zip.open(model_file)) {
+                    load_attributes(nullptr, zip_reader(zip));
+                }
+            }
+        }
+        return success;
+    }
+
+    bool load_model(const void* model_data, size_t model_size, const char* meta_data = nullptr)
+    {
+        untrack_tensors();
+        ++_state->model_loads;
+        _state->invalidate_float();
+        _state->attributes = ModelAttributes{};
+        bool success = Network::load_model(model_data, model_size, meta_data);
+        track_tensors();
+        if (success) {
+            ZipTool zip;
+            if (meta_data) {
+                load_attributes(meta_data, nullptr);
+            }
+            else if (zip.open(model_data, model_size)) {
+                load_attributes(nullptr, zip_reader(zip));
+            }
+        }
+        return success;
+    }
+
+    bool predict()
+    {
+        if (!metrics::enabled()) {
+            bool success = Network::predict();
+            if (success) {
+                ++_state->generation;
+            }
+            return success;
+        }
+        const auto start = metrics::Clock::now();
+        bool success = Network::predict();
+        const auto duration = metrics::Clock::now() - start;
+        const metrics::NetworkMetrics& m = _state->get_metrics();
+        if (success) {
+            ++_state->generation;
+            m.predict_seconds.record(duration);
+            m.inferences.add(1);
+        } else {
+            m.errors.add(1);
+        }
+        return success;
+    }
+
+    /// Label of the network in the metrics
+    std::string metrics_label() const
+    {
+        return _state->get_metrics_label();
+    }
+
+    void set_metrics_label(const std::string& label)
+    {
+        _state->set_metrics_label(label, true);
+    }
+
+    uint64_t generation() const
+    {
+        return _state->generation;
+    }
+
+    /// Number of models loaded so far
+    uint64_t model_loads() const
+    {
+        return _state->model_loads;
+    }
+
+    /// Take ownership of the Python buffers set to the tensors, must be called with the GIL held.
+    /// Used when loading a new model, the buffers must be released once the old model is unloaded.
+    std::unordered_map<const Tensor*, py::object> take_buffers()
+    {
+        return std::move(_state->buffers);
+    }
+
+    /// Conversion of the arrays assigned to an input by predict(), null if none.
+    /// Must be called with the GIL held.
+    const InputConversion* input_conversion(size_t index) const
+    {
+        const auto& conversions = _state->input_conversions;
+        return index < conversions.size() && !conversions[index].empty() ? &conversions[index] : nullptr;
+    }
+
+    /// Must be called with the GIL held
+    void set_input_conversion(size_t index, InputConversion conversion)
+    {
+        if (index >= inputs.size()) {
+            throw std::out_of_range("Input index out of bounds");
+        }
+        auto& conversions = _state->input_conversions;
+        if (conversions.size() <= index) {
+            conversions.resize(index + 1);
+        }
+        conversions[index] = std::move(conversion);
+    }
+
+    /// Must be called with the GIL held
+    void clear_input_conversions()
+    {
+        _state->input_conversions.clear();
+    }
+
+    /// Get state of a tensor owned by a network, with a null network if the tensor doesn't belong to a network
+    static TensorState tensor_state(const Tensor& tensor)
+    {
+        return TensorRegistry::get(tensor);
+    }
+
+private:
+    /// Keep the attributes of the tensors of the loaded model, read from the given metadata or
+    /// from the model bundle. They are dropped if they don't match the tensors of the network.
+    void load_attributes(const char* meta_data, const BundleReader& read_bundle)
+    {
+        ModelAttributes attrs;
+        bool valid = meta_data ? read_metadata_attributes(meta_data, attrs) : read_bundle_attributes(read_bundle, attrs);
+        if (valid && same_tensors(attrs.inputs, inputs) && same_tensors(attrs.outputs, outputs)) {
+            _state->attributes = std::move(attrs);
+        }
+    }
+
+    /// Model file name without directory and extension
+    static std::string model_stem(const std::string& model_file)
+    {
+        std::string name = model_file.substr(model_file.find_last_of("/\\") + 1);
+        return name.substr(0, name.rfind('.'));
+    }
+
+    void track_tensors()
+    {
+        for (auto& t : inputs) {
+            TensorRegistry::add(t, TensorState{_state, true, t.buffer()});
+        }
+        for (auto& t : outputs) {
+            TensorRegistry::add(t, TensorState{_state, false, t.buffer()});
+        }
+    }
+
+    void untrack_tensors()
+    {
+        for (const auto& t : inputs) {
+            TensorRegistry::remove(t);
+        }
+        for (const auto& t : outputs) {
+            TensorRegistry::remove(t);
+        }
+    }
+
+    std::shared_ptr<NetworkState> _state;
+};
+
+/// Storage of DetachedTensors, a base class so that it is constructed before Tensors
+struct TensorStorage {
+    std::vector<Tensor> tensors;
+};
+
+/// Tensors with their own buffers, not owned by a network.
+/// They have the attributes of the tensors of a network, including quantization, so they can be
+/// used with the preprocessor and the postprocessors while the network uses other buffers.
+class DetachedTensors : private TensorStorage, public Tensors {
+public:
+    explicit DetachedTensors(const std::vector<TensorAttributes>& attrs)
+    :
+    Tensors(TensorStorage::tensors)
+    {
+        // Tensors can't be moved, they must be constructed in place
+        tensors.reserve(attrs.size());
+        for (size_t i = 0; i < attrs.size(); i++) {
+            tensors.emplace_back(nullptr, static_cast<int32_t>(i), Tensor::Type::none, &attrs[i]);
+            // Allocate the default buffer so that it can be set to a network tensor
+            tensors.back().data();
+        }
+    }
+};
+
+}  // namespace
+
+/// Get the Python object wrapping a tensor, used as base object to keep the tensor alive
+static py::object tensor_handle(const Tensor& t)
+{
+    return py::cast(&t, py::return_value_policy::reference);
+}
+
+static py::buffer_info tensor_buffer_info(Tensor& t)
+{
+    void* data = t.data();
+    if (!data) {
+        throw std::runtime_error("Tensor data is null");
+    }
+    const auto& shape = t.shape();
+    const auto dtype = t.data_type();
+    const py::ssize_t itemsize = synap_type_size(dtype);
+    bool readonly = !NetworkWrapper::tensor_state(t).is_input;
+    return py::buffer_info(
+        data,
+        itemsize,
+        to_buffer_format(dtype),
+        shape.size(),
+        std::vector<py::ssize_t>(shape.begin(), shape.end()),
+        c_strides(shape, itemsize),
+        readonly
+    );
+}
+
+/// Get dequantized tensor data as a NumPy array aliasing the tensor's dequantization buffer
+static py::array tensor_to_numpy(const Tensor& self)
+{
+    auto size = self.item_count();
+    const float* data;
+    {
+        metrics::ScopedTimer timer(metrics::to_numpy_seconds());
+        py::gil_scoped_release release;
+        data = dequantized_data(self);
+    }
+    if (!data) {
+        throw std::runtime_error("Tensor data is null");
+    }
+
+    // The array aliases the tensor's dequantization buffer, keep the tensor alive as long as the array
+    auto np_array = py::array_t<float>(
+        size,
+        data,
+        tensor_handle(self)
+    );
+
+    return np_array.reshape(self.shape());
+}
+
+/// Convert a float to IEEE half precision, rounding to nearest even
+static inline uint16_t float_to_half(float value)
+{
+    uint32_t f;
+    std::memcpy(&f, &value, sizeof(f));
+    const uint32_t sign = (f >> 16) & 0x8000;
+    const uint32_t abs = f & 0x7fffffff;
+    if (abs >= 0x7f800000) {
+        // Infinity or NaN
+        return sign | 0x7c00 | (abs > 0x7f800000 ? 0x200 : 0);
+    }
+    if (abs >= 0x477ff000) {
+        // 65520 and above round to infinity
+        return sign | 0x7c00;
+    }
+    uint32_t half, rem, halfway;
+    if (abs < 0x38800000) {
+        // Subnormal half, values below 2^-25 round to zero
+        if (abs < 0x33000000) {
+            return sign;
+        }
+        const uint32_t mantissa = (abs & 0x7fffff) | 0x800000;
+        const uint32_t shift = 126 - (abs >> 23);
+        half = mantissa >> shift;
+        rem = mantissa & ((1u << shift) - 1);
+        halfway = 1u << (shift - 1);
+    } else {
+        half = (abs >> 13) - (112 << 10);
+        rem = abs & 0x1fff;
+        halfway = 0x1000;
+    }
+    if (rem > halfway || (rem == halfway && (half & 1))) {
+        ++half;
+    }
+    return sign | half;
+}
+
+static inline float sigmoid(float value)
+{
+    return 1.0f / (1.0f + std::exp(-value));
+}
+
+/// Copy a strided view of the source data to a C-contiguous destination, converting each item with store()
+template <typename T, typename Store>
+static void strided_copy(const float* src, T* dst, const std::vector<py::ssize_t>& shape, const std::vector<py::ssize_t>& strides, Store store)
+{
+    const size_t ndim = shape.size();
+    py::ssize_t count = 1;
+    for (auto dim : shape) {
+        count *= dim;
+    }
+    if (count == 0) {
+        return;
+    }
+    if (ndim == 0) {
+        *dst = store(*src);
+        return;
+    }
+    const py::ssize_t inner = shape[ndim - 1];
+    const py::ssize_t inner_stride = strides[ndim - 1];
+    std::vector<py::ssize_t> index(ndim, 0);
+    for (py::ssize_t outer = count / inner; outer > 0; --outer) {
+        for (py::ssize_t i = 0; i < inner; ++i) {
+            *dst++ = store(src[i * inner_stride]);
+        }
+        for (size_t d = ndim - 1; d-- > 0;) {
+            src += strides[d];
+            if (++index[d] < shape[d]) {
+                break;
+            }
+            src -= strides[d] * shape[d];
+            index[d] = 0;
+        }
+    }
+}
+
+/// Softmax in place along an axis of a C-contiguous array
+static void softmax(float* data, const std::vector<py::ssize_t>& shape, size_t axis)
+{
+    py::ssize_t outer = 1, inner = 1;
+    for (size_t d = 0; d < axis; ++d) {
+        outer *= shape[d];
+    }
+    for (size_t d = axis + 1; d < shape.size(); ++d) {
+        inner *= shape[d];
+    }
+    const py::ssize_t n = shape[axis];
+    for (py::ssize_t o = 0; o < outer; ++o) {
+        for (py::ssize_t i = 0; i < inner; ++i) {
+            float* lane = data + o * n * inner + i;
+            float max_value = -std::numeric_limits<float>::infinity();
+            for (py::ssize_t k = 0; k < n; ++k) {
+                max_value = std::max(max_value, lane[k * inner]);
+            }
+            float sum = 0.0f;
+            for (py::ssize_t k = 0; k < n; ++k) {
+                lane[k * inner] = std::exp(lane[k * inner] - max_value);
+                sum += lane[k * inner];
+            }
+            for (py::ssize_t k = 0; k < n; ++k) {
+                lane[k * inner] /= sum;
+            }
+        }
+    }
+}
+
+/// Get dequantized tensor data converted to another layout, data type and/or with an activation
+/// in a new NumPy array, optionally keeping only a range of channels.
+/// The subset, permutation, activation and type conversion are done in a single pass over the
+/// tensor's dequantization buffer.
+static py::array tensor_to_numpy_converted(const Tensor& self, py::object layout, py::object dtype, py::object activation, int axis, py::object channels)
+{
+    const Shape& shape = self.shape();
+    const size_t ndim = shape.size();
+    const Layout tensor_layout = self.layout();
+    std::vector<py::ssize_t> src_shape(shape.begin(), shape.end());
+    std::vector<py::ssize_t> src_strides = c_strides(src_shape, 1);
+
+    bool half = false;
+    if (!dtype.is_none()) {
+        py::dtype dt = py::dtype::from_args(dtype);
+        if (dt.kind() != 'f' || (dt.itemsize() != 4 && dt.itemsize() != 2)) {
+            throw std::invalid_argument("Unsupported data type: dtype must be float32 or float16");
+        }
+        half = dt.itemsize() == 2;
+    }
+
+    std::vector<size_t> perm(ndim);
+    for (size_t i = 0; i < ndim; ++i) {
+        perm[i] = i;
+    }
+    if (!layout.is_none()) {
+        const Layout target = layout.cast<Layout>();
+        if (target != tensor_layout) {
+            bool is_image = ndim == 4 && (tensor_layout == Layout::nhwc || tensor_layout == Layout::nchw);
+            if (!is_image || (target != Layout::nhwc && target != Layout::nchw)) {
+                throw std::invalid_argument("Layout conversion is only supported between nhwc and nchw for 4D tensors");
+            }
+            perm = target == Layout::nchw ? std::vector<size_t>{0, 3, 1, 2} : std::vector<size_t>{0, 2, 3, 1};
+        }
+    }
+
+    py::ssize_t offset = 0;
+    if (!channels.is_none()) {
+        if (ndim == 0) {
+            throw std::invalid_argument("Channel subset not supported for scalar tensors");
+        }
+        // Channel axis of images, rows of other tensors
+        size_t channel_axis = ndim >= 2 ? 1 : 0;
+        if (ndim == 4 && tensor_layout == Layout::nhwc) {
+            channel_axis = 3;
+        }
+        const py::ssize_t length = src_shape[channel_axis];
+        py::ssize_t start, stop;
+        if (py::isinstance<py::slice>(channels)) {
+            py::ssize_t step, slice_length;
+            if (!channels.cast<py::slice>().compute(length, &start, &stop, &step, &slice_length) || step != 1) {
+                throw std::invalid_argument("Invalid channel range: the slice step must be 1");
+            }
+            stop = start + slice_length;
+        } else {
+            py::sequence range = channels.cast<py::sequence>();
+            if (range.size() != 2) {
+                throw std::invalid_argument("Invalid channel range: expected a slice or a (start, stop) pair");
+            }
+            start = range[0].cast<py::ssize_t>();
+            stop = range[1].cast<py::ssize_t>();
+        }
+        if (start < 0 || stop > length || start >= stop) {
+            std::ostringstream err;
+            err << "Invalid channel range: [" << start << ", " << stop << ") for " << length << " channels";
+            throw std::invalid_argument(err.str());
+        }
+        offset = start * src_strides[channel_axis];
+        src_shape[channel_axis] = stop - start;
+    }
+
+    std::vector<py::ssize_t> out_shape(ndim), strides(ndim);
+    for (size_t i = 0; i < ndim; ++i) {
+        out_shape[i] = src_shape[perm[i]];
+        strides[i] = src_strides[perm[i]];
+    }
+
+    enum class Activation { none, sigmoid, softmax } act = Activation::none;
+    size_t softmax_axis = 0;
+    if (!activation.is_none()) {
+        const std::string name = activation.cast<std::string>();
+        if (name == "sigmoid") {
+            act = Activation::sigmoid;
+        } else if (name == "softmax") {
+            act = Activation::softmax;
+            const int normalized = axis < 0 ? axis + static_cast<int>(ndim) : axis;
+            if (normalized < 0 || normalized >= static_cast<int>(ndim)) {
+                throw std::invalid_argument("Softmax axis out of range");
+            }
+            softmax_axis = normalized;
+        } else if (name != "none") {
+            throw std::invalid_argument("Unsupported activation: " + name + ", expected sigmoid or softmax");
+        }
+    }
+
+    py::array result(half ? py::dtype("float16") : py::dtype::of<float>(), out_shape);
+    void* out = result.mutable_data();
+    const size_t count = result.size();
+    bool success;
+    {
+        metrics::ScopedTimer timer(metrics::to_numpy_seconds());
+        py::gil_scoped_release release;
+        const float* data = dequantized_data(self);
+        success = data != nullptr;
+        if (success) {
+            data += offset;
+            auto identity = [](float v) { return v; };
+            if (act == Activation::softmax) {
+                // Softmax needs the complete lanes, converted to half precision afterwards
+                std::vector<float> buffer;
+                float* dst = static_cast<float*>(out);
+                if (half) {
+                    buffer.resize(count);
+                    dst = buffer.data();
+                }
+                strided_copy(data, dst, out_shape, strides, identity);
+                softmax(dst, out_shape, softmax_axis);
+                if (half) {
+                    uint16_t* half_out = static_cast<uint16_t*>(out);
+                    for (size_t i = 0; i < count; ++i) {
+                        half_out[i] = float_to_half(dst[i]);
+                    }
+                }
+            } else if (half && act == Activation::sigmoid) {
+                strided_copy(data, static_cast<uint16_t*>(out), out_shape, strides, [](float v) { return float_to_half(sigmoid(v)); });
+            } else if (half) {
+                strided_copy(data, static_cast<uint16_t*>(out), out_shape, strides, [](float v) { return float_to_half(v); });
+            } else if (act == Activation::sigmoid) {
+                strided_copy(data, static_cast<float*>(out), out_shape, strides, [](float v) { return sigmoid(v); });
+            } else {
+                strided_copy(data, static_cast<float*>(out), out_shape, strides, identity);
+            }
+        }
+    }
+    if (!success) {
+        throw std::runtime_error("Tensor data is null");
+    }
+    return result;
+}
+
+/// Check that the shape of an array matches the expected shape, the batch dimension can be omitted when it is 1
+static void check_shape(const std::vector<py::ssize_t>& shape, const py::array& data)
+{
     const auto &data_dims = data.ndim();
     const auto &tensor_dims = shape.size();
     if (data_dims > tensor_dims || data_dims < tensor_dims - 1) {
@@ -56,6 +674,282 @@ static void assign_tensor(Tensor &t, const py::array &data) {
             throw std::invalid_argument(err.str());
         }
     }
+}
+
+/// Convert an IEEE half precision value to float
+static inline float half_to_float(uint16_t half)
+{
+    const uint32_t sign = static_cast<uint32_t>(half & 0x8000) << 16;
+    uint32_t exponent = (half >> 10) & 0x1f;
+    uint32_t mantissa = half & 0x3ff;
+    uint32_t f;
+    if (exponent == 0x1f) {
+        f = sign | 0x7f800000 | (mantissa << 13);
+    } else if (exponent != 0) {
+        f = sign | ((exponent + 112) << 23) | (mantissa << 13);
+    } else if (mantissa == 0) {
+        f = sign;
+    } else {
+        // Subnormal half, normalize the mantissa
+        exponent = 113;
+        while (!(mantissa & 0x400)) {
+            mantissa <<= 1;
+            --exponent;
+        }
+        f = sign | (exponent << 23) | ((mantissa & 0x3ff) << 13);
+    }
+    float value;
+    std::memcpy(&value, &f, sizeof(value));
+    return value;
+}
+
+/// Half precision item of a NumPy array
+struct Half {
+    uint16_t bits;
+};
+
+template <typename T>
+static inline float item_to_float(T value)
+{
+    return static_cast<float>(value);
+}
+
+template <>
+inline float item_to_float<Half>(Half value)
+{
+    return half_to_float(value.bits);
+}
+
+/// Input conversion of an array to a tensor, seen as 4 dimensions in the tensor layout
+struct ConversionPlan {
+    /// Dimensions and source strides in items of each tensor dimension
+    py::ssize_t dims[4];
+    py::ssize_t strides[4];
+    /// Tensor dimension of the channels (1 or 3), -1 if the tensor is not an image
+    int channel_axis;
+    /// Source offset of each channel, with the R and B channels swapped if needed
+    std::vector<py::ssize_t> channel_offsets;
+    /// value = x * mul[c] + add[c]
+    std::vector<float> mul;
+    std::vector<float> add;
+};
+
+template <typename T>
+static void convert_rows(const T* src, float* dst, const ConversionPlan& plan, py::ssize_t row_begin, py::ssize_t row_end)
+{
+    const py::ssize_t rows_per_batch = plan.dims[1];
+    const py::ssize_t row_size = plan.dims[2] * plan.dims[3];
+    for (py::ssize_t row = row_begin; row < row_end; ++row) {
+        const py::ssize_t n = row / rows_per_batch;
+        const py::ssize_t a = row % rows_per_batch;
+        const T* base = src + n * plan.strides[0];
+        base += plan.channel_axis == 1 ? plan.channel_offsets[a] : a * plan.strides[1];
+        float* out = dst + row * row_size;
+        if (plan.channel_axis == 3) {
+            for (py::ssize_t b = 0; b < plan.dims[2]; ++b) {
+                const T* pixel = base + b * plan.strides[2];
+                for (py::ssize_t c = 0; c < plan.dims[3]; ++c) {
+                    *out++ = item_to_float(pixel[plan.channel_offsets[c]]) * plan.mul[c] + plan.add[c];
+                }
+            }
+        } else {
+            const float mul = plan.mul[plan.channel_axis == 1 ? a : 0];
+            const float add = plan.add[plan.channel_axis == 1 ? a : 0];
+            for (py::ssize_t b = 0; b < plan.dims[2]; ++b) {
+                const T* line = base + b * plan.strides[2];
+                for (py::ssize_t d = 0; d < plan.dims[3]; ++d) {
+                    *out++ = item_to_float(line[d * plan.strides[3]]) * mul + add;
+                }
+            }
+        }
+    }
+}
+
+/// Run the conversion of all the rows, split between several threads for large tensors
+template <typename T>
+static void convert_input(const T* src, float* dst, const ConversionPlan& plan)
+{
+    constexpr py::ssize_t items_per_thread = 1 << 16;
+    const py::ssize_t rows = plan.dims[0] * plan.dims[1];
+    const py::ssize_t items = rows * plan.dims[2] * plan.dims[3];
+    const py::ssize_t max_threads = std::max(1u, std::min(std::thread::hardware_concurrency(), 8u));
+    const py::ssize_t thread_count = std::min({max_threads, rows, std::max<py::ssize_t>(1, items / items_per_thread)});
+    if (thread_count <= 1) {
+        convert_rows(src, dst, plan, 0, rows);
+        return;
+    }
+    std::vector<std::thread> threads;
+    threads.reserve(thread_count - 1);
+    const py::ssize_t chunk = (rows + thread_count - 1) / thread_count;
+    for (py::ssize_t begin = chunk; begin < rows; begin += chunk) {
+        threads.emplace_back(convert_rows<T>, src, dst, std::cref(plan), begin, std::min(rows, begin + chunk));
+    }
+    convert_rows(src, dst, plan, 0, std::min(rows, chunk));
+    for (auto& thread : threads) {
+        thread.join();
+    }
+}
+
+/// Parse a per-channel value given as None, a number or a sequence of numbers
+static std::vector<float> channel_values(const py::object& values, const char* name)
+{
+    std::vector<float> result;
+    if (values.is_none()) {
+        return result;
+    }
+    if (py::isinstance<py::sequence>(values) && !py::isinstance<py::str>(values)) {
+        for (auto value : values.cast<py::sequence>()) {
+            result.push_back(value.cast<float>());
+        }
+        if (result.empty()) {
+            throw std::invalid_argument(std::string(name) + " must not be empty");
+        }
+    } else {
+        result.push_back(values.cast<float>());
+    }
+    return result;
+}
+
+static InputConversion make_input_conversion(py::object mean, py::object std, float scale, bool swap_rb, py::object layout)
+{
+    InputConversion conversion;
+    conversion.mean = channel_values(mean, "mean");
+    conversion.std = channel_values(std, "std");
+    for (float value : conversion.std) {
+        if (value == 0.0f) {
+            throw std::invalid_argument("std values must not be zero");
+        }
+    }
+    conversion.scale = scale;
+    conversion.swap_rb = swap_rb;
+    if (!layout.is_none()) {
+        conversion.layout = layout.cast<Layout>();
+    }
+    return conversion;
+}
+
+/// Assign an array of any supported type to a tensor, converting it with the given conversion in a single pass
+/// to a float staging buffer, which the tensor then normalizes and quantizes as any float data
+static void assign_converted(Tensor& t, const py::array& array, const InputConversion& conversion)
+{
+    const Shape& shape = t.shape();
+    const Layout tensor_layout = t.layout();
+    const bool image = shape.size() == 4 && (tensor_layout == Layout::nhwc || tensor_layout == Layout::nchw);
+    const Layout data_layout = conversion.layout == Layout::none ? tensor_layout : conversion.layout;
+    if (data_layout != tensor_layout && (!image || (data_layout != Layout::nhwc && data_layout != Layout::nchw))) {
+        throw std::invalid_argument("Layout conversion is only supported between nhwc and nchw for 4D tensors");
+    }
+
+    // Tensor dimension of each data dimension
+    std::vector<size_t> perm{0, 1, 2, 3};
+    if (data_layout != tensor_layout) {
+        perm = data_layout == Layout::nchw ? std::vector<size_t>{0, 3, 1, 2} : std::vector<size_t>{0, 2, 3, 1};
+    }
+    std::vector<py::ssize_t> data_shape(shape.begin(), shape.end());
+    if (image) {
+        for (size_t i = 0; i < 4; ++i) {
+            data_shape[i] = shape[perm[i]];
+        }
+    }
+    check_shape(data_shape, array);
+
+    ConversionPlan plan;
+    py::ssize_t channels = 1;
+    if (image) {
+        const std::vector<py::ssize_t> data_strides = c_strides(data_shape, 1);
+        for (size_t i = 0; i < 4; ++i) {
+            plan.dims[i] = shape[i];
+            plan.strides[perm[i]] = data_strides[i];
+        }
+        plan.channel_axis = tensor_layout == Layout::nhwc ? 3 : 1;
+        channels = shape[plan.channel_axis];
+    } else {
+        py::ssize_t count = t.item_count();
+        plan.dims[0] = plan.dims[1] = plan.dims[2] = 1;
+        plan.dims[3] = count;
+        plan.strides[0] = plan.strides[1] = plan.strides[2] = 0;
+        plan.strides[3] = 1;
+        plan.channel_axis = -1;
+    }
+
+    for (const auto* values : {&conversion.mean, &conversion.std}) {
+        if (values->size() > 1 && static_cast<py::ssize_t>(values->size()) != channels) {
+            std::ostringstream err;
+            err << (values == &conversion.mean ? "mean" : "std") << " must have 1 or " << channels << " values, got " << values->size();
+            throw std::invalid_argument(err.str());
+        }
+    }
+    if (conversion.swap_rb && channels != 3) {
+        throw std::invalid_argument("swap_rb requires an image tensor with 3 channels");
+    }
+    plan.mul.resize(channels);
+    plan.add.resize(channels);
+    plan.channel_offsets.resize(image ? channels : 0);
+    for (py::ssize_t c = 0; c < channels; ++c) {
+        const float mean = conversion.mean.empty() ? 0.0f : conversion.mean[conversion.mean.size() > 1 ? c : 0];
+        const float std = conversion.std.empty() ? 1.0f : conversion.std[conversion.std.size() > 1 ? c : 0];
+        plan.mul[c] = conversion.scale / std;
+        plan.add[c] = -mean / std;
+        if (image) {
+            const py::ssize_t src_channel = conversion.swap_rb ? channels - 1 - c : c;
+            plan.channel_offsets[c] = src_channel * plan.strides[plan.channel_axis];
+        }
+    }
+
+    py::array data = py::array::ensure(array, py::array::c_style);
+    if (!data) {
+        throw py::error_already_set();
+    }
+    const py::dtype dtype = data.dtype();
+    const void* src = data.data();
+    const size_t count = t.item_count();
+    metrics::ScopedTimer timer(metrics::tensor_assign_seconds());
+    bool supported = true;
+    bool success = false;
+    {
+        py::gil_scoped_release release;
+        // Reused between calls to avoid allocating a float frame each time
+        thread_local std::vector<float> staging;
+        staging.resize(count);
+        const char kind = dtype.kind();
+        const py::ssize_t itemsize = dtype.itemsize();
+        if (kind == 'u' && itemsize == 1) {
+            convert_input(static_cast<const uint8_t*>(src), staging.data(), plan);
+        } else if (kind == 'i' && itemsize == 1) {
+            convert_input(static_cast<const int8_t*>(src), staging.data(), plan);
+        } else if (kind == 'u' && itemsize == 2) {
+            convert_input(static_cast<const uint16_t*>(src), staging.data(), plan);
+        } else if (kind == 'i' && itemsize == 2) {
+            convert_input(static_cast<const int16_t*>(src), staging.data(), plan);
+        } else if (kind == 'f' && itemsize == 2) {
+            convert_input(static_cast<const Half*>(src), staging.data(), plan);
+        } else if (kind == 'f' && itemsize == 4) {
+            convert_input(static_cast<const float*>(src), staging.data(), plan);
+        } else {
+            supported = false;
+        }
+        if (supported) {
+            success = t.assign(staging.data(), count);
+        }
+    }
+    if (!supported) {
+        throw std::invalid_argument("Unsupported data type: data must be uint8, int8, uint16, int16, float16 or float32.");
+    }
+    if (!success) {
+        throw std::runtime_error("Failed to assign converted data to tensor");
+    }
+    metrics::count(metrics::tensor_assign_bytes(), data.nbytes());
+}
+
+static void assign_tensor(Tensor &t, const py::array &data, const InputConversion* conversion = nullptr) {
+    const auto &dtype = data.dtype();
+    const bool native = dtype.is(py::dtype::of<uint8_t>()) || dtype.is(py::dtype::of<int16_t>()) || dtype.is(py::dtype::of<float>());
+    if (!native || (conversion && !conversion->empty())) {
+        assign_converted(t, data, conversion ? *conversion : InputConversion{});
+        return;
+    }
+    const auto &shape = t.shape();
+    check_shape(std::vector<py::ssize_t>(shape.begin(), shape.end()), data);
 
     const auto &size = t.size();
     const auto &data_size = data.nbytes();
@@ -65,25 +959,43 @@ static void assign_tensor(Tensor &t, const py::array &data) {
         throw std::invalid_argument(err.str());
     }
     
-    const auto &dtype = data.dtype();
+    metrics::ScopedTimer timer(metrics::tensor_assign_seconds());
+    const auto &count = data.size();
     if (dtype.is(py::dtype::of<uint8_t>())) {
-        if (!t.assign(data.unchecked<uint8_t>().data(0), data.size())) {
+        const uint8_t* ptr = data.unchecked<uint8_t>().data(0);
+        bool success;
+        {
+            py::gil_scoped_release release;
+            success = t.assign(ptr, count);
+        }
+        if (!success) {
             throw std::runtime_error("Failed to assign NumPy uint8_t data to tensor");
         }
     } else if (dtype.is(py::dtype::of<int16_t>())) {
-        if (!t.assign(data.unchecked<int16_t>().data(0), data.size())) {
+        const int16_t* ptr = data.unchecked<int16_t>().data(0);
+        bool success;
+        {
+            py::gil_scoped_release release;
+            success = t.assign(ptr, count);
+        }
+        if (!success) {
             throw std::runtime_error("Failed to assign NumPy int16_t data to tensor");
         }
-    } else if (dtype.is(py::dtype::of<float>())) {
-        if (!t.assign(data.unchecked<float>().data(0), data.size())) {
+    } else {
+        const float* ptr = data.unchecked<float>().data(0);
+        bool success;
+        {
+            py::gil_scoped_release release;
+            success = t.assign(ptr, count);
+        }
+        if (!success) {
             throw std::runtime_error("Failed to assign NumPy float data to tensor");
         }
-    } else {
-        throw std::invalid_argument("Unsupported data type: data must be uint8_t, int16_t, or float.");
     }
+    metrics::count(metrics::tensor_assign_bytes(), data_size);
 }
 
-static void predict_from(Network& net, py::iterable input_data)
+static void predict_from(NetworkWrapper& net, py::iterable input_data)
 {
     const auto& n_inputs = py::len(input_data);
     const auto& n_net_inputs = net.inputs.size();
@@ -98,32 +1010,323 @@ static void predict_from(Network& net, py::iterable input_data)
         if (!py::isinstance<py::array>(item)) {
             throw py::type_error("Input data must be a collection of numpy arrays");
         }
-        assign_tensor(net.inputs[inp_idx], item.cast<py::array>());
+        assign_tensor(net.inputs[inp_idx], item.cast<py::array>(), net.input_conversion(inp_idx));
         ++inp_idx;
     }
 
-    if (!net.predict()) {
+    bool success;
+    {
+        py::gil_scoped_release release;
+        success = net.predict();
+    }
+    if (!success) {
         throw std::runtime_error("Failed to predict");
     }
 }
 
+namespace {
+
+/// Preallocated NumPy arrays bound to the inputs and outputs of a network.
+/// The arrays are validated once, run() then copies the inputs, runs inference and
+/// dequantizes the outputs into the bound arrays without creating Python objects.
+class IOBinding {
+public:
+    IOBinding(NetworkWrapper& net, py::object inputs, py::object outputs)
+    :
+    _net(net),
+    _model_loads(net.model_loads())
+    {
+        if (!inputs.is_none()) {
+            bind_inputs(inputs);
+        }
+        py::list results;
+        if (!outputs.is_none()) {
+            bind_outputs(outputs);
+            for (const auto& output : _outputs) {
+                results.append(output.array);
+            }
+        } else {
+            for (auto& t : net.outputs) {
+                results.append(py::cast(&t, py::return_value_policy::reference));
+            }
+        }
+        _results = py::tuple(results);
+    }
+
+    /// Copy the inputs, run inference and write the outputs, returns the bound output arrays
+    py::tuple run()
+    {
+        if (_net.model_loads() != _model_loads) {
+            throw std::runtime_error("A new model was loaded since the arrays were bound, bind them again");
+        }
+        // Inputs needing a conversion go through Tensor.assign, with the GIL held
+        for (const auto& input : _inputs) {
+            if (input.kind == InputKind::converted) {
+                assign_tensor(*input.tensor, input.array, &input.conversion);
+            }
+        }
+        uint64_t assigned = 0;
+        const char* error = nullptr;
+        {
+            py::gil_scoped_release release;
+            error = run_unlocked(assigned);
+        }
+        if (error) {
+            throw std::runtime_error(error);
+        }
+        metrics::count(metrics::tensor_assign_bytes(), assigned);
+        return _results;
+    }
+
+    py::list inputs() const
+    {
+        py::list arrays;
+        for (const auto& input : _inputs) {
+            arrays.append(input.array);
+        }
+        return arrays;
+    }
+
+    py::tuple outputs() const
+    {
+        return _results;
+    }
+
+private:
+    enum class InputKind { uint8, int16, float32, converted };
+
+    struct BoundInput {
+        Tensor* tensor;
+        py::array array;
+        InputKind kind;
+        const void* data;
+        size_t count;
+        InputConversion conversion;
+    };
+
+    struct BoundOutput {
+        Tensor* tensor;
+        py::array array;
+        void* data;
+        size_t count;
+        bool half;
+    };
+
+    /// Copy the native inputs, predict and write the outputs without the GIL, returns an error message on failure
+    const char* run_unlocked(uint64_t& assigned)
+    {
+        {
+            metrics::ScopedTimer timer(metrics::tensor_assign_seconds());
+            for (const auto& input : _inputs) {
+                bool success = true;
+                switch (input.kind) {
+                case InputKind::uint8:
+                    success = input.tensor->assign(static_cast<const uint8_t*>(input.data), input.count);
+                    break;
+                case InputKind::int16:
+                    success = input.tensor->assign(static_cast<const int16_t*>(input.data), input.count);
+                    break;
+                case InputKind::float32:
+                    success = input.tensor->assign(static_cast<const float*>(input.data), input.count);
+                    break;
+                case InputKind::converted:
+                    continue;
+                }
+                if (!success) {
+                    return "Failed to assign bound input data to tensor";
+                }
+                assigned += input.tensor->size();
+            }
+        }
+        if (!_net.predict()) {
+            return "Failed to predict";
+        }
+        metrics::ScopedTimer timer(metrics::to_numpy_seconds());
+        for (const auto& output : _outputs) {
+            const float* data = dequantized_data(*output.tensor);
+            if (!data) {
+                return "Tensor data is null";
+            }
+            if (output.half) {
+                uint16_t* dst = static_cast<uint16_t*>(output.data);
+                for (size_t i = 0; i < output.count; ++i) {
+                    dst[i] = float_to_half(data[i]);
+                }
+            } else {
+                std::memcpy(output.data, data, output.count * sizeof(float));
+            }
+        }
+        return nullptr;
+    }
+
+    void bind_inputs(py::object inputs)
+    {
+        const size_t n_inputs = py::len(inputs);
+        if (n_inputs != _net.inputs.size()) {
+            std::ostringstream err;
+            err << "Invalid number of inputs: expected " << _net.inputs.size() << " inputs, got " << n_inputs << " inputs";
+            throw std::invalid_argument(err.str());
+        }
+        size_t index = 0;
+        for (auto item : inputs) {
+            Tensor& t = _net.inputs[index];
+            const InputConversion* conversion = _net.input_conversion(index++);
+            if (item.is_none()) {
+                // Input written directly by the caller, e.g. through Tensor.view()
+                continue;
+            }
+            if (!py::isinstance<py::array>(item)) {
+                throw py::type_error("Bound inputs must be NumPy arrays or None");
+            }
+            py::array array = item.cast<py::array>();
+            if (!(array.flags() & py::array::c_style)) {
+                throw std::invalid_argument("Bound input arrays must be C-contiguous");
+            }
+            const auto& dtype = array.dtype();
+            InputKind kind = InputKind::converted;
+            if (!conversion) {
+                if (dtype.is(py::dtype::of<uint8_t>())) {
+                    kind = InputKind::uint8;
+                } else if (dtype.is(py::dtype::of<int16_t>())) {
+                    kind = InputKind::int16;
+                } else if (dtype.is(py::dtype::of<float>())) {
+                    kind = InputKind::float32;
+                }
+            }
+            // Validate the array once, assigning it with the conversion in use
+            assign_tensor(t, array, conversion);
+            BoundInput input{&t, array, kind, array.data(), static_cast<size_t>(array.size()), conversion ? *conversion : InputConversion{}};
+            _inputs.push_back(std::move(input));
+        }
+    }
+
+    void bind_outputs(py::object outputs)
+    {
+        const size_t n_outputs = py::len(outputs);
+        if (n_outputs != _net.outputs.size()) {
+            std::ostringstream err;
+            err << "Invalid number of outputs: expected " << _net.outputs.size() << " outputs, got " << n_outputs << " outputs";
+            throw std::invalid_argument(err.str());
+        }
+        size_t index = 0;
+        for (auto item : outputs) {
+            Tensor& t = _net.outputs[index++];
+            if (!py::isinstance<py::array>(item)) {
+                throw py::type_error("Bound outputs must be NumPy arrays");
+            }
+            py::array array = item.cast<py::array>();
+            const auto& dtype = array.dtype();
+            const bool half = dtype.is(py::dtype("float16"));
+            if (!half && !dtype.is(py::dtype::of<float>())) {
+                throw std::invalid_argument("Unsupported data type: bound outputs must be float32 or float16 arrays");
+            }
+            if (!(array.flags() & py::array::c_style) || !array.writeable()) {
+                throw std::invalid_argument("Bound output arrays must be writable and C-contiguous");
+            }
+            if (static_cast<size_t>(array.size()) != t.item_count()) {
+                std::ostringstream err;
+                err << "Size mismatch: output " << t.name() << " has " << t.item_count() << " items, got an array of " << array.size() << " items";
+                throw std::invalid_argument(err.str());
+            }
+            BoundOutput output{&t, array, array.mutable_data(), t.item_count(), half};
+            _outputs.push_back(std::move(output));
+        }
+    }
+
+    NetworkWrapper& _net;
+    uint64_t _model_loads;
+    std::vector<BoundInput> _inputs;
+    std::vector<BoundOutput> _outputs;
+    /// Returned by run(), created once
+    py::tuple _results;
+};
+
+}  // namespace
+
 static void export_tensors(py::module_& m)
 {
     /* Buffer */
-    py::class_<Buffer>(m, "Buffer")
-    // .def(
-    /// FIXME: Causes memory corruption when used as `buf = Buffer(<buffer>, <offset>, <size>)` in Python
-    //     py::init<const Buffer&, size_t, size_t>(),
-    //     py::arg("rhs"),
-    //     py::arg("offset"),
-    //     py::arg("size"),
-    //     "Create a new Buffer from an existing buffer"
-    // )
+    py::class_<Buffer>(m, "Buffer", py::buffer_protocol())
+    .def(
+        py::init([](size_t size) {
+            return std::make_unique<Buffer>(size);
+        }),
+        py::arg("size") = 0,
+        "Create a new Buffer of the given size in bytes"
+    )
+    .def(
+        py::init([](py::buffer data) {
+            py::buffer_info info = request_contiguous(data);
+            size_t size = info.size * info.itemsize;
+            auto buffer = std::make_unique<Buffer>(size);
+            if (!buffer->assign(info.ptr, size)) {
+                throw std::runtime_error("Failed to copy data to buffer");
+            }
+            return buffer;
+        }),
+        py::arg("data"),
+        "Create a new Buffer containing a copy of the data of a bytes-like object or NumPy array"
+    )
+    .def(
+        py::init([](const Buffer& rhs, size_t offset, size_t size) {
+            if (offset > rhs.size() || size > rhs.size() - offset) {
+                std::ostringstream err;
+                err << "Sub-range out of bounds: offset " << offset << " and size " << size
+                    << " exceed buffer size " << rhs.size();
+                throw std::out_of_range(err.str());
+            }
+            auto buffer = std::make_unique<Buffer>(rhs, offset, size);
+            if (buffer->size() != size) {
+                throw std::runtime_error("Sub-range buffers are not supported for this buffer");
+            }
+            return buffer;
+        }),
+        py::arg("rhs"),
+        py::arg("offset"),
+        py::arg("size"),
+        // the new buffer references the memory of rhs, which must outlive it
+        py::keep_alive<1, 2>(),
+        "Create a new Buffer referencing a sub-range of an existing buffer"
+    )
+    .def_buffer([](Buffer& self) -> py::buffer_info {
+        void* data = self.data();
+        if (!data && self.size()) {
+            throw std::runtime_error("Buffer data is not accessible");
+        }
+        return py::buffer_info(data, 1, py::format_descriptor<uint8_t>::format(), self.size(), false);
+    })
     .def_property_readonly(
         "size",
         &Buffer::size,
         "Buffer data size"
     )
+    .def(
+        "resize",
+        [](Buffer& self, size_t size) {
+            if (!self.resize(size)) {
+                throw std::runtime_error("Failed to resize buffer");
+            }
+        },
+        py::arg("size"),
+        "Resize the buffer, its content is not preserved"
+    )
+    .def(
+        "assign",
+        [](Buffer& self, py::buffer data) {
+            py::buffer_info info = request_contiguous(data);
+            size_t size = info.size * info.itemsize;
+            bool success;
+            {
+                py::gil_scoped_release release;
+                success = self.assign(info.ptr, size);
+            }
+            if (!success) {
+                throw std::runtime_error("Failed to assign data to buffer");
+            }
+        },
+        py::arg("data"),
+        "Copy the data of a bytes-like object or NumPy array to the buffer, resizing it if needed (releases the GIL)"
+    )
     .def(
         "allow_cpu_access",
         &Buffer::allow_cpu_access,
@@ -133,10 +1336,11 @@ static void export_tensors(py::module_& m)
     ;
 
     /* Tensor */
-    py::class_<Tensor>(m, "Tensor")
+    py::class_<Tensor>(m, "Tensor", py::buffer_protocol())
     .def(
         py::init<const Tensor &>()
     )
+    .def_buffer(&tensor_buffer_info)
     .def_property_readonly(
         "name",
         &Tensor::name,
@@ -175,12 +1379,20 @@ static void export_tensors(py::module_& m)
     .def(
         "assign",
         [](Tensor& self, const Tensor& src) {
-            if (!self.assign(src)) {
+            metrics::ScopedTimer timer(metrics::tensor_assign_seconds());
+            bool success;
+            {
+                py::gil_scoped_release release;
+                success = self.assign(src);
+            }
+            invalidate_dequantized(self);
+            if (!success) {
                 throw std::runtime_error("Failed to assign tensor data to tensor");
             }
+            metrics::count(metrics::tensor_assign_bytes(), self.size());
         },
         py::arg("src"),
-        "Assign the contents of another tensor to this tensor"
+        "Assign the contents of another tensor to this tensor (releases the GIL)"
     )
     .def(
         "assign",
@@ -188,6 +1400,7 @@ static void export_tensors(py::module_& m)
             if (!self.assign(value)) {
                 throw std::runtime_error("Failed to assign scalar data to tensor");
             }
+            invalidate_dequantized(self);
         },
         py::arg("value"),
         "Assign scalar value to tensor"
@@ -203,20 +1416,48 @@ static void export_tensors(py::module_& m)
                 err << "Size mismatch: expected " << tensor_size << " bytes, got " << data_size << " bytes";
                 throw std::invalid_argument(err.str());
             }
-            if (!self.assign(static_cast<const void*>(data_info.ptr), data_size)) {
+            metrics::ScopedTimer timer(metrics::tensor_assign_seconds());
+            bool success;
+            {
+                py::gil_scoped_release release;
+                success = self.assign(static_cast<const void*>(data_info.ptr), data_size);
+            }
+            invalidate_dequantized(self);
+            if (!success) {
                 throw std::runtime_error("Failed to assign raw data to tensor");
             }
+            metrics::count(metrics::tensor_assign_bytes(), data_size);
         },
         py::arg("data"),
-        "Assign raw bytes to tensor"
+        "Assign raw bytes to tensor (releases the GIL)"
     )
     .def(
         "assign",
-        [](Tensor &self, py::array data) {
-            assign_tensor(self, data);
+        [](Tensor &self, py::array data, py::object mean, py::object std, float scale, bool swap_rb, py::object layout) {
+            InputConversion conversion = make_input_conversion(mean, std, scale, swap_rb, layout);
+            assign_tensor(self, data, &conversion);
+            invalidate_dequantized(self);
         },
         py::arg("data"),
-        "Assign NumPy array to tensor"
+        py::kw_only(),
+        py::arg("mean") = py::none(),
+        py::arg("std") = py::none(),
+        py::arg("scale") = 1.0f,
+        py::arg("swap_rb") = false,
+        py::arg("layout") = py::none(),
+        R"doc(
+        Assign NumPy array to tensor (releases the GIL)
+
+        uint8, int8, uint16, int16, float16 and float32 arrays are accepted.
+        The optional conversion is done in a single multithreaded pass before
+        the tensor normalization and quantization:
+
+        - ``mean``, ``std``, ``scale``: per-channel ``(x * scale - mean[c]) / std[c]``,
+          one value or one per channel of the tensor.
+        - ``swap_rb``: swap the first and third channels (RGB <-> BGR).
+        - ``layout``: ``Layout.nhwc`` or ``Layout.nchw`` layout of the data if it differs
+          from the layout of the tensor, the data is transposed.
+        )doc"
     )
     .def(
         "buffer",
@@ -227,45 +1468,131 @@ static void export_tensors(py::module_& m)
             }
             return buf;
         },
-        py::return_value_policy::reference,
+        py::return_value_policy::reference_internal,
         "Get tensor's current data buffer"
     )
     .def(
         "set_buffer",
-        [](Tensor& self, Buffer* buffer) {
-            if (!self.set_buffer(buffer)) {
+        [](Tensor& self, py::object buffer) {
+            // The network keeps the buffers set to its tensors alive, other tensors have no owner to do it
+            // (copies of network tensors share their data but are not registered)
+            const TensorState state = NetworkWrapper::tensor_state(self);
+            if (!state.network) {
+                throw std::invalid_argument("Buffers can only be set to the tensors of a network");
+            }
+            if (!buffer.is_none() && !py::isinstance<Buffer>(buffer)) {
+                throw py::type_error("buffer must be a Buffer or None");
+            }
+            // Unsetting the buffer of a network tensor restores its default buffer, so it can still be used
+            Buffer* buf = buffer.is_none() ? state.default_buffer : buffer.cast<Buffer*>();
+            if (!self.set_buffer(buf)) {
                 throw std::runtime_error("Failed to assign buffer to tensor");
             }
+            invalidate_dequantized(self);
+            if (!buffer.is_none()) {
+                state.network->buffers[&self] = buffer;
+            } else {
+                state.network->buffers.erase(&self);
+            }
         },
         py::arg("buffer").none(true),
-        "Set/unset tensor's current data buffer"
+        "Set the current data buffer of a network tensor, the buffer size must match the tensor size. None restores the default buffer of the tensor"
     )
     .def(
         "to_numpy",
-        [](const Tensor &self) -> py::array {
-            auto size = self.item_count();
-            auto data = self.as_float();
-            if (!data) {
-                throw std::runtime_error("Tensor data is null");
+        [](const Tensor &self, py::object layout, py::object dtype, py::object activation, int axis, py::object channels) -> py::array {
+            if (layout.is_none() && dtype.is_none() && activation.is_none() && channels.is_none()) {
+                return tensor_to_numpy(self);
             }
+            return tensor_to_numpy_converted(self, layout, dtype, activation, axis, channels);
+        },
+        py::kw_only(),
+        py::arg("layout") = py::none(),
+        py::arg("dtype") = py::none(),
+        py::arg("activation") = py::none(),
+        py::arg("axis") = -1,
+        py::arg("channels") = py::none(),
+        R"doc(
+        Get dequantized tensor data as NumPy array (releases the GIL while dequantizing)
 
-            auto np_array = py::array_t<float>(
-                size,
-                data,
-                py::capsule(data, [](void *v) { /* no-op destructor */ })
-            );
+        The outputs of a network are dequantized once per inference and cached
+        until the next one. Without arguments, the array aliases the cached
+        data, copy it before modifying it. With any argument, a new array is
+        returned, converted in a single pass from the dequantized data:
 
-            return np_array.reshape(self.shape());
+        - ``layout``: ``Layout.nhwc`` or ``Layout.nchw`` to transpose a 4D image tensor.
+        - ``dtype``: ``numpy.float32`` or ``numpy.float16``.
+        - ``activation``: ``"sigmoid"``, or ``"softmax"`` along ``axis`` of the returned array.
+        - ``channels``: ``slice`` or ``(start, stop)`` range of channels to keep, the
+          C axis of 4D image tensors, the second axis of other tensors.
+        )doc"
+    )
+    .def(
+        "view",
+        [](Tensor& self) -> py::array {
+            py::buffer_info info = tensor_buffer_info(self);
+            py::array view(to_np_dtype(self.data_type()), info.shape, info.strides, info.ptr, tensor_handle(self));
+            if (info.readonly) {
+                view.attr("setflags")(py::arg("write") = false);
+            }
+            return view;
         },
-        "Get dequantized tensor data as NumPy array"
+        R"doc(
+        Get the raw tensor data as a NumPy array without copying.
+
+        The array has the tensor's native data type (no dequantization) and
+        keeps the tensor and its network alive. It is writable only for the
+        input tensors of a network. Its content is overwritten by the next
+        inference, compare :attr:`generation` to detect this.
+        )doc"
+    )
+    .def_property_readonly(
+        "generation",
+        [](const Tensor& self) -> uint64_t {
+            const TensorState state = NetworkWrapper::tensor_state(self);
+            return state.network ? state.network->generation.load() : 0;
+        },
+        "Inference generation of the network owning the tensor (0 if not owned by a network)"
+    )
+    .def_property_readonly(
+        "owned_by_network",
+        [](const Tensor& self) -> bool {
+            return NetworkWrapper::tensor_state(self).network != nullptr;
+        },
+        "True if the tensor is an input or output of a network, False for copies and detached tensors"
     )
     ;
 
     /* Tensors */
-    py::class_<Tensors>(m, "Tensors")
+    py::class_<Tensors> tensors_class(m, "Tensors");
+    // Registered before the methods of Tensors so that their signatures use its Python name
+    py::class_<DetachedTensors, Tensors>(
+        m,
+        "DetachedTensors",
+        "Tensors with their own buffers and the attributes of the tensors of a network, see Tensors.detached()"
+    );
+
+    tensors_class
     .def_property_readonly(
         "size", &Tensors::size, "Get tensors size"
     )
+    .def_property_readonly(
+        "generation",
+        [](const Tensors& ts) -> uint64_t {
+            if (ts.size() == 0) {
+                return 0;
+            }
+            const TensorState state = NetworkWrapper::tensor_state(*ts.begin());
+            return state.network ? state.network->generation.load() : 0;
+        },
+        R"doc(
+        Inference generation of the network owning the tensors (0 if not owned by a network)
+
+        It is incremented by each inference. The dequantized data of the output
+        tensors is computed by the first to_numpy() of each generation and
+        cached until the next one.
+        )doc"
+    )
     .def(
         "__len__",
         [](Tensors& ts) -> size_t {
@@ -281,25 +1608,82 @@ static void export_tensors(py::module_& m)
             }
             return ts[index];
         },
-        py::return_value_policy::reference,
+        py::return_value_policy::reference_internal,
         "Access tensor by index"
     )
     .def(
         "__iter__",
         [](Tensors& ts) -> py::iterator {
-            return py::make_iterator(ts.begin(), ts.end(), py::return_value_policy::reference);
+            return py::make_iterator(ts.begin(), ts.end(), py::return_value_policy::reference_internal);
         },
+        py::keep_alive<0, 1>(),
         "Iterate over tensors"
     )
+    .def(
+        "detached",
+        [](const Tensors& ts) {
+            if (ts.size() == 0) {
+                return std::make_unique<DetachedTensors>(std::vector<TensorAttributes>{});
+            }
+            const TensorState state = NetworkWrapper::tensor_state(*ts.begin());
+            if (!state.network) {
+                throw std::invalid_argument("Tensors not owned by a network");
+            }
+            const ModelAttributes& attrs = state.network->attributes;
+            const std::vector<TensorAttributes>& tensor_attrs = state.is_input ? attrs.inputs : attrs.outputs;
+            if (tensor_attrs.size() != ts.size()) {
+                throw std::runtime_error("Tensor attributes not available in the model metadata");
+            }
+            return std::make_unique<DetachedTensors>(tensor_attrs);
+        },
+        R"doc(
+        Create tensors with the attributes of these tensors and their own buffers (data is not copied)
+
+        The tensors are not owned by the network. They can be written by a
+        Preprocessor or read by a Classifier or Detector while the network
+        runs, and their buffers can be set to the network tensors with
+        Tensor.set_buffer(). Raises RuntimeError if the tensor attributes
+        could not be read from the model metadata.
+        )doc"
+    )
+    ;
+
+    /* IOBinding */
+    py::class_<IOBinding>(m, "IOBinding")
+    .def(
+        "run",
+        &IOBinding::run,
+        R"doc(
+        Copy the bound inputs, run inference and write the bound outputs (releases the GIL).
+
+        Returns the bound output arrays, or the output tensors if no output
+        arrays are bound. Raises RuntimeError if a model was loaded since binding.
+        )doc"
+    )
+    .def_property_readonly(
+        "inputs",
+        &IOBinding::inputs,
+        "Bound input arrays"
+    )
+    .def_property_readonly(
+        "outputs",
+        &IOBinding::outputs,
+        "Bound output arrays, or output tensors"
+    )
     ;
 
     /* Network */
-    py::class_<Network>(m, "Network")
+    py::class_<NetworkWrapper>(m, "Network")
     .def(py::init())
     .def(
        py::init([](const string& model_file, const string& meta_file = ""){
-            auto network = std::make_unique<Network>();
-            if (!network->load_model(model_file, meta_file)) {
+            auto network = std::make_unique<NetworkWrapper>();
+            bool success;
+            {
+                py::gil_scoped_release release;
+                success = network->load_model(model_file, meta_file);
+            }
+            if (!success) {
                 throw std::runtime_error("Unable to load model from file");
             }
             return network;
@@ -308,55 +1692,141 @@ static void export_tensors(py::module_& m)
        py::arg("meta_file") = ""
     )
     .def("load_model",
-        [](Network& self, py::bytes model_data, const string& meta_data) {
-            py::buffer_info model_info(py::buffer(model_data).request());
-            if (!self.load_model(static_cast<const void*>(model_info.ptr), model_info.size, meta_data.empty() ? nullptr : meta_data.c_str())) {
+        [](NetworkWrapper& self, py::buffer model_data, const string& meta_data) {
+            // The model is only read during loading, use the caller's memory directly (e.g. bytes, mmap, memoryview)
+            py::buffer_info model_info = request_contiguous(model_data);
+            size_t model_size = model_info.size * model_info.itemsize;
+            auto old_buffers = self.take_buffers();
+            self.clear_input_conversions();
+            bool success;
+            {
+                py::gil_scoped_release release;
+                success = self.load_model(static_cast<const void*>(model_info.ptr), model_size, meta_data.empty() ? nullptr : meta_data.c_str());
+            }
+            if (!success) {
                 throw std::runtime_error("Unable to load model from memory");
             }
         },
         py::arg("model_data"),
         py::arg("meta_data") = "",
-        "Load model from memory"
+        "Load model from memory, any bytes-like object such as bytes, mmap or memoryview, without copy (releases the GIL)"
     )
     .def("load_model",
-        [](Network& self, const string& model_file, const string& meta_file = "") {
-            if (!self.load_model(model_file, meta_file)) {
+        [](NetworkWrapper& self, const string& model_file, const string& meta_file = "") {
+            auto old_buffers = self.take_buffers();
+            self.clear_input_conversions();
+            bool success;
+            {
+                py::gil_scoped_release release;
+                success = self.load_model(model_file, meta_file);
+            }
+            if (!success) {
                 throw std::runtime_error("Unable to load model from file");
             }
         },
         py::arg("model_file"),
         py::arg("meta_file") = "",
-        "Load model from file"
+        "Load model from file (releases the GIL)"
     )
     .def(
         "predict",
-        [](Network& self) -> Tensors&  {
-            if (!self.predict()) {
+        [](NetworkWrapper& self) -> Tensors&  {
+            bool success;
+            {
+                py::gil_scoped_release release;
+                success = self.predict();
+            }
+            if (!success) {
                 throw std::runtime_error("Failed to predict");
             }
             return self.outputs;
         },
-        py::return_value_policy::reference,
-        "run inference"
+        py::return_value_policy::reference_internal,
+        "run inference (releases the GIL)"
     )
     .def(
         "predict",
-        [](Network& self, py::list input_data) -> Tensors&  {
+        [](NetworkWrapper& self, py::list input_data) -> Tensors&  {
             predict_from(self, input_data);
             return self.outputs;
         },
-        py::return_value_policy::reference,
+        py::return_value_policy::reference_internal,
         py::arg("input_data"),
-        "run inference"
+        "run inference (releases the GIL)"
     )
     .def(
         "predict",
-        [](Network& self, py::args input_data) -> Tensors&  {
+        [](NetworkWrapper& self, py::args input_data) -> Tensors&  {
             predict_from(self, input_data);
             return self.outputs;
         },
-        py::return_value_policy::reference,
-        "run inference"
+        py::return_value_policy::reference_internal,
+        "run inference (releases the GIL)"
+    )
+    .def(
+        "stream",
+        [](py::object self, py::iterable frames, py::object preprocessor, py::object postprocessor, size_t depth) {
+            return py::module_::import("synap.pipeline").attr("stream")(self, frames, preprocessor, postprocessor, depth);
+        },
+        py::arg("frames"),
+        py::arg("preprocessor") = py::none(),
+        py::arg("postprocessor") = py::none(),
+        py::arg("depth") = 3,
+        "Run inference on a stream of frames with pipelined pre/postprocessing, see synap.pipeline.stream"
+    )
+    .def(
+        "bind",
+        [](NetworkWrapper& self, py::object inputs, py::object outputs) {
+            return std::make_unique<IOBinding>(self, inputs, outputs);
+        },
+        py::arg("inputs") = py::none(),
+        py::arg("outputs") = py::none(),
+        // the binding references the network tensors
+        py::keep_alive<0, 1>(),
+        R"doc(
+        Bind preallocated NumPy arrays to the inputs and outputs of the network.
+
+        The arrays are validated once. IOBinding.run() then copies the inputs,
+        runs inference and writes the dequantized outputs into the output
+        arrays without allocating Python objects.
+
+        - ``inputs``: one C-contiguous array per input, None for an input written
+          directly (e.g. through Tensor.view()). The input conversions set with
+          set_input_conversion() at the time of the call are applied.
+        - ``outputs``: one writable C-contiguous float32 or float16 array per
+          output, with the item count of the output. Without outputs, run()
+          returns the output tensors.
+        )doc"
+    )
+    .def(
+        "set_input_conversion",
+        [](NetworkWrapper& self, size_t input_index, py::object mean, py::object std, float scale, bool swap_rb, py::object layout) {
+            self.set_input_conversion(input_index, make_input_conversion(mean, std, scale, swap_rb, layout));
+        },
+        py::arg("input_index"),
+        py::kw_only(),
+        py::arg("mean") = py::none(),
+        py::arg("std") = py::none(),
+        py::arg("scale") = 1.0f,
+        py::arg("swap_rb") = false,
+        py::arg("layout") = py::none(),
+        R"doc(
+        Set the conversion of the arrays assigned to an input by predict(), see Tensor.assign().
+
+        Calling it with only the input index removes the conversion. The
+        conversions are removed when a model is loaded.
+        )doc"
+    )
+    .def_property_readonly(
+        "generation",
+        &NetworkWrapper::generation,
+        "Number of successful inferences, incremented each time the outputs are overwritten"
+    )
+    .def_property(
+        "metrics_label",
+        &NetworkWrapper::metrics_label,
+        &NetworkWrapper::set_metrics_label,
+        "Value of the network label in synap.metrics: the model file name for models loaded from a file, \"unnamed\" otherwise. Networks with the same label share their metrics."
     )
     .def_readonly("inputs", &Network::inputs)
     .def_readonly("outputs", &Network::outputs)
@@ -2,6 +2,7 @@
 // SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
 
 #include "synap/types.hpp"
+#include "export_utils.hpp"
 
 #include <pybind11/pybind11.h>
 #include <pybind11/iostream.h>
@@ -14,6 +15,24 @@ namespace py = pybind11;
 using namespace std;
 using namespace synaptics::synap;
 
+/// Describe the mask values as a read-only (height, width) float32 buffer
+static py::buffer_info mask_buffer_info(const Mask& mask)
+{
+    std::vector<py::ssize_t> shape{mask.height(), mask.width()};
+    if (mask.buffer().size() != static_cast<size_t>(shape[0] * shape[1])) {
+        throw std::runtime_error("Mask data size does not match its dimensions");
+    }
+    return py::buffer_info(
+        const_cast<float*>(mask.buffer().data()),
+        sizeof(float),
+        py::format_descriptor<float>::format(),
+        2,
+        shape,
+        c_strides(shape, sizeof(float)),
+        true
+    );
+}
+
 static void export_types(py::module_& m)
 {
     auto types = m.def_submodule("types", "SyNAP types");
@@ -100,18 +119,7 @@ static void export_types(py::module_& m)
     .def(
         "np_type",
         [](const DataType& dtype) {
-            switch(dtype) {
-                case DataType::byte:    return py::dtype::of<uint8_t>();
-                case DataType::int8:    return py::dtype::of<int8_t>();
-                case DataType::uint8:   return py::dtype::of<uint8_t>();
-                case DataType::int16:   return py::dtype::of<int16_t>();
-                case DataType::uint16:  return py::dtype::of<uint16_t>();
-                case DataType::int32:   return py::dtype::of<int32_t>();
-                case DataType::uint32:  return py::dtype::of<uint32_t>();
-                case DataType::float16: return py::dtype("float16");
-                case DataType::float32: return py::dtype::of<float>();
-                default: throw std::invalid_argument("Invalid DataType");
-            }
+            return to_np_dtype(dtype);
         },
         "Get corresponding NumPy dtype"
     )
@@ -170,13 +178,19 @@ static void export_types(py::module_& m)
     ;
 
     /* Segment mask */
-    py::class_<Mask>(types, "Mask", R"doc(
+    py::class_<Mask>(types, "Mask", py::buffer_protocol(), R"doc(
         Represents an instance segmentation.
 
+        Masks support the buffer protocol: ``numpy.asarray(mask)`` is a
+        read-only (height, width) float32 view of the mask values.
+
         :ivar int width: The width of the mask.
         :ivar int height: The height of the mask.
         )doc"
     )
+    .def_buffer([](const Mask& self) -> py::buffer_info {
+        return mask_buffer_info(self);
+    })
     .def(
         py::init<uint32_t, uint32_t>(),
         py::arg("width"),
@@ -232,6 +246,21 @@ static void export_types(py::module_& m)
         :rtype: list[float]
         )doc"
     )
+    .def(
+        "to_numpy",
+        [](py::object self) -> py::array {
+            py::buffer_info info = mask_buffer_info(self.cast<const Mask&>());
+            py::array view(py::dtype::of<float>(), info.shape, info.strides, info.ptr, self);
+            view.attr("setflags")(py::arg("write") = false);
+            return view;
+        },
+        R"doc(
+        Get mask values as a NumPy array without copying.
+
+        :return: Read-only (height, width) float32 array, keeping the mask alive.
+        :rtype: numpy.ndarray
+        )doc"
+    )
     .def("__bool__", &Mask::operator bool)
     .def("__repr__",
         [](const Mask &self) {
@@ -0,0 +1,76 @@
+// SPDX-License-Identifier: Apache-2.0
+// SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+#pragma once
+
+#include <stdexcept>
+#include <string>
+#include "synap/types.hpp"
+
+#include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
+
+namespace py = pybind11;
+
+using namespace synaptics::synap;
+
+/// Get the NumPy dtype corresponding to a SyNAP data type
+static inline py::dtype to_np_dtype(DataType dtype)
+{
+    switch(dtype) {
+        case DataType::byte:    return py::dtype::of<uint8_t>();
+        case DataType::int8:    return py::dtype::of<int8_t>();
+        case DataType::uint8:   return py::dtype::of<uint8_t>();
+        case DataType::int16:   return py::dtype::of<int16_t>();
+        case DataType::uint16:  return py::dtype::of<uint16_t>();
+        case DataType::int32:   return py::dtype::of<int32_t>();
+        case DataType::uint32:  return py::dtype::of<uint32_t>();
+        case DataType::float16: return py::dtype("float16");
+        case DataType::float32: return py::dtype::of<float>();
+        default: throw std::invalid_argument("Invalid DataType");
+    }
+}
+
+/// Get the Python buffer protocol format string corresponding to a SyNAP data type
+static inline std::string to_buffer_format(DataType dtype)
+{
+    switch(dtype) {
+        case DataType::byte:    return py::format_descriptor<uint8_t>::format();
+        case DataType::int8:    return py::format_descriptor<int8_t>::format();
+        case DataType::uint8:   return py::format_descriptor<uint8_t>::format();
+        case DataType::int16:   return py::format_descriptor<int16_t>::format();
+        case DataType::uint16:  return py::format_descriptor<uint16_t>::format();
+        case DataType::int32:   return py::format_descriptor<int32_t>::format();
+        case DataType::uint32:  return py::format_descriptor<uint32_t>::format();
+        case DataType::float16: return "e";
+        case DataType::float32: return py::format_descriptor<float>::format();
+        default: throw std::invalid_argument("Invalid DataType");
+    }
+}
+
+/// Compute C-contiguous strides in bytes for a shape
+template <typename ShapeT>
+static inline std::vector<py::ssize_t> c_strides(const ShapeT& shape, py::ssize_t itemsize)
+{
+    std::vector<py::ssize_t> strides(shape.size());
+    py::ssize_t stride = itemsize;
+    for (size_t i = shape.size(); i-- > 0;) {
+        strides[i] = stride;
+        stride *= shape[i];
+    }
+    return strides;
+}
+
+/// Request the data of a Python object supporting the buffer protocol, which must be C-contiguous
+static inline py::buffer_info request_contiguous(const py::buffer& data, bool writable = false)
+{
+    py::buffer_info info = data.request(writable);
+    py::ssize_t stride = info.itemsize;
+    for (size_t i = info.shape.size(); i-- > 0;) {
+        if (info.shape[i] > 1 && info.strides[i] != stride) {
+            throw std::invalid_argument("Data is not C-contiguous, use numpy.ascontiguousarray() to get a contiguous copy");
+        }
+        stride *= info.shape[i];
+    }
+    return info;
+}
@@ -3,29 +3,83 @@
 
 from __future__ import annotations
 
+import importlib
+
 from ._synap import (
     __doc__,
     __version__,
-    synap_version, 
+    synap_version,
     Buffer,
+    DetachedTensors,
+    IOBinding,
     Network,
     Tensor,
     Tensors,
 )
 
-import synap.postprocessor
-import synap.preprocessor
-import synap.types
+# The Python classes and the submodules are imported when first accessed (PEP 562),
+# so that "import synap" only loads the native module and not NumPy or asyncio
+_LAZY_ATTRIBUTES = {
+    "BatchScheduler": ".batching",
+    "BatchStats": ".batching",
+    "BufferPool": ".buffer_pool",
+    "InferenceResult": ".executor",
+    "InstanceStats": ".pool",
+    "ModelCache": ".model_cache",
+    "ModelInfo": ".model_info",
+    "NetworkExecutor": ".executor",
+    "NetworkPool": ".pool",
+    "ProcessPool": ".process_pool",
+    "TiledDetector": ".tiling",
+}
+
+_LAZY_SUBMODULES = (
+    "metrics",
+    "pipeline",
+    "postprocessor",
+    "preprocessor",
+    "types",
+)
 
 __all__ = [
     "__doc__",
     "__version__",
     "synap_version",
+    "BatchScheduler",
+    "BatchStats",
     "Buffer",
+    "BufferPool",
+    "DetachedTensors",
+    "InferenceResult",
+    "InstanceStats",
+    "IOBinding",
+    "ModelCache",
+    "ModelInfo",
     "Network",
+    "NetworkExecutor",
+    "NetworkPool",
+    "ProcessPool",
     "Tensor",
     "Tensors",
+    "TiledDetector",
+    "metrics",
+    "pipeline",
     "postprocessor",
     "preprocessor",
     "types",
 ]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
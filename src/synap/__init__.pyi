@@ -8,20 +8,77 @@ from __future__ import annotations
 import numpy
 import typing
 import typing_extensions
+from . import metrics
+from . import pipeline
 from . import postprocessor
 from . import preprocessor
 from . import types
-__all__ = ['Buffer', 'Network', 'Tensor', 'Tensors', 'postprocessor', 'preprocessor', 'synap_version', 'types']
+from .batching import BatchScheduler, BatchStats
+from .buffer_pool import BufferPool
+from .executor import InferenceResult, NetworkExecutor
+from .model_cache import ModelCache
+from .model_info import ModelInfo
+from .pool import InstanceStats, NetworkPool
+from .process_pool import ProcessPool
+from .tiling import TiledDetector
+__all__ = ['BatchScheduler', 'BatchStats', 'Buffer', 'BufferPool', 'DetachedTensors', 'IOBinding', 'InferenceResult', 'InstanceStats', 'ModelCache', 'ModelInfo', 'Network', 'NetworkExecutor', 'NetworkPool', 'ProcessPool', 'Tensor', 'Tensors', 'TiledDetector', 'metrics', 'pipeline', 'postprocessor', 'preprocessor', 'synap_version', 'types']
 class Buffer:
-    def allow_cpu_access(self: typing_extensions.Buffer, allow: bool) -> bool:
+    def __buffer__(self, flags: int) -> memoryview:
+        ...
+    @typing.overload
+    def __init__(self, size: int = 0) -> None:
+        """
+        Create a new Buffer of the given size in bytes
+        """
+    @typing.overload
+    def __init__(self, data: typing_extensions.Buffer) -> None:
+        """
+        Create a new Buffer containing a copy of the data of a bytes-like object or NumPy array
+        """
+    @typing.overload
+    def __init__(self, rhs: Buffer, offset: int, size: int) -> None:
+        """
+        Create a new Buffer referencing a sub-range of an existing buffer
+        """
+    def allow_cpu_access(self, allow: bool) -> bool:
         """
         Enable/disable the possibility for the CPU to read/write the buffer data
         """
+    def assign(self, data: typing_extensions.Buffer) -> None:
+        """
+        Copy the data of a bytes-like object or NumPy array to the buffer, resizing it if needed (releases the GIL)
+        """
+    def resize(self, size: int) -> None:
+        """
+        Resize the buffer, its content is not preserved
+        """
     @property
     def size(self) -> int:
         """
         Buffer data size
         """
+class DetachedTensors(Tensors):
+    """
+    Tensors with their own buffers and the attributes of the tensors of a network, see Tensors.detached()
+    """
+class IOBinding:
+    def run(self) -> tuple:
+        """
+        Copy the bound inputs, run inference and write the bound outputs (releases the GIL).
+        
+        Returns the bound output arrays, or the output tensors if no output
+        arrays are bound. Raises RuntimeError if a model was loaded since binding.
+        """
+    @property
+    def inputs(self) -> list:
+        """
+        Bound input arrays
+        """
+    @property
+    def outputs(self) -> tuple:
+        """
+        Bound output arrays, or output tensors
+        """
 class Network:
     @typing.overload
     def __init__(self) -> None:
@@ -29,35 +86,74 @@ class Network:
     @typing.overload
     def __init__(self, model_file: str, meta_file: str = '') -> None:
         ...
+    def bind(self, inputs: typing.Any = None, outputs: typing.Any = None) -> IOBinding:
+        """
+        Bind preallocated NumPy arrays to the inputs and outputs of the network.
+        
+        The arrays are validated once. IOBinding.run() then copies the inputs,
+        runs inference and writes the dequantized outputs into the output
+        arrays without allocating Python objects.
+        
+        - ``inputs``: one C-contiguous array per input, None for an input written
+          directly (e.g. through Tensor.view()). The input conversions set with
+          set_input_conversion() at the time of the call are applied.
+        - ``outputs``: one writable C-contiguous float32 or float16 array per
+          output, with the item count of the output. Without outputs, run()
+          returns the output tensors.
+        """
     @typing.overload
-    def load_model(self, model_data: bytes, meta_data: str = '') -> None:
+    def load_model(self, model_data: typing_extensions.Buffer, meta_data: str = '') -> None:
         """
-        Load model from memory
+        Load model from memory, any bytes-like object such as bytes, mmap or memoryview, without copy (releases the GIL)
         """
     @typing.overload
     def load_model(self, model_file: str, meta_file: str = '') -> None:
         """
-        Load model from file
+        Load model from file (releases the GIL)
         """
     @typing.overload
     def predict(self) -> Tensors:
         """
-        run inference
+        run inference (releases the GIL)
         """
     @typing.overload
     def predict(self, input_data: list) -> Tensors:
         """
-        run inference
+        run inference (releases the GIL)
         """
     @typing.overload
     def predict(self, *args) -> Tensors:
         """
-        run inference
+        run inference (releases the GIL)
+        """
+    def set_input_conversion(self, input_index: int, *, mean: typing.Any = None, std: typing.Any = None, scale: float = 1.0, swap_rb: bool = False, layout: typing.Any = None) -> None:
+        """
+        Set the conversion of the arrays assigned to an input by predict(), see Tensor.assign().
+        
+        Calling it with only the input index removes the conversion. The
+        conversions are removed when a model is loaded.
+        """
+    def stream(self, frames: typing.Iterable, preprocessor: typing.Any = None, postprocessor: typing.Any = None, depth: int = 3) -> pipeline.Pipeline:
+        """
+        Run inference on a stream of frames with pipelined pre/postprocessing, see synap.pipeline.stream
+        """
+    @property
+    def generation(self) -> int:
+        """
+        Number of successful inferences, incremented each time the outputs are overwritten
         """
     @property
     def inputs(self) -> Tensors:
         ...
     @property
+    def metrics_label(self) -> str:
+        """
+        Value of the network label in synap.metrics: the model file name for models loaded from a file, "unnamed" otherwise. Networks with the same label share their metrics.
+        """
+    @metrics_label.setter
+    def metrics_label(self, arg1: str) -> None:
+        ...
+    @property
     def outputs(self) -> Tensors:
         ...
 class Tensor:
@@ -66,7 +162,7 @@ class Tensor:
     @typing.overload
     def assign(self, src: Tensor) -> None:
         """
-        Assign the contents of another tensor to this tensor
+        Assign the contents of another tensor to this tensor (releases the GIL)
         """
     @typing.overload
     def assign(self, value: int) -> None:
@@ -76,24 +172,54 @@ class Tensor:
     @typing.overload
     def assign(self, data: bytes) -> None:
         """
-        Assign raw bytes to tensor
+        Assign raw bytes to tensor (releases the GIL)
         """
     @typing.overload
-    def assign(self, data: numpy.ndarray) -> None:
+    def assign(self, data: numpy.ndarray, *, mean: typing.Any = None, std: typing.Any = None, scale: float = 1.0, swap_rb: bool = False, layout: typing.Any = None) -> None:
+        """
+        Assign NumPy array to tensor (releases the GIL)
+        
+        uint8, int8, uint16, int16, float16 and float32 arrays are accepted.
+        The optional conversion is done in a single multithreaded pass before
+        the tensor normalization and quantization:
+        
+        - ``mean``, ``std``, ``scale``: per-channel ``(x * scale - mean[c]) / std[c]``,
+          one value or one per channel of the tensor.
+        - ``swap_rb``: swap the first and third channels (RGB <-> BGR).
+        - ``layout``: ``Layout.nhwc`` or ``Layout.nchw`` layout of the data if it differs
+          from the layout of the tensor, the data is transposed.
+        """
+    def buffer(self) -> Buffer:
         """
-        Assign NumPy array to tensor
+        Get tensor's current data buffer
         """
-    def buffer(self) -> typing_extensions.Buffer:
+    def set_buffer(self, buffer: Buffer | None) -> None:
         """
-        Get tensor's current data buffer
+        Set the current data buffer of a network tensor, the buffer size must match the tensor size. None restores the default buffer of the tensor
         """
-    def set_buffer(self, buffer: typing_extensions.Buffer) -> None:
+    def to_numpy(self, *, layout: typing.Any = None, dtype: typing.Any = None, activation: typing.Any = None, axis: int = -1, channels: typing.Any = None) -> numpy.ndarray:
         """
-        Set/unset tensor's current data buffer
+        Get dequantized tensor data as NumPy array (releases the GIL while dequantizing)
+        
+        The outputs of a network are dequantized once per inference and cached
+        until the next one. Without arguments, the array aliases the cached
+        data, copy it before modifying it. With any argument, a new array is
+        returned, converted in a single pass from the dequantized data:
+        
+        - ``layout``: ``Layout.nhwc`` or ``Layout.nchw`` to transpose a 4D image tensor.
+        - ``dtype``: ``numpy.float32`` or ``numpy.float16``.
+        - ``activation``: ``"sigmoid"``, or ``"softmax"`` along ``axis`` of the returned array.
+        - ``channels``: ``slice`` or ``(start, stop)`` range of channels to keep, the
+          C axis of 4D image tensors, the second axis of other tensors.
         """
-    def to_numpy(self) -> numpy.ndarray:
+    def view(self) -> numpy.ndarray:
         """
-        Get dequantized tensor data as NumPy array
+        Get the raw tensor data as a NumPy array without copying.
+        
+        The array has the tensor's native data type (no dequantization) and
+        keeps the tensor and its network alive. It is writable only for the
+        input tensors of a network. Its content is overwritten by the next
+        inference, compare :attr:`generation` to detect this.
         """
     @property
     def data_type(self) -> types.DataType:
@@ -101,6 +227,16 @@ class Tensor:
         Get tensor data type
         """
     @property
+    def generation(self) -> int:
+        """
+        Inference generation of the network owning the tensor (0 if not owned by a network)
+        """
+    @property
+    def owned_by_network(self) -> bool:
+        """
+        True if the tensor is an input or output of a network, False for copies and detached tensors
+        """
+    @property
     def is_scalar(self) -> bool:
         """
         Check if tensor is a scalar
@@ -143,6 +279,25 @@ class Tensors:
         """
         Get tensors size
         """
+    def detached(self) -> DetachedTensors:
+        """
+        Create tensors with the attributes of these tensors and their own buffers (data is not copied)
+        
+        The tensors are not owned by the network. They can be written by a
+        Preprocessor or read by a Classifier or Detector while the network
+        runs, and their buffers can be set to the network tensors with
+        Tensor.set_buffer(). Raises RuntimeError if the tensor attributes
+        could not be read from the model metadata.
+        """
+    @property
+    def generation(self) -> int:
+        """
+        Inference generation of the network owning the tensors (0 if not owned by a network)
+        
+        It is incremented by each inference. The dequantized data of the output
+        tensors is computed by the first to_numpy() of each generation and
+        cached until the next one.
+        """
     @property
     def size(self) -> int:
         """
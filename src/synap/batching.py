@@ -0,0 +1,373 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Dynamic batching of single inference requests.
+
+Models compiled with a batch dimension greater than 1 process several
+samples per inference for little more than the cost of one. A
+:class:`BatchScheduler` queues the requests of independent callers, each
+with one sample per input, and copies them into the batch slots of the
+input tensors. A batch is dispatched as soon as it is full, or when the
+oldest queued request has waited ``max_wait`` seconds, the free slots of a
+partial batch being padded with zeros. The outputs are then split along
+the batch axis and each caller's future receives its own slice.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Union
+
+import numpy as np
+
+from ._synap import Network
+
+__all__ = [
+    "BatchScheduler",
+    "BatchStats",
+]
+
+# Array data types accepted by Tensor.assign
+_SUPPORTED_DTYPES = frozenset(np.dtype(t) for t in (np.uint8, np.int8, np.uint16, np.int16, np.float16, np.float32))
+
+
+class BatchStats:
+    """
+    Statistics of a :class:`BatchScheduler`.
+
+    The queueing delay of a request is the time from its submission to the
+    start of the inference of its batch. :attr:`batch_size` is the number of
+    slots filled per batch, the ``max_batch`` of the scheduler.
+    """
+
+    #: Number of recent queueing delays kept for :meth:`queue_delay_percentile`
+    RECENT_DELAYS = 1024
+
+    def __init__(self, batch_size: int = 0):
+        self.batch_size = batch_size
+        self.batches = 0
+        self.requests = 0
+        self.padded_slots = 0
+        self.deadline_batches = 0
+        self.total_queue_delay = 0.0
+        self.max_queue_delay = 0.0
+        self.inference_time = 0.0
+        self._recent_delays: collections.deque[float] = collections.deque(maxlen=self.RECENT_DELAYS)
+
+    @property
+    def fill_ratio(self) -> float:
+        """
+        Fraction of the batch slots filled by requests, 0 before the first batch.
+        """
+        slots = self.batches * self.batch_size
+        return self.requests / slots if slots else 0.0
+
+    @property
+    def mean_batch_size(self) -> float:
+        """
+        Mean number of requests per batch.
+        """
+        return self.requests / self.batches if self.batches else 0.0
+
+    @property
+    def mean_queue_delay(self) -> float:
+        """
+        Mean queueing delay of the requests in seconds.
+        """
+        return self.total_queue_delay / self.requests if self.requests else 0.0
+
+    def queue_delay_percentile(self, percent: float) -> float:
+        """
+        Percentile of the queueing delay of the recent requests.
+
+        :param percent: percentile in [0, 100], e.g. 99 for the tail latency.
+        :return: the delay in seconds, 0 before the first batch.
+        """
+        if not self._recent_delays:
+            return 0.0
+        return float(np.percentile(np.fromiter(self._recent_delays, dtype=np.float64), percent))
+
+    def _add_batch(self, delays: list[float], elapsed: float, deadline: bool) -> None:
+        self.batches += 1
+        self.requests += len(delays)
+        self.padded_slots += self.batch_size - len(delays)
+        self.deadline_batches += deadline
+        self.total_queue_delay += sum(delays)
+        self.max_queue_delay = max(self.max_queue_delay, *delays)
+        self.inference_time += elapsed
+        self._recent_delays.extend(delays)
+
+    def _copy(self) -> BatchStats:
+        stats = BatchStats()
+        stats.__dict__.update(self.__dict__)
+        stats._recent_delays = collections.deque(self._recent_delays, maxlen=self.RECENT_DELAYS)
+        return stats
+
+    def __repr__(self) -> str:
+        return (
+            f"BatchStats(batch_size={self.batch_size}, batches={self.batches}, requests={self.requests}, "
+            f"fill_ratio={self.fill_ratio:.3f}, deadline_batches={self.deadline_batches}, "
+            f"mean_queue_delay={self.mean_queue_delay:.6f}, max_queue_delay={self.max_queue_delay:.6f})"
+        )
+
+
+class _Request:
+    __slots__ = ("future", "inputs", "submitted")
+
+    def __init__(self, future: Future, inputs: list[np.ndarray]):
+        self.future = future
+        self.inputs = inputs
+        self.submitted = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Group single-sample requests into batched inferences of a network.
+
+    The batch size is the first dimension of the input tensors, which must
+    be the same for all the inputs. The scheduler takes ownership of the
+    network and runs the inferences on a dedicated worker thread; requests
+    can be submitted from any thread.
+
+    Each request has one array per input holding one sample, with the shape
+    of the input tensor without its batch dimension (a leading dimension of
+    1 is also accepted). The data type of each input is set by the first
+    request, later requests must use the same one. The samples of a batch
+    are copied into one array per input, assigned with
+    :meth:`synap.Network.predict` so that the input conversions set with
+    :meth:`synap.Network.set_input_conversion` apply. Each caller gets copies
+    of its row of the outputs whose first dimension is the batch size, and
+    copies of the whole other outputs.
+
+    :param network: network instance or path to the model file.
+    :param max_wait: maximum time in seconds the oldest queued request waits for the batch to fill up.
+    :param max_batch: number of batch slots filled per inference, the batch dimension of the inputs if None.
+    :raises ValueError: if the inputs have different batch dimensions or ``max_batch`` exceeds it.
+    """
+
+    def __init__(self, network: Union[Network, str], max_wait: float = 0.005, max_batch: Optional[int] = None):
+        if max_wait < 0:
+            raise ValueError("max_wait must not be negative")
+        self._network = Network(network) if isinstance(network, str) else network
+        inputs = list(self._network.inputs)
+        if not inputs:
+            raise ValueError("Network has no inputs")
+        batch_sizes = {int(tensor.shape[0]) for tensor in inputs}
+        if len(batch_sizes) != 1:
+            raise ValueError("All the inputs must have the same batch dimension")
+        self._batch_size = batch_sizes.pop()
+        if max_batch is None:
+            max_batch = self._batch_size
+        if not 1 <= max_batch <= self._batch_size:
+            raise ValueError(f"max_batch must be in [1, {self._batch_size}]")
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._sample_shapes = [tuple(tensor.shape)[1:] for tensor in inputs]
+        self._dtypes: list[Optional[np.dtype]] = [None] * len(inputs)
+        self._staging: list[Optional[np.ndarray]] = [None] * len(inputs)
+        self._stats = BatchStats(max_batch)
+        self._pending: collections.deque[_Request] = collections.deque()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="synap-batching", daemon=True)
+        self._thread.start()
+
+    @property
+    def network(self) -> Network:
+        """
+        The network owned by the scheduler.
+        """
+        return self._network
+
+    @property
+    def batch_size(self) -> int:
+        """
+        Batch dimension of the network inputs.
+        """
+        return self._batch_size
+
+    @property
+    def max_batch(self) -> int:
+        """
+        Number of batch slots filled per inference.
+        """
+        return self._max_batch
+
+    @property
+    def max_wait(self) -> float:
+        """
+        Maximum time in seconds the oldest queued request waits for the batch to fill up.
+        """
+        return self._max_wait
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of queued requests not yet dispatched.
+        """
+        with self._cond:
+            return len(self._pending)
+
+    @property
+    def stats(self) -> BatchStats:
+        """
+        Snapshot of the scheduler statistics.
+        """
+        with self._cond:
+            return self._stats._copy()
+
+    def reset_stats(self) -> None:
+        """
+        Reset the scheduler statistics.
+        """
+        with self._cond:
+            self._stats = BatchStats(self._max_batch)
+
+    def submit(self, *inputs: np.ndarray) -> Future:
+        """
+        Queue a request.
+
+        Cancelling the returned future before its batch is dispatched
+        removes the request from the batch.
+
+        :param inputs: one sample per network input.
+        :return: future resolving to the list of the request's dequantized outputs.
+        :raises ValueError: if the number or the shapes of the inputs do not match the network inputs,
+            or if an input has an unsupported data type or a different one than the previous requests.
+        :raises RuntimeError: if the scheduler is closed.
+        """
+        if len(inputs) != len(self._sample_shapes):
+            raise ValueError(f"Expected {len(self._sample_shapes)} inputs, got {len(inputs)}")
+        samples = []
+        for index, (data, shape) in enumerate(zip(inputs, self._sample_shapes)):
+            data = np.asarray(data)
+            if data.shape == (1, *shape):
+                data = data[0]
+            elif data.shape != shape:
+                raise ValueError(f"Input {index} has shape {data.shape}, expected {shape}")
+            if data.dtype not in _SUPPORTED_DTYPES:
+                raise ValueError(f"Input {index} has unsupported data type {data.dtype}")
+            samples.append(data)
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            # Checked before queueing so that a request cannot fail the batch of other callers
+            for index, (data, dtype) in enumerate(zip(samples, self._dtypes)):
+                if dtype is not None and data.dtype != dtype:
+                    raise ValueError(f"Input {index} has data type {data.dtype}, expected {dtype}")
+            self._dtypes = [data.dtype for data in samples]
+            self._pending.append(_Request(future, samples))
+            self._cond.notify()
+        return future
+
+    def predict(self, *inputs: np.ndarray, timeout: Optional[float] = None) -> list[np.ndarray]:
+        """
+        Run a request and wait for its outputs.
+
+        :param inputs: one sample per network input.
+        :param timeout: maximum time in seconds to wait for the outputs, wait forever if None.
+        :return: the request's dequantized outputs.
+        :raises TimeoutError: if the outputs were not ready within ``timeout``.
+        """
+        return self.submit(*inputs).result(timeout)
+
+    async def predict_async(self, *inputs: np.ndarray) -> list[np.ndarray]:
+        """
+        Run a request without blocking the event loop.
+
+        :param inputs: one sample per network input.
+        :return: the request's dequantized outputs.
+        """
+        return await asyncio.wrap_future(self.submit(*inputs))
+
+    def close(self, cancel_pending: bool = False) -> None:
+        """
+        Stop the worker thread once the queued requests are done.
+
+        The queued requests are dispatched without waiting for their batch
+        to fill up.
+
+        :param cancel_pending: cancel the queued requests instead of running them.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            if cancel_pending:
+                while self._pending:
+                    self._pending.popleft().future.cancel()
+            self._cond.notify_all()
+        self._thread.join()
+
+    def __enter__(self) -> BatchScheduler:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _next_batch(self) -> Optional[tuple[list[_Request], bool]]:
+        # Wait for the first request, then for the batch to fill up until its deadline
+        with self._cond:
+            while True:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return None
+                deadline = self._pending[0].submitted + self._max_wait
+                while len(self._pending) < self._max_batch and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                expired = len(self._pending) < self._max_batch
+                batch = []
+                while self._pending and len(batch) < self._max_batch:
+                    request = self._pending.popleft()
+                    if request.future.set_running_or_notify_cancel():
+                        batch.append(request)
+                if batch:
+                    return batch, expired
+
+    def _staging_array(self, index: int, dtype: np.dtype) -> np.ndarray:
+        array = self._staging[index]
+        if array is None:
+            array = self._staging[index] = np.zeros((self._batch_size, *self._sample_shapes[index]), dtype=dtype)
+        return array
+
+    def _run(self) -> None:
+        while True:
+            item = self._next_batch()
+            if item is None:
+                break
+            batch, expired = item
+            start = time.perf_counter()
+            delays = [start - request.submitted for request in batch]
+            try:
+                arrays = []
+                for index in range(len(self._sample_shapes)):
+                    array = self._staging_array(index, batch[0].inputs[index].dtype)
+                    for slot, request in enumerate(batch):
+                        array[slot] = request.inputs[index]
+                    array[len(batch):] = 0
+                    arrays.append(array)
+                outputs = [out.to_numpy() for out in self._network.predict(arrays)]
+                results = [
+                    [out[slot].copy() if out.shape[:1] == (self._batch_size,) else out.copy() for out in outputs]
+                    for slot in range(len(batch))
+                ]
+            except BaseException as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                results = None
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self._stats._add_batch(delays, elapsed, expired)
+            if results is not None:
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
@@ -0,0 +1,361 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Benchmark the inference of a model.
+
+Run as ``python -m synap.benchmark -m model.synap``. The model is run for a
+number of iterations or for a fixed duration, after some warmup iterations,
+from one or more threads sharing a :class:`synap.NetworkPool`. The report is
+printed in JSON, with the throughput, the latency percentiles of each stage
+(input assignment, inference, postprocessing) and the host memory usage.
+
+Inputs are random data of the type of each input tensor, an image, or the
+images of a directory, decoded before the measurements start. With the
+``replay`` backend, the model runs on the host with a simulated inference
+time, see :mod:`synap.replay`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from ._synap import Network, __version__, synap_version
+from ._synap.postprocessor import Classifier, Detector
+from ._synap.preprocessor import InputData, Preprocessor
+from ._synap.types import Layout, Rect
+from .pool import NetworkPool
+from .process_pool import _assign_raw
+from .preprocessor.dataset import DatasetLoader
+from .replay import ReplayNetwork
+
+__all__ = [
+    "host_memory",
+    "latency_stats",
+    "main",
+    "run",
+]
+
+#: Measured stages of an iteration, in order
+STAGES = ("preprocess", "inference", "postprocess")
+
+#: Postprocessing done after each inference
+POSTPROCESS = ("none", "to_numpy", "classifier", "detector")
+
+#: Backends running the model
+BACKENDS = ("npu", "replay")
+
+#: Latency percentiles of the report
+PERCENTILES = (50, 90, 95, 99)
+
+def latency_stats(seconds: list[float]) -> dict[str, float]:
+    """
+    Summarize durations in milliseconds.
+
+    :param seconds: measured durations in seconds.
+    :return: the ``mean``, ``min``, ``max`` and ``p50``, ``p90``, ``p95``, ``p99`` percentiles, all 0 if there is no duration.
+    """
+    stats = {"mean": 0.0, "min": 0.0, "max": 0.0}
+    stats.update({f"p{p}": 0.0 for p in PERCENTILES})
+    if not seconds:
+        return stats
+    ms = 1000 * np.asarray(seconds, dtype=np.float64)
+    stats["mean"] = float(ms.mean())
+    stats["min"] = float(ms.min())
+    stats["max"] = float(ms.max())
+    for p, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        stats[f"p{p}"] = float(value)
+    return stats
+
+
+def host_memory() -> dict[str, int]:
+    """
+    Host memory used by the process.
+
+    :return: the current (``rss``) and peak (``peak_rss``) resident set size in bytes, ``rss`` is 0 if unknown.
+    """
+    memory = {"rss": 0, "peak_rss": 0}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "VmRSS":
+                    memory["rss"] = int(value.split()[0]) * 1024
+                elif key == "VmHWM":
+                    memory["peak_rss"] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    if not memory["peak_rss"]:
+        # ru_maxrss is in kilobytes on Linux
+        memory["peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return memory
+
+
+def _input_rect(network: Network) -> Rect:
+    # Full input rectangle of the network, for random inputs
+    tensor = network.inputs[0]
+    shape = list(tensor.shape)
+    if len(shape) != 4:
+        return Rect((0, 0), (0, 0))
+    if tensor.layout == Layout.nchw:
+        return Rect((0, 0), (shape[3], shape[2]))
+    return Rect((0, 0), (shape[2], shape[1]))
+
+
+def _random_inputs(network: Network, seed: int) -> list[np.ndarray]:
+    # Random data of the type of each input, covering the whole range of integer types
+    rng = np.random.default_rng(seed)
+    inputs = []
+    for tensor in network.inputs:
+        dtype = np.dtype(tensor.data_type.np_type())
+        shape = tuple(tensor.shape)
+        if dtype.kind in "iu":
+            info = np.iinfo(dtype)
+            inputs.append(rng.integers(info.min, info.max, shape, dtype=dtype, endpoint=True))
+        else:
+            inputs.append(rng.standard_normal(shape).astype(dtype))
+    return inputs
+
+
+def _load_images(source: str, max_images: int) -> list[InputData]:
+    if os.path.isdir(source):
+        paths = DatasetLoader(source).paths
+        if max_images > 0:
+            paths = paths[:max_images]
+        images = [input_data for _, input_data in DatasetLoader(paths)]
+    else:
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"'{source}' not found")
+        images = [InputData(source)]
+    if not images:
+        raise ValueError(f"No image found in '{source}'")
+    return images
+
+
+def _make_iteration(kind: str, inputs: list, postprocess: str) -> Callable[[Network, int], tuple[float, float, float]]:
+    # Create the function running one iteration in the calling thread, returning the time of each stage
+    preprocessor = Preprocessor()
+    if postprocess == "classifier":
+        postprocessor = Classifier()
+    elif postprocess == "detector":
+        postprocessor = Detector()
+    else:
+        postprocessor = None
+
+    def iteration(network: Network, index: int) -> tuple[float, float, float]:
+        start = time.perf_counter()
+        if kind == "random":
+            for tensor, data in zip(network.inputs, inputs):
+                _assign_raw(tensor, data)
+            rect = _input_rect(network) if postprocess == "detector" else None
+        else:
+            rect = preprocessor.assign(network.inputs, inputs[index % len(inputs)])
+        assigned = time.perf_counter()
+        outputs = network.predict()
+        predicted = time.perf_counter()
+        if postprocess == "to_numpy":
+            for output in outputs:
+                output.to_numpy()
+        elif postprocess == "classifier":
+            postprocessor.process(outputs)
+        elif postprocess == "detector":
+            postprocessor.process(outputs, rect)
+        done = time.perf_counter()
+        return assigned - start, predicted - assigned, done - predicted
+
+    return iteration
+
+
+def run(
+    model: str,
+    iterations: int = 100,
+    duration: Optional[float] = None,
+    warmup: int = 10,
+    threads: int = 1,
+    instances: Optional[int] = None,
+    input: str = "random",
+    postprocess: str = "none",
+    meta: str = "",
+    seed: int = 0,
+    max_images: int = 100,
+    backend: str = "npu",
+    replay_latency: float = 0.0,
+    replay_outputs: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """
+    Benchmark the inference of a model.
+
+    :param model: path to the model file.
+    :param iterations: number of measured iterations, ignored if ``duration`` is set.
+    :param duration: duration of the measurements in seconds, instead of a number of iterations.
+    :param warmup: number of iterations run on each network instance before the measurements.
+    :param threads: number of threads running iterations concurrently.
+    :param instances: number of network instances, same as ``threads`` if None.
+    :param input: ``"random"`` for random data, or path to an image or to a directory of images.
+    :param postprocess: postprocessing of the outputs, one of ``"none"``, ``"to_numpy"``, ``"classifier"`` or ``"detector"``.
+    :param meta: path to the model metadata file, for models in legacy format.
+    :param seed: seed of the random input data.
+    :param max_images: maximum number of images used from a directory, 0 for all.
+    :param backend: ``"npu"``, or ``"replay"`` to run on the host with a :class:`synap.replay.ReplayNetwork`.
+    :param replay_latency: inference time in seconds of the replay backend.
+    :param replay_outputs: recorded output files of the replay backend, one per output, random outputs if None.
+    :return: the benchmark report.
+    """
+    if duration is None and iterations < 1:
+        raise ValueError("iterations must be at least 1")
+    if duration is not None and duration <= 0:
+        raise ValueError("duration must be positive")
+    if warmup < 0:
+        raise ValueError("warmup must not be negative")
+    if threads < 1:
+        raise ValueError("threads must be at least 1")
+    if postprocess not in POSTPROCESS:
+        raise ValueError(f"postprocess must be one of {', '.join(POSTPROCESS)}")
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+    network_factory = None
+    if backend == "replay":
+        # The native preprocessor and postprocessors only accept the tensors of a synap.Network
+        if input != "random" or postprocess in ("classifier", "detector"):
+            raise ValueError("The replay backend only supports random inputs, without postprocessing or with to_numpy")
+        network_factory = lambda: ReplayNetwork(outputs=replay_outputs, latency=replay_latency, seed=seed)
+    instances = instances or threads
+    meta_data = ""
+    if meta:
+        with open(meta, "r") as f:
+            meta_data = f.read()
+
+    memory_before = host_memory()
+    pool = NetworkPool(model, size=instances, meta=meta_data, network_factory=network_factory)
+    memory_loaded = host_memory()
+    if input == "random":
+        kind, inputs = "random", _random_inputs(pool.networks[0], seed)
+    else:
+        kind, inputs = "image", _load_images(input, max_images)
+
+    for network in pool.networks:
+        iteration = _make_iteration(kind, inputs, postprocess)
+        for i in range(warmup):
+            iteration(network, i)
+
+    lock = threading.Lock()
+    issued = 0
+    times: list[list[tuple[float, float, float]]] = [[] for _ in range(threads)]
+    errors: list[BaseException] = []
+
+    def worker(thread_index: int, deadline: Optional[float]) -> None:
+        nonlocal issued
+        iteration = _make_iteration(kind, inputs, postprocess)
+        while not errors:
+            with lock:
+                if deadline is None and issued >= iterations:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                index = issued
+                issued += 1
+            try:
+                with pool.network() as network:
+                    times[thread_index].append(iteration(network, index))
+            except BaseException as e:
+                errors.append(e)
+
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+    workers = [threading.Thread(target=worker, args=(i, deadline)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    measured = [t for thread_times in times for t in thread_times]
+    memory = host_memory()
+    return {
+        "model": model,
+        "synap_version": str(synap_version()),
+        "synap_python_version": __version__,
+        "python_version": platform.python_version(),
+        "config": {
+            "backend": backend,
+            "iterations": iterations if duration is None else None,
+            "duration": duration,
+            "warmup": warmup,
+            "threads": threads,
+            "instances": instances,
+            "input": input,
+            "postprocess": postprocess,
+            "seed": seed,
+        },
+        "iterations": len(measured),
+        "elapsed": elapsed,
+        "throughput": len(measured) / elapsed if elapsed > 0 else 0.0,
+        "latency": latency_stats([sum(t) for t in measured]),
+        "stages": {stage: latency_stats([t[i] for t in measured]) for i, stage in enumerate(STAGES)},
+        "memory": {
+            "rss_before_load": memory_before["rss"],
+            "rss_after_load": memory_loaded["rss"],
+            "rss": memory["rss"],
+            "peak_rss": memory["peak_rss"],
+        },
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m synap.benchmark", description="Benchmark the inference of a SyNAP model")
+    parser.add_argument('-m', '--model', required=True, help='synap model')
+    parser.add_argument('--meta', default="", help='model metadata file, for models in legacy format')
+    parser.add_argument('-i', '--input', default="random", help='"random", an image file, or a directory of images (default: random)')
+    parser.add_argument('-n', '--iterations', type=int, default=100, help='number of measured iterations (default: 100)')
+    parser.add_argument('-d', '--duration', type=float, help='measure for this duration in seconds instead of a number of iterations')
+    parser.add_argument('-w', '--warmup', type=int, default=10, help='warmup iterations for each network instance (default: 10)')
+    parser.add_argument('-t', '--threads', type=int, default=1, help='number of concurrent threads (default: 1)')
+    parser.add_argument('--instances', type=int, help='number of network instances (default: same as threads)')
+    parser.add_argument('-p', '--postprocess', choices=POSTPROCESS, default="none", help='postprocessing of the outputs (default: none)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random input data (default: 0)')
+    parser.add_argument('--max-images', type=int, default=100, help='maximum number of images used from a directory, 0 for all (default: 100)')
+    parser.add_argument('-b', '--backend', choices=BACKENDS, default="npu", help='run on the NPU, or on the host replaying outputs (default: npu)')
+    parser.add_argument('--replay-latency', type=float, default=0.0, help='inference time in seconds of the replay backend (default: 0)')
+    parser.add_argument('--replay-outputs', nargs='+', help='recorded output files of the replay backend, one per output (default: random)')
+    parser.add_argument('-o', '--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.model):
+        raise FileNotFoundError(f"'{args.model}' not found")
+    report = run(
+        args.model,
+        iterations=args.iterations,
+        duration=args.duration,
+        warmup=args.warmup,
+        threads=args.threads,
+        instances=args.instances,
+        input=args.input,
+        postprocess=args.postprocess,
+        meta=args.meta,
+        seed=args.seed,
+        max_images=args.max_images,
+        backend=args.backend,
+        replay_latency=args.replay_latency,
+        replay_outputs=args.replay_outputs,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
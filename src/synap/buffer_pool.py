@@ -0,0 +1,186 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Rotating sets of user-allocated buffers for network tensors.
+
+A :class:`BufferPool` allocates ``depth`` buffers for each of a set of
+tensors and rotates them with :meth:`Tensor.set_buffer`, so that the data
+of one slot can be written or read while the network uses another one.
+For the tensors of a :class:`synap.Network`, :meth:`BufferPool.slot_tensors`
+gives tensors over the buffers of any slot, for the native preprocessor and
+postprocessors.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+from ._synap import Buffer, Tensor, Tensors
+
+__all__ = [
+    "BufferPool",
+]
+
+
+class BufferPool:
+    """
+    Rotate ``depth`` buffers for each tensor of a set of tensors.
+
+    Typical uses are double-buffered inputs, where the next frame is written
+    to the next slot while the network reads the current one, and
+    double-buffered outputs, where the results of the previous inference stay
+    readable while the next one is running.
+
+    The tensors use the buffers of the current slot until :meth:`rotate` is
+    called. If ``tensors`` are the inputs or outputs of a :class:`synap.Network`,
+    the buffers of each slot belong to detached tensors (see
+    :meth:`synap.Tensors.detached`), returned by :meth:`slot_tensors`. The
+    pool must be released with :meth:`release` (or used as a context manager)
+    before the network is loaded with another model.
+
+    :param tensors: tensors to allocate buffers for, inputs or outputs of a network,
+        typically ``network.inputs`` or ``network.outputs``. Detached tensors such as
+        the ones of :meth:`slot_tensors` can't use other buffers.
+    :param depth: number of buffers per tensor.
+    :raises ValueError: if a tensor is not an input or output of a network.
+    """
+
+    def __init__(self, tensors: Iterable[Tensor], depth: int = 2):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self._tensors = list(tensors)
+        if not all(isinstance(t, Tensor) and t.owned_by_network for t in self._tensors):
+            raise ValueError("Buffer pool tensors must be inputs or outputs of a network")
+        self._slot_tensors: Optional[list[Tensors]] = None
+        if isinstance(tensors, Tensors):
+            try:
+                self._slot_tensors = [tensors.detached() for _ in range(depth)]
+            except RuntimeError:
+                # Attributes not in the model metadata, the slots only have buffers
+                pass
+        if self._slot_tensors is not None:
+            self._slots = [[t.buffer() for t in slot] for slot in self._slot_tensors]
+        else:
+            self._slots = [[Buffer(t.size) for t in self._tensors] for _ in range(depth)]
+        self._index = 0
+        self._released = False
+        self._bind()
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of buffers per tensor.
+        """
+        return len(self._slots)
+
+    @property
+    def tensors(self) -> list[Tensor]:
+        """
+        Tensors using the buffers of the pool.
+        """
+        return self._tensors
+
+    @property
+    def index(self) -> int:
+        """
+        Index of the slot currently used by the tensors.
+        """
+        return self._index
+
+    @property
+    def next_index(self) -> int:
+        """
+        Index of the slot that will be used after the next :meth:`rotate`.
+        """
+        return (self._index + 1) % self.depth
+
+    @property
+    def previous_index(self) -> int:
+        """
+        Index of the slot that was used before the last :meth:`rotate`.
+        """
+        return (self._index - 1) % self.depth
+
+    def rotate(self) -> int:
+        """
+        Make the tensors use the buffers of the next slot.
+
+        :return: index of the new current slot.
+        :raises RuntimeError: if the pool has been released.
+        """
+        self._check_released()
+        self._index = self.next_index
+        self._bind()
+        return self._index
+
+    def buffers(self, slot: Optional[int] = None) -> list[Buffer]:
+        """
+        Get the buffers of a slot, one per tensor.
+
+        :param slot: slot index, the current slot if None.
+        :return: list of buffers.
+        """
+        return list(self._slots[self._index if slot is None else slot])
+
+    def slot_tensors(self, slot: Optional[int] = None) -> Tensors:
+        """
+        Get tensors with the attributes of the pool tensors that use the buffers of a slot.
+
+        They can be written by a :class:`synap.preprocessor.Preprocessor`
+        before the slot becomes current, or read by a
+        :class:`synap.postprocessor.Classifier` or
+        :class:`synap.postprocessor.Detector` while the network uses another
+        slot.
+
+        :param slot: slot index, the current slot if None.
+        :return: tensors of the slot, in the order of the pool tensors.
+        :raises RuntimeError: if the pool was not created from the tensors of a network with readable metadata.
+        """
+        if self._slot_tensors is None:
+            raise RuntimeError("Slot tensors are only available for the inputs or outputs of a network")
+        return self._slot_tensors[self._index if slot is None else slot]
+
+    def view(self, tensor_index: int, slot: Optional[int] = None) -> np.ndarray:
+        """
+        Get a NumPy view of the raw data of a tensor in a slot, without copy.
+
+        The view has the data type and shape of the tensor and is writable, so
+        it can be used to fill an input slot before it becomes current. The
+        data is not dequantized.
+
+        :param tensor_index: index of the tensor in the pool.
+        :param slot: slot index, the current slot if None.
+        :return: NumPy array sharing the buffer memory.
+        """
+        tensor = self._tensors[tensor_index]
+        buffer = self._slots[self._index if slot is None else slot][tensor_index]
+        dtype = tensor.data_type.np_type()
+        return np.frombuffer(buffer, dtype=dtype).reshape(tuple(tensor.shape))
+
+    def release(self) -> None:
+        """
+        Unset the buffers from the tensors, which use their default buffers
+        again. Releasing twice has no effect.
+        """
+        if self._released:
+            return
+        self._released = True
+        for tensor in self._tensors:
+            tensor.set_buffer(None)
+
+    def __enter__(self) -> BufferPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def _check_released(self) -> None:
+        if self._released:
+            raise RuntimeError("Buffer pool has been released")
+
+    def _bind(self) -> None:
+        for tensor, buffer in zip(self._tensors, self._slots[self._index]):
+            tensor.set_buffer(buffer)
@@ -0,0 +1,284 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Asynchronous inference on top of :class:`synap.Network`.
+
+A :class:`NetworkExecutor` owns a network and runs all inferences on a
+dedicated worker thread, in submission order. Inferences can be submitted
+from any thread with :meth:`NetworkExecutor.submit`, which returns a
+:class:`concurrent.futures.Future`, or awaited from an asyncio event loop
+with :meth:`NetworkExecutor.predict_async`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+from ._synap import Network
+
+__all__ = [
+    "InferenceResult",
+    "NetworkExecutor",
+]
+
+_STOP = object()
+
+
+class InferenceResult:
+    """
+    Dequantized outputs of one inference.
+
+    The output arrays stay valid until :meth:`release` is called, after which
+    they are recycled for later inferences. Results can be used as a context
+    manager to release them automatically.
+    """
+
+    def __init__(self, outputs: list[np.ndarray], executor: NetworkExecutor):
+        self._outputs: Optional[list[np.ndarray]] = outputs
+        self._executor = executor
+
+    @property
+    def outputs(self) -> list[np.ndarray]:
+        """
+        Output arrays, one per network output.
+
+        :raises RuntimeError: if the result has been released.
+        """
+        if self._outputs is None:
+            raise RuntimeError("Inference result has been released")
+        return self._outputs
+
+    @property
+    def released(self) -> bool:
+        """
+        True if the result has been released.
+        """
+        return self._outputs is None
+
+    def release(self) -> None:
+        """
+        Give the output arrays back to the executor for reuse.
+
+        The arrays must not be accessed after this call. Releasing a result
+        twice has no effect.
+        """
+        if self._outputs is not None:
+            outputs, self._outputs = self._outputs, None
+            self._executor._recycle(outputs)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.outputs[index]
+
+    def __len__(self) -> int:
+        return len(self.outputs)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self.outputs)
+
+    def __enter__(self) -> InferenceResult:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class NetworkExecutor:
+    """
+    Run inferences of a network on a dedicated worker thread.
+
+    The executor takes ownership of the network: once passed to the executor
+    it must not be used directly by other threads. Inferences run in
+    submission order, with at most ``max_in_flight`` requests queued or
+    running at any time; further submissions wait for a slot to free up.
+
+    :param network: network instance or path to the model file.
+    :param max_in_flight: maximum number of queued and running inferences.
+    """
+
+    def __init__(self, network: Union[Network, str], max_in_flight: int = 2):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self._network = Network(network) if isinstance(network, str) else network
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._async_waiters: collections.deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = collections.deque()
+        self._free_outputs: list[list[np.ndarray]] = []
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="synap-executor", daemon=True)
+        self._thread.start()
+
+    @property
+    def network(self) -> Network:
+        """
+        The network owned by the executor.
+        """
+        return self._network
+
+    @property
+    def max_in_flight(self) -> int:
+        """
+        Maximum number of queued and running inferences.
+        """
+        return self._max_in_flight
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of inferences currently queued or running.
+        """
+        with self._cond:
+            return self._in_flight
+
+    def submit(self, *inputs: np.ndarray, timeout: Optional[float] = None) -> Future:
+        """
+        Queue an inference.
+
+        Blocks while ``max_in_flight`` inferences are already pending.
+        Cancelling the returned future before the inference starts removes it
+        from the queue.
+
+        :param inputs: one NumPy array per network input.
+        :param timeout: maximum time in seconds to wait for a free slot, wait forever if None.
+        :return: future resolving to an :class:`InferenceResult`.
+        :raises TimeoutError: if no slot became free within ``timeout``.
+        :raises RuntimeError: if the executor is closed.
+        """
+        with self._cond:
+            if not self._cond.wait_for(self._has_slot, timeout):
+                raise TimeoutError("Timed out waiting for a free inference slot")
+            return self._enqueue(inputs)
+
+    async def predict_async(self, *inputs: np.ndarray) -> InferenceResult:
+        """
+        Run an inference without blocking the event loop.
+
+        Waits asynchronously while ``max_in_flight`` inferences are already
+        pending. Cancelling the awaiting task cancels the inference if it has
+        not started yet.
+
+        :param inputs: one NumPy array per network input.
+        :return: the inference result.
+        :raises RuntimeError: if the executor is closed.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._has_slot():
+                    future = self._enqueue(inputs)
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._cond:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+                    else:
+                        # We were woken up for a slot we will not use, pass it on
+                        self._wake_async_waiter()
+                raise
+        return await asyncio.wrap_future(future)
+
+    def close(self, cancel_pending: bool = False) -> None:
+        """
+        Stop the worker thread once the queued inferences are done.
+
+        :param cancel_pending: cancel the inferences that have not started yet instead of running them.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            while self._async_waiters:
+                self._wake_async_waiter()
+            # Requests are queued with the lock held, none can be queued after the stop marker
+            if cancel_pending:
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    item[0].cancel()
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def __enter__(self) -> NetworkExecutor:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _has_slot(self) -> bool:
+        if self._closed:
+            raise RuntimeError("Executor is closed")
+        return self._in_flight < self._max_in_flight
+
+    def _release_slot(self, _future: Future) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+            self._wake_async_waiter()
+
+    def _wake_async_waiter(self) -> None:
+        # Must be called with self._cond held
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_set_waiter, waiter)
+                return
+
+    def _enqueue(self, inputs: tuple) -> Future:
+        # Must be called with self._cond held, so that close() can't queue the stop marker first
+        if self._closed:
+            raise RuntimeError("Executor is closed")
+        self._in_flight += 1
+        future: Future = Future()
+        future.add_done_callback(self._release_slot)
+        self._queue.put((future, inputs))
+        return future
+
+    def _recycle(self, outputs: list[np.ndarray]) -> None:
+        with self._cond:
+            if len(self._free_outputs) < self._max_in_flight:
+                self._free_outputs.append(outputs)
+
+    def _output_arrays(self) -> list[np.ndarray]:
+        with self._cond:
+            if self._free_outputs:
+                return self._free_outputs.pop()
+        return [np.empty(tuple(out.shape), dtype=np.float32) for out in self._network.outputs]
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            future, inputs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                outputs = self._network.predict(list(inputs)) if inputs else self._network.predict()
+                arrays = self._output_arrays()
+                for dst, out in zip(arrays, outputs):
+                    np.copyto(dst, out.to_numpy())
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(InferenceResult(arrays, self))
+
+
+def _set_waiter(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,25 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+from __future__ import annotations
+
+from .._synap.metrics import (
+    disable,
+    enable,
+    enabled,
+    reset,
+    snapshot,
+)
+
+from .prometheus import (
+    prometheus_text,
+)
+
+__all__ = [
+    "disable",
+    "enable",
+    "enabled",
+    "prometheus_text",
+    "reset",
+    "snapshot",
+]
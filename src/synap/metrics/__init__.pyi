@@ -0,0 +1,37 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+SyNAP runtime metrics
+"""
+from __future__ import annotations
+from .prometheus import prometheus_text
+__all__ = ['disable', 'enable', 'enabled', 'prometheus_text', 'reset', 'snapshot']
+def disable() -> None:
+    """
+    Disable the recording of metrics, the recorded values are kept
+    """
+def enable(enabled: bool = True) -> None:
+    """
+    Enable or disable the recording of metrics, they are disabled by default unless the SYNAP_METRICS environment variable is set
+    """
+def enabled() -> bool:
+    """
+    Check if metrics are being recorded
+    """
+def reset() -> None:
+    """
+    Reset all the recorded values to zero
+    """
+def snapshot() -> list:
+    """
+    Get the current value of all the metrics.
+
+    Each metric family is a dict with ``name``, ``type`` (``"counter"`` or
+    ``"summary"``), ``help`` and ``samples``. Each sample has ``labels``
+    and either the ``value`` of a counter, or the ``count``, ``sum``,
+    ``max`` and ``quantiles`` (0.5, 0.95 and 0.99) of the recorded
+    durations in seconds.
+
+    :rtype: list[dict]
+    """
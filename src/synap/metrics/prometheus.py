@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Export of the runtime metrics in the Prometheus text exposition format.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+from .._synap.metrics import snapshot
+
+__all__ = [
+    "prometheus_text",
+]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str], **extra: str) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _value(value: float) -> str:
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    return repr(value)
+
+
+def prometheus_text(families: Optional[list[dict]] = None) -> str:
+    """
+    Format metrics in the Prometheus text exposition format.
+
+    Durations are exported as summaries in seconds, with their 0.5, 0.95
+    and 0.99 quantiles. The text can be served on a ``/metrics`` HTTP
+    endpoint, or written to a file read by the node exporter textfile
+    collector.
+
+    :param families: metrics as returned by :func:`snapshot`, the current metrics if None.
+    :return: the metrics in the Prometheus text format.
+    """
+    if families is None:
+        families = snapshot()
+    lines = []
+    for family in families:
+        name = family["name"]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for sample in family["samples"]:
+            labels = sample["labels"]
+            if family["type"] == "counter":
+                lines.append(f"{name}{_labels(labels)} {sample['value']}")
+                continue
+            for quantile, value in sample["quantiles"].items():
+                value = value if sample["count"] else math.nan
+                lines.append(f"{name}{_labels(labels, quantile=repr(quantile))} {_value(value)}")
+            lines.append(f"{name}_sum{_labels(labels)} {_value(sample['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {sample['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,242 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+LRU cache of loaded networks.
+
+A :class:`ModelCache` keeps recently used models loaded, so that switching
+between models on demand does not reload them each time. Models are
+memory-mapped while loading instead of being read into Python memory.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import mmap
+import os
+import threading
+from typing import Iterable, Optional
+
+from ._synap import Network
+
+__all__ = [
+    "ModelCache",
+    "load_network",
+]
+
+
+def load_network(model_file: str, meta_file: str = "") -> Network:
+    """
+    Load a network from a memory-mapped model file.
+
+    The model data is passed to the runtime without being read into a
+    Python object first.
+
+    :param model_file: path to the model file.
+    :param meta_file: path to the model metadata file, for models in legacy format.
+    :return: the loaded network.
+    """
+    meta_data = ""
+    if meta_file:
+        with open(meta_file, "r") as f:
+            meta_data = f.read()
+    network = Network()
+    with open(model_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as model_data:
+        network.load_model(model_data, meta_data)
+    # Same metrics label as a network loaded from the file
+    network.metrics_label = os.path.splitext(os.path.basename(model_file))[0]
+    return network
+
+
+def _network_footprint(network: Network, model_size: int) -> int:
+    # Model data plus the memory of the input and output tensors
+    return model_size + sum(t.size for t in network.inputs) + sum(t.size for t in network.outputs)
+
+
+class ModelCache:
+    """
+    Keep recently used networks loaded, evicting the least recently used
+    ones when the memory budget is exceeded.
+
+    The memory used by a model is estimated as the size of its model file
+    plus the size of its input and output tensors. A model larger than the
+    whole budget is still loaded, after evicting all the other models.
+
+    Evicted networks are only dropped from the cache: a network obtained
+    with :meth:`get` stays valid as long as the caller references it.
+
+    :param memory_budget: maximum estimated memory in bytes used by the cached models, no limit if None.
+    :param max_models: maximum number of cached models, no limit if None.
+    :param preload: model files to load immediately.
+    """
+
+    def __init__(
+        self,
+        memory_budget: Optional[int] = None,
+        max_models: Optional[int] = None,
+        preload: Iterable[str] = (),
+    ):
+        if memory_budget is not None and memory_budget < 0:
+            raise ValueError("memory_budget must not be negative")
+        if max_models is not None and max_models < 1:
+            raise ValueError("max_models must be at least 1")
+        self._memory_budget = memory_budget
+        self._max_models = max_models
+        self._entries: collections.OrderedDict[tuple[str, str], tuple[Network, int]] = collections.OrderedDict()
+        self._memory_usage = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+        # Futures of the models being loaded, shared by concurrent misses
+        self._loading: dict[tuple[str, str], concurrent.futures.Future] = {}
+        self.preload(preload)
+
+    @property
+    def memory_budget(self) -> Optional[int]:
+        """
+        Maximum estimated memory in bytes used by the cached models.
+        """
+        return self._memory_budget
+
+    @property
+    def memory_usage(self) -> int:
+        """
+        Estimated memory in bytes used by the cached models.
+        """
+        with self._lock:
+            return self._memory_usage
+
+    @property
+    def hits(self) -> int:
+        """
+        Number of :meth:`get` calls served from the cache or by a load already in progress.
+        """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """
+        Number of :meth:`get` calls that loaded the model.
+        """
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        """
+        Number of models evicted to stay within the limits.
+        """
+        return self._evictions
+
+    @property
+    def models(self) -> list[str]:
+        """
+        Cached model files, from least to most recently used.
+        """
+        with self._lock:
+            return [model_file for model_file, _ in self._entries]
+
+    def get(self, model_file: str, meta_file: str = "") -> Network:
+        """
+        Get the network of a model, loading it if it is not cached.
+
+        The model is loaded without holding the cache lock, so other models
+        can be served meanwhile. Concurrent calls for a model being loaded
+        wait for that load instead of loading the model again.
+
+        :param model_file: path to the model file.
+        :param meta_file: path to the model metadata file, for models in legacy format.
+        :return: the loaded network.
+        """
+        return self._get(model_file, meta_file, count=True)
+
+    def preload(self, model_files: Iterable[str]) -> None:
+        """
+        Load models into the cache without counting hits or misses.
+
+        :param model_files: paths to the model files.
+        """
+        for model_file in model_files:
+            self._get(model_file, "", count=False)
+
+    def evict(self, model_file: str, meta_file: str = "") -> bool:
+        """
+        Remove a model from the cache.
+
+        :param model_file: path to the model file.
+        :param meta_file: path to the model metadata file, for models in legacy format.
+        :return: True if the model was cached.
+        """
+        with self._lock:
+            entry = self._entries.pop(self._key(model_file, meta_file), None)
+            if entry is None:
+                return False
+            self._memory_usage -= entry[1]
+            return True
+
+    def clear(self) -> None:
+        """
+        Remove all the models from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._memory_usage = 0
+
+    def __contains__(self, model_file: str) -> bool:
+        with self._lock:
+            return self._key(model_file, "") in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _get(self, model_file: str, meta_file: str, count: bool) -> Network:
+        key = self._key(model_file, meta_file)
+        with self._lock:
+            entry = self._entries.get(key)
+            loading = self._loading.get(key)
+            if count:
+                if entry is not None or loading is not None:
+                    self._hits += 1
+                else:
+                    self._misses += 1
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+            if loading is None:
+                self._loading[key] = future = concurrent.futures.Future()
+        if loading is not None:
+            return loading.result()
+
+        try:
+            network = load_network(model_file, meta_file)
+            footprint = _network_footprint(network, os.path.getsize(model_file))
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[key]
+            self._entries[key] = (network, footprint)
+            self._memory_usage += footprint
+            self._evict()
+        future.set_result(network)
+        return network
+
+    @staticmethod
+    def _key(model_file: str, meta_file: str) -> tuple[str, str]:
+        return os.path.realpath(model_file), os.path.realpath(meta_file) if meta_file else ""
+
+    def _over_limits(self) -> bool:
+        if self._max_models is not None and len(self._entries) > self._max_models:
+            return True
+        return self._memory_budget is not None and self._memory_usage > self._memory_budget
+
+    def _evict(self) -> None:
+        # Never evict the most recently used model
+        while len(self._entries) > 1 and self._over_limits():
+            _, (_, footprint) = self._entries.popitem(last=False)
+            self._memory_usage -= footprint
+            self._evictions += 1
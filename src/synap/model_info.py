@@ -0,0 +1,282 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Model metadata, read without loading the model.
+
+:meth:`ModelInfo.from_file` reads the names, shapes, layouts, data types and
+quantization of the tensors of a model from its metadata (``0/model.json``
+in the ``.synap`` archive), without creating a :class:`synap.Network` and
+allocating NPU resources. This module does not import NumPy, so that
+validation tools and health checks start quickly.
+"""
+
+from __future__ import annotations
+
+import collections
+import io
+import json
+import os
+import threading
+import zipfile
+from typing import Any, Callable, Optional, Union
+
+from ._synap.types import DataType, Layout, Shape
+
+__all__ = [
+    "ModelInfo",
+    "QuantizationInfo",
+    "TensorInfo",
+]
+
+_MODEL_META_FILE = "0/model.json"
+
+#: Maximum number of models kept in the cache of ModelInfo.from_file
+CACHE_SIZE = 64
+
+# Data type names in the model metadata, including the ones of the "quantize" node
+_DATA_TYPES = {
+    "byte": DataType.byte,
+    "int8": DataType.int8,
+    "i8": DataType.int8,
+    "uint8": DataType.uint8,
+    "u8": DataType.uint8,
+    "int16": DataType.int16,
+    "i16": DataType.int16,
+    "uint16": DataType.uint16,
+    "u16": DataType.uint16,
+    "int32": DataType.int32,
+    "uint32": DataType.uint32,
+    "float16": DataType.float16,
+    "float32": DataType.float32,
+}
+
+_DATA_TYPE_SIZES = {
+    DataType.byte: 1,
+    DataType.int8: 1,
+    DataType.uint8: 1,
+    DataType.int16: 2,
+    DataType.uint16: 2,
+    DataType.float16: 2,
+    DataType.int32: 4,
+    DataType.uint32: 4,
+    DataType.float32: 4,
+}
+
+_LAYOUTS = {
+    "nhwc": Layout.nhwc,
+    "nchw": Layout.nchw,
+}
+
+_cache: collections.OrderedDict[tuple, ModelInfo] = collections.OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _scalar(value: Any) -> Any:
+    # Per-channel values are given as lists, only the first one is used as by the runtime
+    return value[0] if isinstance(value, list) else value
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+def _read_archive(source: Union[str, io.BytesIO]) -> dict:
+    # Metadata of a model file or file-like object
+    with zipfile.ZipFile(source, "r") as archive:
+        if _MODEL_META_FILE not in archive.namelist():
+            raise ValueError("missing model metadata")
+        with archive.open(_MODEL_META_FILE, "r") as f:
+            return json.load(f)
+
+
+class QuantizationInfo:
+    """
+    Quantization of a tensor.
+
+    ``scheme`` is ``"asymmetric_affine"`` (``value = (q - zero_point) * scale``),
+    ``"dynamic_fixed_point"`` (``value = q * 2 ** -fractional_length``) or
+    ``"none"``.
+    """
+
+    def __init__(self, scheme: str = "none", zero_point: int = 0, scale: float = 0.0, fractional_length: int = 0):
+        self.scheme = scheme
+        self.zero_point = zero_point
+        self.scale = scale
+        self.fractional_length = fractional_length
+
+    def __repr__(self) -> str:
+        return (
+            f"QuantizationInfo(scheme={self.scheme!r}, zero_point={self.zero_point}, "
+            f"scale={self.scale}, fractional_length={self.fractional_length})"
+        )
+
+
+class TensorInfo:
+    """
+    Metadata of an input or output tensor of a model.
+
+    ``data_format``, ``mean`` and ``scale`` describe the expected input data
+    (such as ``"rgb"`` and its normalization) for the inputs converted by the
+    model, they are empty for other tensors.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        shape: list[int],
+        layout: Layout,
+        data_type: DataType,
+        quantization: QuantizationInfo,
+        data_format: str = "",
+        mean: Optional[list[float]] = None,
+        scale: Optional[float] = None,
+    ):
+        self.name = name
+        self.shape = Shape(shape)
+        self.layout = layout
+        self.data_type = data_type
+        self.quantization = quantization
+        self.data_format = data_format
+        self.mean = mean or []
+        self.scale = scale
+        self._dims = list(shape)
+
+    @property
+    def item_count(self) -> int:
+        """
+        Number of items in the tensor.
+        """
+        count = 1
+        for dim in self._dims:
+            count *= dim
+        return count
+
+    @property
+    def size(self) -> int:
+        """
+        Size of the tensor in bytes.
+        """
+        return self.item_count * _DATA_TYPE_SIZES[self.data_type]
+
+    @staticmethod
+    def _from_metadata(info: dict) -> TensorInfo:
+        # Same interpretation of the tensor metadata as the SyNAP runtime
+        dtype = info.get("dtype", "float32")
+        quantize = info.get("quantize", {})
+        if dtype != "float32" and "qtype" in quantize:
+            dtype = quantize["qtype"]
+        scheme = info.get("quantizer")
+        if scheme is None:
+            scheme = "asymmetric_affine" if "scale" in quantize else "dynamic_fixed_point" if "fl" in quantize else "none"
+        shape = info["shape"]
+        mean = info.get("mean", [])
+        return TensorInfo(
+            name=info.get("name", ""),
+            shape=[shape] if isinstance(shape, int) else list(shape),
+            layout=_LAYOUTS.get(info.get("format", "none"), Layout.none),
+            data_type=_DATA_TYPES[dtype],
+            quantization=QuantizationInfo(
+                scheme=scheme,
+                zero_point=int(_scalar(quantize.get("zero_point", 0))),
+                scale=float(_scalar(quantize.get("scale", 0.0))),
+                fractional_length=int(_scalar(quantize.get("fl", 0))),
+            ),
+            data_format=info.get("data_format", ""),
+            mean=[float(m) for m in mean] if isinstance(mean, list) else [float(mean)],
+            scale=float(info["scale"]) if info.get("scale") is not None else None,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"TensorInfo(name={self.name!r}, shape={self._dims}, layout={self.layout.name}, "
+            f"data_type={self.data_type.name}, quantization={self.quantization!r})"
+        )
+
+
+class ModelInfo:
+    """
+    Metadata of a model: its input and output tensors and its delegate.
+
+    Use :meth:`from_file` or :meth:`from_data` to read it.
+    """
+
+    def __init__(self, inputs: list[TensorInfo], outputs: list[TensorInfo], delegate: str = "npu", secure: bool = False):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.delegate = delegate
+        self.secure = secure
+
+    @staticmethod
+    def from_file(model_file: str, meta_file: str = "") -> ModelInfo:
+        """
+        Read the metadata of a model file, without loading the model.
+
+        Results are cached by path and modification time, so reading the
+        same unchanged model again does not parse it again. The returned
+        object is shared by all the callers and must not be modified.
+
+        :param model_file: path to the model file.
+        :param meta_file: path to the model metadata file, for models in legacy format.
+        :return: the model metadata.
+        :raises FileNotFoundError: if the model file or the metadata file does not exist.
+        :raises RuntimeError: if the model metadata is missing or invalid.
+        """
+        paths = (os.path.abspath(model_file), os.path.abspath(meta_file) if meta_file else "")
+        key = paths + tuple(os.stat(path).st_mtime_ns for path in paths if path)
+        with _cache_lock:
+            info = _cache.get(key)
+            if info is not None:
+                _cache.move_to_end(key)
+                return info
+        if meta_file:
+            info = ModelInfo._parse(lambda: json.loads(_read_text(meta_file)), model_file)
+        else:
+            info = ModelInfo._parse(lambda: _read_archive(model_file), model_file)
+        with _cache_lock:
+            # Drop the entries of previous versions of the same files
+            for stale in [k for k in _cache if k[:2] == paths]:
+                del _cache[stale]
+            _cache[key] = info
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+        return info
+
+    @staticmethod
+    def from_data(model_data: Union[bytes, bytearray, memoryview, Any], meta_data: str = "") -> ModelInfo:
+        """
+        Read the metadata of a model in memory, such as the data given to :meth:`synap.Network.load_model`.
+
+        :param model_data: the model data, any bytes-like object.
+        :param meta_data: the model metadata, for models in legacy format.
+        :return: the model metadata.
+        :raises RuntimeError: if the model metadata is missing or invalid.
+        """
+        if meta_data:
+            return ModelInfo._parse(lambda: json.loads(meta_data), "<data>")
+        return ModelInfo._parse(lambda: _read_archive(io.BytesIO(model_data)), "<data>")
+
+    @staticmethod
+    def clear_cache() -> None:
+        """
+        Remove all the models from the cache of :meth:`from_file`.
+        """
+        with _cache_lock:
+            _cache.clear()
+
+    @staticmethod
+    def _parse(read_metadata: Callable[[], dict], name: str) -> ModelInfo:
+        try:
+            metadata = read_metadata()
+            return ModelInfo(
+                inputs=[TensorInfo._from_metadata(info) for info in metadata["Inputs"].values()],
+                outputs=[TensorInfo._from_metadata(info) for info in metadata["Outputs"].values()],
+                delegate=metadata.get("delegate", "npu"),
+                secure=bool(metadata.get("secure", False)),
+            )
+        except (zipfile.BadZipFile, ValueError, KeyError, TypeError, AttributeError) as e:
+            raise RuntimeError(f"Invalid SyNAP model '{name}': {e}") from e
+
+    def __repr__(self) -> str:
+        return f"ModelInfo(inputs={self.inputs!r}, outputs={self.outputs!r}, delegate={self.delegate!r})"
@@ -0,0 +1,376 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Pipelined streaming inference.
+
+:func:`stream` runs preprocessing, inference and postprocessing of a
+sequence of frames on three threads connected by bounded queues, so that
+the next frame is preprocessed and the previous one postprocessed while the
+NPU is busy. Results are yielded in frame order.
+
+With a synap :class:`Preprocessor`, :class:`Classifier` or :class:`Detector`,
+the network tensors rotate over the buffers of a :class:`BufferPool`, so that
+the next frame is written to the inputs and the previous outputs are read
+without waiting for the inference.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Union
+
+import numpy as np
+
+from ._synap import Network
+from .buffer_pool import BufferPool
+from .preprocessor import InputData, Preprocessor
+from .postprocessor import Classifier, Detector
+
+__all__ = [
+    "Pipeline",
+    "StageStats",
+    "stream",
+]
+
+#: Callable preprocessor: takes a frame, returns ``(inputs, context)``
+PreprocessFn = Callable[[Any], "tuple[Union[np.ndarray, Sequence[np.ndarray]], Any]"]
+#: Callable postprocessor: takes the dequantized outputs and the frame context
+PostprocessFn = Callable[[list, Any], Any]
+
+_STAGES = ("pre", "infer", "post")
+_END = object()
+_POLL_INTERVAL = 0.1
+
+
+class StageStats:
+    """
+    Activity of one pipeline stage.
+
+    A stage is busy while it processes an item, and idle while it waits for
+    an input item or for room in its output queue. The stage with the
+    highest occupancy limits the pipeline throughput.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_time = 0.0
+        self.elapsed_time = 0.0
+
+    @property
+    def occupancy(self) -> float:
+        """
+        Fraction of the pipeline run time the stage spent busy, between 0 and 1.
+        """
+        return self.busy_time / self.elapsed_time if self.elapsed_time > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"StageStats(name={self.name!r}, items={self.items}, "
+            f"busy_time={self.busy_time:.6f}, occupancy={self.occupancy:.3f})"
+        )
+
+
+class _Stopped(Exception):
+    pass
+
+
+class _Error:
+    def __init__(self, exception: Exception):
+        self.exception = exception
+
+
+class Pipeline:
+    """
+    Streaming inference over an iterable of frames, see :func:`stream`.
+
+    Iterating the pipeline yields one result per frame, in frame order. The
+    worker threads start on the first iteration and stop when all frames are
+    processed, when an error occurs, or when :meth:`close` is called.
+    """
+
+    def __init__(
+        self,
+        network: Network,
+        frames: Iterable,
+        preprocessor: Union[Preprocessor, PreprocessFn, None] = None,
+        postprocessor: Union[Detector, Classifier, PostprocessFn, None] = None,
+        depth: int = 3,
+    ):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self._network = network
+        self._frames = frames
+        self._preprocessor = preprocessor
+        self._postprocessor = postprocessor
+        self._depth = depth
+        self._stats = {name: StageStats(name) for name in _STAGES}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._queues: list[queue.Queue] = [queue.Queue(maxsize=depth) for _ in _STAGES]
+        # Buffers of the inputs written by a synap preprocessor and of the outputs read by a synap
+        # postprocessor, one slot more than the queue depth so that the stages overlap with a depth of 1
+        self._slots = depth + 1
+        self._input_pool: Optional[BufferPool] = None
+        self._output_pool: Optional[BufferPool] = None
+        self._next_input_slot = 0
+        self._inputs_free = threading.Semaphore(self._slots)
+        self._outputs_free = threading.Semaphore(self._slots)
+        self._threads: list[threading.Thread] = []
+        self._start_time: Optional[float] = None
+        self._end_time: Optional[float] = None
+
+    @property
+    def depth(self) -> int:
+        """
+        Maximum number of items queued between two stages.
+        """
+        return self._depth
+
+    @property
+    def stats(self) -> dict[str, StageStats]:
+        """
+        Snapshot of the statistics of the ``"pre"``, ``"infer"`` and ``"post"`` stages.
+        """
+        with self._lock:
+            end = self._end_time if self._end_time is not None else time.perf_counter()
+            elapsed = end - self._start_time if self._start_time is not None else 0.0
+            stats = {}
+            for name, stage in self._stats.items():
+                snapshot = StageStats(name)
+                snapshot.items = stage.items
+                snapshot.busy_time = stage.busy_time
+                snapshot.elapsed_time = elapsed
+                stats[name] = snapshot
+            return stats
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._start_time is not None:
+            raise RuntimeError("Pipeline can only be iterated once")
+        self._start_time = time.perf_counter()
+        try:
+            if isinstance(self._preprocessor, Preprocessor):
+                self._input_pool = self._buffer_pool(self._network.inputs)
+            if isinstance(self._postprocessor, (Detector, Classifier)):
+                self._output_pool = self._buffer_pool(self._network.outputs)
+            targets = (self._run_pre, self._run_infer, self._run_post)
+            self._threads = [
+                threading.Thread(target=target, name=f"synap-pipeline-{name}", daemon=True)
+                for name, target in zip(_STAGES, targets)
+            ]
+            for thread in self._threads:
+                thread.start()
+            while True:
+                item = self._get(self._queues[2])
+                if item is _END:
+                    break
+                if isinstance(item, _Error):
+                    raise item.exception
+                yield item
+        except _Stopped:
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        Stop the worker threads, dropping the frames not processed yet.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        # The network tensors use their own buffers again
+        for pool in (self._input_pool, self._output_pool):
+            if pool is not None:
+                pool.release()
+        with self._lock:
+            if self._start_time is not None and self._end_time is None:
+                self._end_time = time.perf_counter()
+
+    def __enter__(self) -> Pipeline:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, q: queue.Queue) -> Any:
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+    def _acquire(self, semaphore: threading.Semaphore) -> None:
+        while not semaphore.acquire(timeout=_POLL_INTERVAL):
+            if self._stop.is_set():
+                raise _Stopped()
+
+    def _buffer_pool(self, tensors: Any) -> BufferPool:
+        pool = BufferPool(tensors, self._slots)
+        try:
+            pool.slot_tensors()
+        except RuntimeError:
+            pool.release()
+            raise
+        return pool
+
+    def _record(self, stage: str, start: float) -> None:
+        with self._lock:
+            stats = self._stats[stage]
+            stats.items += 1
+            stats.busy_time += time.perf_counter() - start
+
+    def _run_stage(self, stage: str, source: Callable[[], Any], process: Callable[[Any], Any], dst: queue.Queue) -> None:
+        try:
+            while True:
+                item = source()
+                if item is _END or isinstance(item, _Error):
+                    self._put(dst, item)
+                    return
+                start = time.perf_counter()
+                try:
+                    result = process(item)
+                except _Stopped:
+                    raise
+                except Exception as e:
+                    self._put(dst, _Error(e))
+                    return
+                self._record(stage, start)
+                self._put(dst, result)
+        except _Stopped:
+            pass
+
+    def _run_pre(self) -> None:
+        frames = iter(self._frames)
+
+        def source():
+            try:
+                return next(frames)
+            except StopIteration:
+                return _END
+            except Exception as e:
+                return _Error(e)
+
+        self._run_stage("pre", source, self._preprocess, self._queues[0])
+
+    def _run_infer(self) -> None:
+        self._run_stage("infer", lambda: self._get(self._queues[0]), self._infer, self._queues[1])
+
+    def _run_post(self) -> None:
+        self._run_stage("post", lambda: self._get(self._queues[1]), self._postprocess, self._queues[2])
+
+    def _preprocess(self, frame: Any) -> tuple[Any, Any]:
+        if self._preprocessor is None:
+            return frame, None
+        if isinstance(self._preprocessor, Preprocessor):
+            # Write to the slot of the input buffers used by the inference of this frame,
+            # slots are used in frame order once the inference of their previous frame is done
+            data = InputData(frame) if isinstance(frame, str) else frame
+            self._acquire(self._inputs_free)
+            slot = self._next_input_slot
+            self._next_input_slot = (slot + 1) % self._slots
+            return slot, self._preprocessor.assign(self._input_pool.slot_tensors(slot), data)
+        return self._preprocessor(frame)
+
+    def _infer(self, item: tuple[Any, Any]) -> tuple[Any, Any]:
+        data, context = item
+        if self._input_pool is None:
+            inputs = self._network.inputs
+            if isinstance(data, np.ndarray):
+                data = [data]
+            if len(data) != len(inputs):
+                raise ValueError(f"Invalid number of inputs: expected {len(inputs)}, got {len(data)}")
+            for tensor, arr in zip(inputs, data):
+                tensor.assign(arr)
+        if self._output_pool is not None:
+            # Wait until the postprocessing of the frame that used the current output slot is done
+            self._acquire(self._outputs_free)
+        # The current slots of the pools are the ones of this frame
+        outputs = self._network.predict()
+        if self._input_pool is not None:
+            self._input_pool.rotate()
+            self._inputs_free.release()
+        if self._output_pool is not None:
+            slot = self._output_pool.index
+            self._output_pool.rotate()
+            return self._output_pool.slot_tensors(slot), context
+        return [out.to_numpy().copy() for out in outputs], context
+
+    def _postprocess(self, item: tuple[Any, Any]) -> Any:
+        outputs, context = item
+        if isinstance(self._postprocessor, Detector):
+            try:
+                return self._postprocessor.process(outputs, context)
+            finally:
+                self._outputs_free.release()
+        if isinstance(self._postprocessor, Classifier):
+            try:
+                return self._postprocessor.process(outputs)
+            finally:
+                self._outputs_free.release()
+        if self._postprocessor is None:
+            return outputs
+        return self._postprocessor(outputs, context)
+
+
+def stream(
+    network: Network,
+    frames: Iterable,
+    preprocessor: Union[Preprocessor, PreprocessFn, None] = None,
+    postprocessor: Union[Detector, Classifier, PostprocessFn, None] = None,
+    depth: int = 3,
+) -> Pipeline:
+    """
+    Run inference on a stream of frames, overlapping preprocessing, inference
+    and postprocessing on separate threads.
+
+    Each stage runs on its own thread and hands its results to the next one
+    through a queue holding at most ``depth`` items, so a slow stage blocks
+    the previous ones instead of letting frames pile up. The network must not
+    be used by other threads while the pipeline is running.
+
+    The preprocessor can be:
+
+    - None: each frame is the input data, a NumPy array or a sequence of arrays (one per input).
+    - a :class:`synap.preprocessor.Preprocessor`: each frame is a file name or an
+      :class:`InputData`, which is loaded and assigned in the preprocessing
+      stage, to input buffers that the network uses for this frame only. The
+      assigned rectangle is the frame context.
+    - a callable taking a frame and returning ``(inputs, context)``, where inputs
+      are as for None and context is passed to the postprocessor.
+
+    The postprocessor can be:
+
+    - None: results are the dequantized outputs as a list of NumPy arrays.
+    - a :class:`synap.postprocessor.Detector` or :class:`synap.postprocessor.Classifier`:
+      results are their ``process()`` results. They read output buffers that
+      the network used for this frame only, so they overlap with the next
+      inference.
+    - a callable taking the list of dequantized outputs (copies owned by the
+      callable) and the frame context, whose return value is the result.
+      It fully overlaps with the next inference.
+
+    :param network: network running the inferences.
+    :param frames: iterable of frames, consumed on the preprocessing thread.
+    :param preprocessor: frame preprocessor.
+    :param postprocessor: output postprocessor.
+    :param depth: maximum number of items queued between two stages. A synap
+        preprocessor or postprocessor uses ``depth + 1`` buffers per tensor.
+    :return: iterable pipeline yielding one result per frame, in frame order.
+    """
+    return Pipeline(network, frames, preprocessor, postprocessor, depth)
@@ -0,0 +1,194 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Pool of networks running the same model.
+
+A :class:`NetworkPool` reads a model once and loads it in several
+:class:`synap.Network` instances, which can be checked out by concurrent
+threads. Each instance has its own input and output tensors, so the
+threads never share a network.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+import time
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+
+from ._synap import Network
+
+__all__ = [
+    "InstanceStats",
+    "NetworkPool",
+]
+
+
+class InstanceStats:
+    """
+    Usage statistics of one network instance of a pool.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.checkouts = 0
+        self.inferences = 0
+        self.busy_time = 0.0
+        self.in_use = False
+
+    def _copy(self) -> InstanceStats:
+        stats = InstanceStats(self.index)
+        stats.checkouts = self.checkouts
+        stats.inferences = self.inferences
+        stats.busy_time = self.busy_time
+        stats.in_use = self.in_use
+        return stats
+
+    def __repr__(self) -> str:
+        return (
+            f"InstanceStats(index={self.index}, checkouts={self.checkouts}, "
+            f"inferences={self.inferences}, busy_time={self.busy_time:.6f}, in_use={self.in_use})"
+        )
+
+
+class NetworkPool:
+    """
+    Several networks loaded with the same model, dispatched to concurrent users.
+
+    The model file is read once and each instance is loaded from the same
+    bytes. A network is reserved with :meth:`checkout` and given back with
+    :meth:`checkin`, or used for the duration of a ``with pool.network()``
+    block. When several instances are free, the least busy one (lowest
+    accumulated checkout time) is chosen.
+
+    :param model: path to the model file, or the model data.
+    :param size: number of network instances.
+    :param meta: model metadata, for models in legacy format.
+    :param network_factory: function creating each network instance before the model is loaded into it, such as a :class:`synap.replay.ReplayNetwork`, :class:`synap.Network` if None.
+    """
+
+    def __init__(
+        self,
+        model: Union[str, bytes],
+        size: int = 2,
+        meta: str = "",
+        network_factory: Optional[Callable[[], Network]] = None,
+    ):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        label = None
+        if isinstance(model, str):
+            label = os.path.splitext(os.path.basename(model))[0]
+            with open(model, "rb") as f:
+                model = f.read()
+        self._networks: list[Network] = []
+        for _ in range(size):
+            network = network_factory() if network_factory is not None else Network()
+            network.load_model(model, meta)
+            if label is not None:
+                network.metrics_label = label
+            self._networks.append(network)
+        self._index = {id(network): i for i, network in enumerate(self._networks)}
+        self._stats = [InstanceStats(i) for i in range(size)]
+        self._checkout_time = [0.0] * size
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        """
+        Number of network instances.
+        """
+        return len(self._networks)
+
+    @property
+    def networks(self) -> list[Network]:
+        """
+        All the network instances of the pool.
+        """
+        return list(self._networks)
+
+    @property
+    def available(self) -> int:
+        """
+        Number of network instances not checked out.
+        """
+        with self._cond:
+            return sum(not stats.in_use for stats in self._stats)
+
+    @property
+    def stats(self) -> list[InstanceStats]:
+        """
+        Snapshot of the statistics of each instance.
+        """
+        with self._cond:
+            snapshot = [stats._copy() for stats in self._stats]
+        for stats, network in zip(snapshot, self._networks):
+            stats.inferences = network.generation
+        return snapshot
+
+    def checkout(self, timeout: Optional[float] = None) -> Network:
+        """
+        Reserve the least busy free network, waiting for one if all are in use.
+
+        :param timeout: maximum time in seconds to wait, wait forever if None.
+        :return: the reserved network, to be given back with :meth:`checkin`.
+        :raises TimeoutError: if no network became free within ``timeout``.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: any(not s.in_use for s in self._stats), timeout):
+                raise TimeoutError("Timed out waiting for a free network")
+            stats = min((s for s in self._stats if not s.in_use), key=lambda s: s.busy_time)
+            stats.in_use = True
+            stats.checkouts += 1
+            self._checkout_time[stats.index] = time.perf_counter()
+            return self._networks[stats.index]
+
+    def checkin(self, network: Network) -> None:
+        """
+        Give back a network reserved with :meth:`checkout`.
+
+        :param network: the network to give back.
+        :raises ValueError: if the network is not checked out from this pool.
+        """
+        index = self._index.get(id(network))
+        with self._cond:
+            if index is None or self._networks[index] is not network or not self._stats[index].in_use:
+                raise ValueError("Network is not checked out from this pool")
+            stats = self._stats[index]
+            stats.in_use = False
+            stats.busy_time += time.perf_counter() - self._checkout_time[index]
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def network(self, timeout: Optional[float] = None) -> Iterator[Network]:
+        """
+        Reserve a network for the duration of a ``with`` block.
+
+        :param timeout: maximum time in seconds to wait, wait forever if None.
+        :raises TimeoutError: if no network became free within ``timeout``.
+        """
+        network = self.checkout(timeout)
+        try:
+            yield network
+        finally:
+            self.checkin(network)
+
+    def predict(self, *inputs: np.ndarray, timeout: Optional[float] = None) -> list[np.ndarray]:
+        """
+        Run an inference on the least busy free network.
+
+        Can be called concurrently from several threads, up to :attr:`size`
+        inferences run in parallel.
+
+        :param inputs: one NumPy array per network input.
+        :param timeout: maximum time in seconds to wait for a free network, wait forever if None.
+        :return: copies of the dequantized outputs.
+        :raises TimeoutError: if no network became free within ``timeout``.
+        """
+        with self.network(timeout) as network:
+            outputs = network.predict(list(inputs)) if inputs else network.predict()
+            return [out.to_numpy().copy() for out in outputs]
@@ -14,6 +14,25 @@ from .._synap.postprocessor import (
     DetectorResultItems,
 )
 
+from .detection import (
+    batched_nms,
+    box_iou,
+    decode_anchor_based,
+    decode_anchor_free,
+    detect_anchor_free,
+    nms,
+    select,
+    to_detector_result,
+    to_image_boxes,
+    top_k,
+)
+
+from .masks import (
+    paste_masks,
+    paste_result_masks,
+    threshold_masks,
+)
+
 __all__ = [
     "Classifier",
     "ClassifierResult",
@@ -23,4 +42,17 @@ __all__ = [
     "DetectorResult",
     "DetectorResultItem",
     "DetectorResultItems",
+    "batched_nms",
+    "box_iou",
+    "decode_anchor_based",
+    "decode_anchor_free",
+    "detect_anchor_free",
+    "nms",
+    "paste_masks",
+    "paste_result_masks",
+    "select",
+    "threshold_masks",
+    "to_detector_result",
+    "to_image_boxes",
+    "top_k",
 ]
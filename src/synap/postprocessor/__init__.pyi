@@ -5,20 +5,39 @@
 SyNAP postprocessor
 """
 from __future__ import annotations
+import numpy
 import synap
 import synap.types
 import typing
-__all__ = ['Classifier', 'ClassifierResult', 'ClassifierResultItem', 'ClassifierResultItems', 'Detector', 'DetectorResult', 'DetectorResultItem', 'DetectorResultItems']
+from .detection import batched_nms, box_iou, decode_anchor_based, decode_anchor_free, detect_anchor_free, nms, select, to_detector_result, to_image_boxes, top_k
+from .masks import paste_masks, paste_result_masks, threshold_masks
+__all__ = ['Classifier', 'ClassifierResult', 'ClassifierResultItem', 'ClassifierResultItems', 'Detector', 'DetectorResult', 'DetectorResultItem', 'DetectorResultItems', 'batched_nms', 'box_iou', 'decode_anchor_based', 'decode_anchor_free', 'detect_anchor_free', 'nms', 'paste_masks', 'paste_result_masks', 'select', 'threshold_masks', 'to_detector_result', 'to_image_boxes', 'top_k']
 class Classifier:
     def __init__(self, top_count: int = 1) -> None:
         ...
     def process(self, outputs: synap.Tensors) -> ClassifierResult:
         """
-        Perform classification on network outputs
+        Perform classification on network outputs (releases the GIL)
+        """
+    def process_batch(self, outputs: synap.Tensors, n_threads: int = 1) -> list[ClassifierResult]:
+        """
+        Perform classification on each element of the batch dimension of the network output (releases the GIL).
+
+        :param outputs: network outputs, with a single tensor whose first dimension is the batch size.
+        :param n_threads: number of threads processing the elements in parallel, 0 for one per CPU core.
+        :return: one result per batch element.
+        :rtype: list[ClassifierResult]
         """
 class ClassifierResult:
     def __init__(self) -> None:
         ...
+    def as_arrays(self) -> dict[str, numpy.ndarray]:
+        """
+        Get all the results as NumPy arrays, without creating a Python object per item.
+
+        :return: dict with ``class_index`` (N,) int32 and ``scores`` (N,) float32 arrays.
+        :rtype: dict[str, numpy.ndarray]
+        """
     @property
     def items(self) -> ClassifierResultItems:
         ...
@@ -54,11 +73,54 @@ class Detector:
         ...
     def process(self, outputs: synap.Tensors, assigned_rect: synap.types.Rect) -> DetectorResult:
         """
-        Perform detection on network outputs
+        Perform detection on network outputs (releases the GIL)
+        """
+    def process_batch(self, outputs: synap.Tensors, assigned_rects: list[synap.types.Rect], n_threads: int = 1) -> list[DetectorResult]:
+        """
+        Perform detection on each element of the batch dimension of the network outputs (releases the GIL).
+
+        The output tensors whose first dimension is the batch size are split
+        into elements, each one decoded as the outputs of a single inference.
+
+        :param outputs: network outputs, the batch size is the first dimension of the first tensor.
+        :param assigned_rects: assigned rectangle of each batch element.
+        :param n_threads: number of threads processing the elements in parallel, 0 for one per CPU core.
+        :return: one result per element.
+        :rtype: list[DetectorResult]
         """
 class DetectorResult:
     def __init__(self) -> None:
         ...
+    def as_arrays(self) -> dict[str, numpy.ndarray]:
+        """
+        Get all the detections as NumPy arrays, without creating a Python object per item.
+
+        Boxes are ``(x, y, width, height)`` in the coordinates of the original
+        image. Items with fewer landmarks than the others are padded with
+        zeros and a visibility of -1.
+
+        :return: dict with ``boxes`` (N, 4) int32, ``scores`` (N,) float32,
+            ``class_index`` (N,) int32, ``landmarks`` (N, K, 3) int32 (x, y, z)
+            and ``landmark_visibility`` (N, K) float32 arrays.
+        :rtype: dict[str, numpy.ndarray]
+        """
+    @staticmethod
+    def from_arrays(boxes: numpy.ndarray[numpy.int32], scores: numpy.ndarray[numpy.float32], class_index: numpy.ndarray[numpy.int32], landmarks: numpy.ndarray[numpy.int32] | None = None, landmark_visibility: numpy.ndarray[numpy.float32] | None = None) -> DetectorResult:
+        """
+        Create a detection result from NumPy arrays, in the format returned by :meth:`as_arrays`.
+
+        This allows postprocessing implemented with NumPy to return the same
+        result type as :class:`Detector`. Padding landmarks (all zeros with a
+        visibility of -1) are dropped.
+
+        :param boxes: (N, 4) boxes as ``(x, y, width, height)`` in the coordinates of the original image.
+        :param scores: (N,) detection confidences.
+        :param class_index: (N,) class indices.
+        :param landmarks: optional (N, K, 3) landmarks as ``(x, y, z)``.
+        :param landmark_visibility: optional (N, K) landmark visibilities.
+        :return: the detection result.
+        :rtype: DetectorResult
+        """
     @property
     def items(self) -> DetectorResultItems:
         ...
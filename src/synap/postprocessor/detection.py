@@ -0,0 +1,401 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Vectorized NumPy building blocks for object detection postprocessing.
+
+These functions decode the outputs of detection heads not supported by
+:class:`Detector`, select the detections with score filtering, top-k and
+non-maximum suppression, and build a :class:`DetectorResult` like the one
+returned by :meth:`Detector.process`. They operate on whole arrays, such as
+the ones returned by :meth:`synap.Tensor.to_numpy`, without a Python loop
+per box.
+
+Boxes are handled as ``(x1, y1, x2, y2)`` float arrays in the coordinates of
+the network input until they are converted to image coordinates by
+:func:`to_image_boxes`.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .._synap.postprocessor import DetectorResult
+from .._synap.types import Rect
+
+__all__ = [
+    "batched_nms",
+    "box_iou",
+    "decode_anchor_based",
+    "decode_anchor_free",
+    "detect_anchor_free",
+    "nms",
+    "select",
+    "to_detector_result",
+    "to_image_boxes",
+    "top_k",
+]
+
+# Number of boxes whose overlaps with the other boxes are computed at once during NMS
+_NMS_BLOCK_SIZE = 512
+
+_DEFAULT_BOX_SCALES = {
+    "retinanet": (5.0, 5.0, 5.0, 5.0),
+    "center_size": (10.0, 10.0, 5.0, 5.0),
+}
+
+
+def _empty_detections() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int32)
+
+
+def decode_anchor_free(
+    output: np.ndarray,
+    score_threshold: float = 0.5,
+    scale: tuple[float, float] = (1.0, 1.0),
+    objectness: bool = False,
+    channels_first: bool = True,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode the output of an anchor-free head with one ``(cx, cy, w, h)`` box per position.
+
+    Each position has the box center and size, optionally an objectness
+    score, then one score per class. The score of a position is its best
+    class score, multiplied by the objectness if present.
+
+    :param output: ``(C, N)`` array for channels-first outputs such as YOLOv8, ``(N, C)`` otherwise,
+        optionally with a leading batch dimension of 1.
+    :param score_threshold: minimum score of the decoded boxes.
+    :param scale: (x, y) factors applied to the box coordinates.
+    :param objectness: if True the fifth channel is an objectness score, as in YOLOv5.
+    :param channels_first: if True the channels are the first dimension.
+    :return: ``(boxes, scores, class_index)`` with (N, 4) ``(x1, y1, x2, y2)`` float32 boxes,
+        (N,) float32 scores and (N,) int32 class indices.
+    """
+    output = np.asarray(output, dtype=np.float32)
+    if output.ndim == 3:
+        if output.shape[0] != 1:
+            raise ValueError(f"Expected a batch size of 1, got {output.shape[0]}")
+        output = output[0]
+    if output.ndim != 2:
+        raise ValueError(f"Expected a 2-D output, got shape {output.shape}")
+    if not channels_first:
+        output = output.T
+    first_class = 5 if objectness else 4
+    if output.shape[0] <= first_class:
+        raise ValueError(f"Output has no class scores: {output.shape[0]} channels")
+    class_scores = output[first_class:]
+    scores = class_scores.max(axis=0)
+    if objectness:
+        scores *= output[4]
+    keep = np.flatnonzero(scores >= score_threshold)
+    if keep.size == 0:
+        return _empty_detections()
+    class_index = class_scores[:, keep].argmax(axis=0).astype(np.int32)
+    cx, cy, w, h = output[:4, keep]
+    sx, sy = scale
+    boxes = np.stack(((cx - w / 2) * sx, (cy - h / 2) * sy, (cx + w / 2) * sx, (cy + h / 2) * sy), axis=1)
+    return boxes.astype(np.float32, copy=False), scores[keep], class_index
+
+
+def decode_anchor_based(
+    deltas: np.ndarray,
+    anchors: np.ndarray,
+    scores: np.ndarray,
+    score_threshold: float = 0.5,
+    scale: tuple[float, float] = (1.0, 1.0),
+    encoding: str = "retinanet",
+    box_scales: Optional[Sequence[float]] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode the box regressions of an anchor-based head.
+
+    Two box encodings are supported, with the same conventions as :class:`Detector`:
+
+    - ``"retinanet"``: deltas and anchors are ``(x1, y1, x2, y2)``, each corner is
+      moved by its delta divided by the box scale, times the anchor size.
+    - ``"center_size"``: deltas and anchors are ``(cy, cx, h, w)`` as in the TFLite
+      detection postprocess, centers are moved by their delta divided by the
+      box scale, times the anchor size, sizes are multiplied by ``exp(delta / box_scale)``.
+
+    :param deltas: (N, 4) regressed box deltas, optionally with a leading batch dimension of 1.
+    :param anchors: (N, 4) anchor boxes.
+    :param scores: (N, num_classes) class scores, optionally with a leading batch dimension of 1.
+    :param score_threshold: minimum score of the decoded boxes.
+    :param scale: (x, y) factors applied to the box coordinates.
+    :param encoding: box encoding, ``"retinanet"`` or ``"center_size"``.
+    :param box_scales: divisors of the 4 deltas, (5, 5, 5, 5) for ``"retinanet"``
+        and (10, 10, 5, 5) for ``"center_size"`` if None.
+    :return: ``(boxes, scores, class_index)`` with (N, 4) ``(x1, y1, x2, y2)`` float32 boxes,
+        (N,) float32 scores and (N,) int32 class indices.
+    """
+    if encoding not in _DEFAULT_BOX_SCALES:
+        raise ValueError(f"Unknown box encoding: {encoding}")
+    deltas = np.asarray(deltas, dtype=np.float32).reshape(-1, 4)
+    anchors = np.asarray(anchors, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32)
+    scores = scores.reshape(-1, scores.shape[-1])
+    if not len(deltas) == len(anchors) == len(scores):
+        raise ValueError(f"Got {len(deltas)} deltas, {len(anchors)} anchors and {len(scores)} scores")
+    best_scores = scores.max(axis=1) if scores.size else np.zeros(len(scores), dtype=np.float32)
+    keep = np.flatnonzero(best_scores >= score_threshold)
+    if keep.size == 0:
+        return _empty_detections()
+    class_index = scores[keep].argmax(axis=1).astype(np.int32)
+    deltas = deltas[keep] / np.asarray(box_scales or _DEFAULT_BOX_SCALES[encoding], dtype=np.float32)
+    anchors = anchors[keep]
+    sx, sy = scale
+    if encoding == "retinanet":
+        size = anchors[:, 2:] - anchors[:, :2]
+        boxes = anchors + deltas * np.tile(size, 2)
+        boxes *= np.array((sx, sy, sx, sy), dtype=np.float32)
+    else:
+        cy = deltas[:, 0] * anchors[:, 2] + anchors[:, 0]
+        cx = deltas[:, 1] * anchors[:, 3] + anchors[:, 1]
+        half_h = 0.5 * np.exp(deltas[:, 2]) * anchors[:, 2]
+        half_w = 0.5 * np.exp(deltas[:, 3]) * anchors[:, 3]
+        boxes = np.stack(((cx - half_w) * sx, (cy - half_h) * sy, (cx + half_w) * sx, (cy + half_h) * sy), axis=1)
+    return boxes.astype(np.float32, copy=False), best_scores[keep], class_index
+
+
+def _pairwise_overlap(boxes_a: np.ndarray, boxes_b: np.ndarray, iou_with_min: bool) -> np.ndarray:
+    # (M, N) overlaps of two (M, 4) and (N, 4) box arrays, 0 where the boxes do not intersect
+    iw = np.minimum(boxes_a[:, None, 2], boxes_b[:, 2]) - np.maximum(boxes_a[:, None, 0], boxes_b[:, 0])
+    ih = np.minimum(boxes_a[:, None, 3], boxes_b[:, 3]) - np.maximum(boxes_a[:, None, 1], boxes_b[:, 1])
+    intersecting = (iw > 0) & (ih > 0)
+    inter = np.where(intersecting, iw * ih, 0)
+    areas_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    areas_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    if iou_with_min:
+        denominator = np.minimum(areas_a[:, None], areas_b)
+    else:
+        denominator = areas_a[:, None] + areas_b - inter
+    return np.divide(inter, denominator, out=np.zeros_like(inter), where=intersecting)
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray, iou_with_min: bool = False) -> np.ndarray:
+    """
+    Compute the overlap of a box with other boxes.
+
+    :param box: ``(x1, y1, x2, y2)`` box.
+    :param boxes: (N, 4) ``(x1, y1, x2, y2)`` boxes.
+    :param iou_with_min: divide the intersection by the smaller of the two areas instead of the union.
+    :return: (N,) float32 overlaps, 0 for boxes that do not intersect.
+    """
+    box = np.asarray(box, dtype=np.float32).reshape(1, 4)
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return _pairwise_overlap(box, boxes, iou_with_min)[0]
+
+
+def nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    iou_threshold: float = 0.5,
+    iou_with_min: bool = False,
+    max_detections: int = 0,
+) -> np.ndarray:
+    """
+    Class-agnostic non-maximum suppression.
+
+    Boxes are selected in decreasing order of score, a box is discarded if its
+    overlap with an already selected box is above the threshold. This is the
+    selection done by :class:`Detector` when ``nms`` is enabled.
+
+    :param boxes: (N, 4) ``(x1, y1, x2, y2)`` boxes.
+    :param scores: (N,) box scores.
+    :param iou_threshold: maximum allowed overlap with a selected box.
+    :param iou_with_min: divide the intersection by the smaller of the two areas instead of the union.
+    :param max_detections: maximum number of selected boxes, 0 for no limit.
+    :return: indices of the selected boxes, in decreasing order of score.
+    """
+    return _nms(np.asarray(boxes, dtype=np.float32).reshape(-1, 4), scores, iou_threshold, iou_with_min, max_detections)
+
+
+def _nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float, iou_with_min: bool, max_detections: int) -> np.ndarray:
+    order = np.argsort(-np.asarray(scores, dtype=np.float32), kind="stable")
+    boxes = boxes[order]
+    count = len(order)
+    suppressed = np.zeros(count, dtype=bool)
+    selected = []
+    # The overlaps are computed for a block of boxes at a time against all the
+    # following ones, which bounds the memory used for many candidates
+    for start in range(0, count, _NMS_BLOCK_SIZE):
+        stop = min(start + _NMS_BLOCK_SIZE, count)
+        suppressing = _pairwise_overlap(boxes[start:stop], boxes[start:], iou_with_min) > iou_threshold
+        for i in range(start, stop):
+            if suppressed[i]:
+                continue
+            selected.append(i)
+            if len(selected) == max_detections:
+                return order[np.asarray(selected, dtype=np.intp)]
+            suppressed[start:] |= suppressing[i - start]
+    return order[np.asarray(selected, dtype=np.intp)]
+
+
+def batched_nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_index: np.ndarray,
+    iou_threshold: float = 0.5,
+    iou_with_min: bool = False,
+    max_detections: int = 0,
+) -> np.ndarray:
+    """
+    Class-wise non-maximum suppression, boxes only suppress boxes of the same class.
+
+    The boxes of each class are shifted to a disjoint region so that a single
+    :func:`nms` pass handles all the classes.
+
+    :param boxes: (N, 4) ``(x1, y1, x2, y2)`` boxes.
+    :param scores: (N,) box scores.
+    :param class_index: (N,) class of each box.
+    :param iou_threshold: maximum allowed overlap with a selected box of the same class.
+    :param iou_with_min: divide the intersection by the smaller of the two areas instead of the union.
+    :param max_detections: maximum number of selected boxes, 0 for no limit.
+    :return: indices of the selected boxes, in decreasing order of score.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if boxes.size == 0:
+        return np.zeros(0, dtype=np.intp)
+    extent = float(boxes.max() - boxes.min()) + 1
+    offsets = np.asarray(class_index, dtype=np.float32)[:, None] * extent
+    return _nms(boxes + offsets, scores, iou_threshold, iou_with_min, max_detections)
+
+
+def top_k(scores: np.ndarray, k: int = 0, score_threshold: Optional[float] = None) -> np.ndarray:
+    """
+    Select the highest scores.
+
+    :param scores: (N,) scores.
+    :param k: maximum number of selected scores, 0 for no limit.
+    :param score_threshold: minimum selected score, no minimum if None.
+    :return: indices of the selected scores, in decreasing order of score.
+    """
+    scores = np.asarray(scores)
+    indices = np.arange(len(scores)) if score_threshold is None else np.flatnonzero(scores >= score_threshold)
+    if 0 < k < len(indices):
+        indices = indices[np.argpartition(-scores[indices], k - 1)[:k]]
+    return indices[np.argsort(-scores[indices], kind="stable")]
+
+
+def select(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_index: Optional[np.ndarray] = None,
+    n_max: int = 0,
+    nms: bool = True,
+    iou_threshold: float = 0.5,
+    iou_with_min: bool = False,
+    class_agnostic: bool = True,
+) -> np.ndarray:
+    """
+    Select detections in decreasing order of score, with the same parameters as :class:`Detector`.
+
+    :param boxes: (N, 4) ``(x1, y1, x2, y2)`` boxes.
+    :param scores: (N,) box scores.
+    :param class_index: (N,) class of each box, required for class-wise NMS.
+    :param n_max: maximum number of detections, 0 for no limit.
+    :param nms: apply non-maximum suppression, else only keep the ``n_max`` best detections.
+    :param iou_threshold: maximum allowed overlap with a selected box.
+    :param iou_with_min: divide the intersection by the smaller of the two areas instead of the union.
+    :param class_agnostic: if True boxes suppress boxes of any class, as in :class:`Detector`, else only boxes of the same class.
+    :return: indices of the selected detections.
+    """
+    if not nms:
+        return top_k(scores, n_max)
+    if class_agnostic:
+        return _nms(np.asarray(boxes, dtype=np.float32).reshape(-1, 4), scores, iou_threshold, iou_with_min, n_max)
+    if class_index is None:
+        raise ValueError("class_index is required for class-wise NMS")
+    return batched_nms(boxes, scores, class_index, iou_threshold, iou_with_min, n_max)
+
+
+def _round(values: np.ndarray) -> np.ndarray:
+    # Round half away from zero, like std::round
+    return np.where(values >= 0, np.floor(values + 0.5), np.ceil(values - 0.5))
+
+
+def to_image_boxes(boxes: np.ndarray, assigned_rect: Rect) -> np.ndarray:
+    """
+    Convert boxes to image coordinates as :class:`Detector` does.
+
+    Box corners are rounded, clipped to the size of the assigned rectangle
+    and offset by its origin.
+
+    :param boxes: (N, 4) ``(x1, y1, x2, y2)`` boxes, scaled to the size of the assigned rectangle.
+    :param assigned_rect: rectangle of the original image assigned to the network input.
+    :return: (N, 4) int32 boxes as ``(x, y, width, height)``, as in :meth:`DetectorResult.as_arrays`.
+    """
+    corners = _round(np.asarray(boxes, dtype=np.float32).reshape(-1, 4))
+    size = assigned_rect.size
+    np.clip(corners[:, 0::2], 0, size.x, out=corners[:, 0::2])
+    np.clip(corners[:, 1::2], 0, size.y, out=corners[:, 1::2])
+    corners[:, 2:] -= corners[:, :2]
+    corners[:, 0] += assigned_rect.origin.x
+    corners[:, 1] += assigned_rect.origin.y
+    return corners.astype(np.int32)
+
+
+def to_detector_result(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_index: np.ndarray,
+    assigned_rect: Rect,
+    class_index_base: int = 0,
+) -> DetectorResult:
+    """
+    Create a :class:`DetectorResult` from selected detections.
+
+    :param boxes: (N, 4) ``(x1, y1, x2, y2)`` boxes, scaled to the size of the assigned rectangle.
+    :param scores: (N,) detection scores.
+    :param class_index: (N,) class of each detection.
+    :param assigned_rect: rectangle of the original image assigned to the network input.
+    :param class_index_base: value added to the class indices.
+    :return: the detection result.
+    """
+    class_index = np.asarray(class_index, dtype=np.int32) + np.int32(class_index_base)
+    return DetectorResult.from_arrays(to_image_boxes(boxes, assigned_rect), scores, class_index)
+
+
+def detect_anchor_free(
+    output: np.ndarray,
+    assigned_rect: Rect,
+    score_threshold: float = 0.5,
+    n_max: int = 0,
+    nms: bool = True,
+    iou_threshold: float = 0.5,
+    iou_with_min: bool = False,
+    class_agnostic: bool = True,
+    input_size: Optional[tuple[float, float]] = None,
+    objectness: bool = False,
+    channels_first: bool = True,
+    class_index_base: int = 0,
+) -> DetectorResult:
+    """
+    Perform detection on the output of an anchor-free head, see :func:`decode_anchor_free`.
+
+    With the default parameters this gives the same detections as
+    :class:`Detector` for YOLOv8 outputs.
+
+    :param output: detection head output, e.g. ``network.outputs[0].to_numpy()``.
+    :param assigned_rect: rectangle of the original image assigned to the network input.
+    :param score_threshold: minimum detection score.
+    :param n_max: maximum number of detections, 0 for no limit.
+    :param nms: apply non-maximum suppression.
+    :param iou_threshold: maximum allowed overlap with a selected box.
+    :param iou_with_min: divide the intersection by the smaller of the two areas instead of the union.
+    :param class_agnostic: if False boxes only suppress boxes of the same class.
+    :param input_size: (width, height) of the box coordinate space, (1, 1) for normalized boxes,
+        boxes are not rescaled if None.
+    :param objectness: if True the fifth channel is an objectness score, as in YOLOv5.
+    :param channels_first: if True the channels are the first dimension, as in YOLOv8.
+    :param class_index_base: value added to the class indices.
+    :return: the detection result.
+    """
+    size = assigned_rect.size
+    scale = (size.x / input_size[0], size.y / input_size[1]) if input_size else (1.0, 1.0)
+    boxes, scores, class_index = decode_anchor_free(output, score_threshold, scale, objectness, channels_first)
+    selected = select(boxes, scores, class_index, n_max, nms, iou_threshold, iou_with_min, class_agnostic)
+    return to_detector_result(boxes[selected], scores[selected], class_index[selected], assigned_rect, class_index_base)
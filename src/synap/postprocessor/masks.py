@@ -0,0 +1,104 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Vectorized helpers for instance segmentation masks.
+
+Masks of a :class:`DetectorResult` are accessed as NumPy arrays without
+copy through the buffer protocol of :class:`synap.types.Mask`, thresholded
+and resized to the bounding box of their detection with NumPy operations.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Sequence, Union
+
+import numpy as np
+
+from .._synap.postprocessor import DetectorResult
+from .._synap.types import Mask
+
+__all__ = [
+    "paste_masks",
+    "paste_result_masks",
+    "threshold_masks",
+]
+
+
+def threshold_masks(masks: Union[Iterable[Mask], np.ndarray], threshold: float = 0.5, value: int = 255) -> np.ndarray:
+    """
+    Binarize masks to uint8.
+
+    :param masks: masks of the same size, or a float array of any shape.
+    :param threshold: mask values strictly greater than the threshold are set.
+    :param value: value of the set pixels, the others are 0.
+    :return: uint8 array, (N, height, width) for a sequence of masks.
+    """
+    if not isinstance(masks, np.ndarray):
+        masks = [np.asarray(mask) for mask in masks]
+        if len({mask.shape for mask in masks}) > 1:
+            raise ValueError("All masks must have the same size, use paste_masks() for masks of different sizes")
+        masks = np.stack(masks) if masks else np.zeros((0, 0, 0), dtype=np.float32)
+    return (masks > threshold).astype(np.uint8) * np.uint8(value)
+
+
+def paste_masks(
+    masks: Sequence[Union[Mask, np.ndarray]],
+    boxes: np.ndarray,
+    image_size: tuple[int, int],
+    threshold: float = 0.5,
+    value: int = 255,
+) -> np.ndarray:
+    """
+    Resize each mask to its bounding box and paste it in image coordinates.
+
+    Masks are resized with nearest-neighbour sampling and clipped to the
+    image. Empty masks give an empty (all zeros) plane.
+
+    :param masks: one mask per box, of any size.
+    :param boxes: (N, 4) array of boxes as (x, y, width, height), as returned by :meth:`DetectorResult.as_arrays`.
+    :param image_size: (width, height) of the original image, as in ``Rect.size``.
+    :param threshold: mask values strictly greater than the threshold are set.
+    :param value: value of the set pixels, the others are 0.
+    :return: (N, height, width) uint8 array, one plane per box.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    if len(masks) != len(boxes):
+        raise ValueError(f"Got {len(masks)} masks for {len(boxes)} boxes")
+    width, height = image_size
+    pasted = np.zeros((len(boxes), height, width), dtype=np.uint8)
+    for i, (mask, (x, y, w, h)) in enumerate(zip(masks, boxes.tolist())):
+        mask = np.asarray(mask)
+        if mask.size == 0 or w <= 0 or h <= 0:
+            continue
+        # Visible part of the box in the image
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, width), min(y + h, height)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        # Nearest mask pixel for each image pixel of the box
+        rows = ((np.arange(y0, y1) - y + 0.5) * mask.shape[0] / h).astype(np.intp)
+        cols = ((np.arange(x0, x1) - x + 0.5) * mask.shape[1] / w).astype(np.intp)
+        np.minimum(rows, mask.shape[0] - 1, out=rows)
+        np.minimum(cols, mask.shape[1] - 1, out=cols)
+        pasted[i, y0:y1, x0:x1] = (mask[np.ix_(rows, cols)] > threshold) * np.uint8(value)
+    return pasted
+
+
+def paste_result_masks(
+    result: DetectorResult,
+    image_size: tuple[int, int],
+    threshold: float = 0.5,
+    value: int = 255,
+) -> np.ndarray:
+    """
+    Paste the masks of all the detections of a result in image coordinates, see :func:`paste_masks`.
+
+    :param result: detection result whose items have masks.
+    :param image_size: (width, height) of the original image, as in ``Rect.size``.
+    :param threshold: mask values strictly greater than the threshold are set.
+    :param value: value of the set pixels, the others are 0.
+    :return: (N, height, width) uint8 array, one plane per detection.
+    """
+    masks = [item.mask for item in result.items]
+    return paste_masks(masks, result.as_arrays()["boxes"], image_size, threshold, value)
@@ -9,8 +9,24 @@ from .._synap.preprocessor import (
     Preprocessor,
 )
 
+from .dataset import (
+    DatasetLoader,
+    LoaderStats,
+)
+
+from .frame_source import (
+    Frame,
+    FrameSource,
+    SourceStats,
+)
+
 __all__ = [
+    "DatasetLoader",
+    "Frame",
+    "FrameSource",
     "InputData",
     "InputType",
+    "LoaderStats",
     "Preprocessor",
+    "SourceStats",
 ]
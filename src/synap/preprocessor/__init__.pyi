@@ -10,17 +10,30 @@ import numpy
 import synap
 import synap.types
 import typing
-__all__ = ['InputData', 'InputType', 'Preprocessor']
+import typing_extensions
+from .dataset import DatasetLoader, LoaderStats
+from .frame_source import Frame, FrameSource, SourceStats
+__all__ = ['DatasetLoader', 'Frame', 'FrameSource', 'InputData', 'InputType', 'LoaderStats', 'Preprocessor', 'SourceStats']
 class InputData:
     @typing.overload
     def __init__(self, arg0: str) -> None:
         """
-        load input data from file
+        load input data from file, encoded images are decoded immediately (releases the GIL)
+        """
+    @typing.overload
+    def __init__(self, buffer: typing_extensions.Buffer, type: InputType, shape: synap.types.Shape = ..., layout: synap.types.Layout = ...) -> None:
+        """
+        Create input data referencing the memory of a bytes-like object or
+        C-contiguous NumPy array, without copy.
+
+        The buffer is kept alive, and cannot be resized, as long as the
+        input data exist. Encoded images are decoded immediately (releases
+        the GIL while decoding).
         """
     @typing.overload
     def __init__(self, buffer: list[int], type: InputType, shape: synap.types.Shape = ..., layout: synap.types.Layout = ...) -> None:
         """
-        create input data from buffer
+        create input data from a copy of a sequence of integers
         """
     def data(self) -> ctypes.c_void_p:
         """
@@ -34,6 +47,29 @@ class InputData:
         """
         get data size in bytes
         """
+    def view(self) -> numpy.ndarray:
+        """
+        Get the data as a read-only uint8 NumPy array without copying.
+        
+        Decoded images and 8-bit images with a (1, height, width, channels)
+        shape are returned as (height, width, channels) arrays, other data
+        as a 1D array of bytes. The array keeps the input data alive.
+        """
+    @property
+    def layout(self) -> synap.types.Layout:
+        """
+        Layout of the data
+        """
+    @property
+    def shape(self) -> synap.types.Shape:
+        """
+        Shape of the data
+        """
+    @property
+    def type(self) -> InputType:
+        """
+        Type of the data, image_8bits for decoded images
+        """
 class InputType:
     """
     Members:
@@ -44,12 +80,15 @@ class InputType:
     
       encoded_image
     
+      image_8bits
+    
       nv12
     
       nv21
     """
-    __members__: typing.ClassVar[dict[str, InputType]]  # value = {'invalid': <InputType.invalid: 0>, 'raw': <InputType.raw: 1>, 'encoded_image': <InputType.encoded_image: 2>, 'nv12': <InputType.nv12: 4>, 'nv21': <InputType.nv21: 5>}
+    __members__: typing.ClassVar[dict[str, InputType]]  # value = {'invalid': <InputType.invalid: 0>, 'raw': <InputType.raw: 1>, 'encoded_image': <InputType.encoded_image: 2>, 'image_8bits': <InputType.image_8bits: 3>, 'nv12': <InputType.nv12: 4>, 'nv21': <InputType.nv21: 5>}
     encoded_image: typing.ClassVar[InputType]  # value = <InputType.encoded_image: 2>
+    image_8bits: typing.ClassVar[InputType]  # value = <InputType.image_8bits: 3>
     invalid: typing.ClassVar[InputType]  # value = <InputType.invalid: 0>
     nv12: typing.ClassVar[InputType]  # value = <InputType.nv12: 4>
     nv21: typing.ClassVar[InputType]  # value = <InputType.nv21: 5>
@@ -86,15 +125,20 @@ class Preprocessor:
     @typing.overload
     def assign(self, inputs: synap.Tensors, input_data: InputData, input_index: int = 0) -> synap.types.Rect:
         """
-        Write input data to network inputs
+        Write input data to network inputs (releases the GIL)
         """
     @typing.overload
     def assign(self, inputs: synap.Tensors, filename: str, input_index: int = 0) -> synap.types.Rect:
         """
-        Write image data to network inputs
+        Write image data to network inputs (releases the GIL)
+        """
+    @typing.overload
+    def assign(self, inputs: synap.Tensors, data: typing_extensions.Buffer, shape: synap.types.Shape, layout: synap.types.Layout, input_index: int = 0) -> synap.types.Rect:
+        """
+        Write 8-bit image data from a bytes-like object or C-contiguous NumPy array to network inputs, without intermediate copy (releases the GIL)
         """
     @typing.overload
-    def assign(self, inputs: synap.Tensors, data: numpy.ndarray[numpy.uint8], shape: synap.types.Shape, layout: synap.types.Layout, input_index: int = 0) -> synap.types.Rect:
+    def assign(self, inputs: synap.Tensors, data: typing_extensions.Buffer, type: InputType, shape: synap.types.Shape = ..., layout: synap.types.Layout = ..., input_index: int = 0) -> synap.types.Rect:
         """
-        Write raw data to network inputs
+        Write encoded image, nv12, nv21 or raw data from a bytes-like object or C-contiguous NumPy array to network inputs, without intermediate copy (releases the GIL)
         """
@@ -0,0 +1,225 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Prefetching loader for datasets of image files.
+
+A :class:`DatasetLoader` reads and decodes the images of a dataset ahead of
+time on a thread pool, while the previous images are being processed, and
+optionally keeps the decoded images in memory for later epochs.
+"""
+
+from __future__ import annotations
+
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+
+from .._synap.preprocessor import InputData, Preprocessor
+from .._synap.types import Rect
+
+if TYPE_CHECKING:
+    from .._synap import Network
+
+__all__ = [
+    "DatasetLoader",
+    "LoaderStats",
+]
+
+#: File extensions of the images found when walking a directory
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+class LoaderStats:
+    """
+    Statistics of a :class:`DatasetLoader`.
+    """
+
+    def __init__(self):
+        self.images = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        self.load_time = 0.0
+        self.wait_time = 0.0
+
+    def _copy(self) -> LoaderStats:
+        stats = LoaderStats()
+        stats.__dict__.update(self.__dict__)
+        return stats
+
+    def __repr__(self) -> str:
+        return (
+            f"LoaderStats(images={self.images}, cache_hits={self.cache_hits}, "
+            f"cache_misses={self.cache_misses}, cache_evictions={self.cache_evictions}, "
+            f"load_time={self.load_time:.6f}, wait_time={self.wait_time:.6f})"
+        )
+
+
+class DatasetLoader:
+    """
+    Load the images of a dataset ahead of time, in order.
+
+    Images are read and decoded into :class:`InputData` by ``workers``
+    threads, at most ``prefetch`` images ahead of the one being consumed.
+    Iterating the loader yields ``(path, input_data)`` pairs in dataset
+    order, :meth:`feed` assigns them to the inputs of a network.
+
+    When ``cache_size`` is non-zero, decoded images are kept in an LRU cache
+    of at most ``cache_size`` bytes, keyed by path and modification time, so
+    that later epochs do not decode them again.
+
+    :param source: directory to walk recursively for images, or list of image files.
+    :param workers: number of loading threads.
+    :param prefetch: maximum number of images loaded ahead.
+    :param cache_size: maximum size in bytes of the decoded image cache, 0 to disable it.
+    :param extensions: file extensions of the images to use when walking a directory.
+    """
+
+    def __init__(
+        self,
+        source: Union[str, Iterable[str]],
+        workers: int = 4,
+        prefetch: int = 8,
+        cache_size: int = 0,
+        extensions: Iterable[str] = IMAGE_EXTENSIONS,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if prefetch < 1:
+            raise ValueError("prefetch must be at least 1")
+        if cache_size < 0:
+            raise ValueError("cache_size must not be negative")
+        if isinstance(source, str):
+            self._paths = _walk(source, tuple(ext.lower() for ext in extensions))
+        else:
+            self._paths = list(source)
+        self._workers = workers
+        self._prefetch = prefetch
+        self._cache_size = cache_size
+        self._cache: collections.OrderedDict[tuple[str, int], InputData] = collections.OrderedDict()
+        self._cache_usage = 0
+        self._stats = LoaderStats()
+        self._lock = threading.Lock()
+
+    @property
+    def paths(self) -> list[str]:
+        """
+        Image files of the dataset, in order.
+        """
+        return list(self._paths)
+
+    @property
+    def cache_usage(self) -> int:
+        """
+        Size in bytes of the decoded images in the cache.
+        """
+        with self._lock:
+            return self._cache_usage
+
+    @property
+    def stats(self) -> LoaderStats:
+        """
+        Snapshot of the loader statistics, accumulated over all epochs.
+
+        ``load_time`` is the time spent by the workers reading and decoding
+        images, ``wait_time`` the time the consumer waited for images that
+        were not loaded yet.
+        """
+        with self._lock:
+            return self._stats._copy()
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __iter__(self) -> Iterator[tuple[str, InputData]]:
+        pending: collections.deque[tuple[str, Future]] = collections.deque()
+        paths = iter(self._paths)
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="synap-loader") as executor:
+            try:
+                for path in paths:
+                    pending.append((path, executor.submit(self._load, path)))
+                    if len(pending) == self._prefetch:
+                        break
+                while pending:
+                    path, future = pending.popleft()
+                    next_path = next(paths, None)
+                    if next_path is not None:
+                        pending.append((next_path, executor.submit(self._load, next_path)))
+                    start = time.perf_counter()
+                    input_data = future.result()
+                    with self._lock:
+                        self._stats.images += 1
+                        self._stats.wait_time += time.perf_counter() - start
+                    yield path, input_data
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def feed(self, network: Network, preprocessor: Optional[Preprocessor] = None) -> Iterator[tuple[str, Rect]]:
+        """
+        Assign the images of the dataset to the network inputs, in order.
+
+        Each image is assigned when the iteration reaches it, the caller
+        runs the inference before requesting the next one.
+
+        :param network: network to assign the images to.
+        :param preprocessor: preprocessor used for the assignment, a new one if None.
+        :return: iterator of ``(path, assigned_rect)`` pairs.
+        """
+        preprocessor = preprocessor or Preprocessor()
+        for path, input_data in self:
+            yield path, preprocessor.assign(network.inputs, input_data)
+
+    def clear_cache(self) -> None:
+        """
+        Remove all the decoded images from the cache.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._cache_usage = 0
+
+    def _load(self, path: str) -> InputData:
+        key = (path, os.stat(path).st_mtime_ns) if self._cache_size else None
+        if key is not None:
+            with self._lock:
+                input_data = self._cache.get(key)
+                if input_data is not None:
+                    self._cache.move_to_end(key)
+                    self._stats.cache_hits += 1
+                    return input_data
+        start = time.perf_counter()
+        input_data = InputData(path)
+        if input_data.empty():
+            raise ValueError(f"Invalid input image: {path}")
+        with self._lock:
+            self._stats.load_time += time.perf_counter() - start
+            if key is not None:
+                self._stats.cache_misses += 1
+                self._insert(key, input_data)
+        return input_data
+
+    def _insert(self, key: tuple[str, int], input_data: InputData) -> None:
+        # Must be called with self._lock held
+        size = input_data.size()
+        if size > self._cache_size or key in self._cache:
+            return
+        self._cache[key] = input_data
+        self._cache_usage += size
+        while self._cache_usage > self._cache_size:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_usage -= evicted.size()
+            self._stats.cache_evictions += 1
+
+
+def _walk(directory: str, extensions: tuple[str, ...]) -> list[str]:
+    if not os.path.isdir(directory):
+        raise NotADirectoryError(f"Dataset directory not found: {directory}")
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(extensions))
+    return paths
@@ -0,0 +1,346 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Streaming source of raw video frames.
+
+A :class:`FrameSource` reads fixed-size NV12, NV21 or RGB frames from a
+file, a pipe or a FIFO on a background thread, into a ring of preallocated
+frame buffers. When the consumer falls behind, frames are dropped instead of
+being queued without limit, so that the end-to-end latency stays bounded.
+"""
+
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterator, Optional, Union
+
+import numpy as np
+
+from .._synap.preprocessor import InputType, Preprocessor
+from .._synap.types import Layout, Rect, Shape
+
+if TYPE_CHECKING:
+    from .._synap import Network
+
+__all__ = [
+    "Frame",
+    "FrameSource",
+    "SourceStats",
+]
+
+#: Frame formats, with the input type used to assign them
+FORMATS = {
+    "nv12": InputType.nv12,
+    "nv21": InputType.nv21,
+    "rgb": InputType.image_8bits,
+}
+
+#: Policies when the frame ring is full
+DROP_POLICIES = ("oldest", "newest", "none")
+
+
+class SourceStats:
+    """
+    Statistics of a :class:`FrameSource`.
+
+    ``dropped`` counts the frames overwritten or discarded because the ring
+    was full, ``stale`` the frames skipped because they were older than the
+    maximum latency. ``queue_depth`` is the number of frames read and not
+    consumed yet.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.stale = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.wait_time = 0.0
+
+    def _copy(self) -> SourceStats:
+        stats = SourceStats()
+        stats.__dict__.update(self.__dict__)
+        return stats
+
+    def __repr__(self) -> str:
+        return (
+            f"SourceStats(frames={self.frames}, delivered={self.delivered}, dropped={self.dropped}, "
+            f"stale={self.stale}, queue_depth={self.queue_depth}, max_queue_depth={self.max_queue_depth}, "
+            f"wait_time={self.wait_time:.6f})"
+        )
+
+
+class Frame:
+    """
+    Frame read by a :class:`FrameSource`.
+
+    ``data`` references a buffer of the frame ring: it is only valid until
+    the next frame is requested from the source, copy it to keep it longer.
+    ``index`` is the position of the frame in the stream, so dropped frames
+    appear as gaps, ``timestamp`` the :func:`time.monotonic` time at which
+    it was read.
+    """
+
+    def __init__(self, data: np.ndarray, index: int, timestamp: float):
+        self.data = data
+        self.index = index
+        self.timestamp = timestamp
+
+    @property
+    def age(self) -> float:
+        """
+        Time in seconds since the frame was read.
+        """
+        return time.monotonic() - self.timestamp
+
+    def __repr__(self) -> str:
+        return f"Frame(index={self.index}, shape={self.data.shape}, timestamp={self.timestamp:.6f})"
+
+
+class FrameSource:
+    """
+    Read raw frames from a file, pipe or FIFO, dropping frames when the consumer falls behind.
+
+    Frames are read into a ring of ``ring_size`` queued frames, plus the
+    frame being read and the one being processed, all preallocated. When
+    the ring is full, ``drop`` selects the frame discarded: the ``"oldest"``
+    queued frame, the ``"newest"`` frame just read, or ``"none"`` to stop
+    reading until a frame is consumed, so that no frame of a file is lost.
+
+    With ``max_latency``, frames read more than ``max_latency`` seconds ago
+    are skipped when a newer frame is available.
+
+    NV12 and NV21 frames have ``height * 3 // 2`` rows of ``width`` bytes
+    and are assigned to the Y and UV input tensors of a network, RGB frames
+    have ``height`` rows of ``width * 3`` bytes and are resized to the input.
+
+    :param source: path of a file or FIFO, or a binary file-like object such as a pipe.
+    :param width: width of the frames in pixels.
+    :param height: height of the frames in pixels.
+    :param format: frame format, ``"nv12"``, ``"nv21"`` or ``"rgb"``.
+    :param ring_size: maximum number of frames read ahead of the consumer.
+    :param drop: frame dropped when the ring is full, ``"oldest"``, ``"newest"`` or ``"none"``.
+    :param max_latency: maximum age in seconds of the frames delivered when newer frames are available, no limit if None.
+    :param fps: rate at which frames are read, to replay a file at the rate of a camera, as fast as possible if None.
+    """
+
+    def __init__(
+        self,
+        source: Union[str, BinaryIO],
+        width: int,
+        height: int,
+        format: str = "nv12",
+        ring_size: int = 4,
+        drop: str = "oldest",
+        max_latency: Optional[float] = None,
+        fps: Optional[float] = None,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported frame format: {format}")
+        if drop not in DROP_POLICIES:
+            raise ValueError(f"Unsupported drop policy: {drop}")
+        if width <= 0 or height <= 0:
+            raise ValueError("width and height must be positive")
+        if format != "rgb" and (width % 2 or height % 2):
+            raise ValueError(f"{format} frames must have an even width and height")
+        if ring_size < 1:
+            raise ValueError("ring_size must be at least 1")
+        if max_latency is not None and max_latency < 0:
+            raise ValueError("max_latency must not be negative")
+        if fps is not None and fps <= 0:
+            raise ValueError("fps must be positive")
+        self._width = width
+        self._height = height
+        self._format = format
+        self._ring_size = ring_size
+        self._drop = drop
+        self._max_latency = max_latency
+        self._fps = fps
+        shape = (height * 3 // 2, width) if format != "rgb" else (height, width, 3)
+        # Queued frames, the frame being read and the frame held by the consumer
+        self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(ring_size + 2)]
+        self._free = collections.deque(range(1, ring_size + 2))
+        self._queue: collections.deque[tuple[int, int, float]] = collections.deque()
+        self._held: Optional[int] = None
+        self._stats = SourceStats()
+        self._cond = threading.Condition()
+        self._eof = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        if isinstance(source, str):
+            self._file: Any = open(source, "rb", buffering=0)
+            self._owns_file = True
+        else:
+            self._file = source
+            self._owns_file = False
+        self._thread = threading.Thread(target=self._read_frames, name="synap-frame-source", daemon=True)
+        self._thread.start()
+
+    @property
+    def frame_size(self) -> int:
+        """
+        Size of a frame in bytes.
+        """
+        return self._buffers[0].nbytes
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """
+        Shape of the frame arrays.
+        """
+        return self._buffers[0].shape
+
+    @property
+    def stats(self) -> SourceStats:
+        """
+        Snapshot of the source statistics.
+        """
+        with self._cond:
+            stats = self._stats._copy()
+            stats.queue_depth = len(self._queue)
+            return stats
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        Get the next frame, releasing the previous one.
+
+        :param timeout: maximum time in seconds to wait for a frame, wait forever if None.
+        :return: the frame, or None at the end of the stream.
+        :raises TimeoutError: if no frame was read within ``timeout``.
+        """
+        start = time.perf_counter()
+        with self._cond:
+            self._release()
+            if not self._cond.wait_for(lambda: self._queue or self._eof or self._error or self._closed, timeout):
+                raise TimeoutError("Timed out waiting for a frame")
+            self._stats.wait_time += time.perf_counter() - start
+            if self._error is not None:
+                raise self._error
+            if not self._queue:
+                return None
+            slot, index, timestamp = self._queue.popleft()
+            if self._max_latency is not None:
+                now = time.monotonic()
+                while self._queue and now - timestamp > self._max_latency:
+                    self._free.append(slot)
+                    self._stats.stale += 1
+                    slot, index, timestamp = self._queue.popleft()
+            self._held = slot
+            self._stats.delivered += 1
+            self._cond.notify_all()
+            return Frame(self._buffers[slot], index, timestamp)
+
+    def feed(self, network: Network, preprocessor: Optional[Preprocessor] = None) -> Iterator[tuple[Frame, Rect]]:
+        """
+        Assign the frames of the stream to the network inputs.
+
+        Each frame is assigned when the iteration reaches it, the caller
+        runs the inference before requesting the next one.
+
+        :param network: network to assign the frames to, NV12 and NV21 frames use two inputs.
+        :param preprocessor: preprocessor used for the assignment, a new one if None.
+        :return: iterator of ``(frame, assigned_rect)`` pairs.
+        """
+        preprocessor = preprocessor or Preprocessor()
+        for frame in self:
+            if self._format == "rgb":
+                rect = preprocessor.assign(network.inputs, frame.data, Shape([1, self._height, self._width, 3]), Layout.nhwc)
+            else:
+                rect = preprocessor.assign(network.inputs, frame.data, FORMATS[self._format])
+            yield frame, rect
+
+    def close(self) -> None:
+        """
+        Stop reading frames.
+
+        A reader blocked on an idle pipe or FIFO ends when its writer writes
+        or closes it.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(0.1)
+        if self._owns_file and not self._thread.is_alive():
+            self._file.close()
+
+    def __iter__(self) -> Iterator[Frame]:
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def __enter__(self) -> FrameSource:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _release(self) -> None:
+        # Must be called with self._cond held
+        if self._held is not None:
+            self._free.append(self._held)
+            self._held = None
+            self._cond.notify_all()
+
+    def _read_frames(self) -> None:
+        slot = 0
+        index = 0
+        next_time = time.monotonic()
+        try:
+            while True:
+                if self._fps is not None:
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_time += 1.0 / self._fps
+                if not self._read_into(self._buffers[slot].reshape(-1)):
+                    break
+                with self._cond:
+                    if self._closed:
+                        break
+                    self._stats.frames += 1
+                    if len(self._queue) >= self._ring_size:
+                        if self._drop == "newest":
+                            self._stats.dropped += 1
+                            index += 1
+                            continue
+                        if self._drop == "oldest":
+                            self._free.append(self._queue.popleft()[0])
+                            self._stats.dropped += 1
+                        else:
+                            self._cond.wait_for(lambda: len(self._queue) < self._ring_size or self._closed)
+                            if self._closed:
+                                break
+                    self._queue.append((slot, index, time.monotonic()))
+                    self._stats.max_queue_depth = max(self._stats.max_queue_depth, len(self._queue))
+                    index += 1
+                    self._cond.wait_for(lambda: self._free or self._closed)
+                    if self._closed:
+                        break
+                    slot = self._free.popleft()
+                    self._cond.notify_all()
+        except Exception as e:
+            with self._cond:
+                self._error = e
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def _read_into(self, buffer: np.ndarray) -> bool:
+        # Read a whole frame, pipes can return partial reads. A partial frame at the end is discarded
+        view = memoryview(buffer)
+        offset = 0
+        while offset < len(view):
+            if self._closed:
+                return False
+            count = self._file.readinto(view[offset:])
+            if not count:
+                return False
+            offset += count
+        return True
@@ -0,0 +1,516 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Pool of worker processes running the same model.
+
+Python preprocessing and postprocessing hold the GIL, so a single process
+cannot keep several networks busy. A :class:`ProcessPool` starts worker
+processes that each own a :class:`synap.Network`. Frames are passed through
+a ring of slots in shared memory instead of being pickled: the client copies
+its input arrays into a free slot, and the worker assigns the slot directly
+to the input tensors. The outputs come back the same way as dequantized
+arrays, or as the compact result of a postprocessing function run in the
+worker, such as ``DetectorResult.as_arrays()``.
+
+Workers are monitored: a worker that exits, or stops responding for longer
+than the heartbeat timeout, is restarted and its pending requests fail with
+a :class:`RuntimeError`.
+"""
+
+from __future__ import annotations
+
+import collections
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from ._synap import Network, Tensor
+from .model_info import ModelInfo
+
+__all__ = [
+    "ProcessPool",
+    "WorkerStatus",
+]
+
+# Interval of the worker heartbeats and of the health checks, in seconds
+_POLL_INTERVAL = 0.1
+
+# Alignment of the tensors in the shared memory slots
+_ALIGNMENT = 64
+
+def _assign_raw(tensor: Tensor, data: np.ndarray) -> None:
+    # The data is already in the quantized type of the tensor: copy it as is, Tensor.assign()
+    # would take it as real values and normalize and quantize it again
+    tensor.view()[...] = data
+
+
+def _align(size: int) -> int:
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _slot_views(buffer: memoryview, offset: int, specs: list[tuple[tuple[int, ...], np.dtype]]) -> list[np.ndarray]:
+    # Arrays of the given shapes and types, one after the other in the buffer
+    views = []
+    for shape, dtype in specs:
+        view = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        views.append(view)
+        offset += _align(view.nbytes)
+    return views
+
+
+def _specs_size(specs: list[tuple[tuple[int, ...], np.dtype]]) -> int:
+    return sum(_align(int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize) for shape, dtype in specs)
+
+
+def _worker_main(
+    model: str,
+    meta: str,
+    network_factory: Optional[Callable[[], Network]],
+    postprocess: Optional[Callable[[Any], Any]],
+    shm_name: str,
+    slots: int,
+    input_specs: list,
+    output_specs: list,
+    conn: multiprocessing.connection.Connection,
+    heartbeat: Any,
+) -> None:
+    # Main function of the worker processes
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = None
+    try:
+        try:
+            network = network_factory() if network_factory is not None else Network()
+            network.load_model(model, meta)
+        except Exception as e:
+            conn.send(("failed", None, f"{type(e).__name__}: {e}"))
+            return
+        input_size = _specs_size(input_specs)
+        slot_size = input_size + _specs_size(output_specs)
+        views = [
+            (_slot_views(shm.buf, slot * slot_size, input_specs), _slot_views(shm.buf, slot * slot_size + input_size, output_specs))
+            for slot in range(slots)
+        ]
+        conn.send(("ready", None, os.getpid()))
+        while True:
+            heartbeat.value = time.monotonic()
+            if not conn.poll(_POLL_INTERVAL):
+                continue
+            slot = conn.recv()
+            if slot is None:
+                break
+            inputs, outputs = views[slot]
+            try:
+                for tensor, data in zip(network.inputs, inputs):
+                    _assign_raw(tensor, data)
+                results = network.predict()
+                if postprocess is None:
+                    for dst, out in zip(outputs, results):
+                        np.copyto(dst, out.to_numpy().reshape(dst.shape))
+                    conn.send(("done", slot, None))
+                else:
+                    conn.send(("done", slot, postprocess(results)))
+            except Exception as e:
+                conn.send(("error", slot, f"{type(e).__name__}: {e}"))
+    finally:
+        # The views must be released before the shared memory can be closed
+        views = None
+        shm.close()
+
+
+class WorkerStatus:
+    """
+    Health of one worker process of a :class:`ProcessPool`.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.pid: Optional[int] = None
+        self.alive = False
+        self.ready = False
+        self.in_flight = 0
+        self.inferences = 0
+        self.errors = 0
+        self.restarts = 0
+        self.heartbeat_age = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"WorkerStatus(index={self.index}, pid={self.pid}, alive={self.alive}, ready={self.ready}, "
+            f"in_flight={self.in_flight}, inferences={self.inferences}, errors={self.errors}, "
+            f"restarts={self.restarts}, heartbeat_age={self.heartbeat_age:.3f})"
+        )
+
+
+class _Worker:
+    # Client side state of a worker process
+
+    def __init__(self, index: int, shm: shared_memory.SharedMemory, slots: int):
+        self.status = WorkerStatus(index)
+        self.shm = shm
+        self.slots = slots
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.conn: Optional[multiprocessing.connection.Connection] = None
+        self.heartbeat: Any = None
+        self.free = collections.deque(range(slots))
+        self.pending: dict[int, Future] = {}
+        self.writing: set[int] = set()
+        self.generation = 0
+        self.load_error: Optional[str] = None
+        self.stopped = False
+
+
+class ProcessPool:
+    """
+    Worker processes running the same model, fed through shared memory.
+
+    Each worker has ``slots`` input and output slots in shared memory, so up
+    to ``slots`` requests can be queued to it. :meth:`submit` copies the
+    inputs to a free slot of the least loaded worker and returns a
+    :class:`concurrent.futures.Future`, waiting for a free slot when all are
+    in use. The result is the list of dequantized outputs, or the return
+    value of ``postprocess(outputs)`` run in the worker.
+
+    Worker processes are started with the ``spawn`` method by default, so
+    ``network_factory`` and ``postprocess`` must be picklable, such as
+    module-level functions or :func:`functools.partial` objects.
+
+    :param model: path to the model file.
+    :param workers: number of worker processes.
+    :param slots: number of shared memory slots of each worker.
+    :param meta: path to the model metadata file, for models in legacy format.
+    :param network_factory: function creating the network of each worker before the model is loaded into it, :class:`synap.Network` if None.
+    :param postprocess: function called in the worker with the output tensors, its result is returned instead of the outputs.
+    :param heartbeat_timeout: time in seconds after which a worker not responding is restarted.
+    :param max_restarts: maximum number of restarts of each worker, no limit if None.
+    :param start_timeout: maximum time in seconds to wait for the workers to load the model.
+    :param mp_context: multiprocessing context used to start the workers, ``spawn`` if None.
+    :raises FileNotFoundError: if the model file or the metadata file does not exist.
+    :raises RuntimeError: if the model metadata is invalid or a worker cannot load the model.
+    :raises TimeoutError: if the workers did not load the model within ``start_timeout``.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        workers: int = 2,
+        slots: int = 2,
+        meta: str = "",
+        network_factory: Optional[Callable[[], Network]] = None,
+        postprocess: Optional[Callable[[Any], Any]] = None,
+        heartbeat_timeout: float = 30.0,
+        max_restarts: Optional[int] = None,
+        start_timeout: float = 60.0,
+        mp_context: Optional[multiprocessing.context.BaseContext] = None,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        if heartbeat_timeout <= 0:
+            raise ValueError("heartbeat_timeout must be positive")
+        info = ModelInfo.from_file(model, meta)
+        self._model = model
+        self._meta = meta
+        self._network_factory = network_factory
+        self._postprocess = postprocess
+        self._heartbeat_timeout = heartbeat_timeout
+        self._max_restarts = max_restarts
+        self._ctx = mp_context or multiprocessing.get_context("spawn")
+        self._input_specs = [(tuple(t.shape), np.dtype(t.data_type.np_type())) for t in info.inputs]
+        self._output_specs = [] if postprocess else [(tuple(t.shape), np.dtype(np.float32)) for t in info.outputs]
+        self._input_size = _specs_size(self._input_specs)
+        self._slot_size = self._input_size + _specs_size(self._output_specs)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers: list[_Worker] = []
+        self._views: list[list[tuple[list[np.ndarray], list[np.ndarray]]]] = []
+        try:
+            for index in range(workers):
+                shm = shared_memory.SharedMemory(create=True, size=max(1, slots * self._slot_size))
+                worker = _Worker(index, shm, slots)
+                self._workers.append(worker)
+                self._views.append([
+                    (_slot_views(shm.buf, slot * self._slot_size, self._input_specs),
+                     _slot_views(shm.buf, slot * self._slot_size + self._input_size, self._output_specs))
+                    for slot in range(slots)
+                ])
+                self._start(worker)
+        except BaseException:
+            self._release()
+            raise
+        self._thread = threading.Thread(target=self._run, name="synap-process-pool", daemon=True)
+        self._thread.start()
+        with self._cond:
+            self._cond.wait_for(lambda: all(w.status.ready or w.load_error or w.stopped for w in self._workers), start_timeout)
+            errors = [w.load_error for w in self._workers if w.load_error]
+            ready = all(w.status.ready for w in self._workers)
+        if errors or not ready:
+            self.close()
+            if errors:
+                raise RuntimeError(f"Worker failed to load the model: {errors[0]}")
+            raise TimeoutError("Timed out waiting for the workers to load the model")
+
+    @property
+    def size(self) -> int:
+        """
+        Number of worker processes.
+        """
+        return len(self._workers)
+
+    @property
+    def healthy(self) -> bool:
+        """
+        True if all the workers are running and have loaded the model.
+        """
+        return all(status.alive and status.ready for status in self.health())
+
+    def health(self) -> list[WorkerStatus]:
+        """
+        Snapshot of the health of each worker.
+        """
+        now = time.monotonic()
+        with self._cond:
+            snapshot = []
+            for worker in self._workers:
+                status = WorkerStatus(worker.status.index)
+                status.__dict__.update(worker.status.__dict__)
+                status.alive = worker.process is not None and worker.process.is_alive()
+                status.in_flight = len(worker.pending)
+                status.heartbeat_age = now - worker.heartbeat.value if worker.heartbeat is not None and status.ready else 0.0
+                snapshot.append(status)
+        return snapshot
+
+    def submit(self, *inputs: np.ndarray, timeout: Optional[float] = None) -> Future:
+        """
+        Run an inference on a worker.
+
+        Can be called from any thread.
+
+        :param inputs: one NumPy array per network input, the batch dimension can be omitted when it is 1.
+        :param timeout: maximum time in seconds to wait for a free slot, wait forever if None.
+        :return: a future of the list of dequantized outputs, or of the result of ``postprocess``.
+        :raises ValueError: if the number or the shapes of the inputs do not match the model.
+        :raises TimeoutError: if no slot became free within ``timeout``.
+        :raises RuntimeError: if the pool is closed or no worker is running.
+        """
+        if len(inputs) != len(self._input_specs):
+            raise ValueError(f"Invalid number of inputs: expected {len(self._input_specs)} inputs, got {len(inputs)} inputs")
+        arrays = []
+        for data, (shape, _) in zip(inputs, self._input_specs):
+            data = np.asarray(data)
+            if data.shape != shape and not (len(shape) > 0 and shape[0] == 1 and data.shape == shape[1:]):
+                raise ValueError(f"Shape mismatch: expected {shape}, got {data.shape}")
+            arrays.append(data.reshape(shape))
+
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closed or self._available_worker() is not False, timeout):
+                raise TimeoutError("Timed out waiting for a free slot")
+            if self._closed:
+                raise RuntimeError("The process pool is closed")
+            worker = self._available_worker()
+            if worker is None:
+                raise RuntimeError("No worker process is running")
+            slot = worker.free.popleft()
+            future: Future = Future()
+            future.set_running_or_notify_cancel()
+            worker.pending[slot] = future
+            worker.writing.add(slot)
+            generation = worker.generation
+
+        # Copy the inputs to shared memory without holding the lock, the slot is reserved
+        for view, data in zip(self._views[worker.status.index][slot][0], arrays):
+            np.copyto(view, data, casting="unsafe")
+
+        with self._cond:
+            worker.writing.discard(slot)
+            if worker.generation != generation:
+                # The worker was restarted meanwhile and the request already failed
+                worker.free.append(slot)
+                self._cond.notify_all()
+            else:
+                worker.conn.send(slot)
+        return future
+
+    def predict(self, *inputs: np.ndarray, timeout: Optional[float] = None) -> Any:
+        """
+        Run an inference on a worker and wait for its result.
+
+        :param inputs: one NumPy array per network input.
+        :param timeout: maximum time in seconds to wait for a free slot and for the result, wait forever if None.
+        :return: the list of dequantized outputs, or the result of ``postprocess``.
+        """
+        return self.submit(*inputs, timeout=timeout).result(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Stop the workers and release the shared memory.
+
+        Requests already sent to a worker are completed, requests still
+        pending after ``timeout`` seconds fail with a :class:`RuntimeError`.
+
+        :param timeout: maximum time in seconds to wait for each worker to exit.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            # The collector thread clears worker.process when a worker exits, and no
+            # longer restarts workers once the pool is closed
+            processes = [worker.process for worker in self._workers if worker.process is not None]
+            for worker in self._workers:
+                if worker.process is not None and worker.process.is_alive():
+                    try:
+                        worker.conn.send(None)
+                    except OSError:
+                        pass
+        try:
+            for process in processes:
+                process.join(timeout)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+            self._thread.join()
+            with self._cond:
+                for worker in self._workers:
+                    self._fail_pending(worker, "The process pool is closed")
+        finally:
+            self._release()
+
+    def __enter__(self) -> ProcessPool:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _available_worker(self) -> Any:
+        # Least loaded running worker with a free slot, None if no worker is running, False if all slots are in use
+        running = [w for w in self._workers if not w.stopped]
+        if not running:
+            return None
+        candidates = [w for w in running if w.free]
+        if not candidates:
+            return False
+        return max(candidates, key=lambda w: len(w.free))
+
+    def _start(self, worker: _Worker) -> None:
+        parent_conn, child_conn = self._ctx.Pipe()
+        worker.heartbeat = self._ctx.Value("d", time.monotonic(), lock=False)
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                self._model, self._meta, self._network_factory, self._postprocess, worker.shm.name,
+                worker.slots, self._input_specs, self._output_specs, child_conn, worker.heartbeat,
+            ),
+            name=f"synap-worker-{worker.status.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.status.pid = worker.process.pid
+        worker.status.ready = False
+
+    def _run(self) -> None:
+        # Collect the results of the workers and restart the ones that exited or hang
+        while True:
+            with self._cond:
+                if self._closed and all(w.process is None or not w.process.is_alive() for w in self._workers):
+                    return
+                conns = {w.conn: w for w in self._workers if w.conn is not None and not w.stopped}
+                sentinels = {w.process.sentinel: w for w in self._workers if w.process is not None and not w.stopped}
+            for ready in multiprocessing.connection.wait(list(conns) + list(sentinels), _POLL_INTERVAL):
+                if ready in conns:
+                    self._receive(conns[ready])
+            for sentinel, worker in sentinels.items():
+                if not worker.process.is_alive():
+                    self._receive(worker)
+                    self._on_exit(worker)
+            self._check_heartbeats()
+
+    def _receive(self, worker: _Worker) -> None:
+        while True:
+            try:
+                if not worker.conn.poll():
+                    return
+                kind, slot, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                return
+            with self._cond:
+                if kind == "ready":
+                    worker.status.ready = True
+                    worker.status.pid = payload
+                elif kind == "failed":
+                    worker.load_error = payload
+                else:
+                    future = worker.pending.pop(slot, None)
+                    if kind == "done" and not self._output_specs:
+                        result = payload
+                    elif kind == "done":
+                        result = [view.copy() for view in self._views[worker.status.index][slot][1]]
+                    worker.free.append(slot)
+                    if kind == "done":
+                        worker.status.inferences += 1
+                    else:
+                        worker.status.errors += 1
+                self._cond.notify_all()
+            if kind == "done" and future is not None:
+                future.set_result(result)
+            elif kind == "error" and future is not None:
+                future.set_exception(RuntimeError(payload))
+
+    def _on_exit(self, worker: _Worker) -> None:
+        worker.process.join()
+        exitcode = worker.process.exitcode
+        with self._cond:
+            worker.conn.close()
+            worker.conn = None
+            worker.generation += 1
+            self._fail_pending(worker, f"Worker process {worker.status.index} exited with code {exitcode}")
+            worker.free = collections.deque(s for s in range(worker.slots) if s not in worker.writing)
+            was_ready = worker.status.ready
+            worker.status.ready = False
+            restart = (
+                not self._closed
+                and was_ready
+                and worker.load_error is None
+                and (self._max_restarts is None or worker.status.restarts < self._max_restarts)
+            )
+            if restart:
+                worker.status.restarts += 1
+                self._start(worker)
+            else:
+                worker.process = None
+                worker.stopped = True
+            self._cond.notify_all()
+
+    def _check_heartbeats(self) -> None:
+        now = time.monotonic()
+        with self._cond:
+            for worker in self._workers:
+                if worker.status.ready and worker.process is not None and now - worker.heartbeat.value > self._heartbeat_timeout:
+                    # Hung worker, it is restarted when its exit is detected
+                    worker.process.kill()
+
+    def _fail_pending(self, worker: _Worker, message: str) -> None:
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(message))
+        worker.pending.clear()
+
+    def _release(self) -> None:
+        self._views = []
+        for worker in self._workers:
+            try:
+                worker.shm.close()
+                worker.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,614 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Host replay backend, running a model without the NPU.
+
+A :class:`ReplayNetwork` takes the names, shapes, layouts, data types and
+quantization of its tensors from the metadata of a model, read with
+:class:`synap.ModelInfo`, and returns recorded or random outputs after a
+configurable inference latency. It has the same interface as
+:class:`synap.Network`, so code using networks, such as a
+:class:`synap.NetworkPool`, :class:`synap.NetworkExecutor` or
+:func:`synap.pipeline.stream` with callable pre/postprocessors, can be
+load tested on any host.
+
+The native :class:`synap.preprocessor.Preprocessor`,
+:class:`synap.postprocessor.Classifier` and
+:class:`synap.postprocessor.Detector` need the tensors of a
+:class:`synap.Network` and do not accept replay tensors, use the NumPy
+postprocessing of :mod:`synap.postprocessor` instead.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+
+from ._synap.types import DataType, Layout, Shape
+from .model_info import ModelInfo, TensorInfo
+
+__all__ = [
+    "ReplayNetwork",
+    "ReplayTensor",
+    "ReplayTensors",
+]
+
+
+class ReplayTensor:
+    """
+    Host tensor of a :class:`ReplayNetwork`, with the interface of :class:`synap.Tensor`.
+    """
+
+    def __init__(self, network: ReplayNetwork, info: TensorInfo, is_input: bool):
+        self._network = network
+        self._name = info.name
+        self._data_type = info.data_type
+        self._layout = info.layout
+        self._shape = list(info.shape)
+        self._scheme = info.quantization.scheme
+        self._zero_point = info.quantization.zero_point
+        self._scale = info.quantization.scale
+        self._fractional_length = info.quantization.fractional_length
+        self._data = np.zeros(self._shape, dtype=self._data_type.np_type())
+        self._data.flags.writeable = is_input
+        self._is_input = is_input
+        # Dequantized data of an output and the generation it belongs to
+        self._dequantized: Optional[tuple[int, np.ndarray]] = None
+
+    @property
+    def name(self) -> str:
+        """
+        Get tensor name
+        """
+        return self._name
+
+    @property
+    def shape(self) -> Shape:
+        """
+        Get tensor shape
+        """
+        return Shape(self._shape)
+
+    @property
+    def layout(self) -> Layout:
+        """
+        Get tensor layout
+        """
+        return self._layout
+
+    @property
+    def data_type(self) -> DataType:
+        """
+        Get tensor data type
+        """
+        return self._data_type
+
+    @property
+    def size(self) -> int:
+        """
+        Get size of tensor in bytes
+        """
+        return self._data.nbytes
+
+    @property
+    def item_count(self) -> int:
+        """
+        Get number of items in tensor
+        """
+        return self._data.size
+
+    @property
+    def is_scalar(self) -> bool:
+        """
+        Check if tensor is a scalar
+        """
+        return len(self._shape) == 0
+
+    @property
+    def generation(self) -> int:
+        """
+        Inference generation of the network owning the tensor
+        """
+        return self._network.generation
+
+    def quantize(self, data: np.ndarray) -> np.ndarray:
+        """
+        Convert float data to the data type of the tensor.
+
+        :param data: float data.
+        :return: the quantized data, with the tensor data type.
+        """
+        dtype = np.dtype(self._data_type.np_type())
+        data = np.asarray(data, dtype=np.float32)
+        if dtype.kind == "f":
+            return data.astype(dtype)
+        if self._scheme == "asymmetric_affine" and self._scale:
+            data = np.rint(data / self._scale) + self._zero_point
+        elif self._scheme == "dynamic_fixed_point":
+            data = np.rint(data * 2.0 ** self._fractional_length)
+        info = np.iinfo(dtype)
+        return np.clip(data, info.min, info.max).astype(dtype)
+
+    def dequantize(self, data: np.ndarray) -> np.ndarray:
+        """
+        Convert data of the tensor data type to float32.
+
+        :param data: data with the tensor data type.
+        :return: the dequantized data.
+        """
+        data = np.asarray(data)
+        if data.dtype.kind == "f":
+            return data.astype(np.float32)
+        if self._scheme == "asymmetric_affine" and self._scale:
+            return ((data.astype(np.float32) - self._zero_point) * np.float32(self._scale)).astype(np.float32)
+        if self._scheme == "dynamic_fixed_point":
+            return data.astype(np.float32) * np.float32(2.0 ** -self._fractional_length)
+        return data.astype(np.float32)
+
+    def assign(
+        self,
+        data: Union[ReplayTensor, np.ndarray, bytes, int, Any],
+        *,
+        mean: Union[float, Sequence[float], None] = None,
+        std: Union[float, Sequence[float], None] = None,
+        scale: float = 1.0,
+        swap_rb: bool = False,
+        layout: Optional[Layout] = None,
+    ) -> None:
+        """
+        Assign data to the tensor.
+
+        Arrays with the tensor data type are copied as is, float arrays are
+        quantized and other ones converted. The batch dimension can be
+        omitted when it is 1. Bytes must have the size of the tensor, a
+        scalar is assigned to all the items. Arrays can be converted before
+        quantization as by :meth:`synap.Tensor.assign`.
+
+        :param data: another tensor, a NumPy array, raw bytes or a scalar.
+        :raises ValueError: if the data size or shape does not match the tensor.
+        """
+        self._dequantized = None
+        if isinstance(data, bytes):
+            if len(data) != self.size:
+                raise ValueError(f"Size mismatch: expected {self.size} bytes, got {len(data)} bytes")
+            self._data.reshape(-1).view(np.uint8)[...] = np.frombuffer(data, dtype=np.uint8)
+            return
+        if isinstance(data, int):
+            self._data[...] = data
+            return
+        if not isinstance(data, np.ndarray) and hasattr(data, "view"):
+            data = data.view()
+        data = np.asarray(data)
+        shape = tuple(self._shape)
+        if mean is not None or std is not None or scale != 1.0 or swap_rb or layout not in (None, self._layout):
+            data = self._convert(data, mean, std, scale, swap_rb, layout)
+        if data.shape != shape and not (len(shape) > 0 and shape[0] == 1 and data.shape == shape[1:]):
+            raise ValueError(f"Shape mismatch: expected {shape}, got {data.shape}")
+        if data.dtype == self._data.dtype:
+            self._data.reshape(shape)[...] = data.reshape(shape)
+        elif data.dtype.kind == "f":
+            self._data[...] = self.quantize(data).reshape(shape)
+        else:
+            self._data[...] = data.reshape(shape)
+
+    def view(self) -> np.ndarray:
+        """
+        Get the raw tensor data as a NumPy array without copying.
+
+        It is writable only for the input tensors of a network.
+        """
+        view = self._data.view()
+        view.flags.writeable = self._is_input
+        return view
+
+    def to_numpy(
+        self,
+        *,
+        layout: Optional[Layout] = None,
+        dtype: Any = None,
+        activation: Optional[str] = None,
+        axis: int = -1,
+        channels: Union[slice, tuple[int, int], None] = None,
+    ) -> np.ndarray:
+        """
+        Get dequantized tensor data as NumPy array, optionally converted as by :meth:`synap.Tensor.to_numpy`.
+
+        The dequantized data of an output is cached until the next inference.
+        """
+        cached = self._dequantize_cached()
+        if layout is None and dtype is None and activation is None and channels is None:
+            return cached
+        data = cached
+        ndim = data.ndim
+        if channels is not None:
+            if ndim == 0:
+                raise ValueError("Channel subset not supported for scalar tensors")
+            channel_axis = 3 if ndim == 4 and self._layout == Layout.nhwc else 1 if ndim >= 2 else 0
+            length = data.shape[channel_axis]
+            if isinstance(channels, slice):
+                start, stop, step = channels.indices(length)
+                if step != 1:
+                    raise ValueError("Invalid channel range: the slice step must be 1")
+            else:
+                start, stop = channels
+            if start < 0 or stop > length or start >= stop:
+                raise ValueError(f"Invalid channel range: [{start}, {stop}) for {length} channels")
+            data = data.take(range(start, stop), axis=channel_axis)
+        if layout is not None and layout != self._layout:
+            if ndim != 4 or self._layout not in (Layout.nhwc, Layout.nchw) or layout not in (Layout.nhwc, Layout.nchw):
+                raise ValueError("Layout conversion is only supported between nhwc and nchw for 4D tensors")
+            data = data.transpose((0, 3, 1, 2) if layout == Layout.nchw else (0, 2, 3, 1))
+        if activation == "sigmoid":
+            data = 1 / (1 + np.exp(-data))
+        elif activation == "softmax":
+            if not -ndim <= axis < ndim:
+                raise ValueError("Softmax axis out of range")
+            data = np.exp(data - data.max(axis=axis, keepdims=True))
+            data /= data.sum(axis=axis, keepdims=True)
+        elif activation not in (None, "none"):
+            raise ValueError(f"Unsupported activation: {activation}, expected sigmoid or softmax")
+        dtype = np.dtype(np.float32 if dtype is None else dtype)
+        if dtype not in (np.float32, np.float16):
+            raise ValueError("Unsupported data type: dtype must be float32 or float16")
+        data = np.ascontiguousarray(data, dtype=dtype)
+        return data.copy() if data is cached else data
+
+    def _dequantize_cached(self) -> np.ndarray:
+        if self._is_input:
+            return self.dequantize(self._data)
+        generation = self._network.generation
+        if self._dequantized is None or self._dequantized[0] != generation:
+            self._dequantized = (generation, self.dequantize(self._data))
+        return self._dequantized[1]
+
+    def _convert(self, data: np.ndarray, mean: Any, std: Any, scale: float, swap_rb: bool, layout: Optional[Layout]) -> np.ndarray:
+        # NumPy version of the input conversion of synap.Tensor.assign, returns float32 data in the tensor layout
+        image = len(self._shape) == 4 and self._layout in (Layout.nhwc, Layout.nchw)
+        if layout not in (None, self._layout):
+            if not image or layout not in (Layout.nhwc, Layout.nchw):
+                raise ValueError("Layout conversion is only supported between nhwc and nchw for 4D tensors")
+            batch = data.ndim == 4
+            data = data.reshape((1,) * (not batch) + data.shape)
+            data = data.transpose((0, 2, 3, 1) if layout == Layout.nchw else (0, 3, 1, 2))
+            if not batch:
+                data = data[0]
+        channel_axis = (-1 if self._layout == Layout.nhwc else -3) if image else None
+        channels = self._shape[channel_axis] if image else 1
+        if swap_rb:
+            if channels != 3:
+                raise ValueError("swap_rb requires an image tensor with 3 channels")
+            data = np.flip(data, axis=channel_axis)
+        values = []
+        for name, value, default in (("mean", mean, 0.0), ("std", std, 1.0)):
+            value = np.asarray(default if value is None else value, dtype=np.float32).reshape(-1)
+            if value.size not in (1, channels):
+                raise ValueError(f"{name} must have 1 or {channels} values, got {value.size}")
+            if image and value.size > 1 and channel_axis == -3:
+                value = value.reshape(-1, 1, 1)
+            values.append(value)
+        if np.any(values[1] == 0):
+            raise ValueError("std values must not be zero")
+        return ((data.astype(np.float32) * np.float32(scale) - values[0]) / values[1]).astype(np.float32)
+
+    def _set(self, data: np.ndarray) -> None:
+        # Replace the content of an output tensor
+        self._data.flags.writeable = True
+        try:
+            self._data[...] = data
+        finally:
+            self._data.flags.writeable = self._is_input
+
+    def __repr__(self) -> str:
+        return f"ReplayTensor(name={self._name!r}, shape={self._shape}, data_type={self._data_type.name})"
+
+
+class ReplayTensors(list):
+    """
+    Tensors of a :class:`ReplayNetwork`, with the interface of :class:`synap.Tensors`.
+    """
+
+    def __init__(self, tensors: Any = (), network: Optional[ReplayNetwork] = None):
+        super().__init__(tensors)
+        self._network = network
+
+    @property
+    def generation(self) -> int:
+        """
+        Inference generation of the network owning the tensors
+        """
+        return self._network.generation if self._network is not None else 0
+
+    @property
+    def size(self) -> int:
+        """
+        Get tensors size
+        """
+        return len(self)
+
+
+class ReplayNetwork:
+    """
+    Network running on the host, returning recorded or random outputs.
+
+    Each inference waits ``latency`` seconds, plus a random variation
+    uniformly distributed in ``[-jitter, jitter]``, without holding the GIL,
+    then sets the outputs to the next recorded inference, in turn. When
+    there are no recorded outputs, random data of the type of each output
+    is generated once when the model is loaded and returned by all the
+    inferences.
+
+    Recorded outputs are given as one array or file per output, or as a
+    list of such lists to replay several inferences. Float32 data is
+    quantized to the output data type, data of other types must have the
+    output data type. Files are ``.npy`` files or raw data, such as the
+    ``output_float_<index>.dat`` files of the tests.
+
+    :param model_file: path to the model file, the model can also be loaded later with :meth:`load_model`.
+    :param meta_file: path to the model metadata file, for models in legacy format.
+    :param outputs: recorded outputs, random outputs if None.
+    :param latency: inference time in seconds.
+    :param jitter: maximum random variation of the inference time in seconds.
+    :param seed: seed of the random outputs and latency variation.
+    """
+
+    def __init__(
+        self,
+        model_file: str = "",
+        meta_file: str = "",
+        outputs: Optional[Sequence] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ):
+        if latency < 0 or jitter < 0:
+            raise ValueError("latency and jitter must not be negative")
+        self._recorded = outputs
+        self._latency = latency
+        self._jitter = jitter
+        self._seed = seed
+        self._random = random.Random(seed)
+        self._inputs = ReplayTensors()
+        self._outputs = ReplayTensors()
+        self._frames: list[list[np.ndarray]] = []
+        self._conversions: dict[int, dict[str, Any]] = {}
+        self._generation = 0
+        self._model_loads = 0
+        self._metrics_label = "unnamed"
+        self._lock = threading.Lock()
+        if model_file:
+            self.load_model(model_file, meta_file)
+
+    @property
+    def inputs(self) -> ReplayTensors:
+        return self._inputs
+
+    @property
+    def outputs(self) -> ReplayTensors:
+        return self._outputs
+
+    @property
+    def generation(self) -> int:
+        """
+        Number of successful inferences, incremented each time the outputs are overwritten
+        """
+        return self._generation
+
+    @property
+    def metrics_label(self) -> str:
+        """
+        Label of the network, the model file name for models loaded from a file.
+        Replay networks do not record :mod:`synap.metrics`.
+        """
+        return self._metrics_label
+
+    @metrics_label.setter
+    def metrics_label(self, label: str) -> None:
+        self._metrics_label = label
+
+    @property
+    def latency(self) -> float:
+        """
+        Inference time in seconds.
+        """
+        return self._latency
+
+    @latency.setter
+    def latency(self, latency: float) -> None:
+        if latency < 0:
+            raise ValueError("latency must not be negative")
+        self._latency = latency
+
+    def load_model(self, model: Union[str, bytes, bytearray, memoryview, Any], meta: str = "") -> None:
+        """
+        Load the tensor metadata of a model.
+
+        :param model: path to the model file, or the model data as any bytes-like object.
+        :param meta: path to the metadata file if ``model`` is a path, else the metadata, for models in legacy format.
+        :raises FileNotFoundError: if ``model`` or ``meta`` is a path to a file that does not exist.
+        :raises RuntimeError: if the model metadata cannot be read.
+        """
+        if isinstance(model, str):
+            info = ModelInfo.from_file(model, meta)
+            self._metrics_label = os.path.splitext(os.path.basename(model))[0]
+        else:
+            info = ModelInfo.from_data(model, meta)
+        self._inputs = ReplayTensors((ReplayTensor(self, tensor_info, True) for tensor_info in info.inputs), self)
+        self._outputs = ReplayTensors((ReplayTensor(self, tensor_info, False) for tensor_info in info.outputs), self)
+        self._frames = self._load_outputs()
+        self._conversions = {}
+        self._generation = 0
+        self._model_loads += 1
+
+    def set_input_conversion(
+        self,
+        input_index: int,
+        *,
+        mean: Union[float, Sequence[float], None] = None,
+        std: Union[float, Sequence[float], None] = None,
+        scale: float = 1.0,
+        swap_rb: bool = False,
+        layout: Optional[Layout] = None,
+    ) -> None:
+        """
+        Set the conversion of the arrays assigned to an input by predict(), see :meth:`synap.Network.set_input_conversion`
+        """
+        if not 0 <= input_index < len(self._inputs):
+            raise IndexError("Input index out of bounds")
+        conversion = {"mean": mean, "std": std, "scale": scale, "swap_rb": swap_rb, "layout": layout}
+        if mean is None and std is None and scale == 1.0 and not swap_rb and layout is None:
+            self._conversions.pop(input_index, None)
+        else:
+            self._conversions[input_index] = conversion
+
+    def predict(self, *args: Any) -> ReplayTensors:
+        """
+        Run a simulated inference, releasing the GIL during the inference time.
+
+        :param args: nothing to use the current inputs, a list with one array per input, or one array per input.
+        :return: the output tensors.
+        """
+        data = args[0] if len(args) == 1 and isinstance(args[0], list) else args
+        if data:
+            if len(data) != len(self._inputs):
+                raise ValueError(f"Invalid number of inputs: expected {len(self._inputs)} inputs, got {len(data)} inputs")
+            for index, (tensor, array) in enumerate(zip(self._inputs, data)):
+                tensor.assign(array, **self._conversions.get(index, {}))
+        if not self._outputs:
+            raise RuntimeError("Failed to predict")
+        with self._lock:
+            delay = self._latency + (self._random.uniform(-self._jitter, self._jitter) if self._jitter else 0.0)
+            frame = self._frames[self._generation % len(self._frames)]
+        if delay > 0:
+            time.sleep(delay)
+        for tensor, array in zip(self._outputs, frame):
+            tensor._set(array)
+        self._generation += 1
+        return self._outputs
+
+    def bind(self, inputs: Optional[Sequence[Optional[np.ndarray]]] = None, outputs: Optional[Sequence[np.ndarray]] = None) -> ReplayIOBinding:
+        """
+        Bind preallocated NumPy arrays to the inputs and outputs of the network, see :meth:`synap.Network.bind`
+        """
+        return ReplayIOBinding(self, inputs, outputs)
+
+    def stream(self, frames: Any, preprocessor: Any = None, postprocessor: Any = None, depth: int = 3) -> Any:
+        """
+        Run inference on a stream of frames with pipelined pre/postprocessing, see synap.pipeline.stream
+        """
+        from .pipeline import stream
+
+        return stream(self, frames, preprocessor, postprocessor, depth)
+
+    def _load_outputs(self) -> list[list[np.ndarray]]:
+        # Raw data of each replayed inference
+        if self._recorded is None:
+            rng = np.random.default_rng(self._seed)
+            frame = []
+            for tensor in self._outputs:
+                dtype = np.dtype(tensor.data_type.np_type())
+                if dtype.kind == "f":
+                    frame.append(rng.standard_normal(tensor._shape).astype(dtype))
+                else:
+                    info = np.iinfo(dtype)
+                    frame.append(rng.integers(info.min, info.max, tensor._shape, dtype=dtype, endpoint=True))
+            return [frame]
+        recorded = list(self._recorded)
+        if not recorded:
+            raise ValueError("No recorded outputs")
+        frames = recorded if isinstance(recorded[0], (list, tuple)) else [recorded]
+        return [self._load_frame(frame) for frame in frames]
+
+    def _load_frame(self, frame: Sequence) -> list[np.ndarray]:
+        if len(frame) != len(self._outputs):
+            raise ValueError(f"Invalid number of recorded outputs: expected {len(self._outputs)}, got {len(frame)}")
+        arrays = []
+        for tensor, data in zip(self._outputs, frame):
+            dtype = np.dtype(tensor.data_type.np_type())
+            if isinstance(data, str):
+                if data.endswith(".npy"):
+                    data = np.load(data)
+                else:
+                    raw = np.fromfile(data, dtype=np.uint8)
+                    # Dequantized data, as saved from to_numpy(), or raw tensor data
+                    data = raw.view(np.float32 if raw.size == 4 * tensor.item_count else dtype)
+            data = np.asarray(data)
+            if data.size != tensor.item_count:
+                raise ValueError(f"Invalid recorded output size for '{tensor.name}': expected {tensor.item_count} items, got {data.size}")
+            if data.dtype != dtype:
+                if data.dtype != np.float32:
+                    raise ValueError(f"Invalid recorded output type for '{tensor.name}': expected float32 or {dtype}, got {data.dtype}")
+                data = tensor.quantize(data)
+            arrays.append(data.reshape(tensor._shape).copy())
+        return arrays
+
+
+class ReplayIOBinding:
+    """
+    Arrays bound to the inputs and outputs of a :class:`ReplayNetwork`, see :class:`synap.IOBinding`.
+    """
+
+    def __init__(self, network: ReplayNetwork, inputs: Optional[Sequence[Optional[np.ndarray]]], outputs: Optional[Sequence[np.ndarray]]):
+        self._network = network
+        self._model_loads = network._model_loads
+        self._inputs: list[tuple[ReplayTensor, np.ndarray, dict[str, Any]]] = []
+        self._outputs: list[tuple[ReplayTensor, np.ndarray]] = []
+        if inputs is not None:
+            if len(inputs) != len(network.inputs):
+                raise ValueError(f"Invalid number of inputs: expected {len(network.inputs)} inputs, got {len(inputs)} inputs")
+            for index, (tensor, array) in enumerate(zip(network.inputs, inputs)):
+                if array is None:
+                    continue
+                if not isinstance(array, np.ndarray):
+                    raise TypeError("Bound inputs must be NumPy arrays or None")
+                if not array.flags.c_contiguous:
+                    raise ValueError("Bound input arrays must be C-contiguous")
+                conversion = dict(network._conversions.get(index, {}))
+                tensor.assign(array, **conversion)
+                self._inputs.append((tensor, array, conversion))
+        if outputs is not None:
+            if len(outputs) != len(network.outputs):
+                raise ValueError(f"Invalid number of outputs: expected {len(network.outputs)} outputs, got {len(outputs)} outputs")
+            for tensor, array in zip(network.outputs, outputs):
+                if not isinstance(array, np.ndarray):
+                    raise TypeError("Bound outputs must be NumPy arrays")
+                if array.dtype not in (np.float32, np.float16):
+                    raise ValueError("Unsupported data type: bound outputs must be float32 or float16 arrays")
+                if not array.flags.c_contiguous or not array.flags.writeable:
+                    raise ValueError("Bound output arrays must be writable and C-contiguous")
+                if array.size != tensor.item_count:
+                    raise ValueError(f"Size mismatch: output {tensor.name} has {tensor.item_count} items, got an array of {array.size} items")
+                self._outputs.append((tensor, array))
+        self._results = tuple(array for _, array in self._outputs) if outputs is not None else tuple(network.outputs)
+
+    @property
+    def inputs(self) -> list[np.ndarray]:
+        """
+        Bound input arrays
+        """
+        return [array for _, array, _ in self._inputs]
+
+    @property
+    def outputs(self) -> tuple:
+        """
+        Bound output arrays, or output tensors
+        """
+        return self._results
+
+    def run(self) -> tuple:
+        """
+        Copy the bound inputs, run inference and write the bound outputs, see :meth:`synap.IOBinding.run`
+        """
+        if self._network._model_loads != self._model_loads:
+            raise RuntimeError("A new model was loaded since the arrays were bound, bind them again")
+        for tensor, array, conversion in self._inputs:
+            tensor.assign(array, **conversion)
+        self._network.predict()
+        for tensor, array in self._outputs:
+            array.reshape(-1)[...] = tensor.to_numpy().reshape(-1)
+        return self._results
@@ -0,0 +1,447 @@
+# SPDX-License-Identifier: Apache-2.0
+# SPDX-FileCopyrightText: Copyright © 2019 Synaptics Incorporated.
+
+"""
+Tiled object detection on images larger than the network input.
+
+Downscaling a high resolution image to the network input size loses small
+objects. A :class:`TiledDetector` instead splits the image into overlapping
+tiles of the network input size, runs the tiles through one or more
+networks in parallel, maps the detections of each tile back to image
+coordinates and merges them with a non-maximum suppression across tiles.
+The image is decoded once, each tile is assigned to the network from a view
+of the decoded pixels.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence, Union
+
+import numpy as np
+
+from ._synap import Network
+from ._synap.types import Layout, Rect, Shape
+from .pool import NetworkPool
+from .postprocessor import Detector, DetectorResult
+from .postprocessor.detection import select
+from .postprocessor.masks import paste_masks
+from .preprocessor import InputData, InputType, Preprocessor
+
+__all__ = [
+    "TiledDetector",
+    "TiledResult",
+    "TileStats",
+    "tile_grid",
+]
+
+#: Callable postprocessor: takes the output tensors and the assigned rectangle of the tile
+TilePostprocessFn = Callable[[Any, Rect], DetectorResult]
+
+
+def tile_grid(image_size: tuple[int, int], tile_size: tuple[int, int], overlap: float = 0.2) -> list[Rect]:
+    """
+    Split an image into overlapping tiles covering all of it.
+
+    Tiles are laid out in rows, the last tile of each row and column is
+    aligned to the image border so that all the tiles have the tile size.
+    An image smaller than the tile size in one dimension gives tiles of the
+    image size in that dimension.
+
+    :param image_size: (width, height) of the image.
+    :param tile_size: (width, height) of the tiles.
+    :param overlap: minimum overlap between adjacent tiles, as a fraction of the tile size in [0, 1).
+    :return: the tiles, in row order.
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError("overlap must be in [0, 1)")
+    if min(image_size) <= 0 or min(tile_size) <= 0:
+        raise ValueError("image and tile sizes must be positive")
+
+    def positions(length: int, tile: int) -> list[int]:
+        if length <= tile:
+            return [0]
+        stride = max(1, tile - int(round(tile * overlap)))
+        count = -(-(length - tile) // stride) + 1
+        # Spread the tiles evenly between both borders
+        return [int(round(i * (length - tile) / (count - 1))) for i in range(count)]
+
+    width, height = image_size
+    tile_width, tile_height = min(tile_size[0], width), min(tile_size[1], height)
+    return [
+        Rect((x, y), (tile_width, tile_height))
+        for y in positions(height, tile_height)
+        for x in positions(width, tile_width)
+    ]
+
+
+class TileStats:
+    """
+    Statistics of a :class:`TiledDetector`.
+    """
+
+    def __init__(self, networks: int = 0):
+        self.images = 0
+        self.tiles = 0
+        self.tile_detections = 0
+        self.detections = 0
+        self.elapsed = 0.0
+        self.network_tiles = [0] * networks
+
+    @property
+    def tiles_per_second(self) -> float:
+        """
+        Number of tiles processed per second of detection time.
+        """
+        return self.tiles / self.elapsed if self.elapsed > 0 else 0.0
+
+    def _copy(self) -> TileStats:
+        stats = TileStats()
+        stats.__dict__.update(self.__dict__)
+        stats.network_tiles = list(self.network_tiles)
+        return stats
+
+    def __repr__(self) -> str:
+        return (
+            f"TileStats(images={self.images}, tiles={self.tiles}, tile_detections={self.tile_detections}, "
+            f"detections={self.detections}, elapsed={self.elapsed:.6f}, tiles_per_second={self.tiles_per_second:.1f}, "
+            f"network_tiles={self.network_tiles})"
+        )
+
+
+class TiledResult:
+    """
+    Merged detections of a tiled image, in the coordinates of the whole image.
+
+    The arrays have the format of :meth:`DetectorResult.as_arrays`, with one
+    more ``tile`` array giving the index of the tile each detection comes
+    from in :attr:`tiles`.
+    """
+
+    def __init__(
+        self,
+        arrays: dict[str, np.ndarray],
+        masks: Optional[list[np.ndarray]],
+        tiles: list[Rect],
+        image_size: tuple[int, int],
+    ):
+        self.boxes = arrays["boxes"]
+        self.scores = arrays["scores"]
+        self.class_index = arrays["class_index"]
+        self.landmarks = arrays["landmarks"]
+        self.landmark_visibility = arrays["landmark_visibility"]
+        self.tile = arrays["tile"]
+        #: Mask of each detection, relative to its box, None if the detector gives no masks
+        self.masks = masks
+        self.tiles = tiles
+        self.image_size = image_size
+        self._result: Optional[DetectorResult] = None
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @property
+    def result(self) -> DetectorResult:
+        """
+        The detections as a :class:`DetectorResult`, without masks.
+        """
+        if self._result is None:
+            self._result = DetectorResult.from_arrays(
+                self.boxes, self.scores, self.class_index, self.landmarks, self.landmark_visibility
+            )
+        return self._result
+
+    def as_arrays(self) -> dict[str, np.ndarray]:
+        """
+        Get the detections as NumPy arrays, see :meth:`DetectorResult.as_arrays`.
+        """
+        return {
+            "boxes": self.boxes,
+            "scores": self.scores,
+            "class_index": self.class_index,
+            "landmarks": self.landmarks,
+            "landmark_visibility": self.landmark_visibility,
+            "tile": self.tile,
+        }
+
+    def paste_masks(self, threshold: float = 0.5, value: int = 255) -> np.ndarray:
+        """
+        Paste the masks of the detections in image coordinates, see :func:`synap.postprocessor.paste_masks`.
+
+        :return: (N, height, width) uint8 array, one plane per detection.
+        """
+        if self.masks is None:
+            raise ValueError("The detections have no masks")
+        return paste_masks(self.masks, self.boxes, self.image_size, threshold, value)
+
+    def __repr__(self) -> str:
+        return f"TiledResult(detections={len(self)}, tiles={len(self.tiles)}, image_size={self.image_size})"
+
+
+class _Slot:
+    # A network with its own preprocessor and postprocessor, used by one tile at a time
+    def __init__(self, index: int, network: Network, postprocessor: Union[Detector, TilePostprocessFn], lock: Optional[threading.Lock]):
+        self.index = index
+        self.network = network
+        self.preprocessor = Preprocessor() if isinstance(network, Network) else None
+        self.postprocessor = postprocessor
+        self.lock = lock
+
+
+class TiledDetector:
+    """
+    Detect objects in a large image by running overlapping tiles through one or more networks.
+
+    Each tile has the input size of the networks (``tile_size`` to override
+    it), adjacent tiles overlap by ``overlap`` of the tile size so that
+    objects cut by a tile border are seen whole in a neighbouring tile. The
+    tiles are processed in parallel, one at a time per network, the native
+    preprocessing, inference and postprocessing release the GIL.
+
+    The detections of each tile are mapped back to image coordinates (boxes
+    and landmarks, masks stay relative to their box) and merged by a global
+    non-maximum suppression. By default the overlap is divided by the
+    smaller box area, so that a box truncated by a tile border is suppressed
+    by the whole box found in the neighbouring tile.
+
+    Networks that are not :class:`synap.Network` instances, such as a
+    :class:`synap.replay.ReplayNetwork`, get the tile pixels assigned to
+    their first input, the tile is padded with zeros if needed.
+
+    :param networks: a network, a list of networks loaded with the same model, or a :class:`synap.NetworkPool`.
+    :param postprocessor: a :class:`Detector`, or a callable taking the output tensors and the assigned
+        rectangle of the tile and returning a :class:`DetectorResult`, such as one using
+        :func:`synap.postprocessor.detect_anchor_free`; or a list with one of them per network.
+        A single postprocessor shared by several networks is called by one tile at a time. A
+        :class:`Detector` per network if None.
+    :param tile_size: (width, height) of the tiles, the input size of the networks if None.
+    :param overlap: minimum overlap between adjacent tiles, as a fraction of the tile size.
+    :param iou_threshold: maximum allowed overlap between merged detections.
+    :param iou_with_min: divide the intersection by the smaller of the two areas instead of the union.
+    :param class_agnostic: if False detections only suppress detections of the same class.
+    :param n_max: maximum number of merged detections, 0 for no limit.
+    """
+
+    def __init__(
+        self,
+        networks: Union[Network, Sequence[Network], NetworkPool],
+        postprocessor: Union[Detector, TilePostprocessFn, Sequence[Union[Detector, TilePostprocessFn]], None] = None,
+        tile_size: Optional[tuple[int, int]] = None,
+        overlap: float = 0.2,
+        iou_threshold: float = 0.5,
+        iou_with_min: bool = True,
+        class_agnostic: bool = False,
+        n_max: int = 0,
+    ):
+        if isinstance(networks, NetworkPool):
+            networks = networks.networks
+        elif not isinstance(networks, (list, tuple)):
+            networks = [networks]
+        if not networks:
+            raise ValueError("At least one network is required")
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap must be in [0, 1)")
+        if postprocessor is None:
+            postprocessors = [Detector() for _ in networks]
+        elif isinstance(postprocessor, (list, tuple)):
+            if len(postprocessor) != len(networks):
+                raise ValueError(f"Got {len(postprocessor)} postprocessors for {len(networks)} networks")
+            postprocessors = list(postprocessor)
+        else:
+            postprocessors = [postprocessor] * len(networks)
+        locks = {id(p): threading.Lock() for p in postprocessors if postprocessors.count(p) > 1}
+        self._slots: queue.Queue[_Slot] = queue.Queue()
+        for index, (network, post) in enumerate(zip(networks, postprocessors)):
+            self._slots.put(_Slot(index, network, post, locks.get(id(post))))
+        self._tile_size = tuple(tile_size) if tile_size is not None else self._input_size(networks[0])
+        self._overlap = overlap
+        self._iou_threshold = iou_threshold
+        self._iou_with_min = iou_with_min
+        self._class_agnostic = class_agnostic
+        self._n_max = n_max
+        self._executor = ThreadPoolExecutor(len(networks), thread_name_prefix="synap-tile")
+        self._stats = TileStats(len(networks))
+        self._stats_lock = threading.Lock()
+
+    @property
+    def tile_size(self) -> tuple[int, int]:
+        """
+        (width, height) of the tiles.
+        """
+        return self._tile_size
+
+    @property
+    def stats(self) -> TileStats:
+        """
+        Snapshot of the statistics.
+        """
+        with self._stats_lock:
+            return self._stats._copy()
+
+    def tiles(self, image_size: tuple[int, int]) -> list[Rect]:
+        """
+        Get the tiles of an image of the given (width, height), see :func:`tile_grid`.
+        """
+        return tile_grid(image_size, self._tile_size, self._overlap)
+
+    def detect(self, image: Union[str, bytes, np.ndarray, InputData]) -> TiledResult:
+        """
+        Detect objects in an image.
+
+        :param image: image file name, encoded image data, decoded :class:`InputData`,
+            or (height, width, channels) uint8 array.
+        :return: the merged detections, in the coordinates of the image.
+        """
+        start = time.perf_counter()
+        pixels = self._decode(image)
+        height, width = pixels.shape[:2]
+        tiles = self.tiles((width, height))
+        futures = [self._executor.submit(self._run_tile, pixels, tile) for tile in tiles]
+        results = [future.result() for future in futures]
+        arrays, masks = self._merge(results)
+        with self._stats_lock:
+            self._stats.images += 1
+            self._stats.tiles += len(tiles)
+            self._stats.tile_detections += sum(len(result[0]["scores"]) for result in results)
+            self._stats.detections += len(arrays["scores"])
+            self._stats.elapsed += time.perf_counter() - start
+        return TiledResult(arrays, masks, tiles, (width, height))
+
+    def close(self) -> None:
+        """
+        Stop the worker threads.
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> TiledDetector:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def _input_size(network: Network) -> tuple[int, int]:
+        tensor = network.inputs[0]
+        shape = list(tensor.shape)
+        if len(shape) != 4:
+            raise ValueError("tile_size is required for networks without a 4D image input")
+        if tensor.layout == Layout.nchw:
+            return shape[3], shape[2]
+        return shape[2], shape[1]
+
+    @staticmethod
+    def _decode(image: Union[str, bytes, np.ndarray, InputData]) -> np.ndarray:
+        if isinstance(image, np.ndarray):
+            pixels = image
+        else:
+            if isinstance(image, str):
+                image = InputData(image)
+            elif not isinstance(image, InputData):
+                image = InputData(image, InputType.encoded_image)
+            if image.empty():
+                raise ValueError("Invalid input image")
+            pixels = image.view()
+        if pixels.ndim != 3 or pixels.dtype != np.uint8:
+            raise ValueError("The image must be a (height, width, channels) uint8 array")
+        return pixels
+
+    def _run_tile(self, pixels: np.ndarray, tile: Rect) -> tuple[dict[str, np.ndarray], Optional[list[np.ndarray]]]:
+        x, y = tile.origin.x, tile.origin.y
+        width, height = tile.size.x, tile.size.y
+        data = np.ascontiguousarray(pixels[y:y + height, x:x + width])
+        slot = self._slots.get()
+        try:
+            if slot.preprocessor is not None:
+                assigned_rect = slot.preprocessor.assign(slot.network.inputs, data, Shape(list(data.shape)), Layout.nhwc)
+            else:
+                assigned_rect = self._assign_padded(slot.network, data)
+            outputs = slot.network.predict()
+            if slot.lock is not None:
+                with slot.lock:
+                    result = self._postprocess(slot.postprocessor, outputs, assigned_rect)
+            else:
+                result = self._postprocess(slot.postprocessor, outputs, assigned_rect)
+            arrays = result.as_arrays()
+            masks = [np.array(item.mask) for item in result.items] if any(item.mask for item in result.items) else None
+        finally:
+            self._slots.put(slot)
+        with self._stats_lock:
+            self._stats.network_tiles[slot.index] += 1
+        # Map the detections from tile to image coordinates
+        arrays["boxes"][:, 0] += x
+        arrays["boxes"][:, 1] += y
+        landmarks = arrays["landmarks"]
+        if landmarks.size:
+            # Padding landmarks stay all zeros
+            present = (arrays["landmark_visibility"] != -1) | np.any(landmarks != 0, axis=2)
+            landmarks[..., 0] += np.where(present, x, 0).astype(landmarks.dtype)
+            landmarks[..., 1] += np.where(present, y, 0).astype(landmarks.dtype)
+        return arrays, masks
+
+    @staticmethod
+    def _postprocess(postprocessor: Union[Detector, TilePostprocessFn], outputs: Any, assigned_rect: Rect) -> DetectorResult:
+        if isinstance(postprocessor, Detector):
+            return postprocessor.process(outputs, assigned_rect)
+        return postprocessor(outputs, assigned_rect)
+
+    @staticmethod
+    def _assign_padded(network: Any, data: np.ndarray) -> Rect:
+        tensor = network.inputs[0]
+        shape = tuple(tensor.shape)
+        if tensor.layout == Layout.nchw:
+            height, width, channels = shape[2], shape[3], shape[1]
+        else:
+            height, width, channels = shape[1], shape[2], shape[3]
+        tile_size = data.shape[1], data.shape[0]
+        if data.shape != (height, width, channels):
+            if data.shape[0] > height or data.shape[1] > width or data.shape[2] != channels:
+                raise ValueError(f"Tile of shape {data.shape} does not fit in the network input of shape {list(shape)}")
+            padded = np.zeros((height, width, channels), dtype=np.uint8)
+            padded[:data.shape[0], :data.shape[1]] = data
+            data = padded
+        tensor.assign(data[None], layout=Layout.nhwc if tensor.layout == Layout.nchw else None)
+        # The tile is not scaled, boxes in input coordinates are tile coordinates
+        return Rect((0, 0), tile_size)
+
+    def _merge(
+        self,
+        results: list[tuple[dict[str, np.ndarray], Optional[list[np.ndarray]]]],
+    ) -> tuple[dict[str, np.ndarray], Optional[list[np.ndarray]]]:
+        landmark_count = max((arrays["landmarks"].shape[1] for arrays, _ in results), default=0)
+        merged: dict[str, list[np.ndarray]] = {name: [] for name in ("boxes", "scores", "class_index", "landmarks", "landmark_visibility", "tile")}
+        has_masks = any(masks is not None for _, masks in results)
+        all_masks: list[np.ndarray] = []
+        for index, (arrays, masks) in enumerate(results):
+            count = len(arrays["scores"])
+            for name in ("boxes", "scores", "class_index"):
+                merged[name].append(arrays[name])
+            # Pad the landmarks of all the tiles to the same count, as as_arrays() does
+            landmarks = np.zeros((count, landmark_count, 3), dtype=np.int32)
+            visibility = np.full((count, landmark_count), -1, dtype=np.float32)
+            landmarks[:, :arrays["landmarks"].shape[1]] = arrays["landmarks"]
+            visibility[:, :arrays["landmark_visibility"].shape[1]] = arrays["landmark_visibility"]
+            merged["landmarks"].append(landmarks)
+            merged["landmark_visibility"].append(visibility)
+            merged["tile"].append(np.full(count, index, dtype=np.int32))
+            if has_masks:
+                all_masks.extend(masks if masks is not None else [np.zeros((0, 0), dtype=np.float32)] * count)
+        arrays = {name: np.concatenate(values) for name, values in merged.items()}
+        arrays["boxes"] = arrays["boxes"].reshape(-1, 4)
+        # Global NMS across the tiles
+        boxes = arrays["boxes"].astype(np.float32)
+        corners = np.concatenate([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]], axis=1)
+        selected = select(
+            corners,
+            arrays["scores"],
+            arrays["class_index"],
+            self._n_max,
+            True,
+            self._iou_threshold,
+            self._iou_with_min,
+            self._class_agnostic,
+        )
+        arrays = {name: values[selected] for name, values in arrays.items()}
+        return arrays, [all_masks[i] for i in selected.tolist()] if has_masks else None
@@ -199,12 +199,17 @@ class Mask:
     
             Represents an instance segmentation.
     
+            Masks support the buffer protocol: ``numpy.asarray(mask)`` is a
+            read-only (height, width) float32 view of the mask values.
+    
             :ivar int width: The width of the mask.
             :ivar int height: The height of the mask.
             
     """
     def __bool__(self) -> bool:
         ...
+    def __buffer__(self, flags: int) -> memoryview:
+        ...
     def __init__(self, width: int, height: int) -> None:
         ...
     def __repr__(self) -> str:
@@ -224,6 +229,13 @@ class Mask:
                 :param int col: The column index.
                 :param float val: The value to set.
         """
+    def to_numpy(self) -> numpy.ndarray:
+        """
+                Get mask values as a NumPy array without copying.
+        
+                :return: Read-only (height, width) float32 array, keeping the mask alive.
+                :rtype: numpy.ndarray
+        """
     @property
     def height(self) -> int:
         """
@@ -0,0 +1,121 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import synap
+from synap.batching import BatchScheduler
+from synap.replay import ReplayNetwork
+
+from .utils import write_model_archive
+
+_MODEL_METADATA = {
+    "Inputs": {
+        "input": {
+            "name": "input",
+            "shape": [4, 2, 3],
+            "format": "none",
+            "dtype": "uint8",
+        },
+    },
+    "Outputs": {
+        "rows": {
+            "name": "rows",
+            "shape": [4, 3],
+            "format": "none",
+            "dtype": "float32",
+        },
+        "shared": {
+            "name": "shared",
+            "shape": [2],
+            "format": "none",
+            "dtype": "float32",
+        },
+    },
+}
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def replay_model_path(tmp_path):
+    return write_model_archive(tmp_path / "batch-model.synap", _MODEL_METADATA)
+
+@pytest.fixture
+def recorded_outputs():
+    return [np.arange(12, dtype=np.float32).reshape(4, 3), np.array([7, 8], dtype=np.float32)]
+
+
+# ------------------------synap.batching------------------------ #
+
+def test_batch_deadline(replay_model_path, recorded_outputs):
+    """
+    Test that a partial batch is padded and dispatched at its deadline
+    """
+    network = ReplayNetwork(replay_model_path, outputs=recorded_outputs)
+    with BatchScheduler(network, max_wait=0.1) as scheduler:
+        assert (scheduler.batch_size, scheduler.max_batch) == (4, 4)
+        futures = [scheduler.submit(np.full((2, 3), i + 1, dtype=np.uint8)) for i in range(3)]
+        results = [future.result() for future in futures]
+        stats = scheduler.stats
+    for slot, (rows, shared) in enumerate(results):
+        assert np.array_equal(rows, recorded_outputs[0][slot])
+        assert np.array_equal(shared, recorded_outputs[1])
+    assert network.inputs[0].view()[:, 0, 0].tolist() == [1, 2, 3, 0]
+    assert (stats.batches, stats.requests, stats.padded_slots, stats.deadline_batches) == (1, 3, 1, 1)
+    assert stats.fill_ratio == 0.75
+    assert 0.05 < stats.mean_queue_delay <= stats.max_queue_delay
+    assert stats.queue_delay_percentile(100) == stats.max_queue_delay
+
+def test_batch_full(replay_model_path, recorded_outputs):
+    """
+    Test that a full batch is dispatched without waiting for the deadline
+    """
+    network = ReplayNetwork(replay_model_path, outputs=recorded_outputs)
+    with BatchScheduler(network, max_wait=10) as scheduler:
+        futures = [scheduler.submit(np.full((1, 2, 3), i, dtype=np.uint8)) for i in range(4)]
+        results = [future.result(timeout=5) for future in futures]
+        stats = scheduler.stats
+    assert [rows.tolist() for rows, _ in results] == recorded_outputs[0].tolist()
+    assert (stats.batches, stats.deadline_batches, stats.fill_ratio) == (1, 0, 1.0)
+    with BatchScheduler(network, max_wait=0, max_batch=2) as scheduler:
+        rows, _ = asyncio.run(scheduler.predict_async(np.zeros((2, 3), dtype=np.float32)))
+        assert rows.shape == (3,)
+        assert scheduler.predict(np.zeros((2, 3), dtype=np.float32), timeout=5)[0].shape == (3,)
+        assert scheduler.stats.padded_slots == 2
+
+def test_batch_invalid(replay_model_path):
+    """
+    Test invalid shapes and data types, and cancelled requests
+    """
+    network = ReplayNetwork(replay_model_path)
+    with pytest.raises(ValueError):
+        BatchScheduler(network, max_batch=5)
+    scheduler = BatchScheduler(network, max_wait=10)
+    with pytest.raises(ValueError):
+        scheduler.submit()
+    with pytest.raises(ValueError):
+        scheduler.submit(np.zeros((3, 2), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        scheduler.submit(np.zeros((2, 3)))
+    future = scheduler.submit(np.zeros((2, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        scheduler.submit(np.full((2, 3), 0.25, dtype=np.float32))
+    assert scheduler.pending == 1
+    scheduler.close(cancel_pending=True)
+    assert future.cancelled()
+    assert scheduler.stats.batches == 0
+    with pytest.raises(RuntimeError):
+        scheduler.submit(np.zeros((2, 3), dtype=np.uint8))
+
+def test_batch_network(valid_uint8_model_path):
+    """
+    Test batching requests to a SyNAP network
+    """
+    with BatchScheduler(synap.Network(valid_uint8_model_path), max_wait=0.001) as scheduler:
+        shape = tuple(scheduler.network.outputs[0].shape)
+        outputs = scheduler.predict(np.zeros((384, 640, 3), dtype=np.uint8))
+    assert outputs[0].shape == shape[1:]
+    assert scheduler.stats.requests == 1
@@ -0,0 +1,218 @@
+import glob
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+import pytest
+
+import synap
+from synap.benchmark import host_memory, latency_stats, main, run
+from synap.postprocessor import Classifier, DetectorResult
+
+from .utils import write_model_archive
+
+# Models benchmarked by the binding overhead tests
+MODELS = sorted(glob.glob("tests/data/*.synap")) or ["tests/data/yolov8s-640x384-uint8.synap"]
+
+# Set SYNAP_BENCHMARK_OUTPUT to save the measured times, and SYNAP_BENCHMARK_BASELINE
+# to the file saved by a previous release to fail on times above the baseline by more
+# than SYNAP_BENCHMARK_TOLERANCE (default 1.5x)
+_BASELINE_FILE = os.environ.get("SYNAP_BENCHMARK_BASELINE")
+_OUTPUT_FILE = os.environ.get("SYNAP_BENCHMARK_OUTPUT")
+_TOLERANCE = float(os.environ.get("SYNAP_BENCHMARK_TOLERANCE", "1.5"))
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def replay_model_path(tmp_path):
+    tensor = {"shape": [1, 8, 8, 3], "format": "nhwc", "dtype": "uint8"}
+    metadata = {"Inputs": {"input": dict(tensor, name="input")}, "Outputs": {"output": dict(tensor, name="output")}}
+    return write_model_archive(tmp_path / "replay-model.synap", metadata)
+
+@pytest.fixture(scope="module")
+def bench_results():
+    results = {}
+    yield results
+    if _OUTPUT_FILE and results:
+        with open(_OUTPUT_FILE, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+@pytest.fixture(scope="module")
+def bench_baseline():
+    if not _BASELINE_FILE:
+        return {}
+    with open(_BASELINE_FILE) as f:
+        return json.load(f)
+
+@pytest.fixture
+def bench(request, bench_results, bench_baseline):
+    """
+    Measure the median time of a function, and check it against the baseline
+    """
+    def measure(func, repeat=200):
+        func()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        median = statistics.median(times)
+        name = request.node.name
+        bench_results[name] = median
+        if name in bench_baseline:
+            limit = bench_baseline[name] * _TOLERANCE
+            assert median <= limit, f"{name}: {median * 1e6:.1f} us, baseline {bench_baseline[name] * 1e6:.1f} us"
+        return median
+    return measure
+
+@pytest.fixture(params=MODELS, ids=lambda path: os.path.splitext(os.path.basename(path))[0])
+def network(request):
+    return synap.Network(request.param)
+
+@pytest.fixture
+def random_inputs(network):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, tuple(t.shape), dtype=np.uint8) for t in network.inputs]
+
+
+# ------------------------synap.benchmark------------------------ #
+
+def test_latency_stats():
+    """
+    Test the summary of durations in milliseconds
+    """
+    stats = latency_stats([0.001 * i for i in range(1, 101)])
+    assert stats["min"] == pytest.approx(1)
+    assert stats["max"] == pytest.approx(100)
+    assert stats["mean"] == pytest.approx(50.5)
+    assert stats["p50"] == pytest.approx(50.5)
+    assert stats["p99"] == pytest.approx(99.01)
+    assert stats["p90"] <= stats["p95"] <= stats["p99"]
+    assert set(latency_stats([]).values()) == {0.0}
+
+def test_host_memory():
+    """
+    Test that the resident memory of the process is reported
+    """
+    memory = host_memory()
+    assert memory["peak_rss"] > 0
+    assert memory["rss"] <= memory["peak_rss"]
+
+def test_run_invalid_arguments(valid_uint8_model_path):
+    """
+    Test rejection of invalid benchmark parameters
+    """
+    with pytest.raises(ValueError):
+        run(valid_uint8_model_path, iterations=0)
+    with pytest.raises(ValueError):
+        run(valid_uint8_model_path, duration=0)
+    with pytest.raises(ValueError):
+        run(valid_uint8_model_path, threads=0)
+    with pytest.raises(ValueError):
+        run(valid_uint8_model_path, postprocess="unknown")
+
+def test_run(valid_uint8_model_path):
+    """
+    Test a benchmark for a number of iterations from several threads
+    """
+    report = run(valid_uint8_model_path, iterations=8, warmup=1, threads=2, postprocess="detector")
+    assert report["iterations"] == 8
+    assert report["config"]["instances"] == 2
+    assert report["throughput"] > 0
+    assert set(report["stages"]) == {"preprocess", "inference", "postprocess"}
+    assert report["latency"]["p50"] >= report["stages"]["inference"]["p50"] > 0
+    assert report["memory"]["rss_after_load"] > 0
+    json.dumps(report)
+
+def test_run_duration(valid_uint8_model_path):
+    """
+    Test a benchmark for a fixed duration
+    """
+    report = run(valid_uint8_model_path, duration=0.2, warmup=0)
+    assert report["iterations"] > 0
+    assert report["elapsed"] >= 0.2
+
+def test_run_replay(replay_model_path):
+    """
+    Test a benchmark on the host with the replay backend
+    """
+    report = run(replay_model_path, iterations=20, warmup=1, threads=2, postprocess="to_numpy", backend="replay", replay_latency=0.002)
+    assert report["iterations"] == 20
+    assert report["config"]["backend"] == "replay"
+    assert report["stages"]["inference"]["min"] >= 2
+    assert report["throughput"] > 0
+    with pytest.raises(ValueError):
+        run(replay_model_path, backend="replay", postprocess="detector")
+    with pytest.raises(ValueError):
+        run(replay_model_path, backend="unknown")
+
+def test_main(valid_uint8_model_path, tmp_path):
+    """
+    Test the JSON report of the command line tool
+    """
+    output = tmp_path / "report.json"
+    main(["-m", valid_uint8_model_path, "-n", "3", "-w", "0", "-p", "to_numpy", "-o", str(output)])
+    report = json.loads(output.read_text())
+    assert report["model"] == valid_uint8_model_path
+    assert report["iterations"] == 3
+
+
+# ------------------------binding overhead------------------------ #
+
+def test_bench_assign(network, random_inputs, bench):
+    """
+    Benchmark copying an array to each input tensor
+    """
+    def assign():
+        for tensor, data in zip(network.inputs, random_inputs):
+            tensor.assign(data)
+    bench(assign)
+
+def test_bench_to_numpy(network, random_inputs, bench):
+    """
+    Benchmark getting the dequantized data of each output tensor, cached after the first call
+    """
+    outputs = network.predict(random_inputs)
+    bench(lambda: [output.to_numpy() for output in outputs])
+
+def test_bench_view(network, random_inputs, bench):
+    """
+    Benchmark getting a zero-copy view of each output tensor
+    """
+    outputs = network.predict(random_inputs)
+    bench(lambda: [output.view() for output in outputs])
+
+def test_bench_classifier_items(network, random_inputs, bench):
+    """
+    Benchmark iterating the items of a classification result
+    """
+    result = Classifier(top_count=100).process(network.predict(random_inputs))
+    bench(lambda: [(item.class_index, item.confidence) for item in result.items])
+
+def test_bench_detector_items(bench):
+    """
+    Benchmark iterating the items of a detection result
+    """
+    rng = np.random.default_rng(0)
+    boxes = rng.integers(0, 600, (100, 4), dtype=np.int32)
+    result = DetectorResult.from_arrays(boxes, rng.uniform(0, 1, 100), rng.integers(0, 80, 100))
+
+    def iterate():
+        for item in result.items:
+            box = item.bounding_box
+            (box.origin.x, box.origin.y, box.size.x, box.size.y, item.confidence, item.class_index)
+    bench(iterate)
+
+def test_bench_detector_as_arrays(bench):
+    """
+    Benchmark converting a detection result to arrays
+    """
+    rng = np.random.default_rng(0)
+    boxes = rng.integers(0, 600, (100, 4), dtype=np.int32)
+    result = DetectorResult.from_arrays(boxes, rng.uniform(0, 1, 100), rng.integers(0, 80, 100))
+    bench(result.as_arrays)
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+import synap
+from synap import BufferPool
+
+from .utils import get_model_metadata
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def valid_uint8_model_props(valid_uint8_model_path):
+    return get_model_metadata(valid_uint8_model_path)
+
+@pytest.fixture
+def network(valid_uint8_model_path):
+    return synap.Network(valid_uint8_model_path)
+
+
+# ------------------------synap.BufferPool------------------------ #
+
+def test_buffer_pool_invalid_depth(network):
+    """
+    Test that the pool depth must be positive
+    """
+    with pytest.raises(ValueError):
+        BufferPool(network.inputs, depth=0)
+
+def test_buffer_pool_network_tensors(network):
+    """
+    Test that the pool tensors must be inputs or outputs of a network
+    """
+    with pytest.raises(ValueError, match="network"):
+        BufferPool(network.outputs.detached())
+    with pytest.raises(ValueError, match="network"):
+        BufferPool([synap.Tensor(network.inputs[0])])
+
+def test_buffer_pool_rotate(network):
+    """
+    Test that rotating the pool switches the tensor buffers
+    """
+    with BufferPool(network.inputs, depth=3) as pool:
+        assert pool.depth == 3
+        assert network.inputs[0].buffer() is pool.buffers()[0]
+        for i in range(1, 7):
+            assert pool.rotate() == i % 3
+            assert network.inputs[0].buffer() is pool.buffers()[0]
+            assert pool.buffers()[0] is pool.buffers(i % 3)[0]
+    assert all(buffer is not network.inputs[0].buffer() for slot in range(3) for buffer in pool.buffers(slot))
+    with pytest.raises(RuntimeError, match="released"):
+        pool.rotate()
+
+def test_buffer_pool_view(network, valid_uint8_model_props):
+    """
+    Test that slot views share memory with the buffers and have the tensor layout
+    """
+    with BufferPool(network.inputs) as pool:
+        view = pool.view(0, pool.next_index)
+        assert view.shape == tuple(valid_uint8_model_props["inputs"][0]["shape"])
+        assert view.dtype == np.uint8
+        view[...] = 7
+        pool.rotate()
+        assert np.all(network.inputs[0].view() == 7)
+
+def test_buffer_pool_double_buffered_outputs(network, valid_uint8_model_props):
+    """
+    Test that outputs of the previous inference stay readable during the next one
+    """
+    with BufferPool(network.inputs) as inputs, BufferPool(network.outputs) as outputs:
+        inputs.view(0)[...] = 0
+        network.predict()
+        first = outputs.view(0).copy()
+        outputs.rotate()
+        inputs.rotate()
+        inputs.view(0)[...] = 255
+        network.predict()
+        assert np.array_equal(outputs.view(0, outputs.previous_index), first)
+
+def test_buffer_pool_slot_tensors(network):
+    """
+    Test that slot tensors read the outputs of their slot while the network uses another one
+    """
+    with BufferPool(network.inputs) as inputs, BufferPool(network.outputs) as outputs:
+        assert outputs.slot_tensors(0)[0].buffer() is outputs.buffers(0)[0]
+        inputs.slot_tensors(inputs.index)[0].assign(np.zeros(tuple(network.inputs[0].shape), dtype=np.uint8))
+        network.predict()
+        first = [out.to_numpy().copy() for out in network.outputs]
+        outputs.rotate()
+        inputs.rotate()
+        inputs.slot_tensors()[0].assign(np.full(tuple(network.inputs[0].shape), 255, dtype=np.uint8))
+        network.predict()
+        previous = outputs.slot_tensors(outputs.previous_index)
+        assert all(np.array_equal(out.to_numpy(), data) for out, data in zip(previous, first))
+    network.predict()
+    with pytest.raises(RuntimeError, match="network"):
+        BufferPool([network.inputs[0]]).slot_tensors()
@@ -0,0 +1,150 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import synap
+from synap.preprocessor import DatasetLoader, InputData, LoaderStats
+
+
+def _write_png(path, image: np.ndarray):
+    """
+    Write an RGB uint8 image as an uncompressed PNG file
+    """
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    height, width = image.shape[:2]
+    raw = b"".join(b"\x00" + image[y].tobytes() for y in range(height))
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw)))
+        f.write(chunk(b"IEND", b""))
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    for i in range(6):
+        subdir = tmp_path / f"class_{i % 2}"
+        subdir.mkdir(exist_ok=True)
+        _write_png(subdir / f"image_{i}.png", np.full((8, 12, 3), i, dtype=np.uint8))
+    (tmp_path / "labels.txt").write_text("not an image")
+    return tmp_path
+
+
+# ------------------------synap.preprocessor.DatasetLoader------------------------ #
+
+def test_loader_invalid_args(dataset_dir):
+    """
+    Test loader argument validation
+    """
+    with pytest.raises(ValueError):
+        DatasetLoader(str(dataset_dir), workers=0)
+    with pytest.raises(ValueError):
+        DatasetLoader(str(dataset_dir), prefetch=0)
+    with pytest.raises(NotADirectoryError):
+        DatasetLoader(str(dataset_dir / "missing"))
+
+def test_loader_walk_directory(dataset_dir):
+    """
+    Test that walking a directory finds the images in sorted order
+    """
+    loader = DatasetLoader(str(dataset_dir))
+    assert len(loader) == 6
+    assert loader.paths == sorted(loader.paths)
+    assert all(path.endswith(".png") for path in loader.paths)
+
+def test_loader_order_and_decode(dataset_dir):
+    """
+    Test that images are decoded and yielded in dataset order
+    """
+    loader = DatasetLoader(str(dataset_dir), workers=3, prefetch=2)
+    items = list(loader)
+    assert [path for path, _ in items] == loader.paths
+    for _, input_data in items:
+        assert isinstance(input_data, InputData)
+        assert input_data.size() == 8 * 12 * 3
+    stats = loader.stats
+    assert isinstance(stats, LoaderStats)
+    assert stats.images == 6
+    assert stats.cache_hits == stats.cache_misses == 0
+
+def test_loader_file_list(dataset_dir):
+    """
+    Test loading an explicit list of files
+    """
+    paths = DatasetLoader(str(dataset_dir)).paths[::-1]
+    loader = DatasetLoader(paths)
+    assert [path for path, _ in loader] == paths
+
+def test_loader_invalid_image(dataset_dir):
+    """
+    Test that unreadable images raise an error
+    """
+    loader = DatasetLoader([str(dataset_dir / "labels.txt")])
+    with pytest.raises(ValueError, match="Invalid input image"):
+        list(loader)
+
+def test_loader_cache(dataset_dir):
+    """
+    Test that decoded images are cached across epochs
+    """
+    loader = DatasetLoader(str(dataset_dir), cache_size=1024 * 1024)
+    first = [input_data for _, input_data in loader]
+    second = [input_data for _, input_data in loader]
+    assert all(a is b for a, b in zip(first, second))
+    stats = loader.stats
+    assert (stats.cache_misses, stats.cache_hits) == (6, 6)
+    assert loader.cache_usage == 6 * 8 * 12 * 3
+
+def test_loader_cache_mtime(dataset_dir):
+    """
+    Test that modified images are decoded again
+    """
+    loader = DatasetLoader(str(dataset_dir), cache_size=1024 * 1024)
+    list(loader)
+    path = loader.paths[0]
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    list(loader)
+    assert loader.stats.cache_misses == 7
+
+def test_loader_cache_eviction(dataset_dir):
+    """
+    Test that the cache size is bounded
+    """
+    image_size = 8 * 12 * 3
+    loader = DatasetLoader(str(dataset_dir), cache_size=2 * image_size)
+    list(loader)
+    assert loader.cache_usage == 2 * image_size
+    assert loader.stats.cache_evictions == 4
+    loader.clear_cache()
+    assert loader.cache_usage == 0
+
+def test_loader_early_exit(dataset_dir):
+    """
+    Test that leaving the iteration early stops prefetching
+    """
+    loader = DatasetLoader(str(dataset_dir), prefetch=2)
+    for _ in loader:
+        break
+    assert loader.stats.images == 1
+
+def test_loader_feed(dataset_dir, valid_uint8_model_path):
+    """
+    Test feeding the images to a network
+    """
+    network = synap.Network(valid_uint8_model_path)
+    loader = DatasetLoader(str(dataset_dir))
+    count = 0
+    for path, rect in loader.feed(network):
+        assert (rect.size.x, rect.size.y) == (12, 8)
+        network.predict()
+        count += 1
+    assert count == len(loader)
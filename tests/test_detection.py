@@ -0,0 +1,231 @@
+import numpy as np
+import pytest
+
+import synap
+from synap.postprocessor import (
+    Detector,
+    DetectorResult,
+    batched_nms,
+    box_iou,
+    decode_anchor_based,
+    decode_anchor_free,
+    detect_anchor_free,
+    nms,
+    select,
+    to_image_boxes,
+    top_k,
+)
+from synap.types import Rect
+
+
+def _reference_nms(boxes, scores, iou_threshold, iou_with_min=False):
+    # Straightforward greedy selection, as done by the native detector
+    selected = []
+    for i in sorted(range(len(scores)), key=lambda i: -scores[i]):
+        keep = True
+        for j in selected:
+            iw = min(boxes[i][2], boxes[j][2]) - max(boxes[i][0], boxes[j][0])
+            ih = min(boxes[i][3], boxes[j][3]) - max(boxes[i][1], boxes[j][1])
+            if iw > 0 and ih > 0:
+                inter = iw * ih
+                area_i = (boxes[i][2] - boxes[i][0]) * (boxes[i][3] - boxes[i][1])
+                area_j = (boxes[j][2] - boxes[j][0]) * (boxes[j][3] - boxes[j][1])
+                union = min(area_i, area_j) if iou_with_min else area_i + area_j - inter
+                if inter / union > iou_threshold:
+                    keep = False
+                    break
+        if keep:
+            selected.append(i)
+    return selected
+
+
+@pytest.fixture
+def random_boxes():
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 600, (700, 2)).astype(np.float32)
+    sizes = rng.uniform(5, 80, (700, 2)).astype(np.float32)
+    boxes = np.concatenate([corners, corners + sizes], axis=1)
+    return boxes, rng.uniform(0, 1, 700).astype(np.float32), rng.integers(0, 5, 700).astype(np.int32)
+
+@pytest.fixture
+def yolov8_output():
+    output = np.fromfile("tests/data/output_float_0.dat", dtype=np.float32).reshape(1, 84, 5040).copy()
+    rng = np.random.default_rng(0)
+    positions = rng.choice(5040, 300, replace=False)
+    output[0, 4 + rng.integers(0, 80, 300), positions] = rng.uniform(0.25, 1.0, 300)
+    return output
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+
+# ------------------------synap.postprocessor.detection------------------------ #
+
+def test_decode_anchor_free(yolov8_output):
+    """
+    Test YOLOv8 output decoding against a per-box loop
+    """
+    boxes, scores, class_index = decode_anchor_free(yolov8_output, 0.5, scale=(640, 384))
+    data = yolov8_output[0]
+    expected = [i for i in range(data.shape[1]) if data[4:, i].max() >= 0.5]
+    assert len(boxes) == len(scores) == len(class_index) == len(expected)
+    for k, i in enumerate(expected):
+        cx, cy, w, h = data[:4, i]
+        assert class_index[k] == np.argmax(data[4:, i])
+        assert scores[k] == data[4:, i].max()
+        assert np.allclose(boxes[k], [(cx - w / 2) * 640, (cy - h / 2) * 384, (cx + w / 2) * 640, (cy + h / 2) * 384])
+    # channels-last outputs give the same result
+    transposed = decode_anchor_free(yolov8_output[0].T, 0.5, scale=(640, 384), channels_first=False)
+    assert all(np.array_equal(a, b) for a, b in zip(transposed, (boxes, scores, class_index)))
+
+def test_decode_anchor_free_objectness():
+    """
+    Test that the objectness multiplies the class scores
+    """
+    output = np.array([[10, 10, 4, 4, 0.5, 0.2, 0.9], [20, 20, 4, 4, 0.9, 0.8, 0.1]], dtype=np.float32)
+    boxes, scores, class_index = decode_anchor_free(output, 0.5, objectness=True, channels_first=False)
+    assert scores.tolist() == [np.float32(0.9) * np.float32(0.8)]
+    assert class_index.tolist() == [0]
+    assert boxes.tolist() == [[18, 18, 22, 22]]
+
+def test_decode_anchor_free_empty():
+    """
+    Test decoding an output without any box above the threshold
+    """
+    output = np.fromfile("tests/data/output_float_0.dat", dtype=np.float32).reshape(1, 84, 5040)
+    boxes, scores, class_index = decode_anchor_free(output, 0.5)
+    assert boxes.shape == (0, 4)
+    assert scores.shape == class_index.shape == (0,)
+
+def test_decode_anchor_based():
+    """
+    Test retinanet and TFLite box decoding
+    """
+    anchors = np.array([[0, 0, 10, 10], [10, 10, 30, 20]], dtype=np.float32)
+    deltas = np.array([[0, 0, 0, 0], [5, 5, -5, 5]], dtype=np.float32)
+    scores = np.array([[0.1, 0.9], [0.6, 0.2]], dtype=np.float32)
+    boxes, box_scores, class_index = decode_anchor_based(deltas, anchors, scores, 0.5)
+    assert boxes.tolist() == [[0, 0, 10, 10], [30, 20, 10, 30]]
+    assert box_scores.tolist() == [np.float32(0.9), np.float32(0.6)]
+    assert class_index.tolist() == [1, 0]
+
+    anchors = np.array([[0.5, 0.5, 0.2, 0.4]], dtype=np.float32)
+    boxes, _, _ = decode_anchor_based(np.zeros((1, 4)), anchors, scores[:1], 0.5, scale=(100, 50), encoding="center_size")
+    assert np.allclose(boxes, [[30, 20, 70, 30]])
+    with pytest.raises(ValueError):
+        decode_anchor_based(deltas, anchors, scores, encoding="unknown")
+
+def test_box_iou():
+    """
+    Test box overlap computation
+    """
+    boxes = [[5, 5, 15, 15], [20, 20, 30, 30], [0, 0, 10, 5]]
+    assert np.allclose(box_iou([0, 0, 10, 10], boxes), [25 / 175, 0, 0.5])
+    assert np.allclose(box_iou([0, 0, 10, 10], boxes, iou_with_min=True), [0.25, 0, 1])
+
+@pytest.mark.parametrize("iou_with_min", [False, True])
+def test_nms(random_boxes, iou_with_min):
+    """
+    Test that NMS selects the same boxes as greedy selection
+    """
+    boxes, scores, _ = random_boxes
+    expected = _reference_nms(boxes.astype(np.float64), scores, 0.4, iou_with_min)
+    assert nms(boxes, scores, 0.4, iou_with_min).tolist() == expected
+    assert nms(boxes, scores, 0.4, iou_with_min, max_detections=10).tolist() == expected[:10]
+    assert nms(np.zeros((0, 4)), np.zeros(0)).tolist() == []
+
+def test_batched_nms(random_boxes):
+    """
+    Test that class-wise NMS is NMS applied to each class
+    """
+    boxes, scores, class_index = random_boxes
+    selected = batched_nms(boxes, scores, class_index, 0.3)
+    assert np.all(np.diff(scores[selected]) <= 0)
+    for c in range(5):
+        in_class = np.flatnonzero(class_index == c)
+        expected = in_class[nms(boxes[in_class], scores[in_class], 0.3)]
+        assert sorted(selected[class_index[selected] == c].tolist()) == sorted(expected.tolist())
+
+def test_top_k():
+    """
+    Test selection of the highest scores
+    """
+    scores = np.array([0.1, 0.5, 0.3, 0.9, 0.7])
+    assert top_k(scores).tolist() == [3, 4, 1, 2, 0]
+    assert top_k(scores, 2).tolist() == [3, 4]
+    assert top_k(scores, 0, score_threshold=0.5).tolist() == [3, 4, 1]
+    assert top_k(scores, 10, score_threshold=0.95).tolist() == []
+
+def test_select(random_boxes):
+    """
+    Test detection selection with the parameters of Detector
+    """
+    boxes, scores, class_index = random_boxes
+    assert select(boxes, scores, n_max=5, nms=False).tolist() == top_k(scores, 5).tolist()
+    assert select(boxes, scores).tolist() == nms(boxes, scores).tolist()
+    assert select(boxes, scores, class_index, class_agnostic=False).tolist() == batched_nms(boxes, scores, class_index).tolist()
+    with pytest.raises(ValueError):
+        select(boxes, scores, class_agnostic=False)
+
+def test_to_image_boxes():
+    """
+    Test rounding, clipping and offset of boxes as done by Detector
+    """
+    boxes = np.array([[-5.5, 2.5, 50.4, 20.5], [10.2, 10.7, 200, 200]], dtype=np.float32)
+    image_boxes = to_image_boxes(boxes, Rect((100, 50), (100, 40)))
+    assert image_boxes.dtype == np.int32
+    assert image_boxes.tolist() == [[100, 53, 50, 18], [110, 61, 90, 29]]
+
+def test_detect_anchor_free(yolov8_output):
+    """
+    Test that detection returns a DetectorResult with selected boxes in image coordinates
+    """
+    rect = Rect((0, 0), (640, 384))
+    result = detect_anchor_free(yolov8_output, rect, 0.5, input_size=(1, 1))
+    assert isinstance(result, DetectorResult)
+    assert result.success
+    arrays = result.as_arrays()
+    boxes, scores, class_index = decode_anchor_free(yolov8_output, 0.5, scale=(640, 384))
+    selected = nms(boxes, scores, 0.5)
+    assert arrays["boxes"].tolist() == to_image_boxes(boxes[selected], rect).tolist()
+    assert arrays["class_index"].tolist() == class_index[selected].tolist()
+    assert len(detect_anchor_free(yolov8_output, rect, 0.5, n_max=3, input_size=(1, 1)).items) == 3
+
+def test_detect_anchor_free_matches_detector(valid_uint8_model_path):
+    """
+    Test that NumPy detection matches the native detector on YOLOv8 outputs
+    """
+    network = synap.Network(valid_uint8_model_path)
+    image = np.random.default_rng(0).integers(0, 255, tuple(network.inputs[0].shape), dtype=np.uint8)
+    outputs = network.predict([image])
+    shape = network.inputs[0].shape
+    rect = Rect((0, 0), (shape[2], shape[1]))
+    output = outputs[0].to_numpy()
+    input_size = (1, 1) if output[0, :2].max() <= 1 else (shape[2], shape[1])
+    expected = Detector(score_threshold=0.1).process(outputs, rect).as_arrays()
+    arrays = detect_anchor_free(output, rect, 0.1, input_size=input_size).as_arrays()
+    assert np.array_equal(arrays["boxes"], expected["boxes"])
+    assert np.array_equal(arrays["class_index"], expected["class_index"])
+    assert np.allclose(arrays["scores"], expected["scores"])
+
+
+# ------------------------synap.postprocessor.DetectorResult------------------------ #
+
+def test_detector_result_from_arrays():
+    """
+    Test creating a detection result from arrays and converting it back
+    """
+    boxes = np.array([[1, 2, 3, 4], [5, 6, 7, 8]], dtype=np.int32)
+    landmarks = np.array([[[1, 2, 0], [0, 0, 0]], [[3, 4, 0], [5, 6, 0]]], dtype=np.int32)
+    visibility = np.array([[0.5, -1], [1, 1]], dtype=np.float32)
+    result = DetectorResult.from_arrays(boxes, [0.9, 0.4], [3, 1], landmarks, visibility)
+    assert [len(item.landmarks) for item in result.items] == [1, 2]
+    arrays = result.as_arrays()
+    assert arrays["boxes"].tolist() == boxes.tolist()
+    assert arrays["scores"].tolist() == [np.float32(0.9), np.float32(0.4)]
+    assert arrays["class_index"].tolist() == [3, 1]
+    assert arrays["landmarks"].tolist() == landmarks.tolist()
+    assert arrays["landmark_visibility"].tolist() == visibility.tolist()
+    with pytest.raises(ValueError):
+        DetectorResult.from_arrays(np.zeros((2, 3)), [0.9, 0.4], [3, 1])
@@ -0,0 +1,177 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+import synap
+from synap import InferenceResult, NetworkExecutor
+
+from .utils import get_model_metadata
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def valid_uint8_model_props(valid_uint8_model_path):
+    return get_model_metadata(valid_uint8_model_path)
+
+@pytest.fixture
+def zero_inputs(valid_uint8_model_props):
+    return [np.zeros(props["shape"], dtype=np.uint8) for props in valid_uint8_model_props["inputs"]]
+
+@pytest.fixture
+def expected_outputs(valid_uint8_model_props):
+    outputs = []
+    for i, props in enumerate(valid_uint8_model_props["outputs"]):
+        with open(f"tests/data/output_float_{i}.dat", "rb") as f:
+            outputs.append(np.frombuffer(f.read(), dtype=np.float32).reshape(props["shape"]))
+    return outputs
+
+@pytest.fixture
+def executor(valid_uint8_model_path):
+    with NetworkExecutor(valid_uint8_model_path, max_in_flight=2) as executor:
+        yield executor
+
+
+# ------------------------synap.NetworkExecutor------------------------ #
+
+def test_executor_invalid_depth():
+    """
+    Test that the in-flight depth must be positive
+    """
+    with pytest.raises(ValueError):
+        NetworkExecutor(synap.Network(), max_in_flight=0)
+
+def test_executor_submit(executor, zero_inputs, expected_outputs):
+    """
+    Test submitting inferences from the calling thread
+    """
+    future = executor.submit(*zero_inputs)
+    assert isinstance(future, Future)
+    result = future.result()
+    assert isinstance(result, InferenceResult)
+    assert len(result) == len(expected_outputs)
+    for out, expected in zip(result, expected_outputs):
+        assert np.array_equal(out, expected)
+    result.release()
+
+def test_executor_ordering(executor, zero_inputs):
+    """
+    Test that inferences complete in submission order
+    """
+    completed = []
+    futures = []
+    done = threading.Event()
+    for i in range(8):
+        future = executor.submit(*zero_inputs)
+        # Done-callbacks run on the worker thread after the waiters are woken up,
+        # the executor's own callback releasing the slot runs first
+        future.add_done_callback(lambda _, i=i: (completed.append(i), i == 7 and done.set()))
+        futures.append(future)
+    for future in futures:
+        future.result().release()
+    assert done.wait(5)
+    assert completed == list(range(8))
+    assert executor.in_flight == 0
+
+def test_executor_result_release(executor, zero_inputs):
+    """
+    Test that released results can no longer be accessed and their arrays are reused
+    """
+    with executor.submit(*zero_inputs).result() as result:
+        arrays = result.outputs
+    assert result.released
+    with pytest.raises(RuntimeError, match="released"):
+        result.outputs
+    result_2 = executor.submit(*zero_inputs).result()
+    assert result_2.outputs[0] is arrays[0]
+    result_2.release()
+
+def test_executor_results_stay_valid(executor, zero_inputs, expected_outputs):
+    """
+    Test that unreleased results are not overwritten by later inferences
+    """
+    first = executor.submit(*zero_inputs).result()
+    executor.submit(*[np.full_like(inp, 255) for inp in zero_inputs]).result().release()
+    for out, expected in zip(first, expected_outputs):
+        assert np.array_equal(out, expected)
+    first.release()
+
+def test_executor_predict_async(executor, zero_inputs, expected_outputs):
+    """
+    Test awaiting inferences from an asyncio event loop
+    """
+    async def run():
+        return await asyncio.gather(*[executor.predict_async(*zero_inputs) for _ in range(6)])
+
+    results = asyncio.run(run())
+    assert len(results) == 6
+    for result in results:
+        for out, expected in zip(result, expected_outputs):
+            assert np.array_equal(out, expected)
+        result.release()
+    assert executor.in_flight == 0
+
+def test_executor_cancel(executor, zero_inputs):
+    """
+    Test that cancelled inferences free their slot
+    """
+    futures = [executor.submit(*zero_inputs) for _ in range(2)]
+    cancelled = futures[1].cancel()
+    futures[0].result().release()
+    if not cancelled:
+        futures[1].result().release()
+    assert executor.in_flight == 0
+
+def test_executor_predict_error(executor):
+    """
+    Test that inference errors are reported through the future
+    """
+    with pytest.raises(ValueError, match="Invalid number of inputs"):
+        executor.submit(np.zeros(1, dtype=np.uint8), np.zeros(1, dtype=np.uint8)).result()
+
+def test_executor_closed(valid_uint8_model_path, zero_inputs):
+    """
+    Test that submitting to a closed executor fails
+    """
+    executor = NetworkExecutor(valid_uint8_model_path)
+    executor.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        executor.submit(*zero_inputs)
+
+def test_executor_submit_close_race():
+    """
+    Test that the futures of requests submitted while the executor closes always resolve
+    """
+    # Switch threads often so that close() runs in the middle of submit()
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for cancel_pending in (False, True):
+            for _ in range(100):
+                executor = NetworkExecutor(synap.Network(), max_in_flight=8)
+                futures = []
+
+                def submit():
+                    try:
+                        while True:
+                            futures.append(executor.submit(timeout=5))
+                    except RuntimeError:
+                        pass
+
+                threads = [threading.Thread(target=submit) for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                executor.close(cancel_pending=cancel_pending)
+                for thread in threads:
+                    thread.join(5)
+                    assert not thread.is_alive()
+                assert all(future.done() for future in futures)
+                assert executor.in_flight == 0
+    finally:
+        sys.setswitchinterval(switch_interval)
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import synap
+from synap.preprocessor import FrameSource
+
+WIDTH, HEIGHT = 8, 4
+NV12_SIZE = WIDTH * HEIGHT * 3 // 2
+
+
+def _nv12_frames(count):
+    return [np.full((HEIGHT * 3 // 2, WIDTH), i, dtype=np.uint8) for i in range(count)]
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def nv12_file(tmp_path):
+    path = tmp_path / "video.nv12"
+    path.write_bytes(b"".join(frame.tobytes() for frame in _nv12_frames(10)))
+    return str(path)
+
+
+# ------------------------synap.preprocessor.FrameSource------------------------ #
+
+def test_source_invalid_args(nv12_file):
+    """
+    Test source argument validation
+    """
+    with pytest.raises(ValueError):
+        FrameSource(nv12_file, WIDTH, HEIGHT, format="yuyv")
+    with pytest.raises(ValueError):
+        FrameSource(nv12_file, WIDTH, HEIGHT, drop="random")
+    with pytest.raises(ValueError):
+        FrameSource(nv12_file, 7, HEIGHT)
+    with pytest.raises(ValueError):
+        FrameSource(nv12_file, WIDTH, HEIGHT, ring_size=0)
+    with pytest.raises(FileNotFoundError):
+        FrameSource(nv12_file + ".missing", WIDTH, HEIGHT)
+
+def test_source_read_file(nv12_file):
+    """
+    Test reading all the frames of a file without dropping
+    """
+    with FrameSource(nv12_file, WIDTH, HEIGHT, ring_size=2, drop="none") as source:
+        assert source.frame_size == NV12_SIZE
+        assert source.shape == (HEIGHT * 3 // 2, WIDTH)
+        frames = [(frame.index, int(frame.data[0, 0])) for frame in source]
+    assert frames == [(i, i) for i in range(10)]
+    stats = source.stats
+    assert (stats.frames, stats.delivered, stats.dropped, stats.queue_depth) == (10, 10, 0, 0)
+    assert stats.max_queue_depth <= 2
+
+def test_source_partial_frame(tmp_path):
+    """
+    Test that a partial frame at the end of the stream is discarded
+    """
+    path = tmp_path / "video.rgb"
+    path.write_bytes(bytes(WIDTH * HEIGHT * 3 * 2 + 5))
+    with FrameSource(str(path), WIDTH, HEIGHT, format="rgb", drop="none") as source:
+        frames = list(source)
+    assert len(frames) == 2
+    assert frames[0].data.shape == (HEIGHT, WIDTH, 3)
+
+def test_source_drop_oldest(nv12_file):
+    """
+    Test that the oldest frames are dropped when the consumer falls behind
+    """
+    with FrameSource(nv12_file, WIDTH, HEIGHT, ring_size=3, drop="oldest") as source:
+        while source.stats.frames < 10:
+            time.sleep(0.01)
+        indexes = [frame.index for frame in source]
+    assert indexes[-3:] == [7, 8, 9]
+    assert source.stats.dropped == 10 - len(indexes)
+    assert source.stats.max_queue_depth == 3
+
+def test_source_drop_newest(nv12_file):
+    """
+    Test that the new frames are discarded when the ring is full
+    """
+    with FrameSource(nv12_file, WIDTH, HEIGHT, ring_size=3, drop="newest") as source:
+        while source.stats.frames < 10:
+            time.sleep(0.01)
+        indexes = [frame.index for frame in source]
+    assert indexes == [0, 1, 2]
+    assert source.stats.dropped == 7
+
+def test_source_max_latency(tmp_path):
+    """
+    Test that stale frames are skipped when newer frames are available
+    """
+    path = tmp_path / "video.nv12"
+    path.write_bytes(bytes(NV12_SIZE * 100))
+    with FrameSource(str(path), WIDTH, HEIGHT, ring_size=10, max_latency=0.05, fps=100) as source:
+        first = source.read(timeout=5)
+        time.sleep(0.2)
+        frame = source.read(timeout=5)
+        assert frame.index > first.index + 1
+        stats = source.stats
+        assert stats.stale > 0
+        assert stats.stale + stats.dropped == frame.index - first.index - 1
+        assert frame.age < 0.1
+
+def test_source_fifo(tmp_path):
+    """
+    Test reading frames written to a named pipe in chunks
+    """
+    path = str(tmp_path / "video.fifo")
+    os.mkfifo(path)
+    frames = _nv12_frames(5)
+
+    def write():
+        with open(path, "wb") as f:
+            for frame in frames:
+                data = frame.tobytes()
+                f.write(data[:7])
+                f.flush()
+                f.write(data[7:])
+                f.flush()
+    writer = threading.Thread(target=write)
+    writer.start()
+    with FrameSource(path, WIDTH, HEIGHT, format="nv21", drop="none") as source:
+        values = [int(frame.data[-1, -1]) for frame in source]
+    writer.join()
+    assert values == list(range(5))
+
+def test_source_read_timeout(tmp_path):
+    """
+    Test waiting for a frame on an idle pipe
+    """
+    read_fd, write_fd = os.pipe()
+    with open(read_fd, "rb", buffering=0) as reader, open(write_fd, "wb", buffering=0) as writer:
+        source = FrameSource(reader, WIDTH, HEIGHT)
+        with pytest.raises(TimeoutError):
+            source.read(timeout=0.05)
+        writer.write(bytes(NV12_SIZE))
+        assert source.read(timeout=5).index == 0
+        writer.close()
+        assert source.read(timeout=5) is None
+        source.close()
+
+def test_source_feed(tmp_path, valid_uint8_model_path):
+    """
+    Test feeding RGB frames to a network
+    """
+    path = tmp_path / "video.rgb"
+    path.write_bytes(bytes(64 * 48 * 3 * 3))
+    network = synap.Network(valid_uint8_model_path)
+    count = 0
+    with FrameSource(str(path), 64, 48, format="rgb", drop="none") as source:
+        for frame, rect in source.feed(network):
+            assert (rect.size.x, rect.size.y) == (64, 48)
+            network.predict()
+            count += 1
+    assert count == 3
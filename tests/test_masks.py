@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from synap.postprocessor import paste_masks, threshold_masks
+from synap.types import Mask
+
+
+def _mask(values: np.ndarray) -> Mask:
+    mask = Mask(values.shape[1], values.shape[0])
+    for (row, col), val in np.ndenumerate(values):
+        mask.set_value(row, col, float(val))
+    return mask
+
+
+# ------------------------synap.postprocessor.threshold_masks------------------------ #
+
+def test_threshold_masks():
+    """
+    Test binarizing a sequence of masks
+    """
+    masks = [_mask(np.array([[0.2, 0.6], [0.5, 0.9]])), _mask(np.array([[1.0, 0.0], [0.0, 1.0]]))]
+    res = threshold_masks(masks)
+    assert res.dtype == np.uint8
+    assert res.tolist() == [[[0, 255], [0, 255]], [[255, 0], [0, 255]]]
+    assert threshold_masks(masks, threshold=0.1, value=1)[0].tolist() == [[1, 1], [1, 1]]
+
+def test_threshold_masks_array():
+    """
+    Test binarizing a float array
+    """
+    res = threshold_masks(np.array([0.1, 0.7], dtype=np.float32))
+    assert res.tolist() == [0, 255]
+
+def test_threshold_masks_different_sizes():
+    """
+    Test that masks of different sizes are rejected
+    """
+    with pytest.raises(ValueError):
+        threshold_masks([Mask(2, 2), Mask(3, 2)])
+
+
+# ------------------------synap.postprocessor.paste_masks------------------------ #
+
+def test_paste_masks_resize():
+    """
+    Test pasting a mask upscaled to its bounding box
+    """
+    mask = _mask(np.array([[1.0, 0.0], [0.0, 1.0]]))
+    res = paste_masks([mask], np.array([[2, 1, 4, 2]]), image_size=(8, 4))
+    assert res.shape == (1, 4, 8)
+    expected = np.zeros((4, 8), dtype=np.uint8)
+    expected[1, 2:4] = 255
+    expected[2, 4:6] = 255
+    assert np.array_equal(res[0], expected)
+
+def test_paste_masks_clipped():
+    """
+    Test that boxes partially outside the image are clipped
+    """
+    mask = np.ones((4, 4), dtype=np.float32)
+    res = paste_masks([mask, mask], np.array([[-2, -2, 4, 4], [10, 10, 4, 4]]), image_size=(6, 6))
+    assert res[0].sum() == 4 * 255
+    assert res[0][:2, :2].all()
+    assert not res[1].any()
+
+def test_paste_masks_empty():
+    """
+    Test pasting with no detections or empty masks
+    """
+    assert paste_masks([], np.zeros((0, 4), dtype=np.int32), image_size=(4, 3)).shape == (0, 3, 4)
+    assert not paste_masks([Mask(0, 0)], np.array([[0, 0, 2, 2]]), image_size=(4, 3)).any()
+    with pytest.raises(ValueError):
+        paste_masks([Mask(1, 1)], np.zeros((2, 4)), image_size=(4, 3))
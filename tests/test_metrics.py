@@ -0,0 +1,165 @@
+import math
+
+import numpy as np
+import pytest
+
+import synap
+from synap import metrics
+from synap.postprocessor import Detector
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def enabled_metrics():
+    was_enabled = metrics.enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    metrics.enable(was_enabled)
+
+def _family(name):
+    return next(f for f in metrics.snapshot() if f["name"] == name)
+
+def _sample(name, **labels):
+    return next(s for s in _family(name)["samples"] if s["labels"] == labels)
+
+
+# ------------------------synap.metrics------------------------ #
+
+def test_enable_disable():
+    """
+    Test switching the recording of metrics on and off
+    """
+    was_enabled = metrics.enabled()
+    try:
+        metrics.enable()
+        assert metrics.enabled()
+        metrics.disable()
+        assert not metrics.enabled()
+        metrics.enable(True)
+        assert metrics.enabled()
+        metrics.enable(False)
+        assert not metrics.enabled()
+    finally:
+        metrics.enable(was_enabled)
+
+def test_snapshot_families():
+    """
+    Test that the metrics not specific to a network are always exported
+    """
+    families = {f["name"]: f for f in metrics.snapshot()}
+    for name in ("synap_preprocess_seconds", "synap_postprocess_seconds", "synap_tensor_assign_seconds", "synap_to_numpy_seconds", "synap_dequantize_seconds"):
+        assert families[name]["type"] == "summary"
+        assert families[name]["help"]
+    for name in ("synap_tensor_assign_bytes_total", "synap_to_numpy_bytes_total", "synap_dequantize_cache_hits_total"):
+        assert families[name]["type"] == "counter"
+    assert {s["labels"]["postprocessor"] for s in families["synap_postprocess_seconds"]["samples"]} == {"classifier", "detector"}
+
+def test_record_and_reset(enabled_metrics):
+    """
+    Test that durations are recorded when enabled, and cleared by reset()
+    """
+    detector = Detector()
+    outputs = synap.Network().outputs
+    for _ in range(5):
+        detector.process_batch(outputs, [])
+    sample = _sample("synap_postprocess_batch_seconds", postprocessor="detector")
+    assert sample["count"] == 5
+    assert sample["sum"] > 0
+    assert 0 < sample["quantiles"][0.5] <= sample["quantiles"][0.99] <= sample["max"]
+
+    metrics.disable()
+    detector.process_batch(outputs, [])
+    assert _sample("synap_postprocess_batch_seconds", postprocessor="detector")["count"] == 5
+
+    metrics.reset()
+    sample = _sample("synap_postprocess_batch_seconds", postprocessor="detector")
+    assert sample["count"] == 0
+    assert sample["sum"] == 0
+    assert sample["quantiles"][0.5] == 0
+
+def test_prometheus_text():
+    """
+    Test formatting of counters and summaries in the Prometheus text format
+    """
+    families = [
+        {"name": "synap_a_total", "type": "counter", "help": "A counter", "samples": [
+            {"labels": {"network": 'my "net"'}, "value": 3},
+        ]},
+        {"name": "synap_b_seconds", "type": "summary", "help": "A summary", "samples": [
+            {"labels": {}, "count": 2, "sum": 0.5, "max": 0.3, "quantiles": {0.5: 0.25, 0.99: 0.3}},
+            {"labels": {"stage": "x"}, "count": 0, "sum": 0.0, "max": 0.0, "quantiles": {0.5: 0.0}},
+        ]},
+    ]
+    assert metrics.prometheus_text(families).splitlines() == [
+        "# HELP synap_a_total A counter",
+        "# TYPE synap_a_total counter",
+        'synap_a_total{network="my \\"net\\""} 3',
+        "# HELP synap_b_seconds A summary",
+        "# TYPE synap_b_seconds summary",
+        'synap_b_seconds{quantile="0.5"} 0.25',
+        'synap_b_seconds{quantile="0.99"} 0.3',
+        "synap_b_seconds_sum 0.5",
+        "synap_b_seconds_count 2",
+        'synap_b_seconds{stage="x",quantile="0.5"} NaN',
+        'synap_b_seconds_sum{stage="x"} 0.0',
+        'synap_b_seconds_count{stage="x"} 0',
+    ]
+
+def test_prometheus_text_current():
+    """
+    Test that the current metrics are exported by default
+    """
+    text = metrics.prometheus_text()
+    assert "# TYPE synap_preprocess_seconds summary\n" in text
+    assert "synap_tensor_assign_bytes_total " in text
+
+
+# ------------------------synap.Network------------------------ #
+
+def test_network_metrics_label():
+    """
+    Test the default and user-defined metrics label of a network
+    """
+    network = synap.Network()
+    assert network.metrics_label == synap.Network().metrics_label == "unnamed"
+    network.metrics_label = "detector-0"
+    assert network.metrics_label == "detector-0"
+
+def test_network_metrics(enabled_metrics, valid_uint8_model_path):
+    """
+    Test per-network inference counts, latencies and copied bytes
+    """
+    network = synap.Network(valid_uint8_model_path)
+    assert network.metrics_label == "yolov8s-640x384-uint8"
+    network.metrics_label = "test_network_metrics"
+    image = np.zeros(tuple(network.inputs[0].shape), dtype=np.uint8)
+    for _ in range(3):
+        outputs = network.predict([image])
+    outputs[0].to_numpy()
+    assert _sample("synap_inferences_total", network="test_network_metrics")["value"] == 3
+    sample = _sample("synap_predict_seconds", network="test_network_metrics")
+    assert sample["count"] == 3
+    assert not math.isnan(sample["quantiles"][0.95])
+    assert _sample("synap_tensor_assign_bytes_total")["value"] == 3 * image.nbytes
+    assert _sample("synap_to_numpy_bytes_total")["value"] == 4 * outputs[0].item_count
+
+def test_dequantize_cache_metrics(enabled_metrics, valid_uint8_model_path):
+    """
+    Test that the outputs are dequantized once per inference
+    """
+    network = synap.Network(valid_uint8_model_path)
+    image = np.zeros(tuple(network.inputs[0].shape), dtype=np.uint8)
+    outputs = network.predict([image])
+    for _ in range(3):
+        outputs[0].to_numpy()
+    outputs[0].to_numpy(channels=(4, 84), activation="sigmoid")
+    assert _sample("synap_dequantize_seconds")["count"] == 1
+    assert _sample("synap_dequantize_cache_hits_total")["value"] == 3
+    assert _sample("synap_to_numpy_bytes_total")["value"] == 4 * outputs[0].item_count
+    network.predict([image])
+    outputs[0].to_numpy()
+    assert _sample("synap_dequantize_seconds")["count"] == 2
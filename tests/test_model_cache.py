@@ -0,0 +1,178 @@
+import mmap
+import threading
+
+import numpy as np
+import pytest
+
+import synap
+import synap.model_cache
+from synap import ModelCache
+
+from .utils import get_model_metadata
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def valid_uint8_model_props(valid_uint8_model_path):
+    return get_model_metadata(valid_uint8_model_path)
+
+@pytest.fixture
+def fake_models(monkeypatch, tmp_path):
+    """
+    Empty model files of 100 bytes each, loaded as empty networks
+    """
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"model_{i}.synap"
+        path.write_bytes(bytes(100))
+        paths.append(str(path))
+    monkeypatch.setattr(synap.model_cache, "load_network", lambda model_file, meta_file="": synap.Network())
+    return paths
+
+
+# ------------------------synap.Network.load_model------------------------ #
+
+def test_network_load_from_mmap(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test loading a model from a memory-mapped file and a memoryview
+    """
+    with open(valid_uint8_model_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as model_data:
+        net = synap.Network()
+        net.load_model(model_data)
+        assert len(net.inputs) == len(valid_uint8_model_props["inputs"])
+        net.load_model(memoryview(model_data))
+        assert len(net.outputs) == len(valid_uint8_model_props["outputs"])
+
+def test_network_load_non_contiguous():
+    """
+    Test that loading a model from non-contiguous memory fails
+    """
+    with pytest.raises(ValueError, match="contiguous"):
+        synap.Network().load_model(np.zeros((4, 4), dtype=np.uint8)[:, ::2])
+
+
+# ------------------------synap.ModelCache------------------------ #
+
+def test_model_cache_hit_miss(fake_models):
+    """
+    Test that cached models are returned without reloading
+    """
+    cache = ModelCache()
+    net = cache.get(fake_models[0])
+    assert cache.get(fake_models[0]) is net
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 0)
+    assert fake_models[0] in cache
+    assert cache.memory_usage == 100
+
+def test_model_cache_lru_eviction(fake_models):
+    """
+    Test that the least recently used models are evicted to stay within the budget
+    """
+    cache = ModelCache(memory_budget=250)
+    cache.get(fake_models[0])
+    cache.get(fake_models[1])
+    cache.get(fake_models[0])
+    cache.get(fake_models[2])
+    assert fake_models[1] not in cache
+    assert cache.models == [fake_models[0], fake_models[2]]
+    assert cache.evictions == 1
+    assert cache.memory_usage == 200
+
+def test_model_cache_max_models(fake_models):
+    """
+    Test limiting the number of cached models
+    """
+    cache = ModelCache(max_models=1)
+    for path in fake_models:
+        cache.get(path)
+    assert len(cache) == 1
+    assert cache.evictions == len(fake_models) - 1
+
+def test_model_cache_oversized_model(fake_models):
+    """
+    Test that a model larger than the budget is still cached alone
+    """
+    cache = ModelCache(memory_budget=50)
+    cache.get(fake_models[0])
+    cache.get(fake_models[1])
+    assert cache.models == [fake_models[1]]
+
+def test_model_cache_preload(fake_models):
+    """
+    Test that preloaded models do not count as hits or misses
+    """
+    cache = ModelCache(preload=fake_models[:2])
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (0, 0)
+    cache.get(fake_models[1])
+    assert cache.hits == 1
+
+def test_model_cache_evict_clear(fake_models):
+    """
+    Test explicit eviction and clearing
+    """
+    cache = ModelCache(preload=fake_models)
+    assert cache.evict(fake_models[0])
+    assert not cache.evict(fake_models[0])
+    assert cache.memory_usage == 300
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.memory_usage == 0
+
+def test_model_cache_concurrent_load(monkeypatch, fake_models):
+    """
+    Test that concurrent misses load a model once, without blocking the cached models
+    """
+    cache = ModelCache(preload=fake_models[1:2])
+    loading, release = threading.Event(), threading.Event()
+    loads = []
+    def slow_load(model_file, meta_file=""):
+        loads.append(model_file)
+        loading.set()
+        assert release.wait(5)
+        return synap.Network()
+    monkeypatch.setattr(synap.model_cache, "load_network", slow_load)
+
+    results = [None] * 4
+    def get(i):
+        results[i] = cache.get(fake_models[0])
+    threads = [threading.Thread(target=get, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    assert loading.wait(5)
+    # Served while the other model is loading
+    assert cache.get(fake_models[1]) is not None
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert loads == [fake_models[0]]
+    assert all(net is results[0] for net in results)
+    assert (cache.hits, cache.misses) == (4, 1)
+    assert cache.models == [fake_models[1], fake_models[0]]
+
+def test_model_cache_load_error(monkeypatch, fake_models):
+    """
+    Test that a failed load is not cached and can be retried
+    """
+    cache = ModelCache()
+    def failing_load(model_file, meta_file=""):
+        raise RuntimeError("Unable to load model")
+    monkeypatch.setattr(synap.model_cache, "load_network", failing_load)
+    with pytest.raises(RuntimeError):
+        cache.get(fake_models[0])
+    assert len(cache) == 0
+    monkeypatch.setattr(synap.model_cache, "load_network", lambda model_file, meta_file="": synap.Network())
+    assert cache.get(fake_models[0]) is not None
+    assert cache.misses == 2
+
+def test_model_cache_real_model(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test loading a real model through the cache
+    """
+    cache = ModelCache()
+    net = cache.get(valid_uint8_model_path)
+    assert len(net.inputs) == len(valid_uint8_model_props["inputs"])
+    assert cache.memory_usage > sum(inp.size for inp in net.inputs)
@@ -0,0 +1,170 @@
+import json
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+import synap
+from synap import ModelInfo
+from synap.types import DataType, Layout
+
+from .utils import get_model_metadata
+
+_MODEL_METADATA = {
+    "delegate": "npu",
+    "Inputs": {
+        "images": {
+            "name": "images",
+            "shape": [1, 384, 640, 3],
+            "format": "nhwc",
+            "dtype": "uint8",
+            "data_format": "rgb",
+            "mean": [0, 0, 0],
+            "scale": 255,
+            "quantizer": "asymmetric_affine",
+            "quantize": {"qtype": "u8", "scale": 0.00392, "zero_point": 0},
+        },
+    },
+    "Outputs": {
+        "output0": {
+            "name": "output0",
+            "shape": [1, 84, 5040],
+            "format": "nchw",
+            "dtype": "int16",
+            "quantizer": "dynamic_fixed_point",
+            "quantize": {"qtype": "i16", "fl": [7]},
+        },
+        "output1": {
+            "name": "output1",
+            "shape": 10,
+            "dtype": "float16",
+        },
+    },
+}
+
+
+def _write_model(path, metadata):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("0/model.json", json.dumps(metadata))
+        archive.writestr("0/model.nb", b"\0" * 16)
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "model.synap"
+    _write_model(path, _MODEL_METADATA)
+    return str(path)
+
+
+# ------------------------synap.ModelInfo------------------------ #
+
+def test_model_info_tensors(model_path):
+    """
+    Test reading the tensor metadata of a model file
+    """
+    info = ModelInfo.from_file(model_path)
+    assert info.delegate == "npu"
+    assert [t.name for t in info.inputs] == ["images"]
+    assert [t.name for t in info.outputs] == ["output0", "output1"]
+    images, (output0, output1) = info.inputs[0], info.outputs
+    assert list(images.shape) == [1, 384, 640, 3]
+    assert (images.layout, images.data_type) == (Layout.nhwc, DataType.uint8)
+    assert (images.data_format, images.mean, images.scale) == ("rgb", [0, 0, 0], 255)
+    assert images.quantization.scheme == "asymmetric_affine"
+    assert images.quantization.scale == pytest.approx(0.00392)
+    assert images.size == images.item_count == 384 * 640 * 3
+    assert (output0.layout, output0.data_type) == (Layout.nchw, DataType.int16)
+    assert (output0.quantization.scheme, output0.quantization.fractional_length) == ("dynamic_fixed_point", 7)
+    assert output0.size == 2 * 84 * 5040
+    assert (list(output1.shape), output1.layout, output1.data_type) == ([10], Layout.none, DataType.float16)
+    assert output1.quantization.scheme == "none"
+    assert output1.size == 20
+
+def test_model_info_cache(model_path):
+    """
+    Test that unchanged model files are parsed once
+    """
+    info = ModelInfo.from_file(model_path)
+    assert ModelInfo.from_file(model_path) is info
+    metadata = json.loads(json.dumps(_MODEL_METADATA))
+    metadata["Inputs"]["images"]["shape"] = [1, 224, 224, 3]
+    _write_model(model_path, metadata)
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    updated = ModelInfo.from_file(model_path)
+    assert updated is not info
+    assert list(updated.inputs[0].shape) == [1, 224, 224, 3]
+    ModelInfo.clear_cache()
+    assert ModelInfo.from_file(model_path) is not updated
+
+def test_model_info_from_data(model_path, tmp_path):
+    """
+    Test reading the metadata of model data and of legacy metadata files
+    """
+    with open(model_path, "rb") as f:
+        info = ModelInfo.from_data(f.read())
+    assert [t.name for t in info.outputs] == ["output0", "output1"]
+    assert [t.name for t in ModelInfo.from_data(b"", json.dumps(_MODEL_METADATA)).inputs] == ["images"]
+    meta_path = tmp_path / "model.json"
+    meta_path.write_text(json.dumps(_MODEL_METADATA))
+    nb_path = tmp_path / "model.nb"
+    nb_path.write_bytes(b"\0" * 16)
+    assert [t.name for t in ModelInfo.from_file(str(nb_path), str(meta_path)).inputs] == ["images"]
+
+def test_model_info_invalid(tmp_path):
+    """
+    Test errors for missing files and invalid models
+    """
+    with pytest.raises(FileNotFoundError):
+        ModelInfo.from_file(str(tmp_path / "missing.synap"))
+    path = tmp_path / "invalid.synap"
+    path.write_bytes(b"not a model")
+    with pytest.raises(RuntimeError):
+        ModelInfo.from_file(str(path))
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("0/model.nb", b"")
+    with pytest.raises(RuntimeError):
+        ModelInfo.from_file(str(path))
+    with pytest.raises(RuntimeError):
+        ModelInfo.from_data(b"", json.dumps({"Inputs": {}}))
+
+def test_model_info_matches_network(valid_uint8_model_path):
+    """
+    Test that the metadata matches the tensors of the loaded network
+    """
+    info = ModelInfo.from_file(valid_uint8_model_path)
+    expected = get_model_metadata(valid_uint8_model_path)
+    network = synap.Network(valid_uint8_model_path)
+    for tensors, infos, props in ((network.inputs, info.inputs, expected["inputs"]), (network.outputs, info.outputs, expected["outputs"])):
+        assert len(tensors) == len(infos) == len(props)
+        for tensor, tensor_info, prop in zip(tensors, infos, props):
+            assert list(tensor_info.shape) == list(tensor.shape) == list(prop["shape"])
+            assert tensor_info.data_type == tensor.data_type == prop["data_type"]
+            assert tensor_info.layout == tensor.layout
+            assert tensor_info.size == tensor.size
+
+
+# ------------------------synap------------------------ #
+
+def test_lazy_import():
+    """
+    Test that importing synap does not import the submodules until they are used
+    """
+    code = (
+        "import sys, synap\n"
+        "lazy = ('numpy', 'asyncio', 'synap.postprocessor', 'synap.preprocessor', 'synap.types', 'synap.pipeline')\n"
+        "assert not [m for m in lazy if m in sys.modules], [m for m in lazy if m in sys.modules]\n"
+        "assert synap.types.Rect is not None and 'synap.types' in sys.modules\n"
+        "assert synap.NetworkPool.__module__ == 'synap.pool'\n"
+        "from synap import postprocessor, ModelInfo\n"
+        "assert set(synap.__all__) <= set(dir(synap))\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, env=os.environ.copy())
+    with pytest.raises(AttributeError):
+        synap.unknown_attribute
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+import synap
+from synap.pipeline import Pipeline, StageStats, stream
+from synap.postprocessor import Detector
+from synap.preprocessor import InputData, InputType, Preprocessor
+from synap.types import Rect
+
+from .utils import get_model_metadata
+
+
+N_FRAMES = 8
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def valid_uint8_model_props(valid_uint8_model_path):
+    return get_model_metadata(valid_uint8_model_path)
+
+@pytest.fixture
+def network(valid_uint8_model_path):
+    return synap.Network(valid_uint8_model_path)
+
+@pytest.fixture
+def frames(valid_uint8_model_props):
+    shape = valid_uint8_model_props["inputs"][0]["shape"]
+    return [np.full(shape, i, dtype=np.uint8) for i in range(N_FRAMES)]
+
+
+# ------------------------synap.pipeline------------------------ #
+
+def test_stream_invalid_depth(network, frames):
+    """
+    Test that the queue depth must be positive
+    """
+    with pytest.raises(ValueError):
+        stream(network, frames, depth=0)
+
+def test_stream_outputs(network, valid_uint8_model_path, frames):
+    """
+    Test streaming without pre/postprocessing gives the outputs of each frame, in order
+    """
+    reference = synap.Network(valid_uint8_model_path)
+    expected = [[out.to_numpy().copy() for out in reference.predict([frame])] for frame in frames]
+    results = list(network.stream(frames, depth=2))
+    assert len(results) == N_FRAMES
+    for outputs, expected_outputs in zip(results, expected):
+        for out, exp in zip(outputs, expected_outputs):
+            assert np.array_equal(out, exp)
+
+def test_stream_callables(network, frames):
+    """
+    Test streaming with callable pre/postprocessors and context propagation
+    """
+    pipeline = stream(
+        network,
+        range(N_FRAMES),
+        preprocessor=lambda i: (frames[i], i),
+        postprocessor=lambda outputs, i: (i, outputs[0].shape),
+    )
+    assert isinstance(pipeline, Pipeline)
+    results = list(pipeline)
+    assert [i for i, _ in results] == list(range(N_FRAMES))
+    stats = pipeline.stats
+    assert set(stats) == {"pre", "infer", "post"}
+    for stage in stats.values():
+        assert isinstance(stage, StageStats)
+        assert stage.items == N_FRAMES
+        assert 0 <= stage.occupancy <= 1
+
+def test_stream_detector(network, frames):
+    """
+    Test streaming with a Detector postprocessor
+    """
+    shape = network.inputs[0].shape
+    rect = Rect((0, 0), (shape[2], shape[1]))
+    detector = Detector()
+    expected = [len(detector.process(network.predict([frame]), rect).items) for frame in frames]
+    results = list(network.stream(frames, lambda frame: (frame, rect), detector))
+    assert [len(result.items) for result in results] == expected
+
+def test_stream_preprocessor_detector(network, frames):
+    """
+    Test streaming with a Preprocessor and a Detector, which use rotating tensor buffers
+    """
+    preprocessor = Preprocessor()
+    detector = Detector()
+    expected = []
+    for frame in frames:
+        rect = preprocessor.assign(network.inputs, InputData(frame, InputType.raw))
+        expected.append(len(detector.process(network.predict(), rect).items))
+    inputs = [InputData(frame, InputType.raw) for frame in frames]
+    results = list(network.stream(inputs, preprocessor, detector, depth=1))
+    assert [len(result.items) for result in results] == expected
+    # The network tensors use their own buffers again
+    assert len(detector.process(network.predict(), rect).items) == expected[-1]
+
+def test_stream_error(network, frames):
+    """
+    Test that errors raised in a stage are raised by the iteration
+    """
+    def preprocess(i):
+        if i == 3:
+            raise KeyError("bad frame")
+        return frames[i], i
+
+    results = []
+    with pytest.raises(KeyError, match="bad frame"):
+        for result in stream(network, range(N_FRAMES), preprocess):
+            results.append(result)
+    assert len(results) == 3
+
+def test_stream_early_exit(network):
+    """
+    Test that leaving the iteration early stops the pipeline
+    """
+    frames = (np.zeros(tuple(network.inputs[0].shape), dtype=np.uint8) for _ in range(1000))
+    with stream(network, frames) as pipeline:
+        for i, _ in enumerate(pipeline):
+            if i == 2:
+                break
+    assert pipeline.stats["infer"].items < 1000
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import synap
+from synap import InstanceStats, NetworkPool
+
+from .utils import get_model_metadata
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def valid_uint8_model_props(valid_uint8_model_path):
+    return get_model_metadata(valid_uint8_model_path)
+
+@pytest.fixture
+def zero_inputs(valid_uint8_model_props):
+    return [np.zeros(props["shape"], dtype=np.uint8) for props in valid_uint8_model_props["inputs"]]
+
+@pytest.fixture
+def expected_outputs(valid_uint8_model_props):
+    outputs = []
+    for i, props in enumerate(valid_uint8_model_props["outputs"]):
+        with open(f"tests/data/output_float_{i}.dat", "rb") as f:
+            outputs.append(np.frombuffer(f.read(), dtype=np.float32).reshape(props["shape"]))
+    return outputs
+
+@pytest.fixture
+def pool(valid_uint8_model_path):
+    return NetworkPool(valid_uint8_model_path, size=3)
+
+
+# ------------------------synap.NetworkPool------------------------ #
+
+def test_pool_invalid_size(valid_uint8_model_path):
+    """
+    Test that the pool size must be positive
+    """
+    with pytest.raises(ValueError):
+        NetworkPool(valid_uint8_model_path, size=0)
+
+def test_pool_from_bytes(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test creating a pool from model data
+    """
+    with open(valid_uint8_model_path, "rb") as f:
+        pool = NetworkPool(f.read(), size=2)
+    assert pool.size == 2
+    for network in pool.networks:
+        assert isinstance(network, synap.Network)
+        assert len(network.inputs) == len(valid_uint8_model_props["inputs"])
+
+def test_pool_checkout_checkin(pool):
+    """
+    Test that checked out networks are distinct and unavailable until checked in
+    """
+    networks = [pool.checkout() for _ in range(pool.size)]
+    assert len({id(network) for network in networks}) == pool.size
+    assert pool.available == 0
+    with pytest.raises(TimeoutError):
+        pool.checkout(timeout=0.01)
+    pool.checkin(networks[0])
+    assert pool.available == 1
+    with pytest.raises(ValueError):
+        pool.checkin(networks[0])
+    with pytest.raises(ValueError):
+        pool.checkin(synap.Network())
+    for network in networks[1:]:
+        pool.checkin(network)
+
+def test_pool_least_busy(pool):
+    """
+    Test that the least busy free network is checked out first
+    """
+    with pool.network() as first:
+        pass
+    with pool.network() as second:
+        assert second is not first
+
+def test_pool_predict_concurrent(pool, zero_inputs, expected_outputs):
+    """
+    Test concurrent inferences dispatched over the pool
+    """
+    n_predictions = 4 * pool.size
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        results = list(executor.map(lambda _: pool.predict(*zero_inputs), range(n_predictions)))
+    for outputs in results:
+        for out, expected in zip(outputs, expected_outputs):
+            assert np.array_equal(out, expected)
+    stats = pool.stats
+    assert all(isinstance(s, InstanceStats) for s in stats)
+    assert sum(s.inferences for s in stats) == n_predictions
+    assert sum(s.checkouts for s in stats) == n_predictions
+    assert not any(s.in_use for s in stats)
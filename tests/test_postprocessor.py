@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+import synap
+from synap.postprocessor import Classifier, ClassifierResult, Detector, DetectorResult
+from synap.types import Rect
+
+from .utils import get_model_metadata
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def valid_uint8_model_props(valid_uint8_model_path):
+    return get_model_metadata(valid_uint8_model_path)
+
+@pytest.fixture
+def outputs(valid_uint8_model_path):
+    network = synap.Network(valid_uint8_model_path)
+    image = np.random.default_rng(0).integers(0, 255, tuple(network.inputs[0].shape), dtype=np.uint8)
+    return network.predict([image])
+
+@pytest.fixture
+def assigned_rect(valid_uint8_model_props):
+    shape = valid_uint8_model_props["inputs"][0]["shape"]
+    return Rect((0, 0), (shape[2], shape[1]))
+
+
+# ------------------------synap.postprocessor.DetectorResult------------------------ #
+
+def test_detector_result_as_arrays_empty():
+    """
+    Test array conversion of an empty detection result
+    """
+    arrays = DetectorResult().as_arrays()
+    assert arrays["boxes"].shape == (0, 4)
+    assert arrays["boxes"].dtype == np.int32
+    assert arrays["scores"].shape == (0,)
+    assert arrays["scores"].dtype == np.float32
+    assert arrays["class_index"].shape == (0,)
+    assert arrays["landmarks"].shape == (0, 0, 3)
+    assert arrays["landmark_visibility"].shape == (0, 0)
+
+def test_detector_result_as_arrays(outputs, assigned_rect):
+    """
+    Test that the detection arrays match the result items
+    """
+    result = Detector(score_threshold=0.1).process(outputs, assigned_rect)
+    arrays = result.as_arrays()
+    assert len(arrays["boxes"]) == len(result.items)
+    for i, item in enumerate(result.items):
+        bb = item.bounding_box
+        assert arrays["boxes"][i].tolist() == [bb.origin.x, bb.origin.y, bb.size.x, bb.size.y]
+        assert arrays["scores"][i] == np.float32(item.confidence)
+        assert arrays["class_index"][i] == item.class_index
+        for k, lm in enumerate(item.landmarks):
+            assert arrays["landmarks"][i, k].tolist() == [lm.x, lm.y, lm.z]
+
+
+# ------------------------synap.postprocessor.ClassifierResult------------------------ #
+
+def test_classifier_result_as_arrays_empty():
+    """
+    Test array conversion of an empty classification result
+    """
+    arrays = ClassifierResult().as_arrays()
+    assert arrays["class_index"].shape == (0,)
+    assert arrays["class_index"].dtype == np.int32
+    assert arrays["scores"].dtype == np.float32
+
+def test_classifier_result_as_arrays(outputs):
+    """
+    Test that the classification arrays match the result items
+    """
+    result = Classifier(top_count=5).process(outputs)
+    arrays = result.as_arrays()
+    assert arrays["class_index"].tolist() == [item.class_index for item in result.items]
+    assert arrays["scores"].tolist() == [np.float32(item.confidence) for item in result.items]
+
+
+# ------------------------synap.postprocessor.Classifier------------------------ #
+
+def test_classifier_process_batch(outputs):
+    """
+    Test that batch classification of a single element matches process()
+    """
+    classifier = Classifier(top_count=5)
+    expected = classifier.process(outputs)
+    for n_threads in (1, 0):
+        results = classifier.process_batch(outputs, n_threads=n_threads)
+        assert len(results) == outputs[0].shape[0]
+        assert [item.class_index for item in results[0].items] == [item.class_index for item in expected.items]
+        assert [item.confidence for item in results[0].items] == [item.confidence for item in expected.items]
+
+
+# ------------------------synap.postprocessor.Detector------------------------ #
+
+def test_detector_process_batch_empty():
+    """
+    Test batch postprocessing of outputs without tensors
+    """
+    outputs = synap.Network().outputs
+    assert Detector().process_batch(outputs, []) == []
+    assert Classifier().process_batch(outputs) == []
+
+def test_detector_process_batch_rects_mismatch(outputs, assigned_rect):
+    """
+    Test that batch detection requires one assigned rect per element
+    """
+    with pytest.raises(ValueError):
+        Detector().process_batch(outputs, [assigned_rect] * (outputs[0].shape[0] + 1))
+
+def test_detector_process_batch(outputs, assigned_rect):
+    """
+    Test that batch detection matches per-element detection, sequentially and in parallel
+    """
+    expected = Detector(score_threshold=0.1).process(outputs, assigned_rect).as_arrays()
+    detector = Detector(score_threshold=0.1)
+    batch = outputs[0].shape[0]
+    for n_threads in (1, 4):
+        results = detector.process_batch(outputs, [assigned_rect] * batch, n_threads=n_threads)
+        assert len(results) == batch
+        for result in results:
+            arrays = result.as_arrays()
+            assert np.array_equal(arrays["boxes"], expected["boxes"])
+            assert np.array_equal(arrays["scores"], expected["scores"])
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+import synap
+from synap.preprocessor import InputData, InputType, Preprocessor
+from synap.types import Layout, Shape
+
+from .utils import get_model_metadata
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def valid_uint8_model_props(valid_uint8_model_path):
+    return get_model_metadata(valid_uint8_model_path)
+
+@pytest.fixture
+def network(valid_uint8_model_path):
+    return synap.Network(valid_uint8_model_path)
+
+@pytest.fixture
+def image(network):
+    shape = network.inputs[0].shape
+    return np.random.randint(0, 255, (shape[1], shape[2], 3), dtype=np.uint8)
+
+
+# ------------------------synap.preprocessor.InputData------------------------ #
+
+@pytest.mark.parametrize("make_buffer", [bytes, bytearray, memoryview, np.frombuffer])
+def test_input_data_from_buffer(make_buffer):
+    """
+    Test InputData construction from objects supporting the buffer protocol
+    """
+    data = make_buffer(bytes(range(64)))
+    input_data = InputData(data, InputType.raw)
+    assert not input_data.empty()
+    assert input_data.size() == 64
+
+def test_input_data_references_buffer():
+    """
+    Test that InputData references the caller's memory and keeps it exported
+    """
+    data = bytearray(16)
+    input_data = InputData(data, InputType.raw)
+    with pytest.raises(BufferError):
+        data.extend(b"more")
+    del input_data
+    data.extend(b"more")
+
+def test_input_data_multibyte_items():
+    """
+    Test that the InputData size is in bytes for arrays with multi-byte items
+    """
+    data = np.zeros((2, 8), dtype=np.float32)
+    assert InputData(data, InputType.raw).size() == data.nbytes
+
+def test_input_data_non_contiguous():
+    """
+    Test that InputData rejects non-contiguous arrays
+    """
+    data = np.zeros((8, 8), dtype=np.uint8)[:, ::2]
+    with pytest.raises(ValueError, match="contiguous"):
+        InputData(data, InputType.raw)
+    assert InputData(np.ascontiguousarray(data), InputType.raw).size() == data.size
+
+def test_input_data_from_list():
+    """
+    Test InputData construction from a list of integers
+    """
+    assert InputData([1, 2, 3], InputType.raw).size() == 3
+
+
+# ------------------------synap.preprocessor.Preprocessor------------------------ #
+
+def test_preprocessor_assign_image(network, image):
+    """
+    Test assigning an 8-bit image from a NumPy array
+    """
+    rect = Preprocessor().assign(network.inputs, image, Shape(image.shape), Layout.nhwc)
+    assert (rect.size.x, rect.size.y) == (image.shape[1], image.shape[0])
+
+def test_preprocessor_assign_image_invalid(network, image):
+    """
+    Test that non-contiguous and non 8-bit images are rejected
+    """
+    preprocessor = Preprocessor()
+    with pytest.raises(ValueError, match="contiguous"):
+        preprocessor.assign(network.inputs, image[:, ::-1], Shape(image.shape), Layout.nhwc)
+    with pytest.raises(ValueError, match="8-bit"):
+        preprocessor.assign(network.inputs, image.astype(np.int32), Shape(image.shape), Layout.nhwc)
+
+def test_preprocessor_assign_nv12(network, image):
+    """
+    Test assigning an NV12 frame from bytes
+    """
+    height, width = image.shape[:2]
+    frame = bytes(width * height * 3 // 2)
+    rect = Preprocessor().assign(network.inputs, frame, InputType.nv12, Shape([1, height, width, 1]), Layout.nhwc)
+    assert (rect.size.x, rect.size.y) == (width, height)
+
+def test_preprocessor_assign_raw(network):
+    """
+    Test assigning raw data matching the input tensor
+    """
+    data = np.full(network.inputs[0].size, 3, dtype=np.uint8)
+    Preprocessor().assign(network.inputs, memoryview(data), InputType.raw)
+    assert np.all(network.inputs[0].view() == 3)
@@ -0,0 +1,155 @@
+import functools
+import json
+import os
+import signal
+import threading
+import time
+import zipfile
+
+import numpy as np
+import pytest
+
+from synap import ProcessPool
+from synap.replay import ReplayNetwork
+
+_MODEL_METADATA = {
+    "Inputs": {
+        "input": {"name": "input", "shape": [1, 4, 4, 3], "format": "nhwc", "dtype": "uint8"},
+    },
+    "Outputs": {
+        "output": {
+            "name": "output",
+            "shape": [1, 4, 4, 3],
+            "format": "nhwc",
+            "dtype": "uint8",
+            "quantizer": "asymmetric_affine",
+            "quantize": {"qtype": "u8", "scale": 0.5, "zero_point": 0},
+        },
+    },
+}
+
+
+class EchoNetwork(ReplayNetwork):
+    """
+    Replay network copying its input to its output
+    """
+
+    def predict(self, *args):
+        outputs = super().predict(*args)
+        outputs[0]._set(self.inputs[0].view())
+        return outputs
+
+
+def output_sum(outputs):
+    return {"sum": np.array([outputs[0].view().sum()], dtype=np.int64)}
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "model.synap"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("0/model.json", json.dumps(_MODEL_METADATA))
+    return str(path)
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (4, 4, 3), dtype=np.uint8) for _ in range(16)]
+
+
+# ------------------------synap.ProcessPool------------------------ #
+
+def test_process_pool_predict(model_path, frames):
+    """
+    Test that the inputs reach the workers and the dequantized outputs come back
+    """
+    with ProcessPool(model_path, workers=2, slots=2, network_factory=EchoNetwork) as pool:
+        assert pool.size == 2
+        assert pool.healthy
+        outputs = pool.predict(frames[0], timeout=10)
+        assert len(outputs) == 1
+        assert outputs[0].dtype == np.float32
+        np.testing.assert_array_equal(outputs[0], frames[0].reshape(1, 4, 4, 3) * 0.5)
+
+def test_process_pool_concurrent(model_path, frames):
+    """
+    Test requests from several threads, more than the available slots
+    """
+    with ProcessPool(model_path, workers=2, slots=2, network_factory=EchoNetwork) as pool:
+        results = {}
+
+        def client(index):
+            for i in range(index, len(frames), 4):
+                results[i] = pool.submit(frames[i])
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i, future in results.items():
+            np.testing.assert_array_equal(future.result(10)[0], frames[i].reshape(1, 4, 4, 3) * 0.5)
+        health = pool.health()
+        assert sum(status.inferences for status in health) == len(frames)
+        assert all(status.in_flight == 0 for status in health)
+
+def test_process_pool_postprocess(model_path, frames):
+    """
+    Test returning the compact result of a postprocessing function run in the worker
+    """
+    with ProcessPool(model_path, workers=1, network_factory=EchoNetwork, postprocess=output_sum) as pool:
+        result = pool.predict(frames[1], timeout=10)
+        assert result["sum"][0] == frames[1].astype(np.int64).sum()
+
+def test_process_pool_invalid_inputs(model_path, frames):
+    """
+    Test rejection of inputs not matching the model
+    """
+    with ProcessPool(model_path, workers=1, network_factory=ReplayNetwork) as pool:
+        with pytest.raises(ValueError):
+            pool.submit()
+        with pytest.raises(ValueError):
+            pool.submit(np.zeros((4, 4), dtype=np.uint8))
+    with pytest.raises(RuntimeError):
+        pool.submit(frames[0])
+
+def test_process_pool_load_error(tmp_path):
+    """
+    Test that a model that cannot be loaded by the workers is reported
+    """
+    path = tmp_path / "model.synap"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("0/model.json", json.dumps(_MODEL_METADATA))
+    network_factory = functools.partial(ReplayNetwork, outputs=[str(tmp_path / "missing.npy")])
+    with pytest.raises(RuntimeError):
+        ProcessPool(str(path), workers=1, network_factory=network_factory)
+    with pytest.raises(ValueError):
+        ProcessPool(str(path), workers=0)
+
+def test_process_pool_restart(model_path, frames):
+    """
+    Test that a worker which exits is restarted and its pending requests fail
+    """
+    network_factory = functools.partial(EchoNetwork, latency=0.5)
+    with ProcessPool(model_path, workers=1, slots=2, network_factory=network_factory) as pool:
+        pid = pool.health()[0].pid
+        future = pool.submit(frames[0])
+        os.kill(pid, signal.SIGKILL)
+        with pytest.raises(RuntimeError):
+            future.result(10)
+        deadline = time.monotonic() + 30
+        while not pool.healthy and time.monotonic() < deadline:
+            time.sleep(0.05)
+        status = pool.health()[0]
+        assert status.restarts == 1
+        assert status.pid != pid
+        np.testing.assert_array_equal(pool.predict(frames[2], timeout=10)[0], frames[2].reshape(1, 4, 4, 3) * 0.5)
+
+def test_process_pool_hung_worker(model_path, frames):
+    """
+    Test that a worker not responding within the heartbeat timeout is restarted
+    """
+    network_factory = functools.partial(EchoNetwork, latency=5.0)
+    with ProcessPool(model_path, workers=1, network_factory=network_factory, heartbeat_timeout=0.5, max_restarts=1) as pool:
+        with pytest.raises(RuntimeError):
+            pool.predict(frames[0], timeout=10)
+        assert pool.health()[0].restarts == 1
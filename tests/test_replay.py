@@ -0,0 +1,276 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from synap import NetworkExecutor, NetworkPool
+from synap.replay import ReplayNetwork, ReplayTensor
+from synap.types import DataType, Layout
+
+from .utils import write_model_archive
+
+_MODEL_METADATA = {
+    "delegate": "npu",
+    "Inputs": {
+        "images": {
+            "name": "images",
+            "shape": [1, 384, 640, 3],
+            "format": "nhwc",
+            "dtype": "uint8",
+            "quantizer": "asymmetric_affine",
+            "quantize": {"qtype": "u8", "scale": 1 / 255, "zero_point": 0},
+        },
+    },
+    "Outputs": {
+        "output0": {
+            "name": "output0",
+            "shape": [1, 84, 5040],
+            "format": "nchw",
+            "dtype": "uint8",
+            "quantizer": "asymmetric_affine",
+            "quantize": {"qtype": "u8", "scale": [0.005], "zero_point": [3]},
+        },
+        "output1": {
+            "name": "output1",
+            "shape": [2, 3],
+            "format": "none",
+            "dtype": "float16",
+        },
+    },
+}
+
+
+@pytest.fixture
+def replay_model_path(tmp_path):
+    return write_model_archive(tmp_path / "replay-model.synap", _MODEL_METADATA)
+
+@pytest.fixture
+def recorded_outputs():
+    output = np.fromfile("tests/data/output_float_0.dat", dtype=np.float32).reshape(1, 84, 5040)
+    return [output, np.arange(6, dtype=np.float32).reshape(2, 3)]
+
+
+# ------------------------synap.replay.ReplayNetwork------------------------ #
+
+def test_replay_tensors(replay_model_path):
+    """
+    Test that the tensors have the attributes of the model metadata
+    """
+    network = ReplayNetwork(replay_model_path)
+    assert network.metrics_label == "replay-model"
+    assert len(network.inputs) == network.inputs.size == 1
+    assert len(network.outputs) == 2
+    image, (output0, output1) = network.inputs[0], network.outputs
+    assert isinstance(image, ReplayTensor)
+    assert (image.name, list(image.shape), image.layout, image.data_type) == ("images", [1, 384, 640, 3], Layout.nhwc, DataType.uint8)
+    assert (output0.name, list(output0.shape), output0.layout, output0.data_type) == ("output0", [1, 84, 5040], Layout.nchw, DataType.uint8)
+    assert (output1.data_type, output1.layout) == (DataType.float16, Layout.none)
+    assert output0.item_count == output0.size == 84 * 5040
+    assert output1.size == 12
+    assert not output1.is_scalar
+
+def test_replay_from_bytes(replay_model_path):
+    """
+    Test loading the metadata from model data, and from legacy metadata
+    """
+    with open(replay_model_path, "rb") as f:
+        data = f.read()
+    network = ReplayNetwork()
+    network.load_model(data)
+    assert [t.name for t in network.outputs] == ["output0", "output1"]
+    network.load_model(b"", json.dumps(_MODEL_METADATA))
+    assert [t.name for t in network.inputs] == ["images"]
+
+def test_replay_invalid_model(tmp_path):
+    """
+    Test that a missing model or a model without metadata cannot be loaded
+    """
+    with pytest.raises(FileNotFoundError):
+        ReplayNetwork(str(tmp_path / "missing.synap"))
+    path = tmp_path / "invalid.synap"
+    path.write_bytes(b"not a model")
+    with pytest.raises(RuntimeError):
+        ReplayNetwork(str(path))
+    with pytest.raises(RuntimeError):
+        ReplayNetwork().predict()
+
+def test_replay_recorded_outputs(replay_model_path, recorded_outputs):
+    """
+    Test that predict returns the quantized recorded outputs
+    """
+    network = ReplayNetwork(replay_model_path, outputs=recorded_outputs)
+    image = np.zeros((384, 640, 3), dtype=np.uint8)
+    outputs = network.predict([image])
+    assert network.generation == outputs[0].generation == 1
+    assert np.allclose(outputs[0].to_numpy(), np.clip(recorded_outputs[0], -0.015, 1.26), atol=0.0025 + 1e-6)
+    assert outputs[0].view().dtype == np.uint8
+    assert not outputs[0].view().flags.writeable
+    assert np.array_equal(outputs[1].to_numpy(), recorded_outputs[1])
+
+def test_replay_recorded_files(replay_model_path, recorded_outputs, tmp_path):
+    """
+    Test replaying outputs saved as raw data and .npy files
+    """
+    np.save(tmp_path / "output1.npy", recorded_outputs[1])
+    network = ReplayNetwork(replay_model_path, outputs=["tests/data/output_float_0.dat", str(tmp_path / "output1.npy")])
+    outputs = network.predict()
+    expected = ReplayNetwork(replay_model_path, outputs=recorded_outputs).predict()
+    assert np.array_equal(outputs[0].view(), expected[0].view())
+    assert np.array_equal(outputs[1].view(), expected[1].view())
+    with pytest.raises(ValueError):
+        ReplayNetwork(replay_model_path, outputs=["tests/data/output_float_0.dat"])
+
+def test_replay_several_inferences(replay_model_path, recorded_outputs):
+    """
+    Test that recorded inferences are replayed in turn
+    """
+    second = [np.zeros_like(recorded_outputs[0]), np.ones((2, 3), dtype=np.float16)]
+    network = ReplayNetwork(replay_model_path, outputs=[recorded_outputs, second])
+    results = [network.predict()[1].to_numpy().copy() for _ in range(3)]
+    assert np.array_equal(results[0], recorded_outputs[1])
+    assert np.array_equal(results[1], second[1])
+    assert np.array_equal(results[2], recorded_outputs[1])
+
+def test_replay_random_outputs(replay_model_path):
+    """
+    Test that random outputs have the output data type and depend on the seed
+    """
+    first = ReplayNetwork(replay_model_path, seed=1).predict()[0].view().copy()
+    assert first.dtype == np.uint8
+    assert first.std() > 0
+    assert np.array_equal(ReplayNetwork(replay_model_path, seed=1).predict()[0].view(), first)
+    assert not np.array_equal(ReplayNetwork(replay_model_path, seed=2).predict()[0].view(), first)
+
+def test_replay_latency(replay_model_path):
+    """
+    Test the simulated inference time
+    """
+    network = ReplayNetwork(replay_model_path, latency=0.02, jitter=0.005)
+    start = time.perf_counter()
+    for _ in range(3):
+        network.predict()
+    assert time.perf_counter() - start >= 3 * 0.015
+    with pytest.raises(ValueError):
+        ReplayNetwork(replay_model_path, latency=-1)
+
+def test_replay_assign(replay_model_path):
+    """
+    Test assigning arrays, bytes and scalars to an input tensor
+    """
+    tensor = ReplayNetwork(replay_model_path).inputs[0]
+    tensor.assign(np.full((1, 384, 640, 3), 0.2, dtype=np.float32))
+    assert np.all(tensor.view() == 51)
+    tensor.assign(7)
+    assert np.allclose(tensor.to_numpy(), 7 / 255)
+    tensor.assign(bytes(range(256)) * (tensor.size // 256))
+    assert tensor.view().reshape(-1)[:3].tolist() == [0, 1, 2]
+    tensor.view()[...] = 3
+    assert np.all(tensor.view() == 3)
+    with pytest.raises(ValueError):
+        tensor.assign(np.zeros((384, 640), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        tensor.assign(b"\0")
+
+def test_replay_to_numpy_converted(replay_model_path, recorded_outputs):
+    """
+    Test the layout, data type, activation and channel conversions of to_numpy
+    """
+    network = ReplayNetwork(replay_model_path, outputs=recorded_outputs)
+    image = network.inputs[0]
+    image.assign(np.arange(384 * 640 * 3, dtype=np.uint8).reshape(1, 384, 640, 3))
+    deq = image.to_numpy()
+    assert np.array_equal(image.to_numpy(layout=Layout.nchw, channels=slice(1, 3)), deq[..., 1:3].transpose(0, 3, 1, 2))
+    assert image.to_numpy(dtype=np.float16).dtype == np.float16
+    output0 = network.predict()[0]
+    rows = output0.to_numpy(channels=(4, 84), activation="sigmoid")
+    assert rows.shape == (1, 80, 5040)
+    assert np.allclose(rows, 1 / (1 + np.exp(-output0.to_numpy()[:, 4:])))
+    softmax = output0.to_numpy(activation="softmax", axis=1)
+    assert np.allclose(softmax.sum(axis=1), 1, atol=1e-5)
+    with pytest.raises(ValueError):
+        output0.to_numpy(layout=Layout.nhwc)
+    with pytest.raises(ValueError):
+        output0.to_numpy(activation="relu")
+
+def test_replay_input_conversion(replay_model_path):
+    """
+    Test the input conversion of assign and predict
+    """
+    network = ReplayNetwork(replay_model_path)
+    tensor = network.inputs[0]
+    data = np.random.default_rng(0).integers(0, 255, (1, 384, 640, 3), dtype=np.uint8)
+    mean = [10, 20, 30]
+    tensor.assign(np.ascontiguousarray(data.transpose(0, 3, 1, 2)), mean=mean, std=255.0, swap_rb=True, layout=Layout.nchw)
+    expected = tensor.quantize((data[..., ::-1].astype(np.float32) - np.array(mean, dtype=np.float32)) / 255)
+    assert np.array_equal(tensor.view(), expected)
+    network.set_input_conversion(0, scale=1 / 255)
+    network.predict(data)
+    assert np.array_equal(tensor.view(), data)
+    network.set_input_conversion(0)
+    network.predict(data.astype(np.float32) / 255)
+    assert np.array_equal(tensor.view(), data)
+    with pytest.raises(ValueError):
+        tensor.assign(data, mean=[1, 2])
+    with pytest.raises(IndexError):
+        network.set_input_conversion(1)
+
+def test_replay_bind(replay_model_path, recorded_outputs):
+    """
+    Test running inference with bound arrays
+    """
+    network = ReplayNetwork(replay_model_path, outputs=recorded_outputs)
+    image = np.full((1, 384, 640, 3), 102, dtype=np.uint8)
+    outputs = [np.empty((1, 84, 5040), dtype=np.float32), np.empty(6, dtype=np.float16)]
+    network.set_input_conversion(0, scale=1 / 510)
+    binding = network.bind(inputs=[image], outputs=outputs)
+    network.set_input_conversion(0)
+    results = binding.run()
+    assert results[0] is outputs[0] and results[1] is outputs[1]
+    assert np.all(network.inputs[0].view() == 51)
+    assert np.array_equal(outputs[0], network.outputs[0].to_numpy())
+    assert np.array_equal(outputs[1], recorded_outputs[1].ravel())
+    assert network.bind().run()[1] is network.outputs[1]
+    with pytest.raises(ValueError):
+        network.bind(outputs=[outputs[0]])
+    with pytest.raises(ValueError):
+        network.bind(outputs=[outputs[0], np.empty(6, dtype=np.float64)])
+    network.load_model(replay_model_path)
+    with pytest.raises(RuntimeError):
+        binding.run()
+
+def test_replay_outputs_cached(replay_model_path, recorded_outputs):
+    """
+    Test that the dequantized outputs are cached until the next inference
+    """
+    network = ReplayNetwork(replay_model_path, outputs=recorded_outputs)
+    assert network.outputs.generation == 0
+    outputs = network.predict()
+    assert outputs.generation == network.inputs.generation == 1
+    first = outputs[0].to_numpy()
+    assert outputs[0].to_numpy() is first
+    assert outputs[0].to_numpy(dtype=np.float32) is not first
+    first[...] = -1
+    network.predict()
+    assert np.allclose(outputs[0].to_numpy(), np.clip(recorded_outputs[0], -0.015, 1.26), atol=0.0025 + 1e-6)
+
+def test_replay_pool(replay_model_path, recorded_outputs):
+    """
+    Test a network pool of replay networks
+    """
+    pool = NetworkPool(replay_model_path, size=2, network_factory=lambda: ReplayNetwork(outputs=recorded_outputs))
+    assert all(isinstance(network, ReplayNetwork) for network in pool.networks)
+    assert pool.networks[0].metrics_label == "replay-model"
+    outputs = pool.predict(np.zeros((1, 384, 640, 3), dtype=np.uint8))
+    assert np.array_equal(outputs[1], recorded_outputs[1])
+
+def test_replay_executor(replay_model_path, recorded_outputs):
+    """
+    Test asynchronous inference on a replay network
+    """
+    with NetworkExecutor(ReplayNetwork(replay_model_path, outputs=recorded_outputs, latency=0.001)) as executor:
+        futures = [executor.submit() for _ in range(4)]
+        for future in futures:
+            result = future.result()
+            assert np.array_equal(result[1], recorded_outputs[1])
+            result.release()
@@ -1,3 +1,4 @@
+import gc
 import pytest
 import re
 import subprocess
@@ -81,6 +82,97 @@ def test_synap_version(curr_synap_version):
     assert str(ver) == curr_synap_version
 
 
+# ------------------------synap.Buffer------------------------ #
+
+def test_buffer_constructor_size():
+    """
+    Test Buffer constructor with a size in bytes
+    """
+    buffer = synap.Buffer(64)
+    assert buffer.size == 64
+    view = np.frombuffer(buffer, dtype=np.uint8)
+    assert view.shape == (64,)
+    assert view.flags.writeable
+    assert synap.Buffer().size == 0
+
+def test_buffer_constructor_data():
+    """
+    Test Buffer constructor copying a NumPy array and a bytes object
+    """
+    data = np.arange(16, dtype=np.float32)
+    buffer = synap.Buffer(data)
+    assert buffer.size == data.nbytes
+    assert np.array_equal(np.frombuffer(buffer, dtype=np.float32), data)
+    # the buffer owns a copy of the data
+    data[0] = 42
+    assert np.frombuffer(buffer, dtype=np.float32)[0] == 0
+    assert bytes(memoryview(synap.Buffer(b"synap"))) == b"synap"
+
+def test_buffer_constructor_non_contiguous():
+    """
+    Test that Buffer constructor rejects non-contiguous data
+    """
+    data = np.zeros((4, 4), dtype=np.uint8)[:, ::2]
+    with pytest.raises(ValueError, match="contiguous"):
+        synap.Buffer(data)
+
+def test_buffer_constructor_subrange_out_of_bounds():
+    """
+    Test that Buffer sub-range constructor checks bounds
+    """
+    buffer = synap.Buffer(16)
+    with pytest.raises(IndexError):
+        synap.Buffer(buffer, 8, 16)
+
+def test_buffer_assign_resize():
+    """
+    Test Buffer assign and resize
+    """
+    buffer = synap.Buffer(4)
+    buffer.assign(b"abcdef")
+    assert buffer.size == 6
+    assert bytes(memoryview(buffer)) == b"abcdef"
+    buffer.resize(2)
+    assert buffer.size == 2
+
+def test_tensor_set_buffer(sample_uint8_tensor, sample_uint8_data):
+    """
+    Test Tensor set_buffer with a user-allocated buffer
+    """
+    data, deq_data = sample_uint8_data
+    buffer = synap.Buffer(sample_uint8_tensor.size)
+    sample_uint8_tensor.set_buffer(buffer)
+    assert sample_uint8_tensor.buffer() is buffer
+    sample_uint8_tensor.assign(data)
+    assert np.array_equal(np.frombuffer(buffer, dtype=np.uint8), data.ravel())
+    assert np.array_equal(sample_uint8_tensor.to_numpy(), deq_data)
+    sample_uint8_tensor.set_buffer(None)
+    assert sample_uint8_tensor.buffer() is not buffer
+
+def test_tensor_set_buffer_invalid(sample_uint8_network):
+    """
+    Test that buffers can only be set to network tensors, and must be Buffer objects
+    """
+    tensor = sample_uint8_network.inputs[0]
+    assert tensor.owned_by_network
+    with pytest.raises(TypeError):
+        tensor.set_buffer(b"\0" * tensor.size)
+    for other in (synap.Tensor(tensor), sample_uint8_network.inputs.detached()[0]):
+        assert not other.owned_by_network
+        with pytest.raises(ValueError, match="network"):
+            other.set_buffer(synap.Buffer(tensor.size))
+
+def test_tensor_set_buffer_lifetime(valid_uint8_model_path):
+    """
+    Test that a buffer set to a network tensor is kept alive by the network
+    """
+    net = synap.Network(valid_uint8_model_path)
+    net.inputs[0].set_buffer(synap.Buffer(net.inputs[0].size))
+    gc.collect()
+    assert net.inputs[0].buffer().size == net.inputs[0].size
+    net.predict()
+
+
 # ------------------------synap.Tensor------------------------ #
 
 def test_tensor_constructor_from_tensor(sample_uint8_tensor, sample_uint8_tensor_props):
@@ -114,6 +206,86 @@ def test_tensor_to_numpy(sample_uint8_tensor, sample_uint8_data):
     assert isinstance(res, np.ndarray)
     assert np.array_equal(res, deq_data)
 
+def test_tensor_to_numpy_converted(sample_uint8_tensor, sample_uint8_data):
+    """
+    Test Tensor to_numpy method with layout, data type, activation and channel conversions
+    """
+    data, deq_data = sample_uint8_data
+    sample_uint8_tensor.assign(data)
+    nchw = sample_uint8_tensor.to_numpy(layout=synap.types.Layout.nchw)
+    assert nchw.flags.c_contiguous
+    assert np.array_equal(nchw, deq_data.transpose(0, 3, 1, 2))
+    assert np.array_equal(sample_uint8_tensor.to_numpy(layout=synap.types.Layout.nhwc), deq_data)
+    subset = sample_uint8_tensor.to_numpy(layout=synap.types.Layout.nchw, channels=slice(1, 3))
+    assert np.array_equal(subset, deq_data[..., 1:3].transpose(0, 3, 1, 2))
+    assert np.array_equal(sample_uint8_tensor.to_numpy(channels=(0, 1)), deq_data[..., 0:1])
+    half = sample_uint8_tensor.to_numpy(dtype=np.float16)
+    assert half.dtype == np.float16
+    assert np.array_equal(half, deq_data.astype(np.float16))
+    sigmoid = sample_uint8_tensor.to_numpy(activation="sigmoid")
+    assert np.allclose(sigmoid, 1 / (1 + np.exp(-deq_data)), atol=1e-6)
+    softmax = sample_uint8_tensor.to_numpy(layout=synap.types.Layout.nchw, activation="softmax", axis=1)
+    expected = np.exp(deq_data - deq_data.max(axis=3, keepdims=True))
+    expected = (expected / expected.sum(axis=3, keepdims=True)).transpose(0, 3, 1, 2)
+    assert np.allclose(softmax, expected, atol=1e-6)
+    with pytest.raises(ValueError):
+        sample_uint8_tensor.to_numpy(dtype=np.int32)
+    with pytest.raises(ValueError):
+        sample_uint8_tensor.to_numpy(activation="relu")
+    with pytest.raises(ValueError):
+        sample_uint8_tensor.to_numpy(activation="softmax", axis=4)
+    with pytest.raises(ValueError):
+        sample_uint8_tensor.to_numpy(channels=(2, 5))
+    with pytest.raises(ValueError):
+        sample_uint8_tensor.to_numpy(channels=slice(0, 3, 2))
+
+def test_tensor_view(sample_uint8_tensor, sample_uint8_data):
+    """
+    Test Tensor view method on an input tensor
+    """
+    data, deq_data = sample_uint8_data
+    sample_uint8_tensor.assign(data)
+    view = sample_uint8_tensor.view()
+    assert isinstance(view, np.ndarray)
+    assert view.dtype == sample_uint8_tensor.data_type.np_type()
+    assert view.shape == tuple(sample_uint8_tensor.shape)
+    assert np.array_equal(view, data)
+    # input views are writable and alias the tensor data
+    assert view.flags.writeable
+    view[...] = 0
+    assert not sample_uint8_tensor.view().any()
+
+def test_tensor_buffer_protocol(sample_uint8_tensor, sample_uint8_data):
+    """
+    Test Tensor buffer protocol support
+    """
+    data, _ = sample_uint8_data
+    sample_uint8_tensor.assign(data)
+    arr = np.asarray(sample_uint8_tensor)
+    assert arr.dtype == sample_uint8_tensor.data_type.np_type()
+    assert np.array_equal(arr, data)
+    mv = memoryview(sample_uint8_tensor)
+    assert mv.nbytes == sample_uint8_tensor.size
+    assert not mv.readonly
+
+def test_tensor_view_lifetime(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test that tensor views keep their network alive and output views are read-only
+    """
+    def make_views():
+        net = synap.Network(valid_uint8_model_path)
+        inputs = [np.zeros(props["shape"], dtype=np.uint8) for props in valid_uint8_model_props["inputs"]]
+        net.predict(inputs)
+        return [out.view() for out in net.outputs], [out.to_numpy() for out in net.outputs]
+
+    views, arrays = make_views()
+    gc.collect()
+    for i, (view, arr) in enumerate(zip(views, arrays)):
+        assert not view.flags.writeable
+        with open(f"tests/data/output_float_{i}.dat", "rb") as f:
+            expected = np.frombuffer(f.read(), dtype=np.float32).reshape(arr.shape)
+        assert np.array_equal(arr, expected)
+
 def test_tensor_assign_bytes(sample_uint8_tensor, sample_uint8_tensor_props, sample_uint8_data):
     """
     Test Tensor assign with bytes data
@@ -132,6 +304,40 @@ def test_tensor_assign_numpy(sample_uint8_tensor, sample_uint8_tensor_props, sam
     assert np.array_equal(sample_uint8_tensor.to_numpy(), deq_data)
     _validate_tensor_props(sample_uint8_tensor, sample_uint8_tensor_props)
 
+def test_tensor_assign_converted(sample_uint8_tensor, sample_uint8_data):
+    """
+    Test Tensor assign with normalization, channel swap and layout conversion
+    """
+    data, _ = sample_uint8_data
+    mean = np.array([10, 20, 30], dtype=np.float32)
+    std = np.array([0.5, 1, 2], dtype=np.float32)
+    expected = (data[..., ::-1].astype(np.float32) * 0.5 - mean) / std
+    sample_uint8_tensor.assign(expected, std=1.0)
+    reference = sample_uint8_tensor.view().astype(np.int32)
+    chw = np.ascontiguousarray(data.transpose(0, 3, 1, 2))
+    sample_uint8_tensor.assign(chw, mean=mean, std=std, scale=0.5, swap_rb=True, layout=synap.types.Layout.nchw)
+    assert np.abs(sample_uint8_tensor.view().astype(np.int32) - reference).max() <= 1
+    with pytest.raises(ValueError):
+        sample_uint8_tensor.assign(data, mean=[1, 2])
+    with pytest.raises(ValueError):
+        sample_uint8_tensor.assign(data, std=0)
+    with pytest.raises(ValueError):
+        sample_uint8_tensor.assign(data, layout=synap.types.Layout.nchw)
+
+def test_tensor_assign_other_types(sample_uint8_tensor, sample_uint8_data):
+    """
+    Test Tensor assign with uint16, int8 and float16 arrays
+    """
+    data, _ = sample_uint8_data
+    small = data // 2
+    sample_uint8_tensor.assign(small)
+    reference = sample_uint8_tensor.view().astype(np.int32)
+    for dtype in (np.uint16, np.int8, np.float16):
+        sample_uint8_tensor.assign(small.astype(dtype))
+        assert np.abs(sample_uint8_tensor.view().astype(np.int32) - reference).max() <= 1
+    with pytest.raises(ValueError, match="Unsupported data type"):
+        sample_uint8_tensor.assign(data.astype(np.float64))
+
 def test_tensor_assign_scalar(sample_uint8_tensor, sample_uint8_tensor_props):
     """
     Test Tensor assign with scalar value
@@ -160,6 +366,23 @@ def test_tensors_iter(sample_uint8_tensors):
         assert isinstance(tensor, synap.Tensor)
         assert tensor is sample_uint8_tensors[i]
 
+def test_tensors_detached(sample_uint8_network, valid_uint8_model_props, sample_uint8_data):
+    """
+    Test that detached tensors have the attributes of the network tensors and their own buffers
+    """
+    data, deq_data = sample_uint8_data
+    inputs = sample_uint8_network.inputs.detached()
+    outputs = sample_uint8_network.outputs.detached()
+    assert isinstance(inputs, synap.Tensors)
+    _validate_tensor_props(inputs[0], valid_uint8_model_props["inputs"][0])
+    for i, out in enumerate(outputs):
+        _validate_tensor_props(out, valid_uint8_model_props["outputs"][i])
+    inputs[0].assign(data)
+    assert np.array_equal(inputs[0].to_numpy(), deq_data)
+    assert inputs[0].buffer() is not sample_uint8_network.inputs[0].buffer()
+    assert inputs.generation == 0
+    assert len(synap.Network().outputs.detached()) == 0
+
 
 # ------------------------synap.Network------------------------ #
 
@@ -230,3 +453,104 @@ def test_network_predict_with_input(valid_uint8_model_path, valid_uint8_model_pr
     inputs = [np.zeros(inp_props[i]["shape"]).astype(np.uint8) for i in range(len(net.inputs))]
     net.predict(inputs)
     _validate_model_output(net, valid_uint8_model_props["outputs"])
+
+def test_network_input_conversion(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test the conversion of the arrays assigned to the inputs by predict
+    """
+    net = synap.Network(valid_uint8_model_path)
+    shape = valid_uint8_model_props["inputs"][0]["shape"]
+    data = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    net.inputs[0].assign(np.ascontiguousarray(data[..., ::-1]))
+    reference = net.inputs[0].view().copy()
+    net.set_input_conversion(0, swap_rb=True)
+    net.predict(data)
+    assert np.array_equal(net.inputs[0].view(), reference)
+    net.set_input_conversion(0)
+    net.predict(data)
+    assert np.array_equal(net.inputs[0].view(), data)
+    with pytest.raises(IndexError):
+        net.set_input_conversion(len(net.inputs))
+    net.set_input_conversion(0, mean=[1, 2])
+    with pytest.raises(ValueError):
+        net.predict(data)
+
+def test_network_bind(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test running inference with arrays bound to the inputs and outputs
+    """
+    net = synap.Network(valid_uint8_model_path)
+    data = np.zeros(valid_uint8_model_props["inputs"][0]["shape"], dtype=np.uint8)
+    outputs = [np.empty(out["shape"], dtype=np.float32) for out in valid_uint8_model_props["outputs"]]
+    binding = net.bind(inputs=[data], outputs=outputs)
+    assert binding.inputs[0] is data
+    results = binding.run()
+    assert all(result is output for result, output in zip(results, outputs))
+    assert net.generation == 1
+    _validate_model_output(net, valid_uint8_model_props["outputs"])
+    for i, output in enumerate(outputs):
+        assert np.array_equal(output, net.outputs[i].to_numpy())
+    # the outputs are updated in place, without rebinding
+    outputs[0][...] = 0
+    binding.run()
+    assert np.array_equal(outputs[0], net.outputs[0].to_numpy())
+    half = net.bind(outputs=[np.empty(out.item_count, dtype=np.float16) for out in net.outputs])
+    assert np.allclose(half.run()[0], net.outputs[0].to_numpy().ravel(), atol=1e-2, rtol=1e-3)
+    net.load_model(valid_uint8_model_path)
+    with pytest.raises(RuntimeError):
+        binding.run()
+
+def test_network_bind_invalid(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test that bound arrays are validated when binding
+    """
+    net = synap.Network(valid_uint8_model_path)
+    shape = valid_uint8_model_props["inputs"][0]["shape"]
+    with pytest.raises(ValueError):
+        net.bind(inputs=[])
+    with pytest.raises(ValueError):
+        net.bind(inputs=[np.zeros(shape, dtype=np.uint8)[..., ::-1]])
+    with pytest.raises(ValueError):
+        net.bind(inputs=[np.zeros((2, 2), dtype=np.uint8)])
+    with pytest.raises(ValueError):
+        net.bind(outputs=[np.empty(out.item_count, dtype=np.float64) for out in net.outputs])
+    with pytest.raises(ValueError):
+        net.bind(outputs=[np.empty(out.item_count + 1, dtype=np.float32) for out in net.outputs])
+    # inputs without array are left unchanged
+    net.inputs[0].view()[...] = 7
+    net.bind(inputs=[None]).run()
+    assert np.all(net.inputs[0].view() == 7)
+
+def test_network_outputs_cached(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test that the dequantized outputs are cached until the next inference
+    """
+    net = synap.Network(valid_uint8_model_path)
+    assert net.outputs.generation == 0
+    image = np.zeros(valid_uint8_model_props["inputs"][0]["shape"], dtype=np.uint8)
+    outputs = net.predict(image)
+    assert outputs.generation == net.inputs.generation == net.generation == 1
+    first = outputs[0].to_numpy()
+    second = outputs[0].to_numpy()
+    assert first.ctypes.data == second.ctypes.data
+    first[...] = -1
+    assert np.all(outputs[0].to_numpy() == -1)
+    # the next inference dequantizes the outputs again
+    net.predict(image)
+    assert outputs.generation == 2
+    _validate_model_output(net, valid_uint8_model_props["outputs"])
+
+def test_network_generation(valid_uint8_model_path, valid_uint8_model_props):
+    """
+    Test that the network generation is incremented by each inference
+    """
+    net = synap.Network(valid_uint8_model_path)
+    assert net.generation == 0
+    inputs = [np.zeros(props["shape"], dtype=np.uint8) for props in valid_uint8_model_props["inputs"]]
+    for i in range(3):
+        net.predict(inputs)
+        assert net.generation == i + 1
+        for tensor in (*net.inputs, *net.outputs):
+            assert tensor.generation == net.generation
+    # tensors not owned by a network have no generation
+    assert synap.Tensor(net.outputs[0]).generation == 0
@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import synap
+from synap.preprocessor import Preprocessor
+from synap.postprocessor import Detector
+from synap.types import Rect
+
+from .utils import get_model_metadata
+
+
+N_THREADS = 4
+N_ITERATIONS = 10
+
+
+def _zero_inputs(net: synap.Network) -> list[np.ndarray]:
+    return [np.zeros(tuple(inp.shape), dtype=inp.data_type.np_type()) for inp in net.inputs]
+
+def _recorded_outputs(out_props: list) -> list[np.ndarray]:
+    outputs = []
+    for i, props in enumerate(out_props):
+        with open(f"tests/data/output_float_{i}.dat", "rb") as f:
+            outputs.append(np.frombuffer(f.read(), dtype=np.float32).reshape(props["shape"]))
+    return outputs
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def valid_uint8_model_props(valid_uint8_model_path):
+    return get_model_metadata(valid_uint8_model_path)
+
+@pytest.fixture
+def expected_outputs(valid_uint8_model_props):
+    return _recorded_outputs(valid_uint8_model_props["outputs"])
+
+
+# ------------------------concurrent inference------------------------ #
+
+def test_concurrent_predict_separate_networks(valid_uint8_model_path, expected_outputs):
+    """
+    Test that separate Network instances can run inference concurrently
+    """
+    def worker():
+        net = synap.Network(valid_uint8_model_path)
+        inputs = _zero_inputs(net)
+        for _ in range(N_ITERATIONS):
+            outputs = net.predict(inputs)
+            for out, expected in zip(outputs, expected_outputs):
+                assert np.array_equal(out.to_numpy(), expected)
+
+    with ThreadPoolExecutor(max_workers=N_THREADS) as executor:
+        futures = [executor.submit(worker) for _ in range(N_THREADS)]
+        for future in futures:
+            future.result()
+
+def test_concurrent_assign_and_predict(valid_uint8_model_path, expected_outputs):
+    """
+    Test overlapping input assignment on one network with inference on another
+    """
+    nets = [synap.Network(valid_uint8_model_path) for _ in range(2)]
+    inputs = _zero_inputs(nets[0])
+
+    def assign(net):
+        for _ in range(N_ITERATIONS):
+            for inp, data in zip(net.inputs, inputs):
+                inp.assign(data)
+
+    def predict(net):
+        for inp, data in zip(net.inputs, inputs):
+            inp.assign(data)
+        for _ in range(N_ITERATIONS):
+            net.predict()
+            for out, expected in zip(net.outputs, expected_outputs):
+                assert np.array_equal(out.to_numpy(), expected)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        f_assign = executor.submit(assign, nets[0])
+        f_predict = executor.submit(predict, nets[1])
+        f_assign.result()
+        f_predict.result()
+
+def test_concurrent_detectors(valid_uint8_model_path):
+    """
+    Test that separate Detector instances give consistent results when run concurrently
+    """
+    net = synap.Network(valid_uint8_model_path)
+    outputs = net.predict(_zero_inputs(net))
+    shape = net.inputs[0].shape
+    rect = Rect((0, 0), (shape[2], shape[1]))
+    expected = len(Detector().process(outputs, rect).items)
+
+    def worker():
+        detector = Detector()
+        return [len(detector.process(outputs, rect).items) for _ in range(N_ITERATIONS)]
+
+    with ThreadPoolExecutor(max_workers=N_THREADS) as executor:
+        for counts in executor.map(lambda _: worker(), range(N_THREADS)):
+            assert counts == [expected] * N_ITERATIONS
+
+def test_shared_preprocessor(valid_uint8_model_path):
+    """
+    Test that one Preprocessor can be shared by threads assigning to different networks
+    """
+    preprocessor = Preprocessor()
+    nets = [synap.Network(valid_uint8_model_path) for _ in range(N_THREADS)]
+    shape = nets[0].inputs[0].shape
+    image = np.random.randint(0, 255, (shape[1] * 2, shape[2] * 2, 3), dtype=np.uint8)
+
+    def worker(net):
+        rects = []
+        for _ in range(N_ITERATIONS):
+            rects.append(preprocessor.assign(net.inputs, image, synap.types.Shape(image.shape), synap.types.Layout.nhwc))
+        return rects
+
+    with ThreadPoolExecutor(max_workers=N_THREADS) as executor:
+        results = list(executor.map(worker, nets))
+    for rects in results:
+        assert all(rect == results[0][0] for rect in rects)
+
+
+# ------------------------GIL release------------------------ #
+
+def test_predict_releases_gil(valid_uint8_model_path):
+    """
+    Test that other Python threads make progress while predict() is running
+    """
+    net = synap.Network(valid_uint8_model_path)
+    inputs = _zero_inputs(net)
+    done = threading.Event()
+    ticks = 0
+
+    def ticker():
+        nonlocal ticks
+        while not done.is_set():
+            ticks += 1
+            time.sleep(0)
+
+    thread = threading.Thread(target=ticker)
+    thread.start()
+    try:
+        start = ticks
+        for _ in range(N_ITERATIONS):
+            net.predict(inputs)
+        progress = ticks - start
+    finally:
+        done.set()
+        thread.join()
+    assert progress > N_ITERATIONS
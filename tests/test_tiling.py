@@ -0,0 +1,145 @@
+
+import numpy as np
+import pytest
+
+import synap
+from synap.postprocessor import DetectorResult
+from synap.preprocessor import InputData, InputType
+from synap.replay import ReplayNetwork
+from synap.tiling import TiledDetector, tile_grid
+from synap.types import Layout, Shape
+
+from .utils import write_model_archive
+
+_MODEL_METADATA = {
+    "Inputs": {
+        "images": {
+            "name": "images",
+            "shape": [1, 96, 128, 3],
+            "format": "nhwc",
+            "dtype": "uint8",
+        },
+    },
+    "Outputs": {
+        "output0": {
+            "name": "output0",
+            "shape": [1, 4],
+            "format": "none",
+            "dtype": "float32",
+        },
+    },
+}
+
+# Objects of the test image as (x, y, width, height)
+_OBJECTS = [(10, 10, 30, 20), (115, 40, 30, 30), (250, 150, 40, 25)]
+
+
+@pytest.fixture
+def valid_uint8_model_path():
+    return "tests/data/yolov8s-640x384-uint8.synap"
+
+@pytest.fixture
+def replay_model_path(tmp_path):
+    return write_model_archive(tmp_path / "tile-model.synap", _MODEL_METADATA)
+
+@pytest.fixture
+def image():
+    pixels = np.zeros((200, 300, 3), dtype=np.uint8)
+    for x, y, w, h in _OBJECTS:
+        pixels[y:y + h, x:x + w] = 255
+    return pixels
+
+
+def _find_objects(network, assigned_rect):
+    # Detect the white rectangles of the tile assigned to the network, one box per
+    # rectangle, with a landmark at its top-left corner
+    tile = network.inputs[0].view()[0, :assigned_rect.size.y, :assigned_rect.size.x, 0] > 0
+    boxes = []
+    rows = tile.any(axis=1)
+    for band in np.split(np.arange(len(rows)), np.flatnonzero(np.diff(rows.astype(np.int8))) + 1):
+        if not rows[band[0]]:
+            continue
+        cols = tile[band].any(axis=0)
+        for run in np.split(np.arange(len(cols)), np.flatnonzero(np.diff(cols.astype(np.int8))) + 1):
+            if cols[run[0]]:
+                boxes.append((run[0], band[0], len(run), len(band)))
+    boxes = np.array(boxes, dtype=np.int32).reshape(-1, 4)
+    # Boxes cut by a tile border get a lower score
+    scores = (boxes[:, 2] * boxes[:, 3] / 1000).astype(np.float32)
+    landmarks = np.concatenate([boxes[:, None, :2], np.zeros((len(boxes), 1, 1), dtype=np.int32)], axis=2)
+    return DetectorResult.from_arrays(boxes, scores, np.zeros(len(boxes), dtype=np.int32), landmarks, np.ones((len(boxes), 1), dtype=np.float32))
+
+def _object_finder(network):
+    return lambda outputs, assigned_rect: _find_objects(network, assigned_rect)
+
+
+# ------------------------synap.tiling------------------------ #
+
+def test_tile_grid():
+    """
+    Test that the tiles cover the image and overlap
+    """
+    tiles = tile_grid((300, 200), (128, 96), overlap=0.25)
+    assert all((tile.size.x, tile.size.y) == (128, 96) for tile in tiles)
+    xs = sorted({tile.origin.x for tile in tiles})
+    ys = sorted({tile.origin.y for tile in tiles})
+    assert xs[0] == 0 and xs[-1] == 300 - 128
+    assert ys[0] == 0 and ys[-1] == 200 - 96
+    assert all(b - a <= 128 - 32 for a, b in zip(xs, xs[1:]))
+    assert all(b - a <= 96 - 24 for a, b in zip(ys, ys[1:]))
+    assert len(tiles) == len(xs) * len(ys)
+    small = tile_grid((100, 50), (128, 96))
+    assert len(small) == 1 and (small[0].size.x, small[0].size.y) == (100, 50)
+    with pytest.raises(ValueError):
+        tile_grid((300, 200), (128, 96), overlap=1)
+
+def test_tiled_detection(replay_model_path, image):
+    """
+    Test that detections are mapped to image coordinates and merged across tiles
+    """
+    networks = [ReplayNetwork(replay_model_path) for _ in range(2)]
+    finders = [_object_finder(network) for network in networks]
+    with TiledDetector(networks, postprocessor=finders, overlap=0.5) as detector:
+        assert detector.tile_size == (128, 96)
+        result = detector.detect(image)
+        stats = detector.stats
+    assert sorted(map(tuple, result.boxes.tolist())) == sorted(_OBJECTS)
+    assert np.array_equal(result.landmarks[:, 0, :2], result.boxes[:, :2])
+    assert np.all(result.tile >= 0) and np.all(result.tile < len(result.tiles))
+    assert len(result.result.items) == len(_OBJECTS)
+    assert stats.images == 1
+    assert stats.tiles == sum(stats.network_tiles) == len(result.tiles)
+    assert stats.tile_detections > stats.detections == len(_OBJECTS)
+    assert stats.tiles_per_second > 0
+
+def test_tiled_detection_inputs(replay_model_path, image):
+    """
+    Test tiling decoded input data, and images smaller than a tile
+    """
+    network = ReplayNetwork(replay_model_path)
+    detector = TiledDetector(network, postprocessor=_object_finder(network))
+    input_data = InputData(image, InputType.image_8bits, Shape([1, 200, 300, 3]), Layout.nhwc)
+    view = input_data.view()
+    assert view.shape == (200, 300, 3)
+    assert not view.flags.writeable
+    assert sorted(map(tuple, detector.detect(input_data).boxes.tolist())) == sorted(_OBJECTS)
+    small = detector.detect(np.ascontiguousarray(image[:50, :100]))
+    assert small.boxes.tolist() == [[10, 10, 30, 20]]
+    with pytest.raises(ValueError):
+        detector.detect(np.zeros((20, 20), dtype=np.uint8))
+    detector.close()
+    with pytest.raises(ValueError):
+        TiledDetector([network], postprocessor=[_object_finder(network)] * 2)
+
+def test_tiled_detector_network(valid_uint8_model_path):
+    """
+    Test tiled detection with SyNAP networks and Detector postprocessing
+    """
+    networks = [synap.Network(valid_uint8_model_path) for _ in range(2)]
+    with TiledDetector(networks) as detector:
+        assert detector.tile_size == (640, 384)
+        result = detector.detect(np.zeros((1080, 1920, 3), dtype=np.uint8))
+    tiles = tile_grid((1920, 1080), (640, 384))
+    assert len(result.tiles) == len(tiles)
+    assert result.boxes.shape == (len(result), 4)
+    assert detector.stats.tiles == len(tiles)
@@ -127,6 +127,31 @@ def test_mask_basic():
     assert repr(m) == "Mask(width=5, height=3)"
 
 
+def test_mask_numpy():
+    """Test zero-copy NumPy access to Mask values"""
+    m = Mask(5, 3)
+    m.set_value(row=1, col=2, val=9.5)
+
+    # Buffer protocol
+    arr = np.asarray(m)
+    assert arr.shape == (3, 5)
+    assert arr.dtype == np.float32
+    assert not arr.flags.writeable
+    assert arr[1, 2] == pytest.approx(9.5)
+
+    # Views share the mask memory
+    view = m.to_numpy()
+    m.set_value(row=2, col=4, val=0.25)
+    assert view[2, 4] == pytest.approx(0.25)
+    assert np.array_equal(view.ravel(), np.array(m.buffer(), dtype=np.float32))
+
+    # The view keeps the mask alive
+    del m
+    assert view[1, 2] == pytest.approx(9.5)
+
+    assert np.asarray(Mask(0, 0)).shape == (0, 0)
+
+
 def test_rect_basic():
     """Test Rect class"""
     # Default constructor (empty rect)
@@ -6,7 +6,7 @@ import numpy as np
 
 from synap.types import DataType, Layout, Shape
 
-__all__ = ["get_model_metadata"]
+__all__ = ["get_model_metadata", "write_model_archive"]
 
 _MODEL_META_FILE = "0/model.json"
 
@@ -78,6 +78,15 @@ def get_model_metadata(model: str) -> tuple[dict, dict]:
     except (NotImplementedError, ValueError) as e:
         raise RuntimeError(f"Error: Invalid SyNAP model '{model}': {e.args[0]}")
 
+def write_model_archive(path, metadata: dict) -> str:
+    """
+    Write a model archive with the given metadata and a dummy model, for replay networks
+    """
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(_MODEL_META_FILE, json.dumps(metadata))
+        archive.writestr("0/model.nb", b"\0" * 16)
+    return str(path)
+
 def get_random_numpy_data(shape: Shape, data_type: DataType, scale: float = 1, zero_point: int = 0):
     data = (np.random.rand(*shape) * 255).astype(data_type.np_type())
     deq_data = (data.astype(np.float32) - zero_point) * scale